@@ -1,9 +1,12 @@
 from typing import Any, Dict, List, Text
+from datetime import date
 from rasa_sdk import Action, Tracker, FormValidationAction
 from rasa_sdk.executor import CollectingDispatcher
 from rasa_sdk.events import SlotSet, AllSlotsReset, FollowupAction
 from rasa_sdk.types import DomainDict
-from .appointment_manager import AppointmentManager
+from .appointment_manager import AppointmentManager, RequestContext
+from .clinic_calendar import clinic_calendar
+from .instrumentation import report_error
 import json
 
 appointment_mgr = AppointmentManager()
@@ -38,6 +41,14 @@ def _extract_user_id_from_tracker(tracker: Tracker) -> int:
         print(f"Error extracting user ID: {e}")
         raise ValueError("Could not extract user ID from session")
 
+def _ask_for_another_slot(slots: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    """Keep the doctor and reason, clear the taken date/time and reopen
+    the form so the user can pick one of the suggested slots"""
+    events = [SlotSet(k, slots[k]) for k in ("doctor_name", "reason") if slots.get(k) is not None]
+    events += [SlotSet("date", None), SlotSet("time", None), FollowupAction("appointment_form")]
+    return events
+
+
 class ActionBookAppointment(Action):
     def name(self) -> Text:
         return "action_book_appointment"
@@ -46,9 +57,8 @@ class ActionBookAppointment(Action):
         self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]
     ) -> List[Dict[Text, Any]]:
         try:
-            # Extract and set user ID from tracker
+            # Extract user ID from tracker; it is passed with every call
             user_id = _extract_user_id_from_tracker(tracker)
-            appointment_mgr.set_user_id(user_id)
             
             # Get entities from current message
             entities = tracker.latest_message.get("entities", [])
@@ -76,7 +86,7 @@ class ActionBookAppointment(Action):
             final_slots = {**existing_slots, **current_slots}
             
             # Try to create appointment
-            result = appointment_mgr.create_appointment(final_slots)
+            result = await appointment_mgr.create_appointment(final_slots, user_id)
             
             if result["success"]:
                 dispatcher.utter_message(text=result["message"])
@@ -95,11 +105,16 @@ class ActionBookAppointment(Action):
                     
                     dispatcher.utter_message(text=result["message"])
                     return slot_events
+                elif "alternatives" in result:
+                    # Slot taken or unavailable; the message lists free ones
+                    dispatcher.utter_message(text=result["message"])
+                    return _ask_for_another_slot(final_slots)
                 else:
                     dispatcher.utter_message(text=result["message"])
                     return [AllSlotsReset()]
 
         except Exception as e:
+            report_error(e)
             dispatcher.utter_message(text=f"Sorry, I couldn't book your appointment: {str(e)}")
             return [AllSlotsReset()]
 
@@ -107,7 +122,7 @@ class ValidateAppointmentForm(FormValidationAction):
     def name(self) -> Text:
         return "validate_appointment_form"
 
-    def validate_date(
+    async def validate_date(
         self,
         slot_value: Any,
         dispatcher: CollectingDispatcher,
@@ -117,8 +132,11 @@ class ValidateAppointmentForm(FormValidationAction):
         """Validate date slot."""
         try:
             if slot_value:
-                normalized_date = appointment_mgr._normalize_date(slot_value)
+                hours = await clinic_calendar.opening_hours()
+                normalized_date = appointment_mgr._normalize_date(slot_value, hours)
                 if normalized_date:
+                    # Holidays come from the clinic calendar, not the parser
+                    await clinic_calendar.check_day(date.fromisoformat(normalized_date))
                     return {"date": normalized_date}
         except ValueError as e:
             dispatcher.utter_message(text=str(e))
@@ -127,7 +145,7 @@ class ValidateAppointmentForm(FormValidationAction):
         dispatcher.utter_message(text="Please provide a valid date (e.g., tomorrow, Friday)")
         return {"date": None}
 
-    def validate_time(
+    async def validate_time(
         self,
         slot_value: Any,
         dispatcher: CollectingDispatcher,
@@ -139,7 +157,8 @@ class ValidateAppointmentForm(FormValidationAction):
             if slot_value:
                 # Get the date from the tracker to validate working hours
                 date_slot = tracker.get_slot("date")
-                normalized_time = appointment_mgr._normalize_time(slot_value, date_slot)
+                hours = await clinic_calendar.opening_hours()
+                normalized_time = appointment_mgr._normalize_time(slot_value, date_slot, hours)
                 if normalized_time:
                     return {"time": normalized_time}
         except ValueError as e:
@@ -149,7 +168,7 @@ class ValidateAppointmentForm(FormValidationAction):
         dispatcher.utter_message(text="Please provide a valid time (e.g., 2 PM, 14:00)")
         return {"time": None}
 
-    def validate_doctor_name(
+    async def validate_doctor_name(
         self,
         slot_value: Any,
         dispatcher: CollectingDispatcher,
@@ -162,14 +181,14 @@ class ValidateAppointmentForm(FormValidationAction):
             intent = tracker.latest_message.get("intent", {}).get("name")
             if intent == "provide_doctor":
                 # Allow doctor changes during the form
-                normalized_doctor = appointment_mgr._normalize_doctor_name(slot_value)
+                normalized_doctor = await appointment_mgr._normalize_doctor_name(slot_value)
                 if normalized_doctor:
                     dispatcher.utter_message(text=f"I'll update your appointment to see {normalized_doctor}")
                     return {"doctor_name": normalized_doctor}
             
             # Normal validation
             if slot_value:
-                normalized_doctor = appointment_mgr._normalize_doctor_name(slot_value)
+                normalized_doctor = await appointment_mgr._normalize_doctor_name(slot_value)
                 if normalized_doctor:
                     return {"doctor_name": normalized_doctor}
         except ValueError as e:
@@ -228,9 +247,8 @@ class ActionSubmitAppointmentForm(Action):
         self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]
     ) -> List[Dict[Text, Any]]:
         try:
-            # Extract and set user ID from tracker
+            # Extract user ID from tracker; it is passed with every call
             user_id = _extract_user_id_from_tracker(tracker)
-            appointment_mgr.set_user_id(user_id)
             
             # Get all slots
             slots = {
@@ -241,7 +259,7 @@ class ActionSubmitAppointmentForm(Action):
             }
             
             # Create appointment
-            result = appointment_mgr.create_appointment(slots)
+            result = await appointment_mgr.create_appointment(slots, user_id)
             
             if result["success"]:
                 dispatcher.utter_message(text=result["message"])
@@ -249,11 +267,15 @@ class ActionSubmitAppointmentForm(Action):
                     SlotSet("appointment_id", result["appointment"]["id"]),
                     AllSlotsReset()
                 ]
+            elif "alternatives" in result:
+                dispatcher.utter_message(text=result["message"])
+                return _ask_for_another_slot(slots)
             else:
                 dispatcher.utter_message(text=result["message"])
                 return [AllSlotsReset()]
                 
         except Exception as e:
+            report_error(e)
             dispatcher.utter_message(text=f"Sorry, I couldn't complete your appointment booking: {str(e)}")
             return [AllSlotsReset()]
 
@@ -266,11 +288,10 @@ class ActionViewAppointments(Action):
         self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]
     ) -> List[Dict[Text, Any]]:
         try:
-            # Extract and set user ID from tracker
+            # Extract user ID from tracker; it is passed with every call
             user_id = _extract_user_id_from_tracker(tracker)
-            appointment_mgr.set_user_id(user_id)
             
-            result = appointment_mgr.get_appointments()
+            result = await appointment_mgr.get_appointments(user_id=user_id)
             
             if result["success"] and result["appointments"]:
                 message_lines = ["📅 Your Appointments:"]
@@ -287,6 +308,7 @@ class ActionViewAppointments(Action):
             dispatcher.utter_message(text=message)
             return []
         except Exception as e:
+            report_error(e)
             dispatcher.utter_message(text=f"Sorry, I couldn't retrieve your appointments: {str(e)}")
             return []
 
@@ -299,39 +321,37 @@ class ActionCancelAppointment(Action):
         self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]
     ) -> List[Dict[Text, Any]]:
         try:
-            # Extract and set user ID from tracker
+            # Extract user ID from tracker; it is passed with every call
             user_id = _extract_user_id_from_tracker(tracker)
-            appointment_mgr.set_user_id(user_id)
             
-            # Get appointments from database
-            result = appointment_mgr.get_appointments()
+            # One context per run: the appointment is read once, joined with
+            # its doctor, and the cancellation reuses that row
+            context = RequestContext(user_id)
+            result = await appointment_mgr.get_scheduled_appointments(limit=1, context=context)
+            if not result["success"]:
+                raise ValueError(result["message"])
             
-            if result["success"] and result["appointments"]:
-                # Get the most recent appointment to cancel
-                active_appointments = [apt for apt in result["appointments"] if apt["status"] == "scheduled"]
+            if result["appointments"]:
+                # For simplicity, cancel the most recent appointment
+                # In a real system, you'd ask which specific appointment to cancel
+                latest_apt = result["appointments"][0]
                 
-                if active_appointments:
-                    # For simplicity, cancel the most recent appointment
-                    # In a real system, you'd ask which specific appointment to cancel
-                    latest_apt = active_appointments[0]
-                    
-                    # Cancel the appointment
-                    cancel_result = appointment_mgr.cancel_appointment(latest_apt["id"])
-                    
-                    if cancel_result["success"]:
-                        dispatcher.utter_message(
-                            text=f"✅ Your appointment on {latest_apt['date']} at {latest_apt['time']} with {latest_apt['doctor']} has been cancelled."
-                        )
-                    else:
-                        dispatcher.utter_message(text=f"❌ Sorry, I couldn't cancel your appointment: {cancel_result['message']}")
+                # Cancel the appointment
+                cancel_result = await appointment_mgr.cancel_appointment(latest_apt["id"], context=context)
+                
+                if cancel_result["success"]:
+                    dispatcher.utter_message(
+                        text=f"✅ Your appointment on {latest_apt['date']} at {latest_apt['time']} with {latest_apt['doctor']} has been cancelled."
+                    )
                 else:
-                    dispatcher.utter_message(text="📅 You have no active appointments to cancel.")
+                    dispatcher.utter_message(text=f"❌ Sorry, I couldn't cancel your appointment: {cancel_result['message']}")
             else:
-                dispatcher.utter_message(text="📅 You have no appointments to cancel.")
+                dispatcher.utter_message(text="📅 You have no active appointments to cancel.")
             
             return []
                 
         except Exception as e:
+            report_error(e)
             dispatcher.utter_message(text=f"Sorry, I couldn't cancel your appointment: {str(e)}")
             return []
 
@@ -344,48 +364,46 @@ class ActionModifyAppointment(Action):
         self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]
     ) -> List[Dict[Text, Any]]:
         try:
-            # Extract and set user ID from tracker
+            # Extract user ID from tracker; it is passed with every call
             user_id = _extract_user_id_from_tracker(tracker)
-            appointment_mgr.set_user_id(user_id)
             
-            # Get appointments from database
-            result = appointment_mgr.get_appointments()
+            # One context per run: the appointment is read once, joined with
+            # its doctor, and the update reuses that row
+            context = RequestContext(user_id)
+            result = await appointment_mgr.get_scheduled_appointments(limit=1, context=context)
+            if not result["success"]:
+                raise ValueError(result["message"])
             
-            if result["success"] and result["appointments"]:
-                # Get the most recent appointment to modify
-                active_appointments = [apt for apt in result["appointments"] if apt["status"] == "scheduled"]
+            if result["appointments"]:
+                latest_apt = result["appointments"][0]
                 
-                if active_appointments:
-                    latest_apt = active_appointments[0]
-            
-                    # Get entities from current message for modification
-                    entities = tracker.latest_message.get("entities", [])
-                    modifications = {}
-                    
-                    for entity in entities:
-                        if entity["entity"] in ["date", "time", "doctor_name", "reason"]:
-                            modifications[entity["entity"]] = entity["value"]
+                # Get entities from current message for modification
+                entities = tracker.latest_message.get("entities", [])
+                modifications = {}
+                
+                for entity in entities:
+                    if entity["entity"] in ["date", "time", "doctor_name", "reason"]:
+                        modifications[entity["entity"]] = entity["value"]
+                
+                if modifications:
+                    # Apply modifications
+                    modify_result = await appointment_mgr.modify_appointment(latest_apt["id"], modifications, context=context)
                     
-                    if modifications:
-                        # Apply modifications
-                        modify_result = appointment_mgr.modify_appointment(latest_apt["id"], modifications)
-                        
-                        if modify_result["success"]:
-                            dispatcher.utter_message(text=modify_result["message"])
-                        else:
-                            dispatcher.utter_message(text=f"❌ Sorry, I couldn't modify your appointment: {modify_result['message']}")
+                    if modify_result["success"]:
+                        dispatcher.utter_message(text=modify_result["message"])
                     else:
-                        # No specific modifications provided, ask what they want to change
-                        dispatcher.utter_message(
-                            text=f"What would you like to change about your appointment on {latest_apt['date']} at {latest_apt['time']} with {latest_apt['doctor']}?"
-                        )
+                        dispatcher.utter_message(text=f"❌ Sorry, I couldn't modify your appointment: {modify_result['message']}")
                 else:
-                    dispatcher.utter_message(text="📅 You have no active appointments to modify.")
+                    # No specific modifications provided, ask what they want to change
+                    dispatcher.utter_message(
+                        text=f"What would you like to change about your appointment on {latest_apt['date']} at {latest_apt['time']} with {latest_apt['doctor']}?"
+                    )
             else:
-                dispatcher.utter_message(text="📅 You have no appointments to modify.")
+                dispatcher.utter_message(text="📅 You have no active appointments to modify.")
             
             return []
             
         except Exception as e:
+            report_error(e)
             dispatcher.utter_message(text=f"Sorry, I couldn't modify your appointment: {str(e)}")
             return []
\ No newline at end of file
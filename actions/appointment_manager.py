@@ -1,8 +1,99 @@
 import json
+import logging
 import re
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import Dict, List, Optional, Any
-from .db_connect import db_manager
+from .db_async import async_db_manager
+from .db_connect import DuplicateKeyError
+from .doctor_directory import doctor_directory, with_title
+from .clinic_calendar import SlotUnavailableError, clinic_calendar, format_slot_suggestions
+from .datetime_parser import OPENING_HOURS, check_opening_hours, normalize_date, normalize_time
+from .response_cache import bump_data_versions
+
+logger = logging.getLogger(__name__)
+
+# Appointment rows come with their doctor's name from one joined query
+APPOINTMENT_QUERY = """
+    SELECT a.*, d.name as doctor_name
+    FROM appointments a
+    LEFT JOIN doctors d ON a.doctor_id = d.id
+"""
+
+
+class RequestContext:
+    """Database state one request needs, fetched at most once.
+
+    An action run creates one context and passes it to every
+    AppointmentManager call it makes: the user is resolved once and an
+    appointment read once (joined with its doctor) is reused by the later
+    steps instead of being queried again. Writes update the cached rows, so
+    the context must not outlive the request.
+    """
+
+    def __init__(self, user_id: Optional[int] = None):
+        self._user_id = user_id
+        self._appointments: Dict[int, Optional[Dict[str, Any]]] = {}
+
+    async def user_id(self) -> int:
+        """The request's user, falling back to the first user in the database"""
+        if self._user_id:
+            return self._user_id
+
+        try:
+            query = "SELECT id FROM users ORDER BY id LIMIT 1"
+            result = await async_db_manager.execute_query(query)
+        except Exception as e:
+            raise ValueError(f"Error getting user context: {str(e)}")
+        if not result:
+            raise ValueError("No users found in database. Please create a user account first.")
+        self._user_id = result[0]['id']
+        return self._user_id
+
+    async def appointment(self, appointment_id: int) -> Optional[Dict[str, Any]]:
+        """One of the user's appointments with its doctor name, or None"""
+        if appointment_id not in self._appointments:
+            query = APPOINTMENT_QUERY + " WHERE a.id = %s AND a.user_id = %s"
+            results = await async_db_manager.execute_query(query, (appointment_id, await self.user_id()))
+            self._appointments[appointment_id] = results[0] if results else None
+        return self._appointments[appointment_id]
+
+    async def data_changed(self):
+        """Bump the user's data version after a write, so the web server
+        rebuilds its cached dashboard responses (actions/response_cache.py)"""
+        try:
+            query, params = bump_data_versions([await self.user_id()])
+            await async_db_manager.execute_query(query, params, fetch=False)
+        except Exception as e:
+            # The write went through; cached responses expire on their own
+            logger.error(f"Could not bump the data version of user {self._user_id}: {str(e)}")
+
+    async def scheduled_appointments(self, limit: int = 1, upcoming: bool = False) -> List[Dict[str, Any]]:
+        """The user's scheduled appointments, latest first, or with `upcoming`
+        the next ones from now, soonest first; at most `limit` of them.
+
+        idx_appointments_user_status_date (user_id, status, appointment_date)
+        serves both orders, so the query reads about `limit` rows however
+        many cancelled or completed appointments the user has.
+        """
+        user_id = await self.user_id()
+        if upcoming:
+            query = APPOINTMENT_QUERY + """
+                WHERE a.user_id = %s AND a.status = 'scheduled' AND a.appointment_date >= %s
+                ORDER BY a.appointment_date ASC
+                LIMIT %s
+            """
+            params = (user_id, datetime.now(), limit)
+        else:
+            query = APPOINTMENT_QUERY + """
+                WHERE a.user_id = %s AND a.status = 'scheduled'
+                ORDER BY a.appointment_date DESC
+                LIMIT %s
+            """
+            params = (user_id, limit)
+
+        rows = await async_db_manager.execute_query(query, params)
+        # Later steps of the request reuse the rows already read
+        return [self._appointments.setdefault(row['id'], row) for row in rows]
 
 
 class AppointmentManager:
@@ -10,12 +101,11 @@ class AppointmentManager:
         self.appointments = {}
         self.next_id = 1
         # Removed hardcoded doctors list - now validating against database
-        # For now, we'll use a default user_id. In a real implementation, 
-        # this would come from the user session/context
+        # User context is not stored here: one instance serves every
+        # conversation, so each call receives the user_id it acts for
         self.default_user_id = 1
-        self.current_user_id = None
 
-    def handle_rasa_intent(self, rasa_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def handle_rasa_intent(self, rasa_data: Dict[str, Any], user_id: Optional[int] = None) -> Dict[str, Any]:
         """Handle Rasa-parsed appointment intent"""
         intent_name = rasa_data["intent"]["name"]
         entities = rasa_data["entities"]
@@ -29,13 +119,13 @@ class AppointmentManager:
         print(f"DEBUG - Slots: {slots}")
 
         if intent_name == "book_appointment":
-            return self.create_appointment(slots)
+            return await self.create_appointment(slots, user_id)
         elif intent_name == "modify_appointment":
             return self.update_appointment(slots.get("appointment_id"), slots)
         elif intent_name == "cancel_appointment":
-            return self.cancel_appointment(slots.get("appointment_id"))
+            return await self.cancel_appointment(slots.get("appointment_id"), user_id)
         elif intent_name == "view_appointments":
-            return self.get_appointments(slots)
+            return await self.get_appointments(slots, user_id)
         else:
             raise ValueError(f"Unsupported intent: {intent_name}")
 
@@ -52,66 +142,46 @@ class AppointmentManager:
 
         return slots
 
-    def set_user_id(self, user_id: int):
-        """Set the current user ID for appointments"""
-        self.current_user_id = user_id
-
-    def _get_user_id(self) -> int:
-        """Get the current user ID, fallback to first available user if not set"""
-        if self.current_user_id:
-            return self.current_user_id
-        
-        # If no user_id is set, try to get the first available user from database
-        try:
-            query = "SELECT id FROM users ORDER BY id LIMIT 1"
-            result = db_manager.execute_query(query)
-            if result:
-                return result[0]['id']
-            else:
-                raise ValueError("No users found in database. Please create a user account first.")
-        except Exception as e:
-            raise ValueError(f"Error getting user context: {str(e)}")
-
-    def _get_doctor_id(self, doctor_name: str) -> int:
-        """Get doctor ID from database by name"""
+    async def _find_doctor(self, doctor_input: str) -> Dict[str, Any]:
+        """Doctor row for a (partial) name, "Dr." prefix optional; ValueError if unknown"""
+        doctor_name = re.sub(r'^(dr\.?|doctor)\s+', '', doctor_input.strip(), flags=re.IGNORECASE)
         try:
-            # Remove Dr. prefix if present for database lookup
-            clean_name = re.sub(r'^(dr\.?|doctor)\s+', '', doctor_name.strip(), flags=re.IGNORECASE)
-            
-            query = "SELECT id FROM doctors WHERE name LIKE %s"
-            results = db_manager.execute_query(query, (f"%{clean_name}%",))
-            
-            if results:
-                return results[0]['id']
-            else:
-                raise ValueError(f"Doctor not found in database: {clean_name}")
+            doctor = await doctor_directory.find(doctor_name)
         except Exception as e:
-            raise ValueError(f"Error finding doctor: {str(e)}")
+            raise ValueError(f"Error validating doctor: {str(e)}")
+        if not doctor:
+            raise ValueError(f"Error validating doctor: Unknown doctor: {doctor_name}")
+        return doctor
 
-    def _normalize_doctor_name(self, doctor_input: str) -> str:
-        """Normalize doctor name with validation against database"""
+    async def _normalize_doctor_name(self, doctor_input: str) -> str:
+        """Normalize doctor name with validation against the doctor directory"""
         if not doctor_input:
             return None
 
-        # Remove any existing prefix
-        doctor_name = re.sub(r'^(dr\.?|doctor)\s+', '', doctor_input.strip(), flags=re.IGNORECASE)
-        
-        # Check if doctor exists in database
-        try:
-            query = "SELECT name FROM doctors WHERE name LIKE %s"
-            results = db_manager.execute_query(query, (f"%{doctor_name}%",))
-            
-            if results:
-                # Return the actual doctor name from database (already includes Dr. prefix)
-                doctor_name = results[0]['name']
-                if doctor_name.startswith('Dr.'):
-                    return doctor_name
-                else:
-                    return f"Dr. {doctor_name}"
-            else:
-                raise ValueError(f"Unknown doctor: {doctor_name}")
-        except Exception as e:
-            raise ValueError(f"Error validating doctor: {str(e)}")
+        # Return the actual doctor name from the directory with a Dr. prefix
+        doctor = await self._find_doctor(doctor_input)
+        return with_title(doctor['name'])
+
+    def _slot_unavailable(self, error: SlotUnavailableError) -> Dict[str, Any]:
+        """Failure response for a rejected slot, offering the next free ones"""
+        message = str(error)
+        if error.alternatives:
+            message += f"\n🕒 Next available: {format_slot_suggestions(error.alternatives)}"
+        return {
+            "success": False,
+            "message": message,
+            "alternatives": [slot.strftime("%Y-%m-%d %H:%M") for slot in error.alternatives]
+        }
+
+    async def _slot_taken(self, doctor_id: int, start: datetime) -> Dict[str, Any]:
+        """Failure response when the database's unique slot key rejects a
+        write: another server process booked the slot first. The slot stays
+        marked as booked in the calendar."""
+        clinic_calendar.confirm(doctor_id, start)
+        alternatives = await clinic_calendar.next_free_slots(doctor_id, start, count=3)
+        return self._slot_unavailable(
+            SlotUnavailableError("The doctor already has an appointment at that time.", alternatives)
+        )
 
     def _normalize_reason(self, reason: str) -> str:
         """Normalize and validate reason for visit"""
@@ -124,8 +194,10 @@ class AppointmentManager:
             
         return reason
 
-    def create_appointment(self, slots: Dict[str, Any]) -> Dict[str, Any]:
+    async def create_appointment(self, slots: Dict[str, Any], user_id: Optional[int] = None,
+                                 context: Optional[RequestContext] = None) -> Dict[str, Any]:
         """Create appointment from slots with validation"""
+        context = context or RequestContext(user_id)
         try:
             # Check if we have all required information
             required_slots = ["date", "time", "doctor_name"]
@@ -138,10 +210,12 @@ class AppointmentManager:
                     "missing_slots": missing_slots
                 }
 
-            # Normalize all inputs
-            normalized_date = self._normalize_date(slots.get("date"))
-            normalized_time = self._normalize_time(slots.get("time"), normalized_date)
-            normalized_doctor = self._normalize_doctor_name(slots.get("doctor_name"))
+            # Normalize all inputs against the clinic's current hours
+            hours = await clinic_calendar.opening_hours()
+            normalized_date = self._normalize_date(slots.get("date"), hours)
+            normalized_time = self._normalize_time(slots.get("time"), normalized_date, hours)
+            doctor = await self._find_doctor(slots.get("doctor_name"))
+            normalized_doctor = with_title(doctor['name'])
             
             # Enhanced reason validation
             reason = slots.get("reason", "").strip()
@@ -161,24 +235,40 @@ class AppointmentManager:
                     "missing_slots": ["reason"]
                 }
 
-            # Get doctor ID from database
-            doctor_id = self._get_doctor_id(normalized_doctor)
+            doctor_id = doctor['id']
             
             # Combine date and time for database storage
             appointment_datetime = f"{normalized_date} {normalized_time}:00"
+            appointment_start = datetime.fromisoformat(appointment_datetime)
+            
+            # Hold the slot before writing so concurrent bookings in this
+            # process cannot take it
+            try:
+                await clinic_calendar.reserve(doctor_id, appointment_start)
+            except SlotUnavailableError as e:
+                return self._slot_unavailable(e)
             
-            # Save appointment to database
+            # Save appointment to database. The UNIQUE (booked_doctor_id,
+            # appointment_date) key makes the insert itself the final check,
+            # so only one booking wins even across processes.
             query = """
                 INSERT INTO appointments (user_id, doctor_id, appointment_date, reason, status) 
                 VALUES (%s, %s, %s, %s, %s)
             """
-            params = (self._get_user_id(), doctor_id, appointment_datetime, reason, "scheduled")
-            db_manager.execute_query(query, params, fetch=False)
+            try:
+                params = (await context.user_id(), doctor_id, appointment_datetime, reason, "scheduled")
+                result = await async_db_manager.execute_query(query, params, fetch=False)
+            except DuplicateKeyError:
+                return await self._slot_taken(doctor_id, appointment_start)
+            except Exception:
+                clinic_calendar.release(doctor_id, appointment_start)
+                raise
+            
+            clinic_calendar.confirm(doctor_id, appointment_start)
             
-            # Get the inserted appointment ID
-            get_id_query = "SELECT LAST_INSERT_ID() as id"
-            result = db_manager.execute_query(get_id_query)
-            appointment_id = result[0]['id']
+            # The insert reports the new appointment ID on the same connection
+            appointment_id = result.lastrowid
+            await context.data_changed()
 
             # Create appointment object for response
             appointment = {
@@ -214,10 +304,11 @@ class AppointmentManager:
                 "message": f"Error creating appointment: {str(e)}"
             }
 
-    def create_appointment_from_slots(self, tracker_slots: Dict[str, Any]) -> Dict[str, Any]:
+    async def create_appointment_from_slots(self, tracker_slots: Dict[str, Any], user_id: Optional[int] = None,
+                                            context: Optional[RequestContext] = None) -> Dict[str, Any]:
         """Create appointment using all slots from tracker (for form completion)"""
         # This method is called after form completion
-        return self.create_appointment(tracker_slots)
+        return await self.create_appointment(tracker_slots, user_id, context)
 
     def update_appointment(self, appointment_id: Optional[str], slots: Dict[str, Any]) -> Dict[str, Any]:
         """Update existing appointment"""
@@ -258,8 +349,10 @@ class AppointmentManager:
             "db_string": self._serialize_for_database(appointment)
         }
 
-    def cancel_appointment(self, appointment_id: Optional[str]) -> Dict[str, Any]:
+    async def cancel_appointment(self, appointment_id: Optional[str], user_id: Optional[int] = None,
+                                 context: Optional[RequestContext] = None) -> Dict[str, Any]:
         """Cancel appointment in database"""
+        context = context or RequestContext(user_id)
         try:
             if not appointment_id:
                 return {
@@ -268,31 +361,39 @@ class AppointmentManager:
                 }
 
             appt_id = int(appointment_id)
+            appointment = await context.appointment(appt_id)
             
-            # Get the appointment from database first
-            query = """
-                SELECT a.*, d.name as doctor_name 
-                FROM appointments a 
-                LEFT JOIN doctors d ON a.doctor_id = d.id 
-                WHERE a.id = %s AND a.user_id = %s
-            """
-            results = db_manager.execute_query(query, (appt_id, self._get_user_id()))
-            
-            if not results:
+            if not appointment:
                 return {
                     "success": False,
                     "message": f"Appointment with ID {appt_id} not found or you don't have permission to cancel it."
                 }
             
-            appointment = results[0]
+            if appointment["status"] != "scheduled":
+                return {
+                    "success": False,
+                    "message": f"Appointment with ID {appt_id} is already {appointment['status']}."
+                }
             
-            # Update the appointment status to cancelled
+            # The status condition makes the update its own check: of two
+            # concurrent cancellations only one changes the row
             update_query = """
                 UPDATE appointments 
                 SET status = 'cancelled'
-                WHERE id = %s AND user_id = %s
+                WHERE id = %s AND user_id = %s AND status = 'scheduled'
             """
-            db_manager.execute_query(update_query, (appt_id, self._get_user_id()), fetch=False)
+            result = await async_db_manager.execute_query(update_query, (appt_id, await context.user_id()), fetch=False)
+            
+            if not result.rowcount:
+                return {
+                    "success": False,
+                    "message": f"Appointment with ID {appt_id} is already cancelled."
+                }
+            appointment["status"] = "cancelled"
+            await context.data_changed()
+            
+            if appointment["appointment_date"]:
+                clinic_calendar.release(appointment["doctor_id"], appointment["appointment_date"])
             
             # Format the response
             date_str = appointment["appointment_date"].strftime("%Y-%m-%d") if appointment["appointment_date"] else "Unknown date"
@@ -316,26 +417,25 @@ class AppointmentManager:
                 "message": f"Error cancelling appointment: {str(e)}"
             }
 
-    def get_appointments(self, slots: Dict[str, Any] = None) -> Dict[str, Any]:
+    async def get_appointments(self, slots: Dict[str, Any] = None, user_id: Optional[int] = None,
+                               context: Optional[RequestContext] = None) -> Dict[str, Any]:
         """Get appointments from database with optional filters"""
         if slots is None:
             slots = {}
+        context = context or RequestContext(user_id)
 
         try:
             # Base query to get appointments with doctor names
-            query = """
-                SELECT a.*, d.name as doctor_name 
-                FROM appointments a 
-                LEFT JOIN doctors d ON a.doctor_id = d.id 
-                WHERE a.user_id = %s
-            """
-            params = [self._get_user_id()]
+            query = APPOINTMENT_QUERY + " WHERE a.user_id = %s"
+            params = [await context.user_id()]
 
             # Apply filters based on slots
             if slots.get("date"):
-                filter_date = self._normalize_date(slots["date"])
-                query += " AND DATE(a.appointment_date) = %s"
-                params.append(filter_date)
+                # A range on the bare column can use idx_appointments_user_date;
+                # DATE(a.appointment_date) = %s would scan every row of the user
+                day_start = datetime.fromisoformat(self._normalize_date(slots["date"]))
+                query += " AND a.appointment_date >= %s AND a.appointment_date < %s"
+                params.extend([day_start, day_start + timedelta(days=1)])
 
             if slots.get("doctor_name"):
                 query += " AND d.name LIKE %s"
@@ -347,21 +447,10 @@ class AppointmentManager:
 
             query += " ORDER BY a.appointment_date DESC"
 
-            results = db_manager.execute_query(query, params)
+            results = await async_db_manager.execute_query(query, params)
 
             # Convert database results to appointment format
-            appointments = []
-            for row in results:
-                appointment = {
-                    "id": row["id"],
-                    "date": row["appointment_date"].strftime("%Y-%m-%d") if row["appointment_date"] else None,
-                    "time": row["appointment_date"].strftime("%H:%M") if row["appointment_date"] else None,
-                    "doctor": row['doctor_name'] if row["doctor_name"] and row['doctor_name'].startswith('Dr.') else f"Dr. {row['doctor_name']}" if row["doctor_name"] else "Unknown Doctor",
-                    "reason": row["reason"],
-                    "status": row["status"],
-                    "created_at": row["created_at"].isoformat() if row["created_at"] else None
-                }
-                appointments.append(appointment)
+            appointments = [self._appointment_from_row(row) for row in results]
 
             return {
                 "success": True,
@@ -378,6 +467,41 @@ class AppointmentManager:
                 "message": f"Error retrieving appointments: {str(e)}"
             }
 
+    async def get_scheduled_appointments(self, user_id: Optional[int] = None, limit: int = 1, upcoming: bool = False,
+                                         context: Optional[RequestContext] = None) -> Dict[str, Any]:
+        """Get only the user's latest scheduled appointments, or with
+        `upcoming` the next ones, without loading their whole history"""
+        context = context or RequestContext(user_id)
+        try:
+            rows = await context.scheduled_appointments(limit, upcoming)
+            appointments = [self._appointment_from_row(row) for row in rows]
+            return {
+                "success": True,
+                "appointments": appointments,
+                "count": len(appointments),
+                "message": f"Found {len(appointments)} scheduled appointment(s)"
+            }
+
+        except Exception as e:
+            return {
+                "success": False,
+                "appointments": [],
+                "count": 0,
+                "message": f"Error retrieving appointments: {str(e)}"
+            }
+
+    def _appointment_from_row(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Appointment in response format from a row of APPOINTMENT_QUERY"""
+        return {
+            "id": row["id"],
+            "date": row["appointment_date"].strftime("%Y-%m-%d") if row["appointment_date"] else None,
+            "time": row["appointment_date"].strftime("%H:%M") if row["appointment_date"] else None,
+            "doctor": row['doctor_name'] if row["doctor_name"] and row['doctor_name'].startswith('Dr.') else f"Dr. {row['doctor_name']}" if row["doctor_name"] else "Unknown Doctor",
+            "reason": row["reason"],
+            "status": row["status"],
+            "created_at": row["created_at"].isoformat() if row["created_at"] else None
+        }
+
     def _serialize_for_database(self, appointment: Dict[str, Any]) -> str:
         """Serialize appointment for database storage"""
         db_data = {
@@ -396,252 +520,151 @@ class AppointmentManager:
 
         return json.dumps(db_data)
 
-    def _normalize_date(self, date_input: str) -> str:
+    def _normalize_date(self, date_input: str, hours: tuple = OPENING_HOURS) -> str:
         """Normalize date to YYYY-MM-DD format"""
-        if not date_input:
-            return None
+        return normalize_date(date_input, hours=hours)
 
-        date_lower = date_input.lower().strip()
-        today = datetime.now().date()
-        
-        # Handle relative dates
-        if date_lower == "today":
-            target_date = today
-        elif date_lower == "tomorrow":
-            target_date = today + timedelta(days=1)
-        elif date_lower in ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]:
-            # Handle weekday names
-            weekdays = {
-                "monday": 0, "tuesday": 1, "wednesday": 2,
-                "thursday": 3, "friday": 4, "saturday": 5, "sunday": 6
-            }
-            
-            # Check if Sunday
-            if date_lower == "sunday":
-                raise ValueError("Sorry, we're closed on Sundays. Please choose Monday through Saturday.")
-            
-            days_ahead = weekdays[date_lower] - today.weekday()
-            if days_ahead <= 0:
-                days_ahead += 7
-            target_date = today + timedelta(days=days_ahead)
-        else:
-            # Try parsing as YYYY-MM-DD
-            try:
-                target_date = datetime.strptime(date_input, "%Y-%m-%d").date()
-                if target_date < today:
-                    raise ValueError("Please choose a future date.")
-            except ValueError:
-                raise ValueError("Please enter a valid date (like 'tomorrow', 'Friday'').")
-        
-        # Check if the target date is a Sunday
-        if target_date.weekday() == 6:  # Sunday
-            raise ValueError("Sorry, we're closed on Sundays. Please choose Monday through Saturday.")
-            
-        return target_date.isoformat()
-
-    def _check_working_hours(self, date_str: str, time_str: str) -> bool:
-        """Check if the appointment time is within working hours"""
+    def _check_working_hours(self, date_str: str, time_str: str, hours: tuple = OPENING_HOURS) -> bool:
+        """Check if the appointment time (HH:MM) is within working hours"""
         try:
-            appointment_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-            appointment_time = datetime.strptime(time_str, "%H:%M").time()
-            
-            # Get day of week (0=Monday, 6=Sunday)
-            day_of_week = appointment_date.weekday()
-            
-            # Working hours
-            if day_of_week == 6:  # Sunday
-                raise ValueError("Sorry, we're closed on Sundays. Please choose Monday through Saturday.")
-            elif day_of_week == 5:  # Saturday
-                # Saturday appointments: 9:00 AM - 1:30 PM (clinic closes at 2:00 PM)
-                start_time = datetime.strptime("09:00", "%H:%M").time()
-                end_time = datetime.strptime("13:30", "%H:%M").time()
-                if not (start_time <= appointment_time <= end_time):
-                    raise ValueError("Saturday appointments are available from 9:00 AM to 1:30 PM. Please choose a time within these hours.")
-            else:  # Monday-Friday
-                # Weekday appointments: 8:00 AM - 5:30 PM (clinic closes at 6:00 PM)
-                start_time = datetime.strptime("08:00", "%H:%M").time()
-                end_time = datetime.strptime("17:30", "%H:%M").time()
-                if not (start_time <= appointment_time <= end_time):
-                    raise ValueError("Weekday appointments are available from 8:00 AM to 5:30 PM. Please choose a time within these hours.")
-            
+            check_opening_hours(date.fromisoformat(date_str), int(time_str[:2]), int(time_str[3:5]), hours)
             return True
-            
         except ValueError:
             raise  # Re-raise ValueError for working hours violations
         except Exception as e:
             raise ValueError(f"Error checking working hours: {str(e)}")
 
-    def _normalize_time(self, time_input: str, date_str: str = None) -> str:
+    def _normalize_time(self, time_input: str, date_str: str = None, hours: tuple = OPENING_HOURS) -> str:
         """Normalize time to HH:MM format and validate working hours"""
-        if not time_input:
-            return None
-
-        time_input = time_input.strip().lower()
-        
-        try:
-            # Pattern 1: "3 PM", "3PM", "3 am", "3am", "8:am", "8:pm", "3", "8" 
-            match = re.match(r'^(\d{1,2}):?\s*(pm|am)?$', time_input)
-            if match:
-                hours = int(match.group(1))
-                period = match.group(2) or "am"  # Default to AM if not specified
-                
-                if period == "pm" and hours != 12:
-                    hours += 12
-                elif period == "am" and hours == 12:
-                    hours = 0
-                
-                if not (0 <= hours <= 23):
-                    raise ValueError("Please enter a valid hour (like 8 AM, 2 PM, or 14:00).")
-                
-                normalized_time = f"{hours:02d}:00"
-                
-                # Check working hours if date is provided
-                if date_str:
-                    self._check_working_hours(date_str, normalized_time)
-                
-                return normalized_time
-            
-            # Pattern 2: "3:30 PM", "3:30PM"
-            match = re.match(r'^(\d{1,2}):(\d{2})\s*(pm|am)?$', time_input)
-            if match:
-                hours = int(match.group(1))
-                minutes = int(match.group(2))
-                period = match.group(3) or "am"
-                
-                if period == "pm" and hours != 12:
-                    hours += 12
-                elif period == "am" and hours == 12:
-                    hours = 0
-                
-                if not (0 <= hours <= 23) or not (0 <= minutes <= 59):
-                    raise ValueError("Please enter a valid time (like 2:30 PM or 14:30).")
-                
-                normalized_time = f"{hours:02d}:{minutes:02d}"
-                
-                # Check working hours if date is provided
-                if date_str:
-                    self._check_working_hours(date_str, normalized_time)
-                
-                return normalized_time
-            
-            # Pattern 3: "14:30", "16:00"
-            match = re.match(r'^(\d{1,2}):(\d{2})$', time_input)
-            if match:
-                hours = int(match.group(1))
-                minutes = int(match.group(2))
-                
-                if not (0 <= hours <= 23) or not (0 <= minutes <= 59):
-                    raise ValueError("Please enter a valid time (like 2:30 PM or 14:30).")
-                
-                normalized_time = f"{hours:02d}:{minutes:02d}"
-                
-                # Check working hours if date is provided
-                if date_str:
-                    self._check_working_hours(date_str, normalized_time)
-                
-                return normalized_time
-            
-            raise ValueError("Please enter a valid time format (like 2 PM, 14:00, or 2:30 PM).")
-            
-        except ValueError:
-            raise  # Re-raise ValueError with user-friendly message
-        except Exception as e:
-            raise ValueError("Please enter a valid time format (like 2 PM, 14:00, or 2:30 PM).")
+        return normalize_time(time_input, date_str, hours)
 
-    def modify_appointment(self, appointment_id: int, modifications: Dict[str, Any]) -> Dict[str, Any]:
+    async def modify_appointment(self, appointment_id: int, modifications: Dict[str, Any], user_id: Optional[int] = None,
+                                 context: Optional[RequestContext] = None) -> Dict[str, Any]:
         """Modify an existing appointment"""
+        context = context or RequestContext(user_id)
         try:
-            # Get the appointment from database
-            query = """
-                SELECT a.*, d.name as doctor_name 
-                FROM appointments a 
-                LEFT JOIN doctors d ON a.doctor_id = d.id 
-                WHERE a.id = %s AND a.user_id = %s
-            """
-            results = db_manager.execute_query(query, (appointment_id, self._get_user_id()))
+            appointment = await context.appointment(appointment_id)
             
-            if not results:
+            if not appointment:
                 return {
                     "success": False,
                     "message": "Appointment not found or you don't have permission to modify it."
                 }
             
-            appointment = results[0]
             update_fields = []
             update_params = []
+            hours = await clinic_calendar.opening_hours()
+            new_start = None
+            new_doctor = None
+            new_doctor_id = appointment["doctor_id"]
+            new_reason = None
             
             # Handle date modification
             if "date" in modifications:
                 try:
-                    new_date = self._normalize_date(modifications["date"])
+                    new_date = self._normalize_date(modifications["date"], hours)
                     # Get existing time or new time if it was also modified
                     if "time" in modifications:
-                        target_time = self._normalize_time(modifications["time"], new_date)
+                        target_time = self._normalize_time(modifications["time"], new_date, hours)
                     else:
                         existing_time = appointment["appointment_date"].strftime("%H:%M") if appointment["appointment_date"] else "09:00"
                         # Validate existing time with new date
-                        self._check_working_hours(new_date, existing_time)
+                        self._check_working_hours(new_date, existing_time, hours)
                         target_time = existing_time
                     
-                    new_datetime = f"{new_date} {target_time}"
-                    update_fields.append("appointment_date = %s")
-                    update_params.append(new_datetime)
+                    new_start = datetime.fromisoformat(f"{new_date} {target_time}")
                 except ValueError as e:
                     return {"success": False, "message": f"Invalid date: {str(e)}"}
             
             # Handle time modification
-            if "time" in modifications:
+            elif "time" in modifications:
                 try:
-                    # Get the existing date or use the new date if it was also modified
-                    if "date" in modifications:
-                        target_date = self._normalize_date(modifications["date"])
-                    else:
-                        target_date = appointment["appointment_date"].strftime("%Y-%m-%d") if appointment["appointment_date"] else self._normalize_date("tomorrow")
-                    
-                    new_time = self._normalize_time(modifications["time"], target_date)
-                    new_datetime = f"{target_date} {new_time}"
-                    update_fields.append("appointment_date = %s")
-                    update_params.append(new_datetime)
+                    target_date = appointment["appointment_date"].strftime("%Y-%m-%d") if appointment["appointment_date"] else self._normalize_date("tomorrow", hours)
+                    new_time = self._normalize_time(modifications["time"], target_date, hours)
+                    new_start = datetime.fromisoformat(f"{target_date} {new_time}")
                 except ValueError as e:
                     return {"success": False, "message": f"Invalid time: {str(e)}"}
             
+            if new_start is not None:
+                update_fields.append("appointment_date = %s")
+                update_params.append(new_start.strftime("%Y-%m-%d %H:%M"))
+            
             # Handle doctor modification
             if "doctor_name" in modifications:
                 try:
-                    normalized_doctor = self._normalize_doctor_name(modifications["doctor_name"])
-                    doctor_id = self._get_doctor_id(normalized_doctor)
+                    new_doctor = await self._find_doctor(modifications["doctor_name"])
+                    new_doctor_id = new_doctor["id"]
                     update_fields.append("doctor_id = %s")
-                    update_params.append(doctor_id)
+                    update_params.append(new_doctor_id)
                 except ValueError as e:
                     return {"success": False, "message": f"Invalid doctor: {str(e)}"}
             
             # Handle reason modification
             if "reason" in modifications:
-                normalized_reason = self._normalize_reason(modifications["reason"])
+                new_reason = self._normalize_reason(modifications["reason"])
                 update_fields.append("reason = %s")
-                update_params.append(normalized_reason)
+                update_params.append(new_reason)
             
             if not update_fields:
                 return {"success": False, "message": "No valid modifications provided."}
             
-            # Update the appointment
+            # Update the appointment. The status condition makes the update
+            # its own check when it was cancelled since it was read.
             update_query = f"""
                 UPDATE appointments 
                 SET {', '.join(update_fields)}, updated_at = NOW()
-                WHERE id = %s AND user_id = %s
+                WHERE id = %s AND user_id = %s AND status = 'scheduled'
             """
-            update_params.extend([appointment_id, self._get_user_id()])
-            
-            db_manager.execute_query(update_query, update_params, fetch=False)
+            update_params.extend([appointment_id, await context.user_id()])
+            
+            # A new time or doctor needs a free slot; the appointment's own
+            # slot does not count as a conflict when it only moves
+            old_start = appointment["appointment_date"]
+            moved = new_start is not None or new_doctor_id != appointment["doctor_id"]
+            if moved:
+                new_start = new_start or old_start
+                ignore = old_start if new_doctor_id == appointment["doctor_id"] else None
+                try:
+                    await clinic_calendar.reserve(new_doctor_id, new_start, ignore=ignore)
+                except SlotUnavailableError as e:
+                    return self._slot_unavailable(e)
             
-            # Get the updated appointment
-            updated_results = db_manager.execute_query(query, (appointment_id, self._get_user_id()))
-            updated_appointment = updated_results[0]
+            # A single statement is atomic on its own; every value it writes
+            # is known here, so the row is not read back
+            try:
+                result = await async_db_manager.execute_query(update_query, update_params, fetch=False)
+            except DuplicateKeyError:
+                return await self._slot_taken(new_doctor_id, new_start)
+            except Exception:
+                if moved:
+                    clinic_calendar.release(new_doctor_id, new_start)
+                raise
+            if not result.rowcount:
+                # Cancelled or deleted since it was read
+                if moved:
+                    clinic_calendar.release(new_doctor_id, new_start)
+                return {
+                    "success": False,
+                    "message": "Appointment not found or you don't have permission to modify it."
+                }
+            if moved:
+                clinic_calendar.confirm(new_doctor_id, new_start)
+                if old_start:
+                    clinic_calendar.release(appointment["doctor_id"], old_start)
+            await context.data_changed()
+            
+            if new_start is not None:
+                appointment["appointment_date"] = new_start
+            if new_doctor is not None:
+                appointment["doctor_id"] = new_doctor["id"]
+                appointment["doctor_name"] = new_doctor["name"]
+            if new_reason is not None:
+                appointment["reason"] = new_reason
             
             # Format response message
-            date_str = updated_appointment["appointment_date"].strftime("%Y-%m-%d") if updated_appointment["appointment_date"] else "Unknown date"
-            time_str = updated_appointment["appointment_date"].strftime("%H:%M") if updated_appointment["appointment_date"] else "Unknown time"
-            doctor_name = updated_appointment["doctor_name"] if updated_appointment["doctor_name"] else "Unknown doctor"
+            date_str = appointment["appointment_date"].strftime("%Y-%m-%d") if appointment["appointment_date"] else "Unknown date"
+            time_str = appointment["appointment_date"].strftime("%H:%M") if appointment["appointment_date"] else "Unknown time"
+            doctor_name = appointment["doctor_name"] if appointment["doctor_name"] else "Unknown doctor"
             
             # Remove "Dr." if it's already in the doctor name
             if doctor_name.startswith("Dr. "):
@@ -651,7 +674,7 @@ class AppointmentManager:
             
             return {
                 "success": True,
-                "message": f"✅ Appointment updated successfully!\n📅 {date_str} at {time_str}\n👨‍⚕️ {display_doctor}\n📝 Reason: {updated_appointment['reason']}"
+                "message": f"✅ Appointment updated successfully!\n📅 {date_str} at {time_str}\n👨‍⚕️ {display_doctor}\n📝 Reason: {appointment['reason']}"
             }
             
         except Exception as e:
@@ -0,0 +1,377 @@
+"""
+Bulk import of patients and medical records from CSV or NDJSON.
+
+Input is read as a stream and handled in chunks of IMPORT_CHUNK_SIZE rows:
+    1. every row is validated on its own (types, required fields, enums)
+    2. the chunk is checked against the database with one query per
+       constraint (existing emails, unknown patient/doctor ids)
+    3. the valid rows go in with one executemany() multi-row INSERT, and
+       the job's progress is updated in the same transaction
+
+A failed or interrupted import can be run again with the same job id: rows
+up to the last committed chunk are skipped. Invalid rows are reported with
+their line number and are not retried on resume.
+
+Imported patients get an unusable password; they cannot log in until a
+password is set for them.
+"""
+
+import csv
+import io
+import json
+import logging
+import re
+import time
+from collections import namedtuple
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .db_config import IMPORT_CONFIG
+from .response_cache import bump_data_versions
+
+logger = logging.getLogger(__name__)
+
+# No password hasher recognises this value, so login always fails
+UNUSABLE_PASSWORD = '!imported$'
+
+_EMAIL = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+RECORD_TYPES = ('diagnosis', 'treatment', 'test_result', 'prescription', 'note')
+SEXES = ('male', 'female', 'other')
+
+
+class BulkImportError(Exception):
+    """Raised when an import cannot start or continue (bad format, job mismatch)"""
+
+
+class RowError(ValueError):
+    """A single input row is invalid"""
+
+
+# How one kind of row is validated and stored. `validate` turns an input
+# dict into the INSERT parameters; `check_chunk` returns {index: message}
+# for rows that conflict with the database. `owner` is the position of the
+# user id in the parameters when the rows belong to a user's dashboard.
+ImportKind = namedtuple('ImportKind', ['table', 'columns', 'validate', 'check_chunk', 'owner'],
+                        defaults=[None])
+
+
+def _text(row: Dict[str, Any], field: str, max_length: int, required: bool = True) -> Optional[str]:
+    value = row.get(field)
+    value = '' if value is None else str(value).strip()
+    if not value:
+        if required:
+            raise RowError(f"{field} is required")
+        return None
+    if len(value) > max_length:
+        raise RowError(f"{field} is longer than {max_length} characters")
+    return value
+
+
+def _integer(row: Dict[str, Any], field: str, required: bool = True) -> Optional[int]:
+    value = row.get(field)
+    if value is None or str(value).strip() == '':
+        if required:
+            raise RowError(f"{field} is required")
+        return None
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        raise RowError(f"{field} must be a whole number")
+
+
+def validate_patient(row: Dict[str, Any]) -> tuple:
+    email = _text(row, 'email', 100).lower()
+    if not _EMAIL.match(email):
+        raise RowError("email is not a valid address")
+    sex = _text(row, 'sex', 10).lower()
+    if sex not in SEXES:
+        raise RowError(f"sex must be one of {', '.join(SEXES)}")
+    age = _integer(row, 'age')
+    if not 0 <= age <= 150:
+        raise RowError("age must be between 0 and 150")
+    return (
+        _text(row, 'first_name', 100),
+        _text(row, 'last_name', 100),
+        email,
+        UNUSABLE_PASSWORD,
+        sex,
+        age,
+        _text(row, 'phone', 20),
+    )
+
+
+def validate_record(row: Dict[str, Any]) -> tuple:
+    record_type = (_text(row, 'record_type', 20, required=False) or 'note').lower()
+    if record_type not in RECORD_TYPES:
+        raise RowError(f"record_type must be one of {', '.join(RECORD_TYPES)}")
+    try:
+        record_date = date.fromisoformat(_text(row, 'record_date', 10))
+    except ValueError:
+        raise RowError("record_date must be YYYY-MM-DD")
+    return (
+        _integer(row, 'patient_id'),
+        _integer(row, 'doctor_id', required=False),
+        record_type,
+        _text(row, 'title', 200),
+        _text(row, 'description', 65535, required=False) or '',
+        record_date,
+    )
+
+
+def _in_clause(values) -> str:
+    return ', '.join(['%s'] * len(values))
+
+
+def check_patients(db, rows: List[tuple]) -> Dict[int, str]:
+    """Reject emails already registered or repeated within the chunk"""
+    emails = sorted({row[2] for row in rows})
+    existing = {
+        found['email'].lower() for found in db.execute_query(
+            f"SELECT email FROM users WHERE email IN ({_in_clause(emails)})", emails
+        )
+    } if emails else set()
+
+    errors, seen = {}, set()
+    for index, row in enumerate(rows):
+        if row[2] in existing:
+            errors[index] = "email is already registered"
+        elif row[2] in seen:
+            errors[index] = "email appears more than once in this chunk"
+        seen.add(row[2])
+    return errors
+
+
+def check_records(db, rows: List[tuple]) -> Dict[int, str]:
+    """Reject records whose patient or doctor does not exist"""
+    patient_ids = sorted({row[0] for row in rows})
+    doctor_ids = sorted({row[1] for row in rows if row[1] is not None})
+    patients = {
+        found['id'] for found in db.execute_query(
+            f"SELECT id FROM users WHERE id IN ({_in_clause(patient_ids)})", patient_ids
+        )
+    } if patient_ids else set()
+    doctors = {
+        found['id'] for found in db.execute_query(
+            f"SELECT id FROM doctors WHERE id IN ({_in_clause(doctor_ids)})", doctor_ids
+        )
+    } if doctor_ids else set()
+
+    errors = {}
+    for index, row in enumerate(rows):
+        if row[0] not in patients:
+            errors[index] = f"patient_id {row[0]} does not exist"
+        elif row[1] is not None and row[1] not in doctors:
+            errors[index] = f"doctor_id {row[1]} does not exist"
+    return errors
+
+
+IMPORT_KINDS = {
+    'patients': ImportKind(
+        'users', ('first_name', 'last_name', 'email', 'password', 'sex', 'age', 'phone'),
+        validate_patient, check_patients,
+    ),
+    'records': ImportKind(
+        'medical_records', ('patient_id', 'doctor_id', 'record_type', 'title', 'description', 'record_date'),
+        validate_record, check_records, owner=0,
+    ),
+}
+
+
+def _csv_rows(stream: Iterable[str]) -> Iterator[Tuple[int, Any]]:
+    reader = csv.DictReader(stream)
+    for row in reader:
+        if None in row:
+            yield reader.line_num, RowError("row has more fields than the header")
+        else:
+            yield reader.line_num, row
+
+
+def _ndjson_rows(stream: Iterable[str]) -> Iterator[Tuple[int, Any]]:
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_number, RowError("line is not valid JSON")
+            continue
+        yield line_number, row if isinstance(row, dict) else RowError("line is not a JSON object")
+
+
+def read_rows(stream: Iterable[str], fmt: str) -> Iterator[Tuple[int, Any]]:
+    """Yield (line number, row) from CSV (with a header) or NDJSON text.
+
+    A row that cannot be parsed is yielded as a RowError instead of a dict.
+    """
+    if fmt == 'csv':
+        return _csv_rows(stream)
+    if fmt == 'ndjson':
+        return _ndjson_rows(stream)
+    raise BulkImportError(f"Unsupported format: {fmt} (use csv or ndjson)")
+
+
+def detect_format(filename: str) -> str:
+    lowered = (filename or '').lower()
+    if lowered.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    if lowered.endswith('.csv'):
+        return 'csv'
+    raise BulkImportError(f"Cannot tell the format of {filename}; pass csv or ndjson")
+
+
+class ImportReport:
+    """Counts, throughput and row errors of one import run"""
+
+    def __init__(self, job_id: str, max_errors: int):
+        self.job_id = job_id
+        self.max_errors = max_errors
+        self.rows_read = 0
+        self.rows_inserted = 0
+        self.rows_failed = 0
+        self.rows_skipped = 0   # already committed by an earlier run
+        self.chunks = 0
+        self.errors = []        # (line, message), first max_errors only
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def add_error(self, line: int, message: str):
+        self.rows_failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line, message))
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows_read / self.elapsed if self.elapsed else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'job_id': self.job_id,
+            'rows_read': self.rows_read,
+            'rows_inserted': self.rows_inserted,
+            'rows_failed': self.rows_failed,
+            'rows_skipped': self.rows_skipped,
+            'chunks': self.chunks,
+            'elapsed_seconds': round(self.elapsed, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+            'errors': [{'line': line, 'error': message} for line, message in self.errors],
+            'errors_truncated': self.rows_failed > len(self.errors),
+        }
+
+
+class BulkImporter:
+    """Streams rows into the database in validated, committed chunks"""
+
+    def __init__(self, db, chunk_size: Optional[int] = None, max_errors: Optional[int] = None,
+                 progress: Optional[Callable[[ImportReport], None]] = None):
+        self.db = db
+        self.chunk_size = chunk_size or IMPORT_CONFIG['chunk_size']
+        self.max_errors = IMPORT_CONFIG['max_reported_errors'] if max_errors is None else max_errors
+        self.progress = progress
+
+    def _start_job(self, job_id: str, kind: str) -> int:
+        """Register the job and return how many input rows it already committed"""
+        rows = self.db.execute_query(
+            "SELECT kind, rows_committed FROM import_jobs WHERE job_id = %s", (job_id,)
+        )
+        if not rows:
+            self.db.execute_query(
+                "INSERT INTO import_jobs (job_id, kind, rows_committed, status) VALUES (%s, %s, 0, 'running')",
+                (job_id, kind), fetch=False
+            )
+            return 0
+        if rows[0]['kind'] != kind:
+            raise BulkImportError(f"Job {job_id} is a {rows[0]['kind']} import, not {kind}")
+        self.db.execute_query(
+            "UPDATE import_jobs SET status = 'running' WHERE job_id = %s", (job_id,), fetch=False
+        )
+        return rows[0]['rows_committed']
+
+    def _commit_chunk(self, spec: ImportKind, job_id: str, chunk: List[Tuple[int, Any]],
+                      committed: int, report: ImportReport):
+        valid, lines = [], []
+        for line, row in chunk:
+            try:
+                if isinstance(row, RowError):
+                    raise row
+                valid.append(spec.validate(row))
+                lines.append(line)
+            except RowError as e:
+                report.add_error(line, str(e))
+
+        conflicts = spec.check_chunk(self.db, valid) if valid else {}
+        for index in sorted(conflicts):
+            report.add_error(lines[index], conflicts[index])
+        values = [row for index, row in enumerate(valid) if index not in conflicts]
+
+        insert = (
+            f"INSERT INTO {spec.table} ({', '.join(spec.columns)}) "
+            f"VALUES ({', '.join(['%s'] * len(spec.columns))})"
+        )
+        with self.db.transaction() as tx:
+            if values:
+                tx.execute_many(insert, values)
+                if spec.owner is not None:
+                    # Cached dashboard responses of these users are stale now
+                    tx.execute_query(*bump_data_versions(row[spec.owner] for row in values), fetch=False)
+            tx.execute_query(
+                "UPDATE import_jobs SET rows_committed = %s WHERE job_id = %s",
+                (committed, job_id), fetch=False
+            )
+        report.rows_inserted += len(values)
+        report.chunks += 1
+
+    def run(self, kind: str, rows: Iterable[Tuple[int, Any]], job_id: str) -> ImportReport:
+        """Import (line, row) pairs from read_rows() under a job id"""
+        spec = IMPORT_KINDS.get(kind)
+        if spec is None:
+            raise BulkImportError(f"Unknown import kind: {kind} (use {', '.join(IMPORT_KINDS)})")
+
+        report = ImportReport(job_id, self.max_errors)
+        already_committed = self._start_job(job_id, kind)
+        position = 0
+        chunk = []
+        try:
+            for line, row in rows:
+                position += 1
+                if position <= already_committed:
+                    report.rows_skipped += 1
+                    continue
+                report.rows_read += 1
+                chunk.append((line, row))
+                if len(chunk) == self.chunk_size:
+                    self._commit_chunk(spec, job_id, chunk, position, report)
+                    chunk = []
+                    self._report_progress(report)
+            if chunk:
+                self._commit_chunk(spec, job_id, chunk, position, report)
+                self._report_progress(report)
+        except Exception:
+            try:
+                self.db.execute_query(
+                    "UPDATE import_jobs SET status = 'failed' WHERE job_id = %s", (job_id,), fetch=False
+                )
+            except Exception as e:
+                logger.error(f"Could not mark import {job_id} as failed: {str(e)}")
+            raise
+
+        self.db.execute_query(
+            "UPDATE import_jobs SET status = 'completed' WHERE job_id = %s", (job_id,), fetch=False
+        )
+        report.elapsed = time.perf_counter() - report.started
+        logger.info(
+            f"Import {job_id}: {report.rows_inserted} inserted, {report.rows_failed} failed, "
+            f"{report.rows_skipped} skipped in {report.elapsed:.1f}s ({report.rows_per_second:.0f} rows/s)"
+        )
+        return report
+
+    def _report_progress(self, report: ImportReport):
+        report.elapsed = time.perf_counter() - report.started
+        logger.debug(f"Import {report.job_id}: {report.rows_read} rows ({report.rows_per_second:.0f} rows/s)")
+        if self.progress:
+            self.progress(report)
+
+
+def text_stream(binary) -> io.TextIOBase:
+    """Decode a binary upload as UTF-8 (a BOM from spreadsheet exports is dropped)"""
+    return io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
@@ -0,0 +1,330 @@
+import bisect
+import heapq
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .db_async import async_db_manager
+from .db_config import CACHE_CONFIG
+from .datetime_parser import (
+    OPENING_HOURS, SLOT_GRID_MESSAGE, SLOT_MINUTES, build_opening_hours, check_opening_hours, closed_message,
+)
+from .doctor_directory import doctor_directory
+
+MINUTES_PER_DAY = 24 * 60
+# How far ahead the slot finder looks before giving up
+MAX_SEARCH_DAYS = 60
+
+
+def _minutes(value) -> int:
+    """Minutes since midnight of a MySQL TIME (timedelta) or datetime.time"""
+    if isinstance(value, timedelta):
+        return int(value.total_seconds()) // 60
+    return value.hour * 60 + value.minute
+
+
+def _to_key(moment: datetime) -> int:
+    """Absolute minute number used by the booking index"""
+    return moment.date().toordinal() * MINUTES_PER_DAY + moment.hour * 60 + moment.minute
+
+
+def _from_key(key: int) -> datetime:
+    day, minute = divmod(key, MINUTES_PER_DAY)
+    return datetime.combine(date.fromordinal(day), datetime.min.time()) + timedelta(minutes=minute)
+
+
+class SlotUnavailableError(ValueError):
+    """Raised when an appointment slot cannot be booked.
+
+    ``alternatives`` holds the next free start times for the same doctor.
+    """
+
+    def __init__(self, message: str, alternatives: Optional[List[datetime]] = None):
+        super().__init__(message)
+        self.alternatives = alternatives or []
+
+
+class ClinicCalendar:
+    """Clinic hours, holidays, doctor shifts and booked slots in memory.
+
+    Loaded from clinic_hours, clinic_holidays, doctor_shifts and the
+    scheduled future appointments, and refreshed after ``ttl`` seconds or an
+    explicit invalidate(). Bookings are kept per doctor as a sorted list of
+    slot start minutes, so a conflict check is two bisects and the free-slot
+    finder jumps straight to the first booking of each working window.
+
+    Doctors without shifts work the full clinic hours. Appointments start
+    on the SLOT_MINUTES grid, so two bookings of one doctor overlap only if
+    they start at the same minute, which the database's unique slot key
+    rejects. Bookings made by other processes become visible on the next
+    reload; reservations of this process whose write has not been seen by
+    the reload are carried over.
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = CACHE_CONFIG['clinic_calendar_ttl'] if ttl is None else ttl
+        self._loaded_at = None
+        self.hours = OPENING_HOURS
+        self._holidays = {}    # date -> description
+        self._shifts = {}      # doctor id -> weekday -> sorted [(start, end)] minutes
+        self._bookings = {}    # doctor id -> sorted slot start keys
+        # (doctor id, slot key) -> monotonic time the write was confirmed,
+        # None while it is still in flight
+        self._reservations = {}
+
+    def load(self, hours: List[Dict[str, Any]], holidays: List[Dict[str, Any]],
+             shifts: List[Dict[str, Any]], bookings: List[Dict[str, Any]],
+             read_since: Optional[float] = None):
+        """Rebuild the calendar from table rows.
+
+        An empty clinic_hours table keeps the default opening hours.
+        `read_since` is the monotonic time the bookings were read from: the
+        reservations still in flight or confirmed after it may be missing
+        from `bookings` and are kept. Without it the rows replace everything.
+        """
+        if hours:
+            self.hours = build_opening_hours({
+                row['weekday']: (_minutes(row['opens_at']), _minutes(row['closes_at']) - SLOT_MINUTES)
+                for row in hours
+            })
+        else:
+            self.hours = OPENING_HOURS
+
+        self._holidays = {row['holiday_date']: row.get('description') for row in holidays}
+
+        shift_index = {}
+        for row in shifts:
+            windows = shift_index.setdefault(row['doctor_id'], {}).setdefault(row['weekday'], [])
+            windows.append((_minutes(row['starts_at']), _minutes(row['ends_at'])))
+        for by_weekday in shift_index.values():
+            for windows in by_weekday.values():
+                windows.sort()
+        self._shifts = shift_index
+
+        booking_index = {}
+        for row in bookings:
+            booking_index.setdefault(row['doctor_id'], []).append(_to_key(row['appointment_date']))
+        if read_since is None:
+            self._reservations = {}
+        else:
+            for (doctor_id, key), confirmed_at in list(self._reservations.items()):
+                if confirmed_at is not None and confirmed_at < read_since:
+                    # Committed before the read started, so it is in the rows
+                    del self._reservations[(doctor_id, key)]
+                else:
+                    booking_index.setdefault(doctor_id, []).append(key)
+        for doctor_id, starts in booking_index.items():
+            booking_index[doctor_id] = sorted(set(starts))
+        self._bookings = booking_index
+        self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        """Force a reload from the database on the next lookup"""
+        self._loaded_at = None
+
+    async def refresh(self):
+        """Reload hours, holidays, shifts and upcoming bookings"""
+        read_since = time.monotonic()
+        hours = await async_db_manager.execute_query(
+            "SELECT weekday, opens_at, closes_at FROM clinic_hours"
+        )
+        holidays = await async_db_manager.execute_query(
+            "SELECT holiday_date, description FROM clinic_holidays WHERE holiday_date >= CURDATE()"
+        )
+        shifts = await async_db_manager.execute_query(
+            "SELECT doctor_id, weekday, starts_at, ends_at FROM doctor_shifts"
+        )
+        bookings = await async_db_manager.execute_query(
+            "SELECT doctor_id, appointment_date FROM appointments "
+            "WHERE status = 'scheduled' AND appointment_date >= CURDATE()"
+        )
+        self.load(hours, holidays, shifts, bookings, read_since)
+
+    async def _ensure_loaded(self):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.ttl:
+            await self.refresh()
+
+    def _windows(self, doctor_id: int, day: date) -> List[Tuple[int, int]]:
+        """Working windows (start, end) in minutes for a doctor on a day"""
+        if day in self._holidays:
+            return []
+        day_hours = self.hours[day.weekday()]
+        if day_hours is None:
+            return []
+        opens, last_slot = day_hours[0], day_hours[1] + SLOT_MINUTES
+
+        shifts = self._shifts.get(doctor_id)
+        windows = [(opens, last_slot)] if shifts is None else [
+            (max(start, opens), min(end, last_slot)) for start, end in shifts.get(day.weekday(), [])
+        ]
+        # Slots start on the grid, so a window opening between two grid
+        # points starts at the next one
+        windows = [(-(-start // SLOT_MINUTES) * SLOT_MINUTES, end) for start, end in windows]
+        return [(start, end) for start, end in windows if end - start >= SLOT_MINUTES]
+
+    def _conflicts(self, doctor_id: int, key: int, ignore: Optional[int] = None) -> bool:
+        starts = self._bookings.get(doctor_id, [])
+        low = bisect.bisect_left(starts, key - SLOT_MINUTES + 1)
+        high = bisect.bisect_left(starts, key + SLOT_MINUTES)
+        overlapping = high - low
+        if ignore is not None and ignore in starts[low:high]:
+            overlapping -= 1
+        return overlapping > 0
+
+    def _iter_free_slots(self, doctor_id: int, after: datetime) -> Iterator[datetime]:
+        """Free slot starts for a doctor from `after` onwards, in order"""
+        starts = self._bookings.get(doctor_id, [])
+        first_day = after.date()
+        after_minute = after.hour * 60 + after.minute
+        for offset in range(MAX_SEARCH_DAYS):
+            day = first_day + timedelta(days=offset)
+            day_key = day.toordinal() * MINUTES_PER_DAY
+            for window_start, window_end in self._windows(doctor_id, day):
+                candidate = window_start
+                if offset == 0 and after_minute > candidate:
+                    # Round up to the slot grid
+                    candidate += -(-(after_minute - candidate) // SLOT_MINUTES) * SLOT_MINUTES
+                index = bisect.bisect_left(starts, day_key + candidate - SLOT_MINUTES + 1)
+                while candidate + SLOT_MINUTES <= window_end:
+                    key = day_key + candidate
+                    # Skip bookings that end before this candidate
+                    while index < len(starts) and starts[index] <= key - SLOT_MINUTES:
+                        index += 1
+                    if index < len(starts) and starts[index] < key + SLOT_MINUTES:
+                        # Jump past the blocking booking, staying on the grid
+                        blocked_until = starts[index] + SLOT_MINUTES - day_key
+                        candidate += max(1, -(-(blocked_until - candidate) // SLOT_MINUTES)) * SLOT_MINUTES
+                        continue
+                    yield _from_key(key)
+                    candidate += SLOT_MINUTES
+
+    def _iter_doctor_slots(self, doctor: Dict[str, Any], after: datetime):
+        """(start, name, doctor) for a doctor's free slots, for merging"""
+        for slot in self._iter_free_slots(doctor['id'], after):
+            yield slot, doctor['name'], doctor
+
+    def _check_slot(self, doctor_id: int, start: datetime, ignore: Optional[datetime] = None):
+        """Raise SlotUnavailableError unless the doctor can take this slot"""
+        day = start.date()
+        if day in self._holidays:
+            description = self._holidays[day]
+            reason = f" ({description})" if description else ""
+            raise SlotUnavailableError(
+                f"Sorry, the clinic is closed on {day.isoformat()}{reason}.",
+                self._next_free(doctor_id, start)
+            )
+        if self.hours[day.weekday()] is None:
+            raise SlotUnavailableError(closed_message(day.weekday(), self.hours), self._next_free(doctor_id, start))
+        try:
+            check_opening_hours(day, start.hour, start.minute, self.hours)
+        except ValueError as e:
+            raise SlotUnavailableError(str(e), self._next_free(doctor_id, start))
+
+        if start.minute % SLOT_MINUTES or start.second or start.microsecond:
+            raise SlotUnavailableError(SLOT_GRID_MESSAGE, self._next_free(doctor_id, start))
+
+        minute = start.hour * 60 + start.minute
+        if not any(begin <= minute and minute + SLOT_MINUTES <= end for begin, end in self._windows(doctor_id, day)):
+            raise SlotUnavailableError(
+                "The doctor is not working at that time.", self._next_free(doctor_id, start)
+            )
+
+        ignore_key = _to_key(ignore) if ignore is not None else None
+        if self._conflicts(doctor_id, _to_key(start), ignore_key):
+            raise SlotUnavailableError(
+                "The doctor already has an appointment at that time.", self._next_free(doctor_id, start)
+            )
+
+    def _next_free(self, doctor_id: int, after: datetime, count: int = 3) -> List[datetime]:
+        slots = []
+        for slot in self._iter_free_slots(doctor_id, after):
+            slots.append(slot)
+            if len(slots) == count:
+                break
+        return slots
+
+    def book(self, doctor_id: int, start: datetime):
+        """Add a booked slot to the index"""
+        bisect.insort(self._bookings.setdefault(doctor_id, []), _to_key(start))
+
+    def confirm(self, doctor_id: int, start: datetime):
+        """Mark a reservation as written to the database"""
+        key = (doctor_id, _to_key(start))
+        if key in self._reservations:
+            self._reservations[key] = time.monotonic()
+
+    def release(self, doctor_id: int, start: datetime):
+        """Remove a booked slot (cancellation, or moving the appointment)"""
+        starts = self._bookings.get(doctor_id, [])
+        key = _to_key(start)
+        self._reservations.pop((doctor_id, key), None)
+        index = bisect.bisect_left(starts, key)
+        if index < len(starts) and starts[index] == key:
+            del starts[index]
+
+    async def opening_hours(self) -> tuple:
+        """Opening-hours table in the datetime_parser format"""
+        await self._ensure_loaded()
+        return self.hours
+
+    async def check_day(self, day: date):
+        """Raise ValueError if the clinic is closed that day"""
+        await self._ensure_loaded()
+        if day in self._holidays:
+            description = self._holidays[day]
+            reason = f" ({description})" if description else ""
+            raise ValueError(f"Sorry, the clinic is closed on {day.isoformat()}{reason}.")
+        if self.hours[day.weekday()] is None:
+            raise ValueError(closed_message(day.weekday(), self.hours))
+
+    async def check_slot(self, doctor_id: int, start: datetime, ignore: Optional[datetime] = None):
+        """Raise SlotUnavailableError unless the doctor can take this slot.
+
+        `ignore` is the appointment's current slot when it is being moved.
+        """
+        await self._ensure_loaded()
+        self._check_slot(doctor_id, start, ignore)
+
+    async def reserve(self, doctor_id: int, start: datetime, ignore: Optional[datetime] = None):
+        """Check a slot and mark it booked in one step.
+
+        Nothing awaits between the check and the booking, so two
+        conversations on the same event loop cannot both reserve a slot.
+        Call confirm() once the database write succeeds, or release() if it
+        fails; until then a reload keeps the slot booked.
+        """
+        await self._ensure_loaded()
+        self._check_slot(doctor_id, start, ignore)
+        self.book(doctor_id, start)
+        self._reservations[(doctor_id, _to_key(start))] = None
+
+    async def next_free_slots(self, doctor_id: int, after: Optional[datetime] = None,
+                              count: int = 5) -> List[datetime]:
+        """The next `count` free slot starts for a doctor"""
+        await self._ensure_loaded()
+        return self._next_free(doctor_id, after or datetime.now(), count)
+
+    async def next_free_slots_for_specialty(self, specialty: str, after: Optional[datetime] = None,
+                                            count: int = 5) -> List[Tuple[datetime, Dict[str, Any]]]:
+        """The next `count` free (start, doctor) pairs across a specialty"""
+        await self._ensure_loaded()
+        doctors = await doctor_directory.by_specialty(specialty)
+        after = after or datetime.now()
+        # Each doctor's slots are already in order, so merging the lazy
+        # streams only generates as many slots as the caller asks for
+        streams = [self._iter_doctor_slots(doctor, after) for doctor in doctors]
+        result = []
+        for slot, _, doctor in heapq.merge(*streams, key=lambda item: item[:2]):
+            result.append((slot, doctor))
+            if len(result) == count:
+                break
+        return result
+
+
+def format_slot_suggestions(slots: List[datetime]) -> str:
+    """Human-readable list of alternative start times"""
+    return ", ".join(slot.strftime("%a %Y-%m-%d %H:%M") for slot in slots)
+
+
+# Create a singleton instance shared by all actions
+clinic_calendar = ClinicCalendar()
@@ -0,0 +1,156 @@
+"""
+Pre-rendered responses of the catalogue actions.
+
+The procedures, tests and prices catalogues live in content/catalogue.yml.
+ContentStore renders each one to its final text once, when the file is
+loaded, and re-reads the file when its modification time changes, checked
+at most every check_interval seconds. Editing the file therefore updates the
+bot without a redeploy, and a broken edit is logged while the previous
+content stays in use.
+
+Doctor lists are rendered from the doctor directory and cached per
+directory version, so they are rebuilt only after the directory reloads.
+Listing doctors, procedures, tests or prices is a dictionary lookup.
+
+invalidate() drops everything, including the doctor directory, so the next
+request re-reads the file and the doctors table; the action metrics server
+calls it for DELETE /content.
+"""
+
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import yaml
+
+from .db_config import CONTENT_CONFIG
+from .doctor_directory import doctor_directory
+
+logger = logging.getLogger(__name__)
+
+CATALOGUES = ('procedures', 'tests', 'prices')
+
+
+class ContentError(ValueError):
+    """The catalogue file is missing or not in the expected format"""
+
+
+def format_doctor_list(doctors: List[Dict[str, Any]]) -> str:
+    """Format doctors (ordered by specialty) as a list grouped by specialty"""
+    response_lines = []
+    current_specialty = None
+    for doctor in doctors:
+        if doctor['specialty'] != current_specialty:
+            current_specialty = doctor['specialty']
+            if len(response_lines) > 0:
+                response_lines.append("")
+            response_lines.append(f"{current_specialty}:")
+        response_lines.append(f"• {doctor['name']}")
+    return "\n".join(response_lines)
+
+
+def format_specialty_doctors(specialty: str, doctors: List[Dict[str, Any]]) -> str:
+    """Format the doctors of one specialty under a heading"""
+    return "\n".join([f"{specialty} Doctors:"] + [f"• {doctor['name']}" for doctor in doctors])
+
+
+def render_catalogue(catalogue: Dict[str, Any], footer: str = '') -> str:
+    """Render one catalogue: title, sections of "• name<separator>detail" items, footer"""
+    separator = catalogue.get('separator', ' - ')
+    blocks = [catalogue['title']] if catalogue.get('title') else []
+    for section in catalogue['sections']:
+        lines = [section['title']]
+        lines.extend(f"• {item['name']}{separator}{item['detail']}" for item in section['items'])
+        blocks.append("\n".join(lines))
+    if footer:
+        blocks.append(footer.strip())
+    return "\n\n".join(blocks)
+
+
+def render_content(content: Dict[str, Any]) -> Dict[str, str]:
+    """Render every catalogue of a parsed catalogue file"""
+    try:
+        catalogues = content['catalogues']
+        return {name: render_catalogue(catalogues[name], content.get('footer', '')) for name in CATALOGUES}
+    except (KeyError, TypeError) as e:
+        raise ContentError(f"Invalid catalogue content: missing {str(e)}")
+
+
+class ContentStore:
+    """Rendered catalogue and doctor list texts, refreshed when their source changes"""
+
+    def __init__(self, path: Optional[str] = None, check_interval: Optional[float] = None):
+        self.path = path or CONTENT_CONFIG['catalogue_path']
+        self.check_interval = CONTENT_CONFIG['check_interval'] if check_interval is None else check_interval
+        self._rendered: Dict[str, str] = {}
+        self._mtime = None
+        self._checked_at = None
+        self._doctor_texts: Dict[tuple, str] = {}   # ('all',) or ('specialty', name) -> text
+        self._doctor_version = None
+
+    def load(self, content: Dict[str, Any]):
+        """Render parsed catalogue content and swap it in"""
+        self._rendered = render_content(content)
+
+    def reload(self):
+        """Read and render the catalogue file if it changed since the last load.
+
+        Raises ContentError when nothing is loaded yet and the file cannot be
+        used; later failures keep the current content.
+        """
+        self._checked_at = time.monotonic()
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            if mtime == self._mtime and self._rendered:
+                return
+            with open(self.path, encoding='utf-8') as source:
+                self.load(yaml.safe_load(source) or {})
+            self._mtime = mtime
+            logger.info(f"Loaded catalogue content from {self.path}")
+        except (OSError, yaml.YAMLError, ContentError) as e:
+            if not self._rendered:
+                raise ContentError(f"Could not load {self.path}: {str(e)}")
+            logger.error(f"Keeping the current catalogue content, {self.path} is unusable: {str(e)}")
+
+    def invalidate(self):
+        """Re-read the catalogue file and the doctors table on the next request"""
+        self._mtime = None
+        self._checked_at = None
+        self._doctor_texts = {}
+        self._doctor_version = None
+        doctor_directory.invalidate()
+
+    def catalogue(self, name: str) -> str:
+        """Rendered text of the procedures, tests or prices catalogue"""
+        if self._checked_at is None or time.monotonic() - self._checked_at >= self.check_interval:
+            self.reload()
+        return self._rendered[name]
+
+    def _cached_doctor_text(self, key: tuple) -> Optional[str]:
+        if self._doctor_version != doctor_directory.version:
+            self._doctor_texts = {}
+            self._doctor_version = doctor_directory.version
+        return self._doctor_texts.get(key)
+
+    async def doctor_list(self) -> Optional[str]:
+        """All doctors grouped by specialty, or None if there are none"""
+        doctors = await doctor_directory.all()
+        text = self._cached_doctor_text(('all',))
+        if text is None and doctors:
+            text = self._doctor_texts[('all',)] = format_doctor_list(doctors).strip()
+        return text
+
+    async def specialty_doctors(self, specialty: str) -> Optional[str]:
+        """The doctors of one specialty under a heading, or None if there are none"""
+        doctors = await doctor_directory.by_specialty(specialty)
+        key = ('specialty', specialty)
+        text = self._cached_doctor_text(key)
+        if text is None and doctors:
+            text = self._doctor_texts[key] = format_specialty_doctors(specialty, doctors)
+        return text
+
+
+# Shared by the catalogue actions; rendered when the action server imports it
+content_store = ContentStore()
+content_store.reload()
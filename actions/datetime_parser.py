@@ -0,0 +1,267 @@
+"""
+Date and time parsing for appointment slots.
+
+Everything the parser needs is built once at import: one compiled regex
+for dates, one for times, word tables and the clinic's opening hours in
+minutes since midnight. A call is a single regex match plus a few
+dictionary lookups.
+
+Dates:  today, tomorrow, day after tomorrow, in 3 days, in two weeks,
+        friday, next tuesday, this fri, on monday, 2025-06-30
+Times:  3 pm, 3pm, 8:am, 14:30, 2:30 PM, 9.15, noon, midday,
+        half past two, quarter to 4, 10 o'clock, 7 in the evening
+"""
+
+import re
+from datetime import date, timedelta
+from typing import Optional, Tuple
+
+WEEKDAYS = {
+    'monday': 0, 'mon': 0,
+    'tuesday': 1, 'tue': 1, 'tues': 1,
+    'wednesday': 2, 'wed': 2,
+    'thursday': 3, 'thu': 3, 'thur': 3, 'thurs': 3,
+    'friday': 4, 'fri': 4,
+    'saturday': 5, 'sat': 5,
+    'sunday': 6, 'sun': 6,
+}
+
+NUMBER_WORDS = {
+    'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6,
+    'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10, 'eleven': 11, 'twelve': 12,
+}
+
+DAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+CLOSED_MESSAGE = "Sorry, we're closed on Sundays. Please choose Monday through Saturday."
+INVALID_DATE_MESSAGE = "Please enter a valid date (like 'tomorrow', 'Friday')."
+PAST_DATE_MESSAGE = "Please choose a future date."
+INVALID_HOUR_MESSAGE = "Please enter a valid hour (like 8 AM, 2 PM, or 14:00)."
+INVALID_TIME_MESSAGE = "Please enter a valid time (like 2:30 PM or 14:30)."
+TIME_FORMAT_MESSAGE = "Please enter a valid time format (like 2 PM, 14:00, or 2:30 PM)."
+
+# Every appointment occupies one slot of this length, starting on the grid
+# of multiples of it (minutes past the hour)
+SLOT_MINUTES = 30
+SLOT_GRID_MESSAGE = (
+    f"Appointments start every {SLOT_MINUTES} minutes, at "
+    + " or ".join(f":{minute:02d}" for minute in range(0, 60, SLOT_MINUTES)) + "."
+)
+
+# Without am/pm, hours before the clinic opens are read as afternoon:
+# "half past two" means 14:30, not 02:30
+EARLIEST_MORNING_HOUR = 8
+
+
+def _clock(minutes: int) -> str:
+    hour, minute = divmod(minutes, 60)
+    return f"{(hour - 1) % 12 + 1}:{minute:02d} {'AM' if hour < 12 else 'PM'}"
+
+
+def build_opening_hours(day_hours: dict) -> tuple:
+    """Build an opening-hours table from {weekday: (first slot, last slot)}.
+
+    Times are minutes since midnight and weekdays 0=Monday. The table holds
+    (first slot, last slot, message) per weekday, or None when closed.
+    """
+    same_weekdays = len({day_hours.get(weekday) for weekday in range(5)}) == 1
+    table = []
+    for weekday in range(7):
+        hours = day_hours.get(weekday)
+        if hours is None:
+            table.append(None)
+            continue
+        first_slot, last_slot = hours
+        label = 'Weekday' if weekday < 5 and same_weekdays else DAY_NAMES[weekday]
+        table.append((
+            first_slot,
+            last_slot,
+            f"{label} appointments are available from {_clock(first_slot)} to {_clock(last_slot)}. "
+            f"Please choose a time within these hours.",
+        ))
+    return tuple(table)
+
+
+def closed_message(weekday: int, hours: tuple) -> str:
+    if [day for day in range(7) if hours[day] is None] == [6]:
+        return CLOSED_MESSAGE
+    return f"Sorry, we're closed on {DAY_NAMES[weekday]}s. Please choose another day."
+
+
+# Default clinic hours, used until the clinic_hours table has been loaded.
+# Appointments must start at least 30 minutes before closing time.
+OPENING_HOURS = build_opening_hours({
+    **{weekday: (8 * 60, 17 * 60 + 30) for weekday in range(5)},
+    5: (9 * 60, 13 * 60 + 30),
+})
+
+_number = '|'.join(sorted(NUMBER_WORDS, key=len, reverse=True))
+_hour_word = '|'.join(sorted((word for word in NUMBER_WORDS if len(word) > 2), key=len, reverse=True))
+_weekday = '|'.join(sorted(WEEKDAYS, key=len, reverse=True))
+_hour = rf'\d{{1,2}}|{_hour_word}'
+
+DATE_PATTERN = re.compile(
+    rf"""^(?:
+        (?P<today>today)
+      | (?P<day_after>(?:the\s+)?day\s+after\s+tomorrow)
+      | (?P<tomorrow>tomorrow)
+      | in\s+(?P<count>\d+|{_number})\s+(?P<unit>days?|weeks?)
+      | (?P<next_week>next\s+week)
+      | (?:(?:next|this|on|coming)\s+)?(?P<weekday>{_weekday})
+      | (?P<iso>\d{{4}}-\d{{2}}-\d{{2}})
+    )$""",
+    re.VERBOSE,
+)
+
+TIME_PATTERN = re.compile(
+    rf"""^(?:
+        (?P<noon>noon|midday|12\s+noon)
+      | (?P<midnight>midnight)
+      | (?:
+            (?P<relative>half\s+past|quarter\s+past|quarter\s+to)\s+(?P<relative_hour>{_hour})
+          | (?P<hour>{_hour})(?:\s*[:.]\s*(?P<minute>\d{{2}}))?
+        )
+        \s*:?\s*
+        (?P<period>a\.?m\.?|p\.?m\.?|o'?clock|in\s+the\s+morning|in\s+the\s+afternoon|in\s+the\s+evening)?
+    )$""",
+    re.VERBOSE,
+)
+
+RELATIVE_MINUTES = {'half past': (0, 30), 'quarter past': (0, 15), 'quarter to': (-1, 45)}
+PM_PERIODS = frozenset(['pm', 'p.m.', 'p.m', 'pm.', 'in the afternoon', 'in the evening'])
+AM_PERIODS = frozenset(['am', 'a.m.', 'a.m', 'am.', 'in the morning'])
+
+_whitespace = re.compile(r'\s+')
+
+
+def _to_int(token: str) -> int:
+    value = NUMBER_WORDS.get(token)
+    return value if value is not None else int(token)
+
+
+def parse_date(text: str, today: Optional[date] = None, hours: tuple = OPENING_HOURS) -> date:
+    """Parse a date expression relative to today.
+
+    Weekday names ("friday", "next friday") mean the next such day after
+    today. Raises ValueError with a user-facing message.
+    """
+    today = today or date.today()
+    match = DATE_PATTERN.match(text.strip().lower())
+    if not match:
+        raise ValueError(INVALID_DATE_MESSAGE)
+
+    kind = match.lastgroup
+    if kind == 'today':
+        return today
+    if kind == 'tomorrow':
+        return today + timedelta(days=1)
+    if kind == 'day_after':
+        return today + timedelta(days=2)
+    if kind == 'next_week':
+        return today + timedelta(days=7)
+    if kind == 'weekday':
+        weekday = WEEKDAYS[match.group('weekday')]
+        if hours[weekday] is None:
+            raise ValueError(closed_message(weekday, hours))
+        days_ahead = (weekday - today.weekday() - 1) % 7 + 1
+        return today + timedelta(days=days_ahead)
+    if kind == 'iso':
+        try:
+            target = date.fromisoformat(match.group('iso'))
+        except ValueError:
+            raise ValueError(INVALID_DATE_MESSAGE)
+        if target < today:
+            raise ValueError(PAST_DATE_MESSAGE)
+        return target
+
+    # in N days / weeks
+    count = _to_int(match.group('count'))
+    days = count * 7 if match.group('unit').startswith('week') else count
+    return today + timedelta(days=days)
+
+
+def parse_time(text: str) -> Tuple[int, int]:
+    """Parse a time expression into (hour, minute) on a 24-hour clock.
+
+    Raises ValueError with a user-facing message.
+    """
+    match = TIME_PATTERN.match(text.strip().lower())
+    if not match:
+        raise ValueError(TIME_FORMAT_MESSAGE)
+
+    if match.group('noon'):
+        return 12, 0
+    if match.group('midnight'):
+        return 0, 0
+
+    relative = match.group('relative')
+    if relative:
+        # am/pm is decided from the spoken hour: "quarter to 8" is 07:45
+        hour_offset, minute = RELATIVE_MINUTES[_whitespace.sub(' ', relative)]
+        hour = _to_int(match.group('relative_hour'))
+        if not 1 <= hour <= 12:
+            raise ValueError(INVALID_HOUR_MESSAGE)
+    else:
+        hour_offset = 0
+        hour = _to_int(match.group('hour'))
+        minute_text = match.group('minute')
+        minute = int(minute_text) if minute_text else 0
+        if hour > 23:
+            raise ValueError(INVALID_HOUR_MESSAGE if minute_text is None else INVALID_TIME_MESSAGE)
+        if minute > 59:
+            raise ValueError(INVALID_TIME_MESSAGE)
+
+    period = match.group('period')
+    if period in PM_PERIODS:
+        if hour > 12:
+            raise ValueError(INVALID_HOUR_MESSAGE)
+        if hour != 12:
+            hour += 12
+    elif period in AM_PERIODS:
+        if hour > 12:
+            raise ValueError(INVALID_HOUR_MESSAGE)
+        if hour == 12:
+            hour = 0
+    elif 1 <= hour < EARLIEST_MORNING_HOUR and not (match.group('hour') or '').startswith('0'):
+        # "07:30" is clearly a 24-hour time; "7:30" or "seven" is not
+        hour += 12
+
+    return (hour + hour_offset) % 24, minute
+
+
+def check_opening_hours(day: date, hour: int, minute: int, hours: tuple = OPENING_HOURS):
+    """Raise ValueError if the clinic takes no appointments at that time"""
+    day_hours = hours[day.weekday()]
+    if day_hours is None:
+        raise ValueError(closed_message(day.weekday(), hours))
+    first_slot, last_slot, message = day_hours
+    if not first_slot <= hour * 60 + minute <= last_slot:
+        raise ValueError(message)
+
+
+def check_slot_grid(minute: int):
+    """Raise ValueError unless an appointment can start at this minute"""
+    if minute % SLOT_MINUTES:
+        raise ValueError(SLOT_GRID_MESSAGE)
+
+
+def normalize_date(text: str, today: Optional[date] = None, hours: tuple = OPENING_HOURS) -> Optional[str]:
+    """Parse a date and return it as YYYY-MM-DD, rejecting closed days"""
+    if not text:
+        return None
+    target = parse_date(text, today, hours)
+    if hours[target.weekday()] is None:
+        raise ValueError(closed_message(target.weekday(), hours))
+    return target.isoformat()
+
+
+def normalize_time(text: str, date_str: Optional[str] = None, hours: tuple = OPENING_HOURS) -> Optional[str]:
+    """Parse a time and return it as HH:MM, checking the slot grid and
+    opening hours when the appointment date (YYYY-MM-DD) is known"""
+    if not text:
+        return None
+    hour, minute = parse_time(text)
+    if date_str:
+        check_slot_grid(minute)
+        check_opening_hours(date.fromisoformat(date_str), hour, minute, hours)
+    return f"{hour:02d}:{minute:02d}"
@@ -0,0 +1,195 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import aiomysql
+import pymysql
+from pymysql import Error
+
+from .db_config import POOL_CONFIG
+from .db_connect import PoolTimeoutError, WriteResult, database_error, db_manager
+from .query_trace import StatementTimer
+
+
+async def _run_statement(cursor, query, params, fetch, connect=0.0):
+    """Execute one statement, trace it and return its rows or a WriteResult.
+
+    connect is the time it took to check the connection out, for the trace.
+    """
+    timer = StatementTimer(query, params, connect)
+    try:
+        if params:
+            await cursor.execute(query, params)
+        else:
+            await cursor.execute(query)
+        timer.mark_executed()
+
+        if fetch:
+            rows = await cursor.fetchall()
+            timer.finish(len(rows))
+            return rows
+
+        timer.finish(cursor.rowcount)
+        return WriteResult(cursor.lastrowid, cursor.rowcount)
+    except BaseException:
+        timer.finish(error=True)
+        raise
+
+
+def _abandon_acquire(pool, acquiring: asyncio.Future):
+    """Cancel a pending acquire; give the connection back if it still arrives"""
+    def release_late_connection(task):
+        if not task.cancelled() and task.exception() is None:
+            pool.release(task.result())
+
+    acquiring.cancel()
+    acquiring.add_done_callback(release_late_connection)
+
+
+class AsyncTransaction:
+    """Unit of work pinned to a single aiomysql connection"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    async def execute_query(self, query, params=None, fetch=True):
+        """Execute a query inside the transaction"""
+        async with self.connection.cursor() as cursor:
+            return await _run_statement(cursor, query, params, fetch)
+
+
+class AsyncDatabaseManager:
+    """asyncio counterpart of DatabaseManager, backed by an aiomysql pool.
+
+    The action server runs every custom action on one event loop, so the
+    actions must await their queries instead of blocking the loop with
+    PyMySQL. The API mirrors DatabaseManager: execute_query() returns rows
+    or a WriteResult, and transaction() pins one connection.
+    """
+
+    def __init__(self, pool_config=None):
+        config = db_manager.db_config
+        self.db_config = {
+            'host': config['host'],
+            'user': config['user'],
+            'password': config['password'],
+            'db': config['database'],
+            'port': config['port'],
+            'charset': config['charset'],
+            'cursorclass': aiomysql.DictCursor,
+            'autocommit': True,
+            # rowcount of an UPDATE counts matched rows, so "no row" is not
+            # confused with "the values were already set"
+            'client_flag': pymysql.constants.CLIENT.FOUND_ROWS,
+        }
+
+        pool_config = pool_config or POOL_CONFIG
+        self.pool_config = {
+            'minsize': pool_config['min_size'],
+            'maxsize': pool_config['max_size'],
+            'pool_recycle': int(pool_config['max_lifetime'])
+        }
+        self.wait_timeout = pool_config['wait_timeout']
+
+        # The pool belongs to the event loop it was created on
+        self._pool_task = None
+        self._pool_loop = None
+
+    async def get_pool(self):
+        """Get the aiomysql pool for the running event loop, creating it once"""
+        loop = asyncio.get_running_loop()
+        task = self._pool_task
+        if task is None or self._pool_loop is not loop or (task.done() and task.exception()):
+            self._pool_loop = loop
+            self._pool_task = task = loop.create_task(
+                aiomysql.create_pool(**self.pool_config, **self.db_config)
+            )
+        return await task
+
+    @asynccontextmanager
+    async def connection(self):
+        """Check a connection out of the pool and always give it back"""
+        pool = await self.get_pool()
+        # wait_for() drops a connection acquired just as the timeout fires,
+        # so the acquire runs as its own task and a late result is released
+        acquiring = asyncio.ensure_future(pool.acquire())
+        try:
+            done, _ = await asyncio.wait({acquiring}, timeout=self.wait_timeout)
+        except BaseException:
+            _abandon_acquire(pool, acquiring)
+            raise
+        if not done:
+            _abandon_acquire(pool, acquiring)
+            raise PoolTimeoutError(
+                f"No database connection available after {self.wait_timeout}s "
+                f"(pool size {pool.maxsize})"
+            )
+        connection = acquiring.result()
+
+        try:
+            yield connection
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            # A closed connection is dropped by the pool on release
+            connection.close()
+            raise
+        finally:
+            pool.release(connection)
+
+    async def execute_query(self, query, params=None, fetch=True):
+        """Execute a query on a pooled connection with proper error handling.
+
+        Returns the fetched rows, or a WriteResult(lastrowid, rowcount) when
+        fetch is False.
+        """
+        try:
+            checkout = time.perf_counter()
+            async with self.connection() as connection:
+                connect = time.perf_counter() - checkout
+                async with connection.cursor() as cursor:
+                    return await _run_statement(cursor, query, params, fetch, connect)
+
+        except Error as e:
+            raise database_error(e)
+
+    @asynccontextmanager
+    async def transaction(self):
+        """Run several queries on one connection and commit them together.
+
+        Usage:
+            async with async_db_manager.transaction() as tx:
+                await tx.execute_query(...)
+        """
+        try:
+            async with self.connection() as connection:
+                await connection.begin()
+                try:
+                    yield AsyncTransaction(connection)
+                    await connection.commit()
+                except BaseException:
+                    await connection.rollback()
+                    raise
+
+        except Error as e:
+            raise database_error(e)
+
+    def pool_stats(self):
+        """Get the aiomysql pool size counters"""
+        task = self._pool_task
+        if task is None or not task.done() or task.exception():
+            return {'size': 0, 'idle': 0, 'min_size': self.pool_config['minsize'],
+                    'max_size': self.pool_config['maxsize']}
+        pool = task.result()
+        return {'size': pool.size, 'idle': pool.freesize, 'min_size': pool.minsize,
+                'max_size': pool.maxsize}
+
+    async def close(self):
+        """Close the pool and wait for its connections to shut down"""
+        if self._pool_task is not None and self._pool_task.done() and not self._pool_task.exception():
+            pool = self._pool_task.result()
+            pool.close()
+            await pool.wait_closed()
+        self._pool_task = None
+        self._pool_loop = None
+
+# Create a singleton instance
+async_db_manager = AsyncDatabaseManager()
@@ -15,4 +15,96 @@ DATABASE_CONFIG = {
 }
 
 # Backward compatibility
-DB_CONFIG = DATABASE_CONFIG 
\ No newline at end of file
+DB_CONFIG = DATABASE_CONFIG 
+
+
+# Connection pool used by DatabaseManager
+POOL_CONFIG = {
+    'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 1)),
+    'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+    'idle_timeout': float(os.getenv('DB_POOL_IDLE_TIMEOUT', 300)),
+    'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', 3600)),
+    'wait_timeout': float(os.getenv('DB_POOL_WAIT_TIMEOUT', 10)),
+    'ping_interval': float(os.getenv('DB_POOL_PING_INTERVAL', 30)),
+}
+
+# Diagnostic /api/admin/* endpoints of server.py. They have no
+# authentication, so they are off unless ADMIN_ENDPOINTS=1.
+ADMIN_CONFIG = {
+    'endpoints': os.getenv('ADMIN_ENDPOINTS', '0') == '1',
+}
+
+# In-process caches in front of the database (seconds)
+CACHE_CONFIG = {
+    'doctor_directory_ttl': float(os.getenv('DOCTOR_DIRECTORY_TTL', 300)),
+    # Clinic hours, holidays, shifts and booked slots (actions/clinic_calendar.py)
+    'clinic_calendar_ttl': float(os.getenv('CLINIC_CALENDAR_TTL', 60)),
+}
+
+# Catalogue texts of the list actions (actions/content_store.py)
+CONTENT_CONFIG = {
+    'catalogue_path': os.getenv('CONTENT_CATALOGUE', os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'content', 'catalogue.yml')),
+    # How often the file is checked for changes (seconds)
+    'check_interval': float(os.getenv('CONTENT_CHECK_INTERVAL', 30)),
+}
+
+# Password hashing (actions/password_hasher.py)
+PASSWORD_CONFIG = {
+    # scrypt cost: memory is ~128 * n * r bytes per hash (16 MiB by default)
+    'scrypt_n': int(os.getenv('PASSWORD_SCRYPT_N', 2 ** 14)),
+    'scrypt_r': int(os.getenv('PASSWORD_SCRYPT_R', 8)),
+    'scrypt_p': int(os.getenv('PASSWORD_SCRYPT_P', 1)),
+    # Concurrent hash computations, and how many more may wait for a slot
+    'workers': int(os.getenv('PASSWORD_HASH_WORKERS', 2)),
+    'max_pending': int(os.getenv('PASSWORD_HASH_MAX_PENDING', 16)),
+    'wait_timeout': float(os.getenv('PASSWORD_HASH_WAIT_TIMEOUT', 2)),
+}
+
+# Signed session tokens (actions/session_tokens.py)
+SESSION_CONFIG = {
+    # Must be the same for every server process; serve.py generates one
+    # for its workers when unset
+    'secret': os.getenv('SESSION_SECRET', ''),
+    'ttl': float(os.getenv('SESSION_TTL', 8 * 3600)),
+    'cache_size': int(os.getenv('SESSION_CACHE_SIZE', 10000)),
+    # How long a validated session is trusted before the database is
+    # consulted again (catches logouts/deletions made by other processes)
+    'recheck_interval': float(os.getenv('SESSION_RECHECK_INTERVAL', 60)),
+}
+
+# Per-user responses of the dashboard endpoints (actions/response_cache.py);
+# a size of 0 turns the cache off
+RESPONSE_CACHE_CONFIG = {
+    'size': int(os.getenv('RESPONSE_CACHE_SIZE', 2000)),
+    # Upper bound on how long a change made outside the application can go
+    # unnoticed (seconds)
+    'ttl': float(os.getenv('RESPONSE_CACHE_TTL', 300)),
+}
+
+# Bulk CSV/NDJSON import (actions/bulk_import.py)
+IMPORT_CONFIG = {
+    # Rows validated and committed together; a resumed import restarts
+    # after the last committed chunk
+    'chunk_size': int(os.getenv('IMPORT_CHUNK_SIZE', 1000)),
+    # Row errors kept in the report (all of them are counted)
+    'max_reported_errors': int(os.getenv('IMPORT_MAX_REPORTED_ERRORS', 1000)),
+}
+
+# Query tracing (actions/query_trace.py)
+TRACE_CONFIG = {
+    # Statements slower than this are logged as warnings
+    'slow_query_ms': float(os.getenv('SLOW_QUERY_MS', 200)),
+    # Slowest statements kept for /api/admin/db-queries
+    'slowest_kept': int(os.getenv('TRACE_SLOWEST_KEPT', 50)),
+    # Distinct statement fingerprints with their own totals
+    'fingerprints_kept': int(os.getenv('TRACE_FINGERPRINTS_KEPT', 500)),
+}
+
+# Action server metrics endpoint (actions/instrumentation.py); port 0 disables it
+METRICS_CONFIG = {
+    'host': os.getenv('ACTION_METRICS_HOST', '127.0.0.1'),
+    'port': int(os.getenv('ACTION_METRICS_PORT', 9155)),
+    # DELETE /queries and /content; only honoured on a loopback host
+    'allow_delete': os.getenv('ACTION_METRICS_ALLOW_DELETE', '0') == '1',
+}
@@ -1,8 +1,291 @@
+import threading
+import time
+from collections import deque, namedtuple
+from contextlib import contextmanager
+
 import pymysql
 from pymysql import Error
 
+from .db_config import POOL_CONFIG
+from .query_trace import StatementTimer
+
+
+# Result of a write statement (execute_query with fetch=False)
+WriteResult = namedtuple('WriteResult', ['lastrowid', 'rowcount'])
+
+# Rows pulled from the server per round trip by stream_query
+STREAM_BATCH_SIZE = 500
+
+# MySQL error code for a write that violates a UNIQUE index
+ER_DUP_ENTRY = 1062
+
+
+def _run_statement(cursor, query, params, fetch, connect=0.0):
+    """Execute one statement, trace it and return its rows or a WriteResult.
+
+    connect is the time it took to check the connection out, for the trace.
+    """
+    timer = StatementTimer(query, params, connect)
+    try:
+        if params:
+            cursor.execute(query, params)
+        else:
+            cursor.execute(query)
+        timer.mark_executed()
+
+        if fetch:
+            rows = cursor.fetchall()
+            timer.finish(len(rows))
+            return rows
+
+        timer.finish(cursor.rowcount)
+        return WriteResult(cursor.lastrowid, cursor.rowcount)
+    except BaseException:
+        timer.finish(error=True)
+        raise
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection became free within the wait timeout"""
+
+
+class DuplicateKeyError(Exception):
+    """Raised when a write violates a UNIQUE index (MySQL error 1062)"""
+
+
+def database_error(e: Error) -> Exception:
+    """Wrap a driver error, keeping duplicate keys distinguishable"""
+    if isinstance(e, pymysql.err.IntegrityError) and e.args and e.args[0] == ER_DUP_ENTRY:
+        return DuplicateKeyError(f"Database error: {str(e)}")
+    return Exception(f"Database error: {str(e)}")
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of database connections.
+
+    Connections are created lazily up to ``max_size``. Idle connections are
+    health-checked on checkout, recycled once they exceed ``max_lifetime`` or
+    sit idle longer than ``idle_timeout`` (never shrinking below ``min_size``),
+    and callers wait up to ``wait_timeout`` seconds when the pool is exhausted.
+    """
+
+    def __init__(self, connect, min_size=1, max_size=10, idle_timeout=300.0,
+                 max_lifetime=3600.0, wait_timeout=10.0, ping_interval=30.0):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min_size={min_size}, max_size={max_size}")
+
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.wait_timeout = wait_timeout
+        self.ping_interval = ping_interval
+
+        self._cond = threading.Condition()
+        self._idle = deque()     # (connection, created_at, returned_at), most recent on the right
+        self._checked_out = {}   # id(connection) -> created_at
+        self._size = 0
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_timeouts': 0,
+            'creates': 0,
+            'recycled': 0,
+            'failed_health_checks': 0,
+        }
+
+    def _is_expired(self, created_at, returned_at, now):
+        if now - created_at >= self.max_lifetime:
+            return True
+        return now - returned_at >= self.idle_timeout and self._size > self.min_size
+
+    def _close_quietly(self, connections):
+        for connection in connections:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def _discard(self, connection):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+        self._close_quietly([connection])
+
+    def _new_connection(self):
+        """Open a connection for a slot that has already been reserved"""
+        try:
+            connection = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        now = time.monotonic()
+        with self._cond:
+            self._stats['creates'] += 1
+            self._checked_out[id(connection)] = now
+        return connection
+
+    def acquire(self):
+        """Check out a healthy connection, waiting if the pool is exhausted"""
+        deadline = None
+        with self._cond:
+            self._stats['checkouts'] += 1
+
+        while True:
+            stale = []
+            entry = None
+            create = False
+
+            with self._cond:
+                now = time.monotonic()
+                while self._idle and entry is None:
+                    candidate = self._idle.pop()
+                    if self._is_expired(candidate[1], candidate[2], now):
+                        self._size -= 1
+                        self._stats['recycled'] += 1
+                        stale.append(candidate[0])
+                    else:
+                        entry = candidate
+
+                if entry is None and not stale:
+                    if self._size < self.max_size:
+                        self._size += 1
+                        create = True
+                    else:
+                        if deadline is None:
+                            deadline = now + self.wait_timeout
+                            self._stats['waits'] += 1
+                        remaining = deadline - now
+                        if remaining <= 0:
+                            self._stats['wait_timeouts'] += 1
+                            raise PoolTimeoutError(
+                                f"No database connection available after {self.wait_timeout}s "
+                                f"(pool size {self.max_size})"
+                            )
+                        self._cond.wait(remaining)
+                        continue
+
+            # Network I/O (closing, connecting, pinging) happens outside the lock
+            self._close_quietly(stale)
+            if create:
+                return self._new_connection()
+            if entry is None:
+                continue
+
+            connection, created_at, returned_at = entry
+            if time.monotonic() - returned_at >= self.ping_interval:
+                try:
+                    connection.ping(reconnect=False)
+                except Exception:
+                    with self._cond:
+                        self._stats['failed_health_checks'] += 1
+                    self._discard(connection)
+                    continue
+
+            with self._cond:
+                self._checked_out[id(connection)] = created_at
+            return connection
+
+    def release(self, connection, discard=False):
+        """Return a connection to the pool, or drop it if it is broken"""
+        with self._cond:
+            created_at = self._checked_out.pop(id(connection), None)
+            if created_at is None:
+                return
+            if discard or not getattr(connection, 'open', True):
+                self._size -= 1
+                self._cond.notify()
+            else:
+                self._idle.append((connection, created_at, time.monotonic()))
+                self._cond.notify()
+                return
+        self._close_quietly([connection])
+
+    @contextmanager
+    def connection(self):
+        """Context manager that checks a connection out and always returns it"""
+        connection = self.acquire()
+        discard = False
+        try:
+            yield connection
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            # The connection itself is suspect - never hand it out again
+            discard = True
+            raise
+        finally:
+            self.release(connection, discard=discard)
+
+    def warm(self):
+        """Open connections until the pool holds at least min_size"""
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            self.release(self._new_connection())
+
+    def close(self):
+        """Close every idle connection"""
+        with self._cond:
+            idle = [entry[0] for entry in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+        self._close_quietly(idle)
+
+    def stats(self):
+        """Snapshot of pool counters for sizing decisions"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': len(self._checked_out),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+            })
+            return stats
+
+
+class Transaction:
+    """Unit of work pinned to a single connection.
+
+    Obtained from DatabaseManager.transaction(); every statement runs on the
+    same connection and the whole block is committed or rolled back once.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute_query(self, query, params=None, fetch=True):
+        """Execute a query inside the transaction"""
+        with self.connection.cursor() as cursor:
+            return _run_statement(cursor, query, params, fetch)
+
+    def execute_many(self, query, rows):
+        """Run one statement for many parameter tuples.
+
+        PyMySQL sends an INSERT ... VALUES statement as multi-row inserts,
+        so this is one round trip per ~1 MB of rows instead of one per row.
+        """
+        rows = list(rows)
+        timer = StatementTimer(query, sum(len(row) for row in rows))
+        with self.connection.cursor() as cursor:
+            try:
+                cursor.executemany(query, rows)
+            except BaseException:
+                timer.finish(error=True)
+                raise
+            timer.mark_executed()
+            timer.finish(cursor.rowcount)
+            return WriteResult(cursor.lastrowid, cursor.rowcount)
+
+
 class DatabaseManager:
-    def __init__(self):
+    def __init__(self, pool_config=None):
         self.db_config = {
             'host': 'localhost',
             'user': 'root',
@@ -10,43 +293,106 @@ class DatabaseManager:
             'database': 'medical_bot',
             'port': 3306,
             'charset': 'utf8mb4',
-            'cursorclass': pymysql.cursors.DictCursor
+            'cursorclass': pymysql.cursors.DictCursor,
+            # Pooled connections are reused, so reads must not leave a
+            # transaction (and its snapshot) open between checkouts
+            'autocommit': True
         }
+        self.pool = ConnectionPool(self.get_connection, **(pool_config or POOL_CONFIG))
 
     def get_connection(self):
         """Get a new database connection"""
         return pymysql.connect(**self.db_config)
 
     def execute_query(self, query, params=None, fetch=True):
-        """Execute a query with proper error handling and connection management"""
-        connection = None
-        cursor = None
+        """Execute a query on a pooled connection with proper error handling.
+
+        Returns the fetched rows, or a WriteResult(lastrowid, rowcount) when
+        fetch is False.
+        """
         try:
-            connection = self.get_connection()
-            cursor = connection.cursor()
-            
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-            
-            if fetch:
-                result = cursor.fetchall()
-                return result
-            
-            connection.commit()
-            return True
+            checkout = time.perf_counter()
+            with self.pool.connection() as connection:
+                connect = time.perf_counter() - checkout
+                with connection.cursor() as cursor:
+                    return _run_statement(cursor, query, params, fetch, connect)
 
         except Error as e:
-            if connection:
-                connection.rollback()
-            raise Exception(f"Database error: {str(e)}")
-            
-        finally:
-            if cursor:
-                cursor.close()
-            if connection:
-                connection.close()
+            raise database_error(e)
+
+    @contextmanager
+    def transaction(self):
+        """Run several queries on one connection and commit them together.
+
+        Usage:
+            with db_manager.transaction() as tx:
+                tx.execute_query(...)
+
+        Any exception raised inside the block rolls the transaction back.
+        """
+        try:
+            with self.pool.connection() as connection:
+                connection.begin()
+                try:
+                    yield Transaction(connection)
+                    connection.commit()
+                except BaseException:
+                    connection.rollback()
+                    raise
+
+        except Error as e:
+            raise database_error(e)
+
+    def stream_query(self, query, params=None, batch_size=STREAM_BATCH_SIZE):
+        """Yield rows one by one from an unbuffered server-side cursor.
+
+        Only batch_size rows are held in memory at a time. The pooled
+        connection stays checked out until the generator is exhausted or
+        closed; a stream abandoned half-way leaves unread rows on the wire,
+        so that connection is closed instead of going back to the pool.
+        """
+        try:
+            checkout = time.perf_counter()
+            with self.pool.connection() as connection:
+                timer = StatementTimer(query, params, time.perf_counter() - checkout)
+                cursor = connection.cursor(pymysql.cursors.SSDictCursor)
+                finished = False
+                failed = False
+                streamed = 0
+                try:
+                    if params:
+                        cursor.execute(query, params)
+                    else:
+                        cursor.execute(query)
+                    timer.mark_executed()
+
+                    while True:
+                        rows = cursor.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        streamed += len(rows)
+                        yield from rows
+                    finished = True
+                except Exception:
+                    failed = True
+                    raise
+                finally:
+                    # Fetch time includes the time the consumer spent between batches
+                    timer.finish(streamed, error=failed)
+                    if finished:
+                        cursor.close()
+                    else:
+                        try:
+                            connection.close()
+                        except Exception:
+                            pass
+
+        except Error as e:
+            raise database_error(e)
+
+    def pool_stats(self):
+        """Get connection pool counters (checkouts, waits, creates, ...)"""
+        return self.pool.stats()
 
 # Create a singleton instance
 db_manager = DatabaseManager()
@@ -1,13 +1,14 @@
 from typing import Dict, Text, Any, List
 from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
-from actions.db_connect import db_manager
+from actions.db_async import async_db_manager
+from actions.instrumentation import report_error
 
 class ActionAddPatient(Action):
     def name(self) -> Text:
         return "action_add_patient"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    async def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         try:
             # Get slot values
             name = tracker.get_slot("patient_name")
@@ -21,10 +22,11 @@ class ActionAddPatient(Action):
             """
             params = (name, surname, age, medical_history)
             
-            db_manager.execute_query(query, params, fetch=False)
+            await async_db_manager.execute_query(query, params, fetch=False)
             dispatcher.utter_message(text=f"Patient {name} {surname} has been successfully added to the database.")
             
         except Exception as e:
+            report_error(e)
             dispatcher.utter_message(text=f"Sorry, I couldn't add the patient: {str(e)}")
         
         return []
@@ -33,7 +35,7 @@ class ActionSearchPatient(Action):
     def name(self) -> Text:
         return "action_search_patient"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    async def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         try:
             search_term = tracker.get_slot("search_term")
             
@@ -44,7 +46,7 @@ class ActionSearchPatient(Action):
             """
             params = (f"%{search_term}%", f"%{search_term}%")
             
-            results = db_manager.execute_query(query, params)
+            results = await async_db_manager.execute_query(query, params)
             
             if results:
                 response = f"Found {len(results)} patient(s) matching '{search_term}':\n"
@@ -55,6 +57,7 @@ class ActionSearchPatient(Action):
             
             dispatcher.utter_message(text=response)
         except Exception as e:
+            report_error(e)
             dispatcher.utter_message(text=f"Sorry, I encountered an error while searching: {str(e)}")
         
         return []
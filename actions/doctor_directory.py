@@ -0,0 +1,185 @@
+import bisect
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from .db_async import async_db_manager
+from .db_config import CACHE_CONFIG
+from .doctor_matcher import DoctorNameMatcher
+
+_TITLE_PREFIX = re.compile(r'^(dr\.?|doctor)\s+', re.IGNORECASE)
+_NON_WORD = re.compile(r'[^\w\s]')
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_doctor_name(name: str) -> str:
+    """Lower-case a doctor name and drop the "Dr."/"Doctor" title and punctuation"""
+    if not name:
+        return ""
+    name = _TITLE_PREFIX.sub('', name.strip())
+    name = _NON_WORD.sub(' ', name.lower())
+    return _SPACES.sub(' ', name).strip()
+
+
+def with_title(name: str) -> str:
+    """Return the doctor name with a single "Dr." prefix"""
+    if name.startswith('Dr.'):
+        return name
+    return f"Dr. {name}"
+
+
+class DoctorDirectory:
+    """In-memory copy of the doctors table with name and specialty indexes.
+
+    The table is loaded once and refreshed after ``ttl`` seconds or an
+    explicit invalidate(). Lookups after that are dictionary and bisect
+    operations - no database round trip and no leading-wildcard LIKE scans.
+    Names that match nothing exactly fall back to the fuzzy trigram matcher,
+    so misspellings like "Dr. Jonson" still resolve.
+    Doctor rows are plain dicts with ``id``, ``name`` and ``specialty``.
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = CACHE_CONFIG['doctor_directory_ttl'] if ttl is None else ttl
+        self.version = 0
+        self._loaded_at = None
+        self._doctors = []        # ordered by specialty, name
+        self._by_id = {}
+        self._by_name = {}        # normalized full name -> doctor
+        self._by_specialty = {}   # lower-case specialty -> doctors ordered by name
+        self._tokens = []         # sorted (token, doctor id) pairs for prefix lookups
+        self._name_keys = []      # normalized names, in the order of _name_blob
+        self._name_starts = []    # offset of each name in _name_blob
+        self._name_blob = ""      # all normalized names joined for substring scans
+        self._matcher = DoctorNameMatcher([])
+
+    def load_rows(self, rows: List[Dict[str, Any]]):
+        """Rebuild every index from doctor rows (id, name, specialty)"""
+        doctors = sorted(
+            ({'id': row['id'], 'name': row['name'], 'specialty': row['specialty']} for row in rows),
+            key=lambda doctor: (doctor['specialty'] or '', doctor['name'])
+        )
+
+        by_id = {}
+        by_name = {}
+        by_specialty = {}
+        tokens = []
+        for doctor in doctors:
+            normalized = normalize_doctor_name(doctor['name'])
+            by_id[doctor['id']] = doctor
+            by_name.setdefault(normalized, doctor)
+            by_specialty.setdefault((doctor['specialty'] or '').lower(), []).append(doctor)
+            tokens.extend((token, doctor['id']) for token in set(normalized.split()))
+        for specialty_doctors in by_specialty.values():
+            specialty_doctors.sort(key=lambda doctor: doctor['name'])
+        tokens.sort()
+
+        name_keys = list(by_name)
+        name_starts = []
+        offset = 0
+        for key in name_keys:
+            name_starts.append(offset)
+            offset += len(key) + 1
+        matcher = DoctorNameMatcher(list(by_name.items()))
+
+        # Swap everything in at once so readers never see a half-built index
+        self._doctors, self._by_id, self._by_name = doctors, by_id, by_name
+        self._by_specialty, self._tokens, self._matcher = by_specialty, tokens, matcher
+        self._name_keys, self._name_starts = name_keys, name_starts
+        self._name_blob = "\n".join(name_keys)
+        self._loaded_at = time.monotonic()
+        self.version += 1
+
+    def invalidate(self):
+        """Force a reload from the database on the next lookup"""
+        self._loaded_at = None
+
+    async def refresh(self):
+        """Reload the doctors table"""
+        query = "SELECT id, name, specialty FROM doctors"
+        rows = await async_db_manager.execute_query(query)
+        self.load_rows(rows)
+
+    async def _ensure_loaded(self):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.ttl:
+            await self.refresh()
+
+    def _prefix_ids(self, prefix: str) -> set:
+        start = bisect.bisect_left(self._tokens, (prefix,))
+        ids = set()
+        for token, doctor_id in self._tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            ids.add(doctor_id)
+        return ids
+
+    def _substring_matches(self, fragment: str) -> List[Dict[str, Any]]:
+        matches = []
+        position = self._name_blob.find(fragment)
+        while position != -1:
+            index = bisect.bisect_right(self._name_starts, position) - 1
+            matches.append(self._by_name[self._name_keys[index]])
+            # Continue after this name so each doctor is reported once
+            next_start = self._name_starts[index + 1] if index + 1 < len(self._name_starts) else len(self._name_blob)
+            position = self._name_blob.find(fragment, next_start)
+        return matches
+
+    def _search_loaded(self, name: str) -> List[Dict[str, Any]]:
+        normalized = normalize_doctor_name(name)
+        if not normalized:
+            return []
+
+        exact = self._by_name.get(normalized)
+        if exact:
+            return [exact]
+
+        # Every word of the query must prefix a word of the doctor's name
+        candidate_ids = None
+        for token in normalized.split():
+            ids = self._prefix_ids(token)
+            candidate_ids = ids if candidate_ids is None else candidate_ids & ids
+            if not candidate_ids:
+                break
+        if candidate_ids:
+            return sorted((self._by_id[i] for i in candidate_ids), key=lambda doctor: doctor['name'])
+
+        # Same semantics as the old LIKE '%name%' lookup, but in memory
+        substring_matches = sorted(self._substring_matches(normalized), key=lambda doctor: doctor['name'])
+        if substring_matches:
+            return substring_matches
+
+        # Misspellings: rank by trigram similarity above the confidence threshold
+        return [doctor for _, doctor in self._matcher.match(normalized)]
+
+    async def all(self) -> List[Dict[str, Any]]:
+        """All doctors ordered by specialty, then name"""
+        await self._ensure_loaded()
+        return self._doctors
+
+    async def get(self, doctor_id: int) -> Optional[Dict[str, Any]]:
+        """Doctor by primary key"""
+        await self._ensure_loaded()
+        return self._by_id.get(doctor_id)
+
+    async def search(self, name: str) -> List[Dict[str, Any]]:
+        """Doctors matching a (partial) name, best match first"""
+        await self._ensure_loaded()
+        return self._search_loaded(name)
+
+    async def find(self, name: str) -> Optional[Dict[str, Any]]:
+        """Best matching doctor for a name, or None"""
+        matches = await self.search(name)
+        return matches[0] if matches else None
+
+    async def suggest(self, name: str, limit: int = 3) -> List[Dict[str, Any]]:
+        """Closest doctors by fuzzy similarity, for "did you mean" prompts"""
+        await self._ensure_loaded()
+        return [doctor for _, doctor in self._matcher.match(normalize_doctor_name(name), limit)]
+
+    async def by_specialty(self, specialty: str) -> List[Dict[str, Any]]:
+        """Doctors of one specialty ordered by name"""
+        await self._ensure_loaded()
+        return self._by_specialty.get((specialty or '').lower(), [])
+
+# Create a singleton instance shared by all actions
+doctor_directory = DoctorDirectory()
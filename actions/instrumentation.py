@@ -0,0 +1,294 @@
+"""
+Per-action latency instrumentation for the action server.
+
+instrument_actions() wraps the run() method of every Action subclass defined
+in this package - sync and async, including inherited FormValidationAction
+runs. run_actions.py calls it before the action server registers the
+actions; importing the package has no side effects. Each run records, under
+its action name:
+
+- wall time
+- time spent in database statements and the number of statements
+  (from the query tracer, see query_trace.py)
+- whether it failed: raised, or caught an error and called report_error
+
+The numbers are kept in histograms and served in Prometheus text format at
+http://ACTION_METRICS_HOST:ACTION_METRICS_PORT/metrics, a small HTTP server
+that run_actions.py starts next to the action server. The same server
+returns the action server's query trace at GET /queries.
+
+The endpoint has no authentication, so the routes that change state -
+DELETE /queries (clear the trace) and DELETE /content (reload the catalogue,
+see content_store.py) - answer 403 unless ACTION_METRICS_ALLOW_DELETE=1 and
+ACTION_METRICS_HOST is a loopback address.
+"""
+
+import asyncio
+import bisect
+import functools
+import importlib
+import ipaddress
+import json
+import logging
+import pkgutil
+import threading
+import time
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+from .db_config import METRICS_CONFIG
+from .query_trace import QueryTrace, query_tracer
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label value, as Prometheus exposes it"""
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series: Dict[str, list] = {}
+
+    def observe(self, label: str, value: float):
+        series = self.series.get(label)
+        if series is None:
+            # Per-bucket counts (last one is +Inf), then sum
+            series = self.series[label] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self, label_name: str) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label, series in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else f"{bound:g}"
+                lines.append(f'{self.name}_bucket{{{label_name}="{label}",le="{le}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label_name}="{label}"}} {series[-1]:.6f}')
+            lines.append(f'{self.name}_count{{{label_name}="{label}"}} {cumulative}')
+        return lines
+
+
+class ActionMetrics:
+    """Histograms and error counters for all instrumented actions"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.duration = Histogram('rasa_action_duration_seconds', "Wall time of custom action runs",
+                                      DURATION_BUCKETS)
+            self.db_time = Histogram('rasa_action_db_seconds', "Time spent in database statements per run",
+                                     DURATION_BUCKETS)
+            self.queries = Histogram('rasa_action_db_queries', "Database statements per run", QUERY_BUCKETS)
+            self.errors: Dict[str, int] = {}
+
+    def observe(self, action: str, seconds: float, db_seconds: float, queries: int, failed: bool):
+        with self._lock:
+            self.duration.observe(action, seconds)
+            self.db_time.observe(action, db_seconds)
+            self.queries.observe(action, queries)
+            self.errors[action] = self.errors.get(action, 0) + (1 if failed else 0)
+
+    def snapshot(self, action: str) -> Optional[dict]:
+        """Runs, errors and total seconds of one action, or None if it never ran"""
+        with self._lock:
+            series = self.duration.series.get(action)
+            if series is None:
+                return None
+            return {
+                'runs': sum(series[:-1]),
+                'errors': self.errors.get(action, 0),
+                'seconds': series[-1],
+                'db_seconds': self.db_time.series[action][-1],
+                'queries': self.queries.series[action][-1],
+            }
+
+    def render(self) -> str:
+        with self._lock:
+            lines = []
+            for histogram in (self.duration, self.db_time, self.queries):
+                lines.extend(histogram.render('action'))
+            lines.append("# HELP rasa_action_errors_total Custom action runs that failed")
+            lines.append("# TYPE rasa_action_errors_total counter")
+            for action, count in sorted(self.errors.items()):
+                lines.append(f'rasa_action_errors_total{{action="{action}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+class _RunStats:
+    __slots__ = ('db_seconds', 'queries', 'failed')
+
+    def __init__(self):
+        self.db_seconds = 0.0
+        self.queries = 0
+        self.failed = False
+
+
+metrics = ActionMetrics()
+_current_run: ContextVar[Optional[_RunStats]] = ContextVar('current_action_run', default=None)
+
+
+def record_query(seconds: float):
+    """Count one database statement against the action that is running, if any"""
+    stats = _current_run.get()
+    if stats is not None:
+        stats.db_seconds += seconds
+        stats.queries += 1
+
+
+def _count_traced_query(trace: QueryTrace):
+    record_query(trace.connect + trace.execute + trace.fetch)
+
+
+query_tracer.add_hook(_count_traced_query)
+
+
+def report_error(error: Exception):
+    """Count an error an action caught and turned into a chat message, and log it"""
+    stats = _current_run.get()
+    if stats is not None:
+        stats.failed = True
+    logger.error("Custom action failed: %s", error, exc_info=error)
+
+
+def _finish(action, stats: _RunStats, started: float):
+    metrics.observe(action.name(), time.perf_counter() - started, stats.db_seconds, stats.queries, stats.failed)
+
+
+def _wrap_run(run):
+    if asyncio.iscoroutinefunction(run):
+        @functools.wraps(run)
+        async def instrumented_run(self, *args, **kwargs):
+            stats = _RunStats()
+            token = _current_run.set(stats)
+            started = time.perf_counter()
+            try:
+                return await run(self, *args, **kwargs)
+            except BaseException:
+                stats.failed = True
+                raise
+            finally:
+                _current_run.reset(token)
+                _finish(self, stats, started)
+    else:
+        @functools.wraps(run)
+        def instrumented_run(self, *args, **kwargs):
+            stats = _RunStats()
+            token = _current_run.set(stats)
+            started = time.perf_counter()
+            try:
+                return run(self, *args, **kwargs)
+            except BaseException:
+                stats.failed = True
+                raise
+            finally:
+                _current_run.reset(token)
+                _finish(self, stats, started)
+
+    instrumented_run.__instrumented__ = True
+    return instrumented_run
+
+
+def instrument_class(cls):
+    """Wrap cls.run, unless a parent's run is already wrapped"""
+    if not getattr(cls.run, '__instrumented__', False):
+        cls.run = _wrap_run(cls.run)
+    return cls
+
+
+def instrument_actions(package: str):
+    """Import every module of `package` and instrument its Action subclasses.
+
+    Call it before the action executor registers the package, which stores
+    each action's bound run() method.
+    """
+    from rasa_sdk import Action
+    from rasa_sdk.utils import all_subclasses
+
+    root = importlib.import_module(package)
+    for module in pkgutil.walk_packages(getattr(root, '__path__', []), package + '.'):
+        importlib.import_module(module.name)
+    for cls in all_subclasses(Action):
+        if cls.__module__ == package or cls.__module__.startswith(package + '.'):
+            instrument_class(cls)
+
+
+def deletes_allowed(config: dict = None) -> bool:
+    """Whether the metrics endpoint accepts its state-changing DELETE routes"""
+    config = config or METRICS_CONFIG
+    if not config['allow_delete']:
+        return False
+    try:
+        return ipaddress.ip_address(config['host']).is_loopback
+    except ValueError:
+        return config['host'] == 'localhost'
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def _send(self, status: int, body: str, content_type: str):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        if path == '/metrics':
+            self._send(200, metrics.render(), 'text/plain; version=0.0.4; charset=utf-8')
+        elif path == '/queries':
+            # Query trace of the action server process, like /api/admin/db-queries
+            self._send(200, json.dumps(query_tracer.snapshot()), 'application/json')
+        else:
+            self.send_error(404)
+
+    def do_DELETE(self):
+        path = self.path.split('?')[0]
+        if path not in ('/queries', '/content'):
+            self.send_error(404)
+        elif not deletes_allowed():
+            self.send_error(403, "Set ACTION_METRICS_ALLOW_DELETE=1 on a loopback ACTION_METRICS_HOST")
+        elif path == '/queries':
+            query_tracer.reset()
+            self._send(200, json.dumps({'message': 'Query trace cleared'}), 'application/json')
+        elif path == '/content':
+            # Catalogues and doctor lists are reloaded on the next request
+            from .content_store import content_store
+            content_store.invalidate()
+            self._send(200, json.dumps({'message': 'Content cache cleared'}), 'application/json')
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(host: str = None, port: int = None) -> Optional[ThreadingHTTPServer]:
+    """Serve /metrics on a daemon thread, once per process. Port 0 in the config disables it."""
+    global _server
+    host = host or METRICS_CONFIG['host']
+    port = METRICS_CONFIG['port'] if port is None else port
+    with _server_lock:
+        if _server is not None or port <= 0:
+            return _server
+        try:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError as e:
+            logger.warning(f"Action metrics endpoint not started on {host}:{port}: {str(e)}")
+            return None
+        threading.Thread(target=_server.serve_forever, name='action-metrics', daemon=True).start()
+        logger.info(f"Action metrics at http://{host}:{port}/metrics")
+        return _server
@@ -0,0 +1,55 @@
+"""Bounded in-process caches shared by the server modules"""
+
+import threading
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe least-recently-used mapping with a fixed capacity.
+
+    hits and misses count get() calls and are updated under the same lock.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None, valid=None):
+        """The value stored under key, or default.
+
+        A value for which `valid(value)` is false is a miss; it stays
+        cached until it is replaced or evicted.
+        """
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING or (valid is not None and not valid(value)):
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.capacity:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def remove_where(self, predicate):
+        """Drop every entry whose (key, value) matches predicate"""
+        with self._lock:
+            for key in [key for key, value in self._data.items() if predicate(key, value)]:
+                del self._data[key]
+
+    def __len__(self):
+        return len(self._data)
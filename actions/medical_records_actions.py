@@ -1,14 +1,15 @@
 from typing import Dict, Text, Any, List
 from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
-from actions.db_connect import db_manager
+from actions.db_async import async_db_manager
+from actions.instrumentation import report_error
 
 
 class ActionViewMedicalRecords(Action):
     def name(self) -> Text:
         return "action_view_medical_records"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    async def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         try:
             # Try to get user from session - for now we'll use the first available user for demo
             # TODO: In production, get this from actual user authentication
@@ -22,12 +23,12 @@ class ActionViewMedicalRecords(Action):
                 ORDER BY record_count DESC
                 LIMIT 1
             """
-            user_info = db_manager.execute_query(users_with_records_query)
+            user_info = await async_db_manager.execute_query(users_with_records_query)
             
             if not user_info:
                 # No users with records found, let's check if we have any users at all
                 all_users_query = "SELECT id, first_name, last_name FROM users LIMIT 1"
-                all_users = db_manager.execute_query(all_users_query)
+                all_users = await async_db_manager.execute_query(all_users_query)
                 
                 if all_users:
                     dispatcher.utter_message(text="You don't have any medical records yet. Your records will appear here after your appointments and consultations.\n\n💡 Tip: If you're testing the system, try running the test data setup script to create sample records.")
@@ -46,7 +47,7 @@ class ActionViewMedicalRecords(Action):
                 ORDER BY mr.record_date DESC, mr.created_at DESC
                 LIMIT 5
             """
-            results = db_manager.execute_query(query, (user_id,))
+            results = await async_db_manager.execute_query(query, (user_id,))
             
             if results:
                 response = f"Here are the recent medical records for {user_name}:\n\n"
@@ -66,6 +67,7 @@ class ActionViewMedicalRecords(Action):
             dispatcher.utter_message(text=response)
             
         except Exception as e:
+            report_error(e)
             dispatcher.utter_message(text=f"Sorry, I encountered an error while retrieving medical records: {str(e)}")
         
         return [] 
\ No newline at end of file
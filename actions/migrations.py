@@ -0,0 +1,290 @@
+"""
+Versioned schema migrations.
+
+Each Migration has a version, SQL statements to apply (`up`) and to revert
+(`down`). Applied versions are recorded in the schema_migrations table, so
+migrate_database.py only runs what a database is missing and can roll back
+to an earlier version.
+
+Databases created before the tracking table existed are baselined: when a
+migration's `detect` query already returns rows, the change is recorded as
+applied without running it. `blockers` is a query whose rows must be fixed
+by hand before the migration can run.
+
+MySQL commits DDL statements implicitly, so a migration that fails half way
+is not rolled back; it stays unrecorded and its error is reported.
+"""
+
+from collections import namedtuple
+from typing import Callable, List, Optional, Tuple
+
+Migration = namedtuple('Migration', ['version', 'name', 'up', 'down', 'detect', 'blockers'],
+                       defaults=[None, None])
+
+
+class MigrationError(Exception):
+    """Raised when a migration cannot be applied or reverted"""
+
+
+def _column_exists(table: str, column: str) -> str:
+    return (
+        "SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS "
+        f"WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = '{table}' AND COLUMN_NAME = '{column}'"
+    )
+
+
+def _table_exists(table: str) -> str:
+    return (
+        "SELECT TABLE_NAME FROM INFORMATION_SCHEMA.TABLES "
+        f"WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = '{table}'"
+    )
+
+
+def _indexes_exist(*indexes: Tuple[str, str]) -> str:
+    """Finds a row only when every (table, index) pair exists"""
+    pairs = ', '.join(f"('{table}', '{index}')" for table, index in indexes)
+    return (
+        "SELECT COUNT(DISTINCT TABLE_NAME, INDEX_NAME) AS found FROM INFORMATION_SCHEMA.STATISTICS "
+        f"WHERE TABLE_SCHEMA = DATABASE() AND (TABLE_NAME, INDEX_NAME) IN ({pairs}) "
+        f"HAVING found = {len(indexes)}"
+    )
+
+
+MIGRATIONS = [
+    Migration(
+        1, 'appointments_updated_at',
+        up=["""
+            ALTER TABLE appointments
+            ADD COLUMN updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        """],
+        down=["ALTER TABLE appointments DROP COLUMN updated_at"],
+        detect=_column_exists('appointments', 'updated_at'),
+    ),
+    Migration(
+        2, 'revoked_sessions',
+        up=["""
+            CREATE TABLE revoked_sessions (
+                session_id VARCHAR(64) PRIMARY KEY,
+                user_id INT NOT NULL,
+                expires_at DATETIME NOT NULL,
+                revoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                INDEX idx_revoked_sessions_expires (expires_at)
+            )
+        """],
+        down=["DROP TABLE revoked_sessions"],
+        detect=_table_exists('revoked_sessions'),
+    ),
+    Migration(
+        3, 'clinic_calendar',
+        up=[
+            """
+            CREATE TABLE clinic_hours (
+                weekday TINYINT UNSIGNED PRIMARY KEY,
+                opens_at TIME NOT NULL,
+                closes_at TIME NOT NULL
+            )
+            """,
+            # The hours the chatbot used before they lived in the database
+            """
+            INSERT INTO clinic_hours (weekday, opens_at, closes_at) VALUES
+                (0, '08:00', '18:00'), (1, '08:00', '18:00'), (2, '08:00', '18:00'),
+                (3, '08:00', '18:00'), (4, '08:00', '18:00'), (5, '09:00', '14:00')
+            """,
+            """
+            CREATE TABLE clinic_holidays (
+                holiday_date DATE PRIMARY KEY,
+                description VARCHAR(100)
+            )
+            """,
+            """
+            CREATE TABLE doctor_shifts (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                doctor_id INT NOT NULL,
+                weekday TINYINT UNSIGNED NOT NULL,
+                starts_at TIME NOT NULL,
+                ends_at TIME NOT NULL,
+                FOREIGN KEY (doctor_id) REFERENCES doctors(id) ON DELETE CASCADE,
+                INDEX idx_doctor_shifts_doctor (doctor_id, weekday)
+            )
+            """,
+        ],
+        down=["DROP TABLE doctor_shifts", "DROP TABLE clinic_holidays", "DROP TABLE clinic_hours"],
+        detect=_table_exists('clinic_hours'),
+    ),
+    Migration(
+        4, 'appointments_slot_key',
+        up=["""
+            ALTER TABLE appointments
+            ADD COLUMN booked_doctor_id INT AS (IF(status = 'scheduled', doctor_id, NULL)) STORED,
+            ADD UNIQUE KEY uniq_appointments_doctor_slot (booked_doctor_id, appointment_date)
+        """],
+        down=["""
+            ALTER TABLE appointments
+            DROP INDEX uniq_appointments_doctor_slot,
+            DROP COLUMN booked_doctor_id
+        """],
+        detect=_column_exists('appointments', 'booked_doctor_id'),
+        # The unique key cannot be built while double bookings exist
+        blockers="""
+            SELECT doctor_id, appointment_date, COUNT(*) AS bookings
+            FROM appointments
+            WHERE status = 'scheduled'
+            GROUP BY doctor_id, appointment_date
+            HAVING COUNT(*) > 1
+        """,
+    ),
+    Migration(
+        # users.email is already covered by its UNIQUE constraint. The new
+        # (user_id, ...) and (patient_id, ...) indexes replace the ones MySQL
+        # created for the foreign keys, so down restores those first.
+        5, 'hot_query_indexes',
+        up=[
+            # Appointments of a user in date order
+            "ALTER TABLE appointments ADD INDEX idx_appointments_user_date (user_id, appointment_date)",
+            # Upcoming scheduled appointments loaded by the clinic calendar
+            "ALTER TABLE appointments ADD INDEX idx_appointments_status_date (status, appointment_date)",
+            # Records of a patient, newest first
+            "ALTER TABLE medical_records ADD INDEX idx_records_patient_date (patient_id, record_date, created_at)",
+            # All records, newest first (admin listing and export)
+            "ALTER TABLE medical_records ADD INDEX idx_records_date (record_date, created_at)",
+            # Doctors by specialty, then name
+            "ALTER TABLE doctors ADD INDEX idx_doctors_specialty (specialty, name)",
+        ],
+        down=[
+            "ALTER TABLE doctors DROP INDEX idx_doctors_specialty",
+            "ALTER TABLE medical_records DROP INDEX idx_records_date",
+            "ALTER TABLE medical_records ADD INDEX patient_id (patient_id), DROP INDEX idx_records_patient_date",
+            "ALTER TABLE appointments DROP INDEX idx_appointments_status_date",
+            "ALTER TABLE appointments ADD INDEX user_id (user_id), DROP INDEX idx_appointments_user_date",
+        ],
+        detect=_indexes_exist(
+            ('appointments', 'idx_appointments_user_date'),
+            ('appointments', 'idx_appointments_status_date'),
+            ('medical_records', 'idx_records_patient_date'),
+            ('medical_records', 'idx_records_date'),
+            ('doctors', 'idx_doctors_specialty'),
+        ),
+    ),
+    Migration(
+        6, 'import_jobs',
+        up=["""
+            CREATE TABLE import_jobs (
+                job_id VARCHAR(100) PRIMARY KEY,
+                kind VARCHAR(20) NOT NULL,
+                rows_committed INT UNSIGNED NOT NULL DEFAULT 0,
+                status ENUM('running', 'completed', 'failed') NOT NULL DEFAULT 'running',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+            )
+        """],
+        down=["DROP TABLE import_jobs"],
+        detect=_table_exists('import_jobs'),
+    ),
+    Migration(
+        # Version stamp of a user's appointments and records, incremented by
+        # every write to them (see actions/response_cache.py)
+        7, 'users_data_version',
+        up=["ALTER TABLE users ADD COLUMN data_version INT UNSIGNED NOT NULL DEFAULT 0"],
+        down=["ALTER TABLE users DROP COLUMN data_version"],
+        detect=_column_exists('users', 'data_version'),
+    ),
+    Migration(
+        # A user's scheduled appointments in date order. Without status in
+        # the key, idx_appointments_user_date walks past every cancelled and
+        # completed appointment to find the scheduled ones.
+        8, 'appointments_user_status_index',
+        up=[
+            "ALTER TABLE appointments "
+            "ADD INDEX idx_appointments_user_status_date (user_id, status, appointment_date)",
+        ],
+        down=["ALTER TABLE appointments DROP INDEX idx_appointments_user_status_date"],
+        detect=_indexes_exist(('appointments', 'idx_appointments_user_status_date')),
+    ),
+]
+
+
+class MigrationRunner:
+    """Applies and reverts MIGRATIONS against a DatabaseManager"""
+
+    def __init__(self, db, migrations: List[Migration] = None, log: Callable[[str], None] = print):
+        self.db = db
+        self.migrations = sorted(migrations or MIGRATIONS, key=lambda migration: migration.version)
+        self.log = log
+
+    def ensure_tracking_table(self):
+        self.db.execute_query("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INT PRIMARY KEY,
+                name VARCHAR(100) NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """, fetch=False)
+
+    def applied_versions(self) -> set:
+        rows = self.db.execute_query("SELECT version FROM schema_migrations")
+        return {row['version'] for row in rows}
+
+    def status(self) -> List[tuple]:
+        """(migration, applied) for every known migration"""
+        self.ensure_tracking_table()
+        applied = self.applied_versions()
+        return [(migration, migration.version in applied) for migration in self.migrations]
+
+    def _record(self, migration: Migration):
+        self.db.execute_query(
+            "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+            (migration.version, migration.name), fetch=False
+        )
+
+    def upgrade(self, target: Optional[int] = None) -> List[Migration]:
+        """Apply pending migrations up to `target` (default: all), in order"""
+        self.ensure_tracking_table()
+        applied = self.applied_versions()
+        done = []
+        for migration in self.migrations:
+            if migration.version in applied or (target is not None and migration.version > target):
+                continue
+
+            if migration.detect and self.db.execute_query(migration.detect):
+                self.log(f"✅ {migration.version:04d} {migration.name}: already in place, recorded")
+                self._record(migration)
+                done.append(migration)
+                continue
+
+            if migration.blockers:
+                rows = self.db.execute_query(migration.blockers)
+                if rows:
+                    raise MigrationError(
+                        f"{migration.version:04d} {migration.name} is blocked by existing data: "
+                        + "; ".join(", ".join(f"{key}={value}" for key, value in row.items()) for row in rows)
+                    )
+
+            self.log(f"➕ {migration.version:04d} {migration.name}")
+            try:
+                for statement in migration.up:
+                    self.db.execute_query(statement, fetch=False)
+            except Exception as e:
+                raise MigrationError(f"{migration.version:04d} {migration.name} failed: {str(e)}")
+            self._record(migration)
+            done.append(migration)
+        return done
+
+    def downgrade(self, target: int) -> List[Migration]:
+        """Revert applied migrations newer than `target`, newest first"""
+        self.ensure_tracking_table()
+        applied = self.applied_versions()
+        done = []
+        for migration in reversed(self.migrations):
+            if migration.version <= target or migration.version not in applied:
+                continue
+
+            self.log(f"➖ {migration.version:04d} {migration.name}")
+            try:
+                for statement in migration.down:
+                    self.db.execute_query(statement, fetch=False)
+            except Exception as e:
+                raise MigrationError(f"{migration.version:04d} {migration.name} revert failed: {str(e)}")
+            self.db.execute_query("DELETE FROM schema_migrations WHERE version = %s",
+                                  (migration.version,), fetch=False)
+            done.append(migration)
+        return done
@@ -0,0 +1,196 @@
+"""
+Password hashing for the user accounts in server.py.
+
+New passwords are hashed with scrypt (memory-hard, cost set in
+PASSWORD_CONFIG). Older formats are still accepted at login and flagged for
+rehashing:
+
+    scrypt$n=16384,r=8,p=1$<salt>$<hash>   current format (base64 salt/hash)
+    <salt>:<sha256 hex>                     single-round SHA-256
+    <anything without ':' or '$'>           plaintext (legacy users)
+
+Hashing is deliberately expensive, so logins run it through a bounded
+VerificationPool instead of the request thread.
+"""
+
+import base64
+import hashlib
+import hmac
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from .db_config import PASSWORD_CONFIG
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.b64encode(raw).decode().rstrip('=')
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+class ScryptHasher:
+    """scrypt KDF with the cost parameters stored alongside each hash"""
+
+    prefix = 'scrypt'
+
+    def __init__(self, n: int = 2 ** 14, r: int = 8, p: int = 1, salt_size: int = 16, key_size: int = 32):
+        if n < 2 or n & (n - 1):
+            raise ValueError("scrypt n must be a power of two greater than 1")
+        self.n = n
+        self.r = r
+        self.p = p
+        self.salt_size = salt_size
+        self.key_size = key_size
+
+    def identify(self, encoded: str) -> bool:
+        return encoded.startswith(self.prefix + '$')
+
+    def _derive(self, password: str, salt: bytes, n: int, r: int, p: int, key_size: int) -> bytes:
+        # OpenSSL refuses to allocate more than maxmem; size it for the cost
+        maxmem = 128 * r * (n + p + 2) + 1024 * 1024
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                              maxmem=maxmem, dklen=key_size)
+
+    def _parse(self, encoded: str):
+        _, params, salt, key = encoded.split('$')
+        values = dict(item.split('=') for item in params.split(','))
+        return int(values['n']), int(values['r']), int(values['p']), _b64decode(salt), _b64decode(key)
+
+    def hash(self, password: str) -> str:
+        salt = secrets.token_bytes(self.salt_size)
+        key = self._derive(password, salt, self.n, self.r, self.p, self.key_size)
+        return f"{self.prefix}$n={self.n},r={self.r},p={self.p}${_b64encode(salt)}${_b64encode(key)}"
+
+    def verify(self, password: str, encoded: str) -> bool:
+        n, r, p, salt, key = self._parse(encoded)
+        candidate = self._derive(password, salt, n, r, p, len(key))
+        return hmac.compare_digest(candidate, key)
+
+    def needs_rehash(self, encoded: str) -> bool:
+        """True when the hash was made with different cost parameters"""
+        n, r, p, _, key = self._parse(encoded)
+        return (n, r, p, len(key)) != (self.n, self.r, self.p, self.key_size)
+
+
+class Sha256Hasher:
+    """Legacy single-round salted SHA-256 ("salt:hexdigest")"""
+
+    def identify(self, encoded: str) -> bool:
+        return ':' in encoded and '$' not in encoded
+
+    def verify(self, password: str, encoded: str) -> bool:
+        salt, stored_hash = encoded.split(':', 1)
+        password_hash = hashlib.sha256((password + salt).encode()).hexdigest()
+        return hmac.compare_digest(password_hash, stored_hash)
+
+
+class PlaintextHasher:
+    """Legacy rows that stored the password itself"""
+
+    def identify(self, encoded: str) -> bool:
+        return ':' not in encoded and '$' not in encoded
+
+    def verify(self, password: str, encoded: str) -> bool:
+        return hmac.compare_digest(password.encode(), encoded.encode())
+
+
+class PasswordContext:
+    """Hashes with the default hasher and verifies any known format"""
+
+    def __init__(self, default: ScryptHasher, legacy: tuple = ()):
+        self.default = default
+        self.legacy = tuple(legacy)
+        self._dummy_hash = None
+
+    def identify(self, encoded: str):
+        for hasher in (self.default,) + self.legacy:
+            if hasher.identify(encoded):
+                return hasher
+        return None
+
+    def hash(self, password: str) -> str:
+        return self.default.hash(password)
+
+    def verify(self, password: str, encoded: Optional[str]) -> bool:
+        return self.verify_and_update(password, encoded)[0]
+
+    def verify_and_update(self, password: str, encoded: Optional[str]) -> Tuple[bool, Optional[str]]:
+        """Check a password and return (valid, new_hash).
+
+        new_hash is set when the password was correct but stored in a legacy
+        format or with outdated cost parameters; the caller should save it.
+        """
+        if not encoded:
+            # Unknown user: still pay for one hash so unknown emails take as
+            # long as wrong passwords
+            if self._dummy_hash is None:
+                self._dummy_hash = self.default.hash(secrets.token_hex(16))
+            self.default.verify(password, self._dummy_hash)
+            return False, None
+
+        hasher = self.identify(encoded)
+        try:
+            valid = hasher is not None and hasher.verify(password, encoded)
+        except (ValueError, KeyError):
+            # Malformed hash in the database
+            valid = False
+        if not valid:
+            return False, None
+
+        if hasher is not self.default or self.default.needs_rehash(encoded):
+            return True, self.default.hash(password)
+        return True, None
+
+
+class HasherBusyError(Exception):
+    """Raised when the hashing pool is saturated and the caller should retry later"""
+
+
+class VerificationPool:
+    """Bounded thread pool for password hashing.
+
+    At most `workers` hashes run at once and at most `max_pending` more may
+    queue. Further callers wait up to `wait_timeout` seconds for a slot and
+    then get HasherBusyError, so a burst of logins is turned away quickly
+    instead of tying up every server thread and several MiB of scrypt
+    memory per request.
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 16, wait_timeout: float = 2.0):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self.wait_timeout = wait_timeout
+
+    def run(self, fn, *args):
+        """Run fn(*args) on the pool and return its result"""
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            raise HasherBusyError("Too many concurrent password checks")
+        try:
+            future = self.executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+
+def create_password_context(config: dict = None) -> PasswordContext:
+    config = config or PASSWORD_CONFIG
+    scrypt = ScryptHasher(n=config['scrypt_n'], r=config['scrypt_r'], p=config['scrypt_p'])
+    return PasswordContext(scrypt, legacy=(Sha256Hasher(), PlaintextHasher()))
+
+
+# Shared instances used by server.py
+password_context = create_password_context()
+verification_pool = VerificationPool(
+    workers=PASSWORD_CONFIG['workers'],
+    max_pending=PASSWORD_CONFIG['max_pending'],
+    wait_timeout=PASSWORD_CONFIG['wait_timeout'],
+)
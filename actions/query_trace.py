@@ -0,0 +1,193 @@
+"""
+Query-level tracing for the database layers.
+
+DatabaseManager and AsyncDatabaseManager report every statement to the
+process-wide query_tracer with its time split into connect (pool checkout,
+including opening a connection), execute and fetch. The tracer keeps:
+
+- the slowest statements, in a bounded buffer
+- per-fingerprint totals (calls, time, rows), so a statement that runs once
+  per row - an N+1 pattern - stands out by its call count
+- a slow-query log entry for every statement above slow_query_ms
+
+Fingerprints replace literals and placeholders with ? and collapse IN lists
+and multi-row VALUES, so the same statement with different parameters is
+counted together. Hooks registered with add_hook receive every QueryTrace.
+"""
+
+import functools
+import heapq
+import itertools
+import logging
+import re
+import threading
+import time
+from collections import namedtuple
+from typing import Callable, Dict, List
+
+from .db_config import TRACE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+QueryTrace = namedtuple('QueryTrace', [
+    'fingerprint', 'sql', 'params', 'rows', 'connect', 'execute', 'fetch', 'error', 'at'
+])
+
+# Statements whose fingerprint did not fit in the table are counted here
+OTHER_FINGERPRINT = '<other>'
+SQL_PREVIEW_LENGTH = 500
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|%\(\w+\)s")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_REPEATED_LIST = re.compile(r"\(\?\+\)(?:\s*,\s*\(\?\+\))+")
+_SPACE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=1024)
+def fingerprint(sql: str) -> str:
+    """Normalize a statement so calls that differ only in values match"""
+    text = _STRING.sub('?', sql)
+    text = _PLACEHOLDER.sub('?', text)
+    text = _NUMBER.sub('?', text)
+    text = _LIST.sub('(?+)', text)
+    text = _REPEATED_LIST.sub('(?+), ...', text)
+    return _SPACE.sub(' ', text).strip().rstrip(';')
+
+
+def param_count(params) -> int:
+    """Number of bound values; params may be the values or already a count"""
+    if isinstance(params, int):
+        return params
+    return len(params) if params else 0
+
+
+class QueryTracer:
+    """Collects QueryTraces; thread-safe, bounded in memory"""
+
+    def __init__(self, slow_query_ms: float = None, slowest_kept: int = None, fingerprints_kept: int = None):
+        self.slow_query_ms = TRACE_CONFIG['slow_query_ms'] if slow_query_ms is None else slow_query_ms
+        self.slowest_kept = slowest_kept or TRACE_CONFIG['slowest_kept']
+        self.fingerprints_kept = fingerprints_kept or TRACE_CONFIG['fingerprints_kept']
+        self.hooks: List[Callable[[QueryTrace], None]] = []
+        self._lock = threading.Lock()
+        self._order = itertools.count()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._slowest = []  # min-heap of (seconds, order, trace)
+            self._fingerprints: Dict[str, list] = {}
+            self._queries = 0
+            self._since = time.time()
+
+    def add_hook(self, hook: Callable[[QueryTrace], None]):
+        """Call hook(trace) for every statement recorded from now on"""
+        self.hooks.append(hook)
+
+    def record(self, sql: str, params=None, rows: int = 0, connect: float = 0.0, execute: float = 0.0,
+               fetch: float = 0.0, error: bool = False):
+        """Record one statement; times are in seconds"""
+        trace = QueryTrace(fingerprint(sql), sql, param_count(params), rows, connect, execute, fetch,
+                           error, time.time())
+        total = connect + execute + fetch
+        with self._lock:
+            self._queries += 1
+            key = trace.fingerprint
+            totals = self._fingerprints.get(key)
+            if totals is None:
+                if len(self._fingerprints) >= self.fingerprints_kept:
+                    key = OTHER_FINGERPRINT
+                    totals = self._fingerprints.setdefault(key, [0, 0.0, 0.0, 0, 0])
+                else:
+                    # calls, seconds, max seconds, rows, errors
+                    totals = self._fingerprints[key] = [0, 0.0, 0.0, 0, 0]
+            totals[0] += 1
+            totals[1] += total
+            totals[2] = max(totals[2], total)
+            totals[3] += rows
+            totals[4] += 1 if error else 0
+
+            entry = (total, next(self._order), trace)
+            if len(self._slowest) < self.slowest_kept:
+                heapq.heappush(self._slowest, entry)
+            elif total > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+        if total * 1000 >= self.slow_query_ms:
+            logger.warning(
+                f"Slow query {total * 1000:.1f}ms (connect {connect * 1000:.1f}ms, execute "
+                f"{execute * 1000:.1f}ms, fetch {fetch * 1000:.1f}ms, {trace.params} params, "
+                f"{rows} rows): {trace.fingerprint}"
+            )
+        for hook in self.hooks:
+            hook(trace)
+
+    def snapshot(self, limit: int = None) -> dict:
+        """Slowest statements and per-fingerprint totals, as JSON-friendly dicts"""
+        ms = lambda seconds: round(seconds * 1000, 3)
+        with self._lock:
+            slowest = sorted(self._slowest, key=lambda entry: entry[0], reverse=True)
+            fingerprints = sorted(self._fingerprints.items(), key=lambda item: item[1][1], reverse=True)
+            queries = self._queries
+            since = self._since
+        return {
+            'since': since,
+            'queries': queries,
+            'slow_query_ms': self.slow_query_ms,
+            'slowest': [
+                {
+                    'fingerprint': trace.fingerprint,
+                    'sql': trace.sql[:SQL_PREVIEW_LENGTH],
+                    'params': trace.params,
+                    'rows': trace.rows,
+                    'connect_ms': ms(trace.connect),
+                    'execute_ms': ms(trace.execute),
+                    'fetch_ms': ms(trace.fetch),
+                    'total_ms': ms(total),
+                    'error': trace.error,
+                    'at': trace.at,
+                }
+                for total, _, trace in slowest[:limit]
+            ],
+            'fingerprints': [
+                {
+                    'fingerprint': key,
+                    'calls': calls,
+                    'total_ms': ms(seconds),
+                    'mean_ms': ms(seconds / calls),
+                    'max_ms': ms(max_seconds),
+                    'rows': rows,
+                    'errors': errors,
+                }
+                for key, (calls, seconds, max_seconds, rows, errors) in fingerprints[:limit]
+            ],
+        }
+
+
+# Shared by every database manager in the process
+query_tracer = QueryTracer()
+
+
+class StatementTimer:
+    """Times one statement's execute and fetch phases and records it on finish()"""
+
+    __slots__ = ('sql', 'params', 'connect', 'started', 'executed')
+
+    def __init__(self, sql: str, params=None, connect: float = 0.0):
+        # params: the bound values, or their count
+        self.sql = sql
+        self.params = params
+        self.connect = connect
+        self.started = time.perf_counter()
+        self.executed = None
+
+    def mark_executed(self):
+        self.executed = time.perf_counter()
+
+    def finish(self, rows: int = 0, error: bool = False):
+        now = time.perf_counter()
+        executed = self.executed or now
+        query_tracer.record(self.sql, self.params, rows, self.connect, executed - self.started,
+                            now - executed, error)
@@ -0,0 +1,90 @@
+"""
+Per-user response cache for the dashboard endpoints of server.py.
+
+html/user.html loads GET /api/appointments?user_id= and
+GET /api/records?user_id= on every visit, and each call runs the same query
+joined with the doctors table.
+
+users.data_version stamps everything the dashboard shows for a user. Every
+write to a user's appointments or medical records increments it after the
+write: the server.py handlers, AppointmentManager in the action server and
+bulk record imports. Every server process therefore sees the change on its
+next request. A request reads the stamp (a primary key lookup) and serves
+the body cached for that stamp, or runs the query and caches the result.
+
+Entries live in a bounded LRU and expire after `ttl` seconds, which bounds
+how long a write made outside the application (plain SQL) stays unseen.
+Responses carry an ETag (a hash of the body) and `Cache-Control: private,
+no-cache`, so browsers revalidate with If-None-Match and get 304 Not
+Modified while nothing changed.
+"""
+
+import hashlib
+import time
+from collections import namedtuple
+from typing import Iterable, List, Optional, Tuple
+
+from .db_config import RESPONSE_CACHE_CONFIG
+from .lru_cache import LRUCache
+
+DATA_VERSION_QUERY = "SELECT data_version FROM users WHERE id = %s"
+
+CachedResponse = namedtuple('CachedResponse', ['version', 'etag', 'body', 'stored_at'])
+
+
+def bump_data_versions(user_ids: Iterable) -> Tuple[str, List]:
+    """Statement and parameters incrementing the data version of users"""
+    ids = list(dict.fromkeys(user_ids))
+    query = f"UPDATE users SET data_version = data_version + 1 WHERE id IN ({', '.join(['%s'] * len(ids))})"
+    return query, ids
+
+
+def body_etag(body: bytes) -> str:
+    return hashlib.sha1(body).hexdigest()
+
+
+class ResponseCache:
+    """Response bodies keyed by (resource, user_id, ...), valid for one data version"""
+
+    def __init__(self, capacity: int = 2000, ttl: float = 300.0, clock=time.monotonic):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = LRUCache(capacity)
+
+    def get(self, key: tuple, version) -> Optional[CachedResponse]:
+        """The entry stored for this data version, unless it has expired"""
+        now = self.clock()
+        return self._entries.get(
+            key, valid=lambda entry: entry.version == version and now - entry.stored_at < self.ttl
+        )
+
+    def put(self, key: tuple, version, body: bytes) -> CachedResponse:
+        entry = CachedResponse(version, body_etag(body), body, self.clock())
+        self._entries.put(key, entry)
+        return entry
+
+    def invalidate(self, user_id=None):
+        """Drop the entries of one user, or every entry"""
+        if user_id is None:
+            self._entries.remove_where(lambda key, entry: True)
+        else:
+            self._entries.remove_where(lambda key, entry: key[1] == str(user_id))
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self._entries),
+            'capacity': self.capacity,
+            'ttl': self.ttl,
+            'hits': self._entries.hits,
+            'misses': self._entries.misses,
+        }
+
+
+def create_response_cache(config: dict = None) -> ResponseCache:
+    config = config or RESPONSE_CACHE_CONFIG
+    return ResponseCache(capacity=config['size'], ttl=config['ttl'])
+
+
+# Shared instance used by server.py
+response_cache = create_response_cache()
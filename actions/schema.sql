@@ -1,4 +1,10 @@
 -- Drop dependent tables first
+DROP TABLE IF EXISTS schema_migrations;
+DROP TABLE IF EXISTS import_jobs;
+DROP TABLE IF EXISTS revoked_sessions;
+DROP TABLE IF EXISTS doctor_shifts;
+DROP TABLE IF EXISTS clinic_holidays;
+DROP TABLE IF EXISTS clinic_hours;
 DROP TABLE IF EXISTS medical_records;
 DROP TABLE IF EXISTS appointments;
 DROP TABLE IF EXISTS doctors;
@@ -14,7 +20,10 @@ CREATE TABLE users (
     sex ENUM('male', 'female', 'other') NOT NULL,
     age INT UNSIGNED NOT NULL,
     phone VARCHAR(20) NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- Incremented by every write to the user's appointments and records;
+    -- cached dashboard responses are valid for one version
+    data_version INT UNSIGNED NOT NULL DEFAULT 0
 );
 
 -- Create doctor table
@@ -22,7 +31,8 @@ CREATE TABLE doctors (
     id INT AUTO_INCREMENT PRIMARY KEY,
     name VARCHAR(100) NOT NULL,
     specialty VARCHAR(100),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_doctors_specialty (specialty, name)
 );
 
 -- Create appointments table
@@ -35,8 +45,17 @@ CREATE TABLE appointments (
     status ENUM('scheduled', 'completed', 'cancelled') DEFAULT 'scheduled',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    -- Doctor holding the slot; NULL once cancelled or completed, so only
+    -- scheduled appointments compete for (doctor, time). Appointments start
+    -- on the 30-minute grid (enforced by the application), so overlapping
+    -- bookings share a start time and the unique key catches them
+    booked_doctor_id INT AS (IF(status = 'scheduled', doctor_id, NULL)) STORED,
     FOREIGN KEY (user_id) REFERENCES users(id),
-    FOREIGN KEY (doctor_id) REFERENCES doctors(id)
+    FOREIGN KEY (doctor_id) REFERENCES doctors(id),
+    UNIQUE KEY uniq_appointments_doctor_slot (booked_doctor_id, appointment_date),
+    INDEX idx_appointments_user_date (user_id, appointment_date),
+    INDEX idx_appointments_user_status_date (user_id, status, appointment_date),
+    INDEX idx_appointments_status_date (status, appointment_date)
 );
 
 -- Create medical_records table
@@ -51,5 +70,71 @@ CREATE TABLE medical_records (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (patient_id) REFERENCES users(id),
-    FOREIGN KEY (doctor_id) REFERENCES doctors(id)
-);
\ No newline at end of file
+    FOREIGN KEY (doctor_id) REFERENCES doctors(id),
+    INDEX idx_records_patient_date (patient_id, record_date, created_at),
+    INDEX idx_records_date (record_date, created_at)
+);
+
+-- Sessions ended by logout before their token expired
+CREATE TABLE revoked_sessions (
+    session_id VARCHAR(64) PRIMARY KEY,
+    user_id INT NOT NULL,
+    expires_at DATETIME NOT NULL,
+    revoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_revoked_sessions_expires (expires_at)
+);
+
+-- Opening hours per weekday (0 = Monday); days without a row are closed
+CREATE TABLE clinic_hours (
+    weekday TINYINT UNSIGNED PRIMARY KEY,
+    opens_at TIME NOT NULL,
+    closes_at TIME NOT NULL
+);
+
+INSERT INTO clinic_hours (weekday, opens_at, closes_at) VALUES
+    (0, '08:00', '18:00'), (1, '08:00', '18:00'), (2, '08:00', '18:00'),
+    (3, '08:00', '18:00'), (4, '08:00', '18:00'), (5, '09:00', '14:00');
+
+-- Days the clinic is closed (public holidays, closures)
+CREATE TABLE clinic_holidays (
+    holiday_date DATE PRIMARY KEY,
+    description VARCHAR(100)
+);
+
+-- Working hours per doctor; doctors without rows work the full clinic hours
+CREATE TABLE doctor_shifts (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    doctor_id INT NOT NULL,
+    weekday TINYINT UNSIGNED NOT NULL,
+    starts_at TIME NOT NULL,
+    ends_at TIME NOT NULL,
+    FOREIGN KEY (doctor_id) REFERENCES doctors(id) ON DELETE CASCADE,
+    INDEX idx_doctor_shifts_doctor (doctor_id, weekday)
+);
+
+-- Progress of bulk imports, so an interrupted import can resume
+CREATE TABLE import_jobs (
+    job_id VARCHAR(100) PRIMARY KEY,
+    kind VARCHAR(20) NOT NULL,
+    rows_committed INT UNSIGNED NOT NULL DEFAULT 0,
+    status ENUM('running', 'completed', 'failed') NOT NULL DEFAULT 'running',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- Migrations already contained in this schema (see actions/migrations.py)
+CREATE TABLE schema_migrations (
+    version INT PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO schema_migrations (version, name) VALUES
+    (1, 'appointments_updated_at'),
+    (2, 'revoked_sessions'),
+    (3, 'clinic_calendar'),
+    (4, 'appointments_slot_key'),
+    (5, 'hot_query_indexes'),
+    (6, 'import_jobs'),
+    (7, 'users_data_version'),
+    (8, 'appointments_user_status_index');
@@ -0,0 +1,147 @@
+"""
+Signed session tokens for the web frontend.
+
+A token is `<payload>.<signature>`: base64url JSON claims
+({uid, sid, iat, exp}) and an HMAC-SHA256 of them with SESSION_SECRET.
+Anyone holding the secret can check a token without the database.
+
+SessionManager keeps two LRU caches so /api/validate-session usually needs
+no query at all:
+    - validated sessions (sid -> user), trusted for `recheck_interval`
+    - revoked sessions (logout) and users (account deletion) in this process
+
+Revocations made by other server processes are picked up from the
+revoked_sessions table / users table when a cached entry is rechecked.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import time
+from typing import Optional, Tuple
+
+from .db_config import SESSION_CONFIG
+from .lru_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidTokenError(Exception):
+    """Raised when a token is malformed, forged, expired or revoked"""
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+class SessionManager:
+    """Issues and validates signed session tokens"""
+
+    def __init__(self, secret: bytes, ttl: float = 8 * 3600, cache_size: int = 10000,
+                 recheck_interval: float = 60.0, clock=time.time):
+        self.secret = secret
+        self.ttl = ttl
+        self.recheck_interval = recheck_interval
+        self.clock = clock
+        # sid -> (user, validated_at)
+        self._validated = LRUCache(cache_size)
+        # sid -> exp; uid -> revoked_at
+        self._revoked_sessions = LRUCache(cache_size)
+        self._revoked_users = LRUCache(cache_size)
+
+    def _sign(self, payload: str) -> str:
+        return _b64encode(hmac.new(self.secret, payload.encode(), hashlib.sha256).digest())
+
+    def issue(self, user: dict) -> str:
+        """Create a token for a user dict ({'id', 'name', 'email'})"""
+        now = int(self.clock())
+        claims = {'uid': user['id'], 'sid': secrets.token_urlsafe(16), 'iat': now, 'exp': now + int(self.ttl)}
+        payload = _b64encode(json.dumps(claims, separators=(',', ':'), sort_keys=True).encode())
+        self._validated.put(claims['sid'], (user, self.clock()))
+        return f"{payload}.{self._sign(payload)}"
+
+    def decode(self, token: str) -> dict:
+        """Check signature and expiry and return the token's claims"""
+        try:
+            payload, signature = token.split('.')
+        except (AttributeError, ValueError):
+            raise InvalidTokenError("Malformed token")
+
+        if not hmac.compare_digest(signature, self._sign(payload)):
+            raise InvalidTokenError("Invalid token signature")
+
+        try:
+            claims = json.loads(_b64decode(payload))
+        except ValueError:
+            raise InvalidTokenError("Malformed token")
+
+        if claims['exp'] <= self.clock():
+            raise InvalidTokenError("Session has expired")
+        return claims
+
+    def validate(self, token: str) -> Tuple[dict, Optional[dict]]:
+        """Validate a token locally.
+
+        Returns (claims, user). user is None when the session has not been
+        confirmed recently; the caller should check the database and then
+        call mark_validated().
+        """
+        claims = self.decode(token)
+
+        if self._revoked_sessions.get(claims['sid']) is not None:
+            raise InvalidTokenError("Session has been revoked")
+        revoked_at = self._revoked_users.get(claims['uid'])
+        if revoked_at is not None and claims['iat'] <= revoked_at:
+            raise InvalidTokenError("Session has been revoked")
+
+        cached = self._validated.get(claims['sid'])
+        if cached is not None:
+            user, validated_at = cached
+            if self.clock() - validated_at < self.recheck_interval:
+                return claims, user
+        return claims, None
+
+    def mark_validated(self, claims: dict, user: dict):
+        self._validated.put(claims['sid'], (user, self.clock()))
+
+    def revoke(self, claims: dict):
+        """Revoke one session (logout)"""
+        self._validated.pop(claims['sid'])
+        self._revoked_sessions.put(claims['sid'], claims['exp'])
+
+    def revoke_user(self, user_id):
+        """Revoke every session issued so far for a user (account deletion)"""
+        self._revoked_users.put(user_id, int(self.clock()))
+        self._validated.remove_where(lambda sid, entry: entry[0].get('id') == user_id)
+
+    def stats(self) -> dict:
+        return {
+            'validated': len(self._validated),
+            'revoked_sessions': len(self._revoked_sessions),
+            'revoked_users': len(self._revoked_users),
+        }
+
+
+def create_session_manager(config: dict = None) -> SessionManager:
+    config = config or SESSION_CONFIG
+    secret = config['secret']
+    if not secret:
+        logger.warning("SESSION_SECRET is not set; using a random key, sessions end when the server restarts")
+        secret = secrets.token_hex(32)
+    return SessionManager(
+        secret.encode(),
+        ttl=config['ttl'],
+        cache_size=config['cache_size'],
+        recheck_interval=config['recheck_interval'],
+    )
+
+
+# Shared instance used by server.py
+session_manager = create_session_manager()
@@ -0,0 +1,124 @@
+"""
+Specialty names from slot values and free text.
+
+The synonym table is the `synonym:` entries of data/nlu.yml whose value is
+one of SPECIALTIES, so Rasa's EntitySynonymMapper and the actions map the
+same phrases. Matching is case-insensitive and accepts the plural of each
+phrase ("surgeons", "cardiologists", "surgeries") without listing it.
+
+Slot values are looked up in a dict. Free text is lower-cased and scanned
+once with a regex compiled from a trie of all phrases, so the cost grows
+with the message length, not with the number of synonyms, and the leftmost,
+longest phrase wins ("pediatric cardiologists" over "pediatric").
+"""
+
+import os
+import re
+from typing import Dict, Optional
+
+import yaml
+
+NLU_DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'nlu.yml')
+
+# Specialty names as stored in the doctors table
+SPECIALTIES = ('Adult Cardiology', 'Pediatric Cardiology', 'Cardiovascular Surgery')
+
+def normalize_phrase(text: str) -> str:
+    """Lower-case and single-spaced"""
+    return ' '.join(text.lower().split())
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == '_'
+
+
+def plural(phrase: str) -> str:
+    """English plural of the last word of a phrase"""
+    if phrase.endswith('y'):
+        return phrase[:-1] + 'ies'
+    return phrase + 's'
+
+
+def _trie_pattern(phrases) -> str:
+    """Regex alternation of phrases, factored by common prefixes"""
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node) -> str:
+        branches = [(r'\s+' if char == ' ' else re.escape(char)) + build(child)
+                    for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # A phrase ends here and a longer one continues: the rest is optional
+        return f'(?:{body})?' if '' in node else body
+
+    return build(trie)
+
+
+def load_nlu_synonyms(path: str = NLU_DATA) -> Dict[str, str]:
+    """Synonym -> specialty from the `synonym:` entries of a Rasa NLU file"""
+    with open(path, encoding='utf-8') as source:
+        data = yaml.safe_load(source) or {}
+    synonyms = {}
+    for entry in data.get('nlu') or []:
+        if entry.get('synonym') in SPECIALTIES:
+            for line in (entry.get('examples') or '').splitlines():
+                example = line.strip().lstrip('-').strip()
+                if example:
+                    synonyms[example] = entry['synonym']
+    return synonyms
+
+
+class SpecialtyResolver:
+    """Maps specialty phrases to specialty names with one precompiled regex"""
+
+    def __init__(self, synonyms: Dict[str, str]):
+        # Every specialty also matches its own name
+        phrases = {normalize_phrase(name): name for name in SPECIALTIES}
+        phrases.update((normalize_phrase(phrase), name) for phrase, name in synonyms.items())
+        table = {}
+        for phrase, name in phrases.items():
+            table.setdefault(plural(phrase), name)
+        table.update(phrases)
+        self._table = table
+        # Slot values usually arrive exactly as written in the NLU data
+        self._exact = {**synonyms, **{name: name for name in SPECIALTIES}}
+        self._pattern = re.compile(_trie_pattern(table) + r'\b')
+
+    @classmethod
+    def from_nlu(cls, path: str = NLU_DATA) -> 'SpecialtyResolver':
+        return cls(load_nlu_synonyms(path))
+
+    def match(self, text: str) -> Optional[str]:
+        """Specialty named by the whole text, or else by the first phrase found in it"""
+        if not text:
+            return None
+        exact = self._exact.get(text)
+        if exact:
+            return exact
+        lowered = text.lower()
+        exact = self._table.get(lowered)
+        if exact:
+            return exact
+        found = self._pattern.search(lowered)
+        # A leading \b would keep the regex engine from skipping ahead on the
+        # first character of a phrase, so the start boundary is checked here
+        while found and found.start() and _is_word_char(lowered[found.start() - 1]):
+            found = self._pattern.search(lowered, found.start() + 1)
+        return self._table.get(normalize_phrase(found.group(0))) if found else None
+
+    def resolve(self, specialty: Optional[str], message_text: str = '') -> Optional[str]:
+        """Map a specialty slot value, or failing that the message text, to a
+        specialty name. An unrecognized slot value is returned unchanged."""
+        if specialty:
+            return self.match(specialty) or specialty
+        return self.match(message_text) or specialty
+
+
+# Shared by the actions; compiled once when the action server imports it
+specialty_resolver = SpecialtyResolver.from_nlu()
@@ -0,0 +1,41 @@
+"""
+Per-call latency of the appointment date/time parser.
+
+Times each expression the appointment form sees through
+actions/datetime_parser.py and prints microseconds per call.
+
+Usage:
+    python benchmark_datetime_parser.py
+    python benchmark_datetime_parser.py --number 200000
+"""
+
+import argparse
+import timeit
+
+from actions.datetime_parser import normalize_date, normalize_time
+
+DATE_INPUTS = ['tomorrow', 'friday', 'next tuesday', 'in 3 days', '2030-06-11']
+TIME_INPUTS = ['2 PM', '14:30', '2:30 pm', 'half past two', 'noon', "ten o'clock"]
+
+
+def per_call_us(fn, *args, number: int) -> float:
+    return timeit.timeit(lambda: fn(*args), number=number) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark date/time normalization")
+    parser.add_argument('--number', type=int, default=100000, help="Calls per expression")
+    args = parser.parse_args()
+
+    print(f"{'call':<45}{'us/call':>10}")
+    for text in DATE_INPUTS:
+        print(f"{f'normalize_date({text!r})':<45}{per_call_us(normalize_date, text, number=args.number):>10.2f}")
+    for text in TIME_INPUTS:
+        print(f"{f'normalize_time({text!r})':<45}{per_call_us(normalize_time, text, number=args.number):>10.2f}")
+    for text in TIME_INPUTS:
+        label = f'normalize_time({text!r}, date)'
+        print(f"{label:<45}{per_call_us(normalize_time, text, '2030-06-11', number=args.number):>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+"""
+Regression-gated micro-benchmarks for the hot pure-Python paths.
+
+Times each benchmark in microseconds per call (best of several repeats) and
+compares the result with the saved baseline. The run fails when a benchmark
+is slower than its baseline by more than --max-regression percent. Without
+a baseline file the results are saved as the new baseline.
+
+Usage:
+    python run_tests.py --bench
+    python benchmark_hot_paths.py --max-regression 15
+    python benchmark_hot_paths.py --save-baseline     # accept current numbers
+    python benchmark_hot_paths.py --only normalize_time
+
+Baselines are machine specific: record them on the machine that runs the
+check.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+from collections import namedtuple
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from rasa_sdk import Tracker
+
+from actions.action_appointments import _extract_user_id_from_tracker
+from actions.appointment_manager import AppointmentManager
+from actions.content_store import format_doctor_list
+from actions.specialty_resolver import specialty_resolver
+
+BASELINE_FILE = 'benchmark_baseline.json'
+DEFAULT_MAX_REGRESSION = float(os.getenv('BENCH_MAX_REGRESSION', 25))
+
+# A benchmark runs `fn` once per call; `calls` is how many calls one run makes
+Benchmark = namedtuple('Benchmark', ['name', 'fn', 'calls'])
+
+manager = AppointmentManager()
+
+# Weekday names and ISO dates are open days whatever today is
+DATE_INPUTS = ['friday', 'next tuesday', 'wednesday', '2030-06-11', '2030-06-14']
+TIME_INPUTS = [('2 PM', '2030-06-11'), ('14:30', '2030-06-11'), ('half past two', '2030-06-11'),
+               ('noon', '2030-06-11'), ("ten o'clock", '2030-06-15')]
+WORKING_HOURS_INPUTS = [('2030-06-11', '08:00'), ('2030-06-11', '14:30'), ('2030-06-15', '12:00')]
+ENTITIES = [
+    {'entity': 'doctor_name', 'value': 'Dr. Smith', 'start': 20, 'end': 29},
+    {'entity': 'date', 'value': 'friday', 'start': 33, 'end': 39},
+    {'entity': 'time', 'value': '2 PM', 'start': 43, 'end': 47, 'additional_info': {'grain': 'hour'}},
+    {'entity': 'reason', 'value': 'chest pain', 'start': 52, 'end': 62},
+]
+DOCTORS = [
+    {'id': i, 'name': f'Dr. Doctor{i}', 'specialty': specialty}
+    for specialty in ('Adult Cardiology', 'Cardiovascular Surgery', 'Pediatric Cardiology')
+    for i in range(10)
+]
+SPECIALTY_INPUTS = [
+    ('Adult Cardiology', ''), ('surgeons', ''), ('Pediatric Cardiologists', ''),
+    (None, 'I need a pediatric cardiologist for my son'),
+    (None, 'can you show me the heart surgeons please'),
+    (None, 'who can help with my blood pressure'),
+]
+
+
+def _tracker(slots: dict, metadata: dict) -> Tracker:
+    return Tracker('bench', slots, {'text': '', 'metadata': metadata}, [], False, None, {}, 'action_listen')
+
+
+USER = json.dumps({'id': 42, 'name': 'Jane Doe'})
+TRACKERS = [
+    _tracker({'session_started_metadata': {'user': USER}}, {}),
+    # Falls back to the latest message metadata
+    _tracker({'session_started_metadata': None}, {'user': USER}),
+]
+
+
+def _each(fn: Callable, inputs: list) -> Callable[[], None]:
+    def run():
+        for args in inputs:
+            fn(*args)
+    return run
+
+
+BENCHMARKS = [
+    Benchmark('normalize_date', _each(manager._normalize_date, [(text,) for text in DATE_INPUTS]),
+              len(DATE_INPUTS)),
+    Benchmark('normalize_time', _each(manager._normalize_time, TIME_INPUTS), len(TIME_INPUTS)),
+    Benchmark('check_working_hours', _each(manager._check_working_hours, WORKING_HOURS_INPUTS),
+              len(WORKING_HOURS_INPUTS)),
+    Benchmark('entities_to_slots', lambda: manager._entities_to_slots(ENTITIES), 1),
+    Benchmark('format_doctor_list', lambda: format_doctor_list(DOCTORS), 1),
+    Benchmark('resolve_specialty', _each(specialty_resolver.resolve, SPECIALTY_INPUTS), len(SPECIALTY_INPUTS)),
+    Benchmark('extract_user_id', _each(_extract_user_id_from_tracker, [(tracker,) for tracker in TRACKERS]),
+              len(TRACKERS)),
+]
+
+
+def measure(benchmark: Benchmark, repeat: int = 5) -> float:
+    """Best-of-`repeat` microseconds per call; each repeat takes at least 0.2s"""
+    timer = timeit.Timer(benchmark.fn)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return best / number / benchmark.calls * 1e6
+
+
+def run_benchmarks(benchmarks: List[Benchmark] = None, repeat: int = 5) -> Dict[str, float]:
+    return {benchmark.name: measure(benchmark, repeat) for benchmark in benchmarks or BENCHMARKS}
+
+
+def load_baseline(path: str = BASELINE_FILE) -> Optional[dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as source:
+        return json.load(source)
+
+
+def save_baseline(results: Dict[str, float], path: str = BASELINE_FILE):
+    baseline = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.node(),
+        'results_us': {name: round(value, 4) for name, value in results.items()},
+    }
+    with open(path, 'w', encoding='utf-8') as output:
+        json.dump(baseline, output, indent=2)
+        output.write('\n')
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], max_regression: float) -> List[tuple]:
+    """(name, baseline us, current us, change %, regressed) per benchmark.
+
+    Benchmarks missing from the baseline have no change and never regress.
+    """
+    rows = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        change = (current - before) / before * 100 if before else None
+        rows.append((name, before, current, change, change is not None and change > max_regression))
+    return rows
+
+
+def print_comparison(rows: List[tuple], max_regression: float):
+    print(f"{'benchmark':<24}{'baseline us':>13}{'current us':>13}{'change':>10}")
+    for name, before, current, change, regressed in rows:
+        before_text = f"{before:.3f}" if before is not None else 'new'
+        change_text = f"{change:+.1f}%" if change is not None else '-'
+        flag = f"  ❌ slower than +{max_regression:g}%" if regressed else ''
+        print(f"{name:<24}{before_text:>13}{current:>13.3f}{change_text:>10}{flag}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks with a regression gate")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help=f"Baseline file (default: {BASELINE_FILE})")
+    parser.add_argument('--max-regression', type=float, default=DEFAULT_MAX_REGRESSION,
+                        help="Allowed slowdown in percent (default: BENCH_MAX_REGRESSION or 25)")
+    parser.add_argument('--save-baseline', action='store_true', help="Store these results as the baseline")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--only', nargs='+', metavar='NAME', help="Run only these benchmarks")
+    args = parser.parse_args(argv)
+
+    benchmarks = BENCHMARKS
+    if args.only:
+        unknown = set(args.only) - {benchmark.name for benchmark in BENCHMARKS}
+        if unknown:
+            parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+        benchmarks = [benchmark for benchmark in BENCHMARKS if benchmark.name in args.only]
+
+    results = run_benchmarks(benchmarks, repeat=args.repeat)
+    baseline = load_baseline(args.baseline)
+
+    if baseline is None or args.save_baseline:
+        if baseline is not None:
+            # Keep the numbers of benchmarks that were not run this time
+            results = {**baseline['results_us'], **results}
+        save_baseline(results, args.baseline)
+        for name, value in results.items():
+            print(f"{name:<24}{value:>13.3f} us")
+        print(f"\n💾 Baseline saved to {args.baseline}")
+        return 0
+
+    if baseline.get('python') != platform.python_version():
+        print(f"⚠️  Baseline was recorded with Python {baseline.get('python')}, "
+              f"running {platform.python_version()}")
+
+    rows = compare(results, baseline['results_us'], args.max_regression)
+    print_comparison(rows, args.max_regression)
+    regressed = [row[0] for row in rows if row[4]]
+    if regressed:
+        print(f"\n❌ {len(regressed)} benchmark(s) regressed: {', '.join(regressed)}")
+        return 1
+    print(f"\n✅ No benchmark regressed by more than {args.max_regression:g}%")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Logins-per-second benchmark for the password hasher at different scrypt costs.
+
+For each cost setting this measures single-threaded verifications per second
+and the throughput of concurrent logins going through the bounded
+VerificationPool used by /api/login. No database is needed.
+
+Usage:
+    python benchmark_login.py
+    python benchmark_login.py --costs 12 14 16 --clients 32 --workers 4
+"""
+
+import argparse
+import hashlib
+import threading
+import time
+
+from actions.password_hasher import (
+    HasherBusyError, PasswordContext, ScryptHasher, Sha256Hasher, VerificationPool
+)
+
+
+def measure_serial(verify, stored_hash: str, duration: float) -> float:
+    count = 0
+    stop_at = time.perf_counter() + duration
+    while time.perf_counter() < stop_at:
+        verify('correct horse battery staple', stored_hash)
+        count += 1
+    return count / duration
+
+
+def measure_pool(verify, stored_hash: str, args: argparse.Namespace) -> dict:
+    pool = VerificationPool(workers=args.workers, max_pending=args.max_pending, wait_timeout=args.wait_timeout)
+    lock = threading.Lock()
+    counts = {'ok': 0, 'busy': 0}
+    stop_at = time.perf_counter() + args.duration
+
+    def client():
+        while time.perf_counter() < stop_at:
+            try:
+                pool.run(verify, 'correct horse battery staple', stored_hash)
+                key = 'ok'
+            except HasherBusyError:
+                key = 'busy'
+            with lock:
+                counts[key] += 1
+
+    threads = [threading.Thread(target=client) for _ in range(args.clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    pool.shutdown()
+    return {'rps': counts['ok'] / elapsed, 'busy': counts['busy']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark password verification throughput")
+    parser.add_argument('--costs', type=int, nargs='+', default=[12, 13, 14, 15, 16],
+                        help="scrypt cost exponents to test (n = 2**cost)")
+    parser.add_argument('--duration', type=float, default=3.0)
+    parser.add_argument('--clients', type=int, default=16, help="Concurrent login threads")
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--max-pending', type=int, default=16)
+    parser.add_argument('--wait-timeout', type=float, default=2.0)
+    args = parser.parse_args()
+
+    print(f"{'hasher':<22}{'memory':>10}{'serial/s':>12}{'pooled/s':>12}{'rejected':>10}")
+
+    # Baseline: the single-round SHA-256 scheme being replaced
+    legacy = Sha256Hasher()
+    salt = 'abcdef0123456789'
+    sha_hash = f"{salt}:" + hashlib.sha256(f"correct horse battery staple{salt}".encode()).hexdigest()
+    serial = measure_serial(legacy.verify, sha_hash, args.duration)
+    pooled = measure_pool(legacy.verify, sha_hash, args)
+    print(f"{'sha256 (legacy)':<22}{'-':>10}{serial:>12.0f}{pooled['rps']:>12.0f}{pooled['busy']:>10}")
+
+    for cost in args.costs:
+        hasher = ScryptHasher(n=2 ** cost)
+        context = PasswordContext(hasher)
+        stored_hash = context.hash('correct horse battery staple')
+        serial = measure_serial(context.verify, stored_hash, args.duration)
+        pooled = measure_pool(context.verify, stored_hash, args)
+        memory = f"{128 * hasher.n * hasher.r // (1024 * 1024)} MiB"
+        print(f"{f'scrypt n=2^{cost}':<22}{memory:>10}{serial:>12.1f}{pooled['rps']:>12.1f}{pooled['busy']:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Requests-per-second benchmark: Werkzeug dev server vs serve.py.
+
+Starts each server in a subprocess on its own port, drives
+GET /api/appointments?user_id=<id> from concurrent keep-alive clients
+and prints throughput and latency for both. Needs the MySQL database
+configured for server.py.
+
+Usage:
+    python benchmark_server.py
+    python benchmark_server.py --user-id 1 --concurrency 32 --duration 15
+    python benchmark_server.py --workers 4 --threads 8
+"""
+
+import argparse
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+DEV_SERVER = (
+    "import server; "
+    "server.app.run(host='127.0.0.1', port={port}, debug=True, use_reloader=False)"
+)
+
+
+def wait_for_port(port: int, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not start within {timeout}s")
+
+
+def start_server(kind: str, port: int, args: argparse.Namespace) -> subprocess.Popen:
+    env = dict(os.environ)
+    if kind == 'dev':
+        command = [sys.executable, '-c', DEV_SERVER.format(port=port)]
+    else:
+        command = [sys.executable, 'serve.py', '--port', str(port),
+                   '--workers', str(args.workers), '--threads', str(args.threads),
+                   '--log-level', 'warning']
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_for_port(port)
+    return process
+
+
+def client_loop(port: int, path: str, stop_at: float, latencies: list, errors: list):
+    """Issue requests on one keep-alive connection until stop_at"""
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    while time.monotonic() < stop_at:
+        started = time.perf_counter()
+        try:
+            connection.request('GET', path)
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+            else:
+                latencies.append(time.perf_counter() - started)
+            if response.will_close:
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            connection.close()
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    connection.close()
+
+
+def run_load(port: int, args: argparse.Namespace) -> dict:
+    path = f"/api/appointments?user_id={args.user_id}"
+
+    # Warm up connections, pools and caches before measuring
+    client_loop(port, path, time.monotonic() + 1.0, [], [])
+
+    latencies, errors = [], []
+    stop_at = time.monotonic() + args.duration
+    threads = [
+        threading.Thread(target=client_loop, args=(port, path, stop_at, latencies, errors))
+        for _ in range(args.concurrency)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    ms = lambda q: latencies[min(int(q * len(latencies)), len(latencies) - 1)] * 1000 if latencies else 0.0
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'rps': len(latencies) / elapsed,
+        'p50_ms': ms(0.50),
+        'p99_ms': ms(0.99),
+        'mean_ms': statistics.mean(latencies) * 1000 if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Flask dev server against serve.py")
+    parser.add_argument('--user-id', default='1')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--port', type=int, default=5100, help="First port to use")
+    args = parser.parse_args()
+
+    results = {}
+    for offset, kind in enumerate(['dev', 'production']):
+        port = args.port + offset
+        print(f"Benchmarking {kind} server on port {port}...")
+        process = start_server(kind, port, args)
+        try:
+            results[kind] = run_load(port, args)
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+    print()
+    print(f"GET /api/appointments?user_id={args.user_id} - "
+          f"{args.concurrency} clients for {args.duration:.0f}s")
+    print(f"{'server':<12}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'mean ms':>10}{'errors':>8}")
+    for kind, result in results.items():
+        print(f"{kind:<12}{result['rps']:>10.1f}{result['p50_ms']:>10.2f}"
+              f"{result['p99_ms']:>10.2f}{result['mean_ms']:>10.2f}{result['errors']:>8}")
+
+    if results['dev']['rps']:
+        print(f"\nSpeed-up: {results['production']['rps'] / results['dev']['rps']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Per-call latency of the specialty resolver against the mapping it replaced.
+
+Times actions/specialty_resolver.py and the former dict lookup plus linear
+substring scan (kept below for comparison) on slot values and on messages
+the action had to scan, and prints microseconds per call for both. A second
+table repeats a miss with larger synonym tables: the scan grows with the
+number of synonyms, the compiled pattern with the message length.
+
+Usage:
+    python benchmark_specialty_resolver.py
+    python benchmark_specialty_resolver.py --number 200000
+"""
+
+import argparse
+import timeit
+
+from actions.specialty_resolver import SpecialtyResolver, specialty_resolver
+
+# The mapping and scan medical_actions.py used before the compiled resolver
+LEGACY_MAPPING = {
+    # Direct mappings for database values
+    'Adult Cardiology': 'Adult Cardiology',
+    'Pediatric Cardiology': 'Pediatric Cardiology',
+    'Cardiovascular Surgery': 'Cardiovascular Surgery',
+
+    # Single word mappings
+    'Adult': 'Adult Cardiology',
+    'adult': 'Adult Cardiology',
+    'Pediatric': 'Pediatric Cardiology',
+    'pediatric': 'Pediatric Cardiology',
+    'Cardiovascular': 'Cardiovascular Surgery',
+    'cardiovascular': 'Cardiovascular Surgery',
+
+    # Surgery mappings (the key fix!)
+    'Surgery': 'Cardiovascular Surgery',
+    'surgery': 'Cardiovascular Surgery',
+    'Surgeons': 'Cardiovascular Surgery',
+    'surgeons': 'Cardiovascular Surgery',
+    'Surgeon': 'Cardiovascular Surgery',
+    'surgeon': 'Cardiovascular Surgery',
+
+    # Full phrase mappings (the key fix!)
+    'adult cardiologist': 'Adult Cardiology',
+    'Adult cardiologist': 'Adult Cardiology',
+    'Adult Cardiologist': 'Adult Cardiology',
+    'adult cardiologists': 'Adult Cardiology',
+    'Adult cardiologists': 'Adult Cardiology',
+    'Adult Cardiologists': 'Adult Cardiology',
+
+    'pediatric cardiologist': 'Pediatric Cardiology',
+    'Pediatric cardiologist': 'Pediatric Cardiology',
+    'Pediatric Cardiologist': 'Pediatric Cardiology',
+    'pediatric cardiologists': 'Pediatric Cardiology',
+    'Pediatric cardiologists': 'Pediatric Cardiology',
+    'Pediatric Cardiologists': 'Pediatric Cardiology',
+
+    'cardiovascular surgeon': 'Cardiovascular Surgery',
+    'Cardiovascular surgeon': 'Cardiovascular Surgery',
+    'Cardiovascular Surgeon': 'Cardiovascular Surgery',
+    'cardiovascular surgeons': 'Cardiovascular Surgery',
+    'Cardiovascular surgeons': 'Cardiovascular Surgery',
+    'Cardiovascular Surgeons': 'Cardiovascular Surgery'
+}
+
+
+def legacy_resolve_specialty(specialty: str, message_text: str) -> str:
+    """Map a specialty slot value, or failing that the message text, to a database specialty"""
+    # First, try to map the extracted specialty
+    if specialty and specialty in LEGACY_MAPPING:
+        return LEGACY_MAPPING[specialty]
+
+    # If no specialty extracted, try parsing the message
+    if not specialty:
+        latest_message = message_text.lower()
+        for key, value in LEGACY_MAPPING.items():
+            if key.lower() in latest_message:
+                return value
+
+    return specialty
+
+
+# (slot value, message text)
+INPUTS = [
+    ('Adult Cardiology', ''),
+    ('surgeons', ''),
+    ('Pediatric Cardiologists', ''),
+    ('pediatric specialist', ''),
+    (None, 'I need a pediatric cardiologist for my son'),
+    (None, 'can you show me the heart surgeons please'),
+    (None, 'who can help with my blood pressure'),
+    (None, 'my father had a heart attack last year and his doctor said he should see someone '
+           'about his valves, who would you recommend for that kind of problem at your clinic'),
+]
+
+
+MISS = INPUTS[-1][1]
+TABLE_SIZES = [len(LEGACY_MAPPING), 200, 1000]
+
+
+def synthetic_synonyms(size: int) -> dict:
+    """LEGACY_MAPPING padded with made-up two word synonyms up to size entries"""
+    synonyms = dict(LEGACY_MAPPING)
+    for i in range(size - len(synonyms)):
+        synonyms[f'heart specialist{i}'] = 'Adult Cardiology'
+    return synonyms
+
+
+def legacy_scan(mapping: dict, message_text: str):
+    latest_message = message_text.lower()
+    for key, value in mapping.items():
+        if key.lower() in latest_message:
+            return value
+    return None
+
+
+def per_call_us(fn, *args, number: int) -> float:
+    return timeit.timeit(lambda: fn(*args), number=number) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark specialty resolution, old and new")
+    parser.add_argument('--number', type=int, default=100000, help="Calls per input")
+    args = parser.parse_args()
+
+    print(f"{'input':<48}{'old us':>9}{'new us':>9}{'speedup':>9}  result")
+    for specialty, message in INPUTS:
+        old = per_call_us(legacy_resolve_specialty, specialty, message, number=args.number)
+        new = per_call_us(specialty_resolver.resolve, specialty, message, number=args.number)
+        before = legacy_resolve_specialty(specialty, message)
+        after = specialty_resolver.resolve(specialty, message)
+        result = after if before == after else f"{after} (was {before})"
+        label = repr(specialty) if specialty else repr(message)
+        label = label if len(label) <= 46 else label[:43] + "...'"
+        print(f"{label:<48}{old:>9.2f}{new:>9.2f}{old / new:>8.1f}x  {result}")
+
+    print(f"\n{'synonyms (no match)':<48}{'old us':>9}{'new us':>9}{'speedup':>9}")
+    for size in TABLE_SIZES:
+        synonyms = synthetic_synonyms(size)
+        resolver = SpecialtyResolver(synonyms)
+        old = per_call_us(legacy_scan, synonyms, MISS, number=args.number // 10)
+        new = per_call_us(resolver.match, MISS, number=args.number // 10)
+        print(f"{size:<48}{old:>9.2f}{new:>9.2f}{old / new:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
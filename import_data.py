@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Bulk import patients or medical records from a CSV or NDJSON file.
+
+Usage:
+    python import_data.py patients clinic_patients.csv
+    python import_data.py records history.ndjson --job partner-history
+    python import_data.py records history.csv --chunk-size 5000
+
+CSV files need a header row with the column names:
+    patients: first_name, last_name, email, sex, age, phone
+    records:  patient_id, doctor_id, record_type, title, description, record_date
+
+Progress is committed every chunk. If an import stops part way, run the same
+command again (same job id) and it continues after the last committed chunk.
+The job id defaults to "<kind>:<file name>".
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+# Add the project root to Python path so we can import from actions
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from actions.bulk_import import IMPORT_KINDS, BulkImporter, BulkImportError, detect_format, read_rows
+from actions.db_connect import db_manager
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import patients or medical records")
+    parser.add_argument('kind', choices=sorted(IMPORT_KINDS))
+    parser.add_argument('file', help="CSV or NDJSON file")
+    parser.add_argument('--format', choices=['csv', 'ndjson'],
+                        help="Input format (default: from the file extension)")
+    parser.add_argument('--job', help="Job id used to resume (default: <kind>:<file name>)")
+    parser.add_argument('--chunk-size', type=int, help="Rows per committed chunk (default: IMPORT_CHUNK_SIZE)")
+    parser.add_argument('--show-errors', type=int, default=20, metavar='N',
+                        help="Row errors to print (default: 20)")
+    return parser.parse_args(argv)
+
+
+def print_progress(report):
+    print(f"   {report.rows_read} rows, {report.rows_inserted} inserted, "
+          f"{report.rows_failed} failed ({report.rows_per_second:.0f} rows/s)", end='\r')
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    job_id = args.job or f"{args.kind}:{os.path.basename(args.file)}"
+
+    try:
+        fmt = args.format or detect_format(args.file)
+        importer = BulkImporter(db_manager, chunk_size=args.chunk_size, progress=print_progress)
+        print(f"📥 Importing {args.kind} from {args.file} (job {job_id})...")
+        with open(args.file, encoding='utf-8-sig', newline='') as source:
+            report = importer.run(args.kind, read_rows(source, fmt), job_id)
+    except (BulkImportError, OSError) as e:
+        print(f"❌ {str(e)}")
+        return 1
+    except Exception as e:
+        print()
+        print(f"❌ Import stopped: {str(e)}")
+        print(f"   Run the same command again to resume job {job_id}")
+        return 1
+
+    print()
+    print(f"✅ {report.rows_inserted} inserted, {report.rows_failed} failed, "
+          f"{report.rows_skipped} already imported earlier")
+    print(f"⏱️ {report.elapsed:.1f}s, {report.rows_per_second:.0f} rows/s")
+    for line, message in report.errors[:args.show_errors]:
+        print(f"   line {line}: {message}")
+    if report.rows_failed > args.show_errors:
+        print(f"   ... and {report.rows_failed - args.show_errors} more")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,561 @@
+#!/usr/bin/env python3
+"""
+Load-test harness: synthetic data generator and traffic replay.
+
+Usage:
+    python load_test.py generate --users 100000 --appointments 300000 --records 500000
+    python load_test.py run --duration 60 --concurrency 32
+    python load_test.py compare load_results/run-a.json load_results/run-b.json
+    python load_test.py clean
+
+`generate` writes synthetic doctors, users, appointments and medical records
+into the database configured in actions/db_connect.py (use a local or
+throw-away MySQL, never production) and saves a manifest of what it created
+to load_results/dataset.json. Every generated user logs in with
+LOAD_TEST_PASSWORD.
+
+`run` replays a weighted mix of concurrent requests against server.py and
+the action server webhook for the generated users, and stores p50/p95/p99
+latency and throughput per endpoint and action in load_results/<time>.json.
+`compare` prints the difference between two such runs.
+
+`clean` deletes the rows listed in the manifest again.
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, namedtuple
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional
+from urllib.parse import urlencode, urlsplit
+
+# Add the project root to Python path so we can import from actions
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from actions.datetime_parser import OPENING_HOURS
+
+RESULTS_DIR = 'load_results'
+DATASET_MANIFEST = os.path.join(RESULTS_DIR, 'dataset.json')
+LOAD_TEST_PASSWORD = 'load-test-password'
+EMAIL_DOMAIN = 'loadtest.example'
+SLOT_MINUTES = 30
+FUTURE_DAYS = 60
+
+FIRST_NAMES = ['James', 'Mary', 'John', 'Patricia', 'Robert', 'Jennifer', 'Michael', 'Linda', 'David',
+               'Elizabeth', 'Ahmet', 'Elif', 'Wei', 'Mei', 'Carlos', 'Lucia', 'Omar', 'Fatima', 'Ivan', 'Olga']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Yilmaz',
+              'Kaya', 'Chen', 'Wang', 'Rodriguez', 'Lopez', 'Hassan', 'Ali', 'Petrov', 'Ivanova', 'Kim', 'Nguyen']
+SPECIALTIES = ['Adult Cardiology', 'Pediatric Cardiology', 'Cardiovascular Surgery']
+REASONS = ['Routine checkup', 'Chest pain', 'Follow-up visit', 'Blood pressure review', 'Palpitations',
+           'Shortness of breath', 'Test results', 'Medication review']
+RECORD_TITLES = {
+    'diagnosis': ['Hypertension', 'Atrial fibrillation', 'Angina', 'Heart murmur'],
+    'treatment': ['Cardiac rehabilitation', 'Lifestyle plan', 'Post-operative care'],
+    'test_result': ['ECG', 'Echocardiogram', 'Lipid panel', 'Stress test'],
+    'prescription': ['Beta blocker', 'Statin', 'Anticoagulant', 'ACE inhibitor'],
+    'note': ['Consultation note', 'Phone consultation', 'Referral letter'],
+}
+
+
+class SyntheticData:
+    """Deterministic rows for a dataset of the given size.
+
+    Ids continue after `first_user_id` / `first_doctor_id`, appointments only
+    go to the generated doctors and never share a (doctor, slot), so the data
+    can be added to a database that already holds rows.
+    """
+
+    def __init__(self, users: int, doctors: int, appointments: int, records: int, seed: int = 42,
+                 first_user_id: int = 1, first_doctor_id: int = 1, today: Optional[date] = None):
+        if users < 1 or doctors < 1:
+            raise ValueError("At least one user and one doctor are required")
+        self.users = users
+        self.doctors = doctors
+        self.appointments = appointments
+        self.records = records
+        self.seed = seed
+        self.first_user_id = first_user_id
+        self.first_doctor_id = first_doctor_id
+        self.today = today or date.today()
+
+    def _rng(self, table: str) -> random.Random:
+        # One stream per table, so changing one count does not reshuffle the rest
+        return random.Random(f"{self.seed}:{table}")
+
+    def user_ids(self) -> range:
+        return range(self.first_user_id, self.first_user_id + self.users)
+
+    def doctor_ids(self) -> range:
+        return range(self.first_doctor_id, self.first_doctor_id + self.doctors)
+
+    def doctor_rows(self) -> Iterator[tuple]:
+        rng = self._rng('doctors')
+        for doctor_id in self.doctor_ids():
+            name = f"Dr. {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            yield (doctor_id, name, SPECIALTIES[doctor_id % len(SPECIALTIES)])
+
+    def user_rows(self, password_hash: str) -> Iterator[tuple]:
+        rng = self._rng('users')
+        for user_id in self.user_ids():
+            yield (
+                user_id, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), user_email(user_id),
+                password_hash, rng.choice(('male', 'female')), rng.randint(18, 90),
+                f"555-{rng.randint(0, 9999):04d}"
+            )
+
+    def _slot_grid(self) -> List[datetime]:
+        """Bookable slots, oldest first, in a window that ends FUTURE_DAYS ahead"""
+        per_week = sum(
+            (hours[1] - hours[0]) // SLOT_MINUTES + 1 for hours in OPENING_HOURS if hours
+        )
+        # Leave a third of the grid free so the sample is not a dense block
+        needed = math.ceil(self.appointments * 1.5 / self.doctors)
+        days = max(FUTURE_DAYS + 7, math.ceil(needed / per_week * 7) + 7)
+        first_day = self.today + timedelta(days=FUTURE_DAYS - days)
+        grid = []
+        for offset in range(days):
+            day = first_day + timedelta(days=offset)
+            hours = OPENING_HOURS[day.weekday()]
+            if hours:
+                start = datetime.combine(day, datetime.min.time())
+                grid.extend(start + timedelta(minutes=minute)
+                            for minute in range(hours[0], hours[1] + 1, SLOT_MINUTES))
+        return grid
+
+    def appointment_rows(self) -> Iterator[tuple]:
+        if not self.appointments:
+            return
+        rng = self._rng('appointments')
+        grid = self._slot_grid()
+        now = datetime.combine(self.today, datetime.min.time())
+        # Each position is a distinct (slot, doctor) pair
+        for position in sorted(rng.sample(range(len(grid) * self.doctors), self.appointments)):
+            slot = grid[position // self.doctors]
+            doctor_id = self.first_doctor_id + position % self.doctors
+            if slot < now:
+                status = 'cancelled' if rng.random() < 0.15 else 'completed'
+            else:
+                status = 'cancelled' if rng.random() < 0.1 else 'scheduled'
+            user_id = self.first_user_id + rng.randrange(self.users)
+            yield (user_id, doctor_id, slot, rng.choice(REASONS), status)
+
+    def record_rows(self) -> Iterator[tuple]:
+        rng = self._rng('records')
+        types = list(RECORD_TITLES)
+        for _ in range(self.records):
+            # Squaring skews records towards low ids: a few patients have long histories
+            patient_id = self.first_user_id + int(rng.random() ** 2 * self.users)
+            doctor_id = None if rng.random() < 0.1 else self.first_doctor_id + rng.randrange(self.doctors)
+            record_type = rng.choice(types)
+            title = rng.choice(RECORD_TITLES[record_type])
+            record_date = self.today - timedelta(days=rng.randrange(5 * 365))
+            yield (patient_id, doctor_id, record_type, title, f"{title} ({record_type})", record_date)
+
+
+def user_email(user_id: int) -> str:
+    return f"user{user_id}@{EMAIL_DOMAIN}"
+
+
+def insert_rows(db, table: str, columns: List[str], rows: Iterator[tuple], chunk_size: int,
+                progress: Optional[Callable[[str, int], None]] = None) -> int:
+    """Insert rows with one executemany per committed chunk"""
+    query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+    inserted = 0
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return inserted
+        with db.transaction() as tx:
+            tx.execute_many(query, chunk)
+        inserted += len(chunk)
+        if progress:
+            progress(table, inserted)
+
+
+def _next_id(db, table: str) -> int:
+    rows = db.execute_query(f"SELECT COALESCE(MAX(id), 0) + 1 AS next_id FROM {table}")
+    return int(rows[0]['next_id'])
+
+
+def generate(db, users: int, doctors: int, appointments: int, records: int, seed: int = 42,
+             chunk_size: int = 5000, password_hash: str = None,
+             progress: Optional[Callable[[str, int], None]] = None) -> dict:
+    """Write a synthetic dataset into db and return its manifest"""
+    if password_hash is None:
+        from actions.password_hasher import password_context
+        # One hash for everyone: hashing a million passwords would take hours
+        password_hash = password_context.hash(LOAD_TEST_PASSWORD)
+
+    data = SyntheticData(users, doctors, appointments, records, seed=seed,
+                         first_user_id=_next_id(db, 'users'), first_doctor_id=_next_id(db, 'doctors'))
+    started = time.perf_counter()
+    insert_rows(db, 'doctors', ['id', 'name', 'specialty'], data.doctor_rows(), chunk_size, progress)
+    insert_rows(db, 'users', ['id', 'first_name', 'last_name', 'email', 'password', 'sex', 'age', 'phone'],
+                data.user_rows(password_hash), chunk_size, progress)
+    insert_rows(db, 'appointments', ['user_id', 'doctor_id', 'appointment_date', 'reason', 'status'],
+                data.appointment_rows(), chunk_size, progress)
+    insert_rows(db, 'medical_records',
+                ['patient_id', 'doctor_id', 'record_type', 'title', 'description', 'record_date'],
+                data.record_rows(), chunk_size, progress)
+
+    return {
+        'seed': seed,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'seconds': round(time.perf_counter() - started, 1),
+        'user_ids': [data.user_ids().start, data.user_ids().stop - 1],
+        'doctor_ids': [data.doctor_ids().start, data.doctor_ids().stop - 1],
+        'appointments': appointments,
+        'records': records,
+        'password': LOAD_TEST_PASSWORD,
+    }
+
+
+def clean(db, manifest: dict, batch_size: int = 10000) -> Dict[str, int]:
+    """Delete the rows a generate() run created, in batches"""
+    users = tuple(manifest['user_ids'])
+    doctors = tuple(manifest['doctor_ids'])
+    statements = [
+        ('medical_records', "DELETE FROM medical_records WHERE patient_id BETWEEN %s AND %s", users),
+        ('medical_records', "DELETE FROM medical_records WHERE doctor_id BETWEEN %s AND %s", doctors),
+        ('appointments', "DELETE FROM appointments WHERE user_id BETWEEN %s AND %s", users),
+        ('appointments', "DELETE FROM appointments WHERE doctor_id BETWEEN %s AND %s", doctors),
+        ('users', "DELETE FROM users WHERE id BETWEEN %s AND %s", users),
+        ('doctors', "DELETE FROM doctors WHERE id BETWEEN %s AND %s", doctors),
+    ]
+    deleted = Counter()
+    for table, query, params in statements:
+        while True:
+            result = db.execute_query(f"{query} LIMIT {batch_size}", params, fetch=False)
+            deleted[table] += result.rowcount
+            if result.rowcount < batch_size:
+                break
+    return dict(deleted)
+
+
+# Traffic mix: name, target ('api' = server.py, 'actions' = action server),
+# relative weight and a builder returning (method, path, body)
+Operation = namedtuple('Operation', ['name', 'target', 'weight', 'build'])
+
+
+def _random_user(rng: random.Random, dataset: dict) -> int:
+    return rng.randint(*dataset['user_ids'])
+
+
+def action_request(action: str, user_id: int, slots: dict = None, sender: str = 'load-test') -> dict:
+    """Body of a POST /webhook call, as Rasa sends it to the action server"""
+    user = json.dumps({'id': user_id})
+    return {
+        'next_action': action,
+        'sender_id': sender,
+        'version': '3.6.4',
+        'domain': {},
+        'tracker': {
+            'sender_id': sender,
+            'slots': {'session_started_metadata': {'user': user}, **(slots or {})},
+            'latest_message': {
+                'text': '', 'intent': {'name': 'load_test', 'confidence': 1.0},
+                'entities': [], 'metadata': {'user': user},
+            },
+            'events': [],
+            'paused': False,
+            'followup_action': None,
+            'active_loop': {},
+            'latest_action_name': 'action_listen',
+        },
+    }
+
+
+def _action(action: str, weight: int, slots: Callable[[random.Random], dict] = None) -> Operation:
+    def build(rng, dataset):
+        body = action_request(action, _random_user(rng, dataset), slots(rng) if slots else None,
+                              sender=f"load-test-{rng.randrange(1000)}")
+        return 'POST', '/webhook', body
+    return Operation(f"action:{action}", 'actions', weight, build)
+
+
+def _get(path: str, weight: int, params: Callable[[random.Random, dict], dict]) -> Operation:
+    def build(rng, dataset):
+        return 'GET', f"{path}?{urlencode(params(rng, dataset))}", None
+    return Operation(f"GET {path}", 'api', weight, build)
+
+
+def _login(rng, dataset):
+    return 'POST', '/api/login', {'email': user_email(_random_user(rng, dataset)), 'password': dataset['password']}
+
+
+OPERATIONS = [
+    _get('/api/appointments', 25, lambda rng, dataset: {'user_id': _random_user(rng, dataset)}),
+    _get('/api/records', 15, lambda rng, dataset: {'user_id': _random_user(rng, dataset)}),
+    _get('/api/patients', 3, lambda rng, dataset: {'limit': 50}),
+    _get('/api/appointments/export', 2, lambda rng, dataset: {'user_id': _random_user(rng, dataset)}),
+    Operation('POST /api/login', 'api', 5, _login),
+    _action('action_view_appointments', 20),
+    _action('action_list_doctors', 10),
+    _action('action_list_doctors_by_specialty', 10, lambda rng: {'specialty': rng.choice(SPECIALTIES)}),
+    _action('action_view_medical_records', 5),
+]
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(math.ceil(q * len(sorted_values)) - 1, 0)]
+
+
+def summarize(latencies: List[float], errors: Counter, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    ms = lambda seconds: round(seconds * 1000, 3)
+    return {
+        'requests': len(latencies),
+        'errors': sum(errors.values()),
+        'error_codes': {str(code): count for code, count in sorted(errors.items(), key=str)},
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': ms(percentile(latencies, 0.50)),
+        'p95_ms': ms(percentile(latencies, 0.95)),
+        'p99_ms': ms(percentile(latencies, 0.99)),
+        'mean_ms': ms(sum(latencies) / len(latencies)) if latencies else 0.0,
+        'max_ms': ms(latencies[-1]) if latencies else 0.0,
+    }
+
+
+class _Client:
+    """One keep-alive connection per target for a worker thread"""
+
+    def __init__(self, urls: Dict[str, str], timeout: float):
+        self.urls = {target: urlsplit(url) for target, url in urls.items()}
+        self.timeout = timeout
+        self.connections = {}
+
+    def _connection(self, target: str) -> http.client.HTTPConnection:
+        if target not in self.connections:
+            url = self.urls[target]
+            self.connections[target] = http.client.HTTPConnection(url.hostname, url.port or 80,
+                                                                  timeout=self.timeout)
+        return self.connections[target]
+
+    def request(self, target: str, method: str, path: str, body: Optional[dict]) -> int:
+        connection = self._connection(target)
+        path = self.urls[target].path.rstrip('/') + path
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        try:
+            connection.request(method, path, body=json.dumps(body) if body is not None else None,
+                               headers=headers)
+            response = connection.getresponse()
+            response.read()
+            if response.will_close:
+                self.close(target)
+            return response.status
+        except (OSError, http.client.HTTPException):
+            self.close(target)
+            raise
+
+    def close(self, target: str = None):
+        for name in [target] if target else list(self.connections):
+            connection = self.connections.pop(name, None)
+            if connection:
+                connection.close()
+
+
+def replay(urls: Dict[str, str], dataset: dict, operations: List[Operation] = None,
+           concurrency: int = 16, duration: float = 30.0, warmup: float = 2.0,
+           seed: int = 1, timeout: float = 10.0) -> dict:
+    """Drive a weighted operation mix from concurrent clients.
+
+    Operations whose target has no URL are skipped. Returns per-operation
+    and total latency/throughput stats for the measured period.
+    """
+    operations = [operation for operation in (operations or OPERATIONS) if operation.target in urls]
+    if not operations:
+        raise ValueError("No operations left for the given targets")
+    weights = [operation.weight for operation in operations]
+    results = [None] * concurrency
+    measure_from = time.monotonic() + warmup
+    stop_at = measure_from + duration
+
+    def worker(index: int):
+        rng = random.Random(f"{seed}:{index}")
+        client = _Client(urls, timeout)
+        latencies = {operation.name: [] for operation in operations}
+        errors = {operation.name: Counter() for operation in operations}
+        while True:
+            now = time.monotonic()
+            if now >= stop_at:
+                break
+            operation = rng.choices(operations, weights)[0]
+            method, path, body = operation.build(rng, dataset)
+            started = time.perf_counter()
+            try:
+                status = client.request(operation.target, method, path, body)
+            except (OSError, http.client.HTTPException) as e:
+                status = type(e).__name__
+            latency = time.perf_counter() - started
+            if now < measure_from:
+                continue
+            if isinstance(status, int) and status < 400:
+                latencies[operation.name].append(latency)
+            else:
+                errors[operation.name][status] += 1
+        client.close()
+        results[index] = (latencies, errors)
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    report = {'operations': {}}
+    all_latencies, all_errors = [], Counter()
+    for operation in operations:
+        latencies = [value for result in results for value in result[0][operation.name]]
+        errors = sum((result[1][operation.name] for result in results), Counter())
+        all_latencies.extend(latencies)
+        all_errors.update(errors)
+        report['operations'][operation.name] = summarize(latencies, errors, duration)
+    report['total'] = summarize(all_latencies, all_errors, duration)
+    return report
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(results: dict, path: str = None) -> str:
+    path = path or os.path.join(RESULTS_DIR, f"run-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as output:
+        json.dump(results, output, indent=2)
+    return path
+
+
+def load_json(path: str) -> dict:
+    with open(path, encoding='utf-8') as source:
+        return json.load(source)
+
+
+def print_report(results: dict):
+    print(f"{'operation':<42}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    rows = list(results['operations'].items()) + [('total', results['total'])]
+    for name, stats in rows:
+        print(f"{name:<42}{stats['throughput_rps']:>9.1f}{stats['p50_ms']:>9.2f}"
+              f"{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}{stats['errors']:>8}")
+
+
+def compare(base: dict, new: dict) -> List[tuple]:
+    """(operation, metric, base, new, change %) for operations in both runs"""
+    rows = []
+    names = [name for name in base['operations'] if name in new['operations']] + ['total']
+    for name in names:
+        before = base['total'] if name == 'total' else base['operations'][name]
+        after = new['total'] if name == 'total' else new['operations'][name]
+        for metric in ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms'):
+            change = (after[metric] - before[metric]) / before[metric] * 100 if before[metric] else None
+            rows.append((name, metric, before[metric], after[metric], change))
+    return rows
+
+
+def print_comparison(rows: List[tuple]):
+    print(f"{'operation':<42}{'metric':<16}{'base':>10}{'new':>10}{'change':>10}")
+    for name, metric, before, after, change in rows:
+        change_text = f"{change:+.1f}%" if change is not None else '-'
+        print(f"{name:<42}{metric:<16}{before:>10.2f}{after:>10.2f}{change_text:>10}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic data and load-test the whole stack")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    gen = commands.add_parser('generate', help="Write a synthetic dataset into the configured database")
+    gen.add_argument('--users', type=int, default=1000)
+    gen.add_argument('--doctors', type=int, default=50)
+    gen.add_argument('--appointments', type=int, default=3000)
+    gen.add_argument('--records', type=int, default=5000)
+    gen.add_argument('--seed', type=int, default=42)
+    gen.add_argument('--chunk-size', type=int, default=5000, help="Rows per committed insert")
+    gen.add_argument('--manifest', default=DATASET_MANIFEST)
+
+    run = commands.add_parser('run', help="Replay concurrent traffic and store the results")
+    run.add_argument('--api-url', default='http://127.0.0.1:5000', help="server.py base URL")
+    run.add_argument('--actions-url', default='http://127.0.0.1:5055', help="Action server base URL")
+    run.add_argument('--targets', default='api,actions', help="Comma-separated: api, actions")
+    run.add_argument('--concurrency', type=int, default=16)
+    run.add_argument('--duration', type=float, default=30.0)
+    run.add_argument('--warmup', type=float, default=2.0)
+    run.add_argument('--seed', type=int, default=1)
+    run.add_argument('--manifest', default=DATASET_MANIFEST)
+    run.add_argument('--output', help="Results file (default: load_results/run-<time>.json)")
+    run.add_argument('--label', help="Free-text note stored with the results")
+
+    cmp = commands.add_parser('compare', help="Compare two result files")
+    cmp.add_argument('base')
+    cmp.add_argument('new')
+
+    cln = commands.add_parser('clean', help="Delete the rows of a generated dataset")
+    cln.add_argument('--manifest', default=DATASET_MANIFEST)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.command == 'compare':
+        print_comparison(compare(load_json(args.base), load_json(args.new)))
+        return 0
+
+    if args.command == 'run':
+        dataset = load_json(args.manifest)
+        targets = {target.strip() for target in args.targets.split(',')}
+        urls = {target: url for target, url in (('api', args.api_url), ('actions', args.actions_url))
+                if target in targets}
+        print(f"🚦 {args.concurrency} clients for {args.duration:.0f}s against {', '.join(urls.values())}...")
+        report = replay(urls, dataset, concurrency=args.concurrency, duration=args.duration,
+                        warmup=args.warmup, seed=args.seed)
+        results = {
+            'label': args.label,
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'git_commit': _git_commit(),
+            'config': {'concurrency': args.concurrency, 'duration': args.duration,
+                       'warmup': args.warmup, 'seed': args.seed, 'targets': urls},
+            'dataset': dataset,
+            **report,
+        }
+        print_report(results)
+        print(f"\n💾 Results saved to {save_results(results, args.output)}")
+        return 0
+
+    from actions.db_connect import db_manager
+
+    if args.command == 'clean':
+        deleted = clean(db_manager, load_json(args.manifest))
+        print("🧹 Deleted " + ", ".join(f"{count} {table}" for table, count in deleted.items()))
+        return 0
+
+    def progress(table, inserted):
+        print(f"   {table}: {inserted} rows", end='\r')
+
+    print(f"🏗️ Generating {args.users} users, {args.doctors} doctors, {args.appointments} appointments "
+          f"and {args.records} medical records...")
+    manifest = generate(db_manager, args.users, args.doctors, args.appointments, args.records,
+                        seed=args.seed, chunk_size=args.chunk_size, progress=progress)
+    save_results(manifest, args.manifest)
+    print(f"\n✅ Done in {manifest['seconds']}s, manifest saved to {args.manifest}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
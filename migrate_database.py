@@ -1,8 +1,15 @@
 #!/usr/bin/env python3
 """
-Database migration script to add missing updated_at column
+Database migration runner (migrations are defined in actions/migrations.py)
+
+Usage:
+    python migrate_database.py                # apply all pending migrations
+    python migrate_database.py --to 3         # apply pending migrations up to version 3
+    python migrate_database.py --down 3       # revert every migration newer than version 3
+    python migrate_database.py --status       # list migrations and whether they are applied
 """
 
+import argparse
 import sys
 import os
 
@@ -10,50 +17,19 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from actions.db_connect import db_manager
+from actions.migrations import MigrationError, MigrationRunner
 
-def migrate_database():
-    """Add missing updated_at column to appointments table"""
-    try:
-        print("🔍 Checking if updated_at column exists...")
-        
-        # Check if column already exists
-        check_query = """
-            SELECT COLUMN_NAME 
-            FROM INFORMATION_SCHEMA.COLUMNS 
-            WHERE TABLE_SCHEMA = 'medical_bot' 
-            AND TABLE_NAME = 'appointments' 
-            AND COLUMN_NAME = 'updated_at'
-        """
-        
-        result = db_manager.execute_query(check_query)
-        
-        if result:
-            print("✅ updated_at column already exists")
-            return True
-        
-        print("➕ Adding updated_at column...")
-        
-        # Add the column
-        alter_query = """
-            ALTER TABLE appointments 
-            ADD COLUMN updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
-        """
-        
-        db_manager.execute_query(alter_query, fetch=False)
-        print("✅ Successfully added updated_at column to appointments table")
-        
-        # Verify the column was added
-        verify_result = db_manager.execute_query(check_query)
-        if verify_result:
-            print("✅ Column addition verified!")
-            return True
-        else:
-            print("❌ Column addition verification failed")
-            return False
-        
-    except Exception as e:
-        print(f"❌ Error migrating database: {str(e)}")
-        return False
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Apply or revert database schema migrations")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--to', type=int, metavar='VERSION', help="Upgrade only up to this version")
+    group.add_argument('--down', type=int, metavar='VERSION', help="Revert migrations newer than this version")
+    group.add_argument('--status', action='store_true', help="Show which migrations are applied")
+    return parser.parse_args(argv)
+
+def print_status(runner):
+    for migration, applied in runner.status():
+        print(f"{'✅' if applied else '⏳'} {migration.version:04d} {migration.name}")
 
 def check_database_connection():
     """Test database connection"""
@@ -70,21 +46,37 @@ def check_database_connection():
         print(f"❌ Database connection error: {str(e)}")
         return False
 
-if __name__ == "__main__":
+def main(argv=None):
+    args = parse_args(argv)
     print("🔄 Running database migration...")
     print("=" * 50)
-    
+
     # First test connection
     if not check_database_connection():
         print("❌ Cannot proceed without database connection")
-        sys.exit(1)
-    
-    # Run migration
-    success = migrate_database()
-    
+        return 1
+
+    runner = MigrationRunner(db_manager)
+    try:
+        if args.status:
+            print_status(runner)
+            return 0
+        if args.down is not None:
+            changed = runner.downgrade(args.down)
+        else:
+            changed = runner.upgrade(args.to)
+    except MigrationError as e:
+        print(f"❌ {str(e)}")
+        print("=" * 50)
+        print("❌ Database migration failed!")
+        return 1
+
     print("=" * 50)
-    if success:
-        print("✅ Database migration completed successfully!")
+    if changed:
+        print(f"✅ Database migration completed successfully! ({len(changed)} migration(s))")
     else:
-        print("❌ Database migration failed!")
-        sys.exit(1) 
\ No newline at end of file
+        print("✅ Database is already up to date")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+"""
+Entry point for the Rasa action server with per-action metrics.
+
+Takes the same options as `rasa run actions` and runs the same server, but
+first instruments the custom actions and starts the metrics endpoint (see
+actions/instrumentation.py). Neither happens when the actions package is
+merely imported.
+
+Usage:
+    python run_actions.py                    # actions package, port 5055
+    python run_actions.py --port 5056 --auto-reload
+
+ACTION_METRICS_HOST / ACTION_METRICS_PORT configure the metrics endpoint
+(port 0 turns it off); see .env.example.
+"""
+
+from rasa_sdk.__main__ import main_from_args
+from rasa_sdk.endpoint import create_argument_parser
+
+from actions.instrumentation import instrument_actions, start_metrics_server
+
+DEFAULT_ACTIONS_PACKAGE = 'actions'
+
+
+def main(argv=None):
+    args = create_argument_parser().parse_args(argv)
+    package = args.actions_module or args.actions or DEFAULT_ACTIONS_PACKAGE
+    args.actions = package
+
+    # The executor registers bound run() methods, so wrap them first
+    instrument_actions(package)
+    start_metrics_server()
+    main_from_args(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,8 @@ Run with:
   python run_tests.py          # Fast unit tests only
   python run_tests.py --all    # Include NLU accuracy tests
   python run_tests.py --nlu    # Only NLU accuracy tests
+  python run_tests.py --bench  # Micro-benchmarks, fail on regression vs baseline
+  python run_tests.py --bench --max-regression 15 --save-baseline
 """
 
 import sys
@@ -29,7 +31,24 @@ def run_tests(test_type="unit"):
     unit_tests = [
         "tests/test_medical_actions.py",
         "tests/test_appointment_actions.py", 
-        "tests/test_performance.py"
+        "tests/test_performance.py",
+        "tests/test_db_connect.py",
+        "tests/test_doctor_directory.py",
+        "tests/test_server.py",
+        "tests/test_password_hasher.py",
+        "tests/test_session_tokens.py",
+        "tests/test_datetime_parser.py",
+        "tests/test_clinic_calendar.py",
+        "tests/test_migrations.py",
+        "tests/test_bulk_import.py",
+        "tests/test_load_test.py",
+        "tests/test_benchmark_hot_paths.py",
+        "tests/test_instrumentation.py",
+        "tests/test_query_trace.py",
+        "tests/test_query_budget.py",
+        "tests/test_content_store.py",
+        "tests/test_specialty_resolver.py",
+        "tests/test_response_cache.py"
     ]
     
     nlu_tests = [
@@ -93,6 +112,13 @@ def run_tests(test_type="unit"):
         print(f"❌ Error running tests: {e}")
         return False
 
+def run_benchmarks(bench_args):
+    """Run the micro-benchmarks and compare them with the saved baseline"""
+    print("⏱️ Running RasaMedical micro-benchmarks...")
+    print("=" * 50)
+    result = subprocess.run([sys.executable, "benchmark_hot_paths.py", *bench_args])
+    return result.returncode == 0
+
 def main():
     """Main function to handle command line arguments"""
     if len(sys.argv) > 1:
@@ -103,6 +129,9 @@ def main():
             test_type = "nlu"
         elif arg in ["--unit", "-u"]:
             test_type = "unit"
+        elif arg in ["--bench", "-b"]:
+            success = run_benchmarks(sys.argv[2:])
+            sys.exit(0 if success else 1)
         elif arg in ["--help", "-h"]:
             print(__doc__)
             return
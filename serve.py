@@ -0,0 +1,189 @@
+"""
+Production entry point for the Flask API in server.py.
+
+`python server.py` runs the single-process Werkzeug dev server with the
+debugger on. This script serves the same `app` under gunicorn (gthread
+workers) on Linux/macOS, or waitress on Windows where gunicorn does not run.
+
+Usage:
+    python serve.py                          # defaults / environment
+    python serve.py --workers 4 --threads 8
+    python serve.py --log-level debug
+    python serve.py --server waitress
+
+Every option can also be set from the environment or the .env file next to
+this script (SERVER_WORKERS, SERVER_THREADS, SERVER_KEEPALIVE, ...,
+LOG_LEVEL); see .env.example. Variables already set in the environment win.
+
+Each gunicorn worker is a separate process with its own database pool, so
+the server can hold up to workers * DB_POOL_MAX_SIZE MySQL connections.
+Send SIGHUP to the master for a graceful restart: new workers are started
+and old ones finish their in-flight requests (up to --graceful-timeout).
+"""
+
+import argparse
+import logging
+import os
+import secrets
+import sys
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+ENV_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
+
+# The option defaults below read the environment, so .env is loaded first
+load_dotenv(ENV_FILE)
+
+LOG_LEVELS = ['debug', 'info', 'warning', 'error']
+
+
+def env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment"""
+    return int(os.getenv(name, default))
+
+
+def default_workers() -> int:
+    """2 * CPUs + 1, capped so the DB connection budget stays reasonable"""
+    return min(2 * (os.cpu_count() or 1) + 1, 8)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve the Medical Flask API in production")
+    parser.add_argument('--server', choices=['auto', 'gunicorn', 'waitress'],
+                        default=os.getenv('SERVER_BACKEND', 'auto'),
+                        help="WSGI server (auto: waitress on Windows, gunicorn elsewhere)")
+    parser.add_argument('--host', default=os.getenv('SERVER_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=env_int('SERVER_PORT', 5000))
+    parser.add_argument('--workers', type=int, default=env_int('SERVER_WORKERS', default_workers()),
+                        help="Worker processes (gunicorn only)")
+    parser.add_argument('--threads', type=int, default=env_int('SERVER_THREADS', 4),
+                        help="Request threads per worker")
+    parser.add_argument('--keepalive', type=int, default=env_int('SERVER_KEEPALIVE', 5),
+                        help="Seconds to keep idle client connections open")
+    parser.add_argument('--timeout', type=int, default=env_int('SERVER_TIMEOUT', 30),
+                        help="Seconds before a stuck worker is killed and replaced")
+    parser.add_argument('--graceful-timeout', type=int, default=env_int('SERVER_GRACEFUL_TIMEOUT', 30),
+                        help="Seconds workers get to finish requests on restart/shutdown")
+    parser.add_argument('--max-requests', type=int, default=env_int('SERVER_MAX_REQUESTS', 10000),
+                        help="Recycle a worker after this many requests (0 disables)")
+    parser.add_argument('--log-level', choices=LOG_LEVELS,
+                        default=os.getenv('LOG_LEVEL', 'info').lower())
+    args = parser.parse_args(argv)
+
+    if args.workers < 1 or args.threads < 1:
+        parser.error("--workers and --threads must be at least 1")
+    if args.server == 'auto':
+        args.server = 'waitress' if sys.platform == 'win32' else 'gunicorn'
+    return args
+
+
+def gunicorn_options(args: argparse.Namespace) -> dict:
+    """Translate parsed arguments into gunicorn settings"""
+    return {
+        'bind': f"{args.host}:{args.port}",
+        'workers': args.workers,
+        'worker_class': 'gthread',
+        'threads': args.threads,
+        'keepalive': args.keepalive,
+        'timeout': args.timeout,
+        'graceful_timeout': args.graceful_timeout,
+        'max_requests': args.max_requests,
+        # Spread recycling so workers do not all restart at once
+        'max_requests_jitter': args.max_requests // 10,
+        'loglevel': args.log_level,
+        'accesslog': '-',
+        'errorlog': '-',
+        'post_worker_init': warm_worker_pool,
+    }
+
+
+def waitress_options(args: argparse.Namespace) -> dict:
+    """Translate parsed arguments into waitress settings"""
+    return {
+        'host': args.host,
+        'port': args.port,
+        'threads': args.threads,
+        'channel_timeout': args.keepalive,
+        'ident': 'medical-api',
+    }
+
+
+def warm_worker_pool(worker=None):
+    """Open the pool's minimum connections before a worker takes traffic"""
+    from server import db_manager
+    try:
+        db_manager.pool.warm()
+    except Exception as e:
+        logger.error(f"Database connection failed: {str(e)}")
+
+
+def check_pool_size(args: argparse.Namespace):
+    from actions.db_config import POOL_CONFIG
+    if args.threads > POOL_CONFIG['max_size']:
+        logger.warning(
+            f"{args.threads} threads per worker but DB_POOL_MAX_SIZE={POOL_CONFIG['max_size']}; "
+            f"requests will queue for database connections"
+        )
+
+
+def run_gunicorn(args: argparse.Namespace):
+    from gunicorn.app.base import BaseApplication
+
+    options = gunicorn_options(args)
+
+    class MedicalApplication(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            # Imported per worker (no preload) so every process gets its own
+            # connection pool instead of sharing forked sockets
+            from server import app
+            return app
+
+    MedicalApplication().run()
+
+
+def run_waitress(args: argparse.Namespace):
+    from waitress import serve
+    from server import app
+
+    if args.workers > 1:
+        logger.info("waitress runs a single process; --workers is ignored")
+    warm_worker_pool()
+    serve(app, **waitress_options(args))
+
+
+def main(argv=None):
+    # SESSION_SECRET is normally set in .env; it must be seen before the
+    # check below generates a throwaway key
+    load_dotenv(ENV_FILE)
+    args = parse_args(argv)
+
+    # server.py configures logging from LOG_LEVEL when it is imported
+    os.environ['LOG_LEVEL'] = args.log_level.upper()
+    logging.basicConfig(level=args.log_level.upper())
+
+    # Every worker must sign sessions with the same key. Set it before
+    # anything imports actions.db_config, since workers fork from here.
+    if not os.getenv('SESSION_SECRET'):
+        os.environ['SESSION_SECRET'] = secrets.token_hex(32)
+        logger.warning("SESSION_SECRET is not set; generated one for this run, sessions end on restart")
+
+    check_pool_size(args)
+    logger.info(
+        f"Starting {args.server} on {args.host}:{args.port} "
+        f"({args.workers} workers x {args.threads} threads, log level {args.log_level})"
+    )
+
+    if args.server == 'gunicorn':
+        run_gunicorn(args)
+    else:
+        run_waitress(args)
+
+
+if __name__ == '__main__':
+    main()
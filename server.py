@@ -1,43 +1,179 @@
-from flask import Flask, jsonify, send_from_directory, request
+from flask import Flask, Response, jsonify, send_from_directory, request
 from flask_cors import CORS
-from actions.db_connect import db_manager
+from actions.db_config import ADMIN_CONFIG
+from actions.db_connect import db_manager, DuplicateKeyError
+from actions.password_hasher import password_context, verification_pool, HasherBusyError
+from actions.session_tokens import session_manager, InvalidTokenError
+from actions.bulk_import import BulkImporter, BulkImportError, read_rows, text_stream
+from actions.query_trace import query_tracer
+from actions.response_cache import DATA_VERSION_QUERY, bump_data_versions, response_cache
+from actions.datetime_parser import SLOT_GRID_MESSAGE, check_slot_grid
+from datetime import datetime
 import logging
-import hashlib
+import os
 import secrets
+import base64
+import binascii
+import json
+from functools import wraps
+from itertools import chain
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
+# Set up logging (serve.py sets LOG_LEVEL=INFO for production)
+logging.basicConfig(level=os.getenv('LOG_LEVEL', 'DEBUG').upper())
 logger = logging.getLogger(__name__)
 
 def hash_password(password: str) -> str:
-    """Create a secure password hash using SHA-256 with salt"""
-    # Generate a random salt
-    salt = secrets.token_hex(16)
-    # Create hash
-    password_hash = hashlib.sha256((password + salt).encode()).hexdigest()
-    # Return salt:hash format
-    return f"{salt}:{password_hash}"
+    """Hash a password with the configured KDF (see actions/password_hasher.py)"""
+    return verification_pool.run(password_context.hash, password)
 
 def verify_password(password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash"""
+    """Verify a password against a stored hash of any supported format"""
+    return verification_pool.run(password_context.verify, password, hashed_password)
+
+# Keyset pagination for the list endpoints
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def encode_cursor(values: list) -> str:
+    """Encode the sort key of the last row on a page as an opaque cursor"""
+    raw = json.dumps(values, default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> list:
+    """Decode a cursor produced by encode_cursor"""
     try:
-        # Handle both hashed and plain text passwords for backward compatibility
-        if ':' not in hashed_password:
-            # Plain text password (legacy users)
-            return password == hashed_password
-        
-        # Extract salt and hash
-        salt, stored_hash = hashed_password.split(':', 1)
-        # Hash the provided password with the same salt
-        password_hash = hashlib.sha256((password + salt).encode()).hexdigest()
-        # Compare hashes
-        return password_hash == stored_hash
-    except Exception:
-        return False
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, binascii.Error):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+def get_page_args():
+    """Read and validate the limit/cursor query parameters"""
+    try:
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+
+    cursor = request.args.get('cursor')
+    return min(limit, MAX_PAGE_SIZE), decode_cursor(cursor) if cursor else None
+
+def keyset_condition(columns: list, values: list, descending: bool = True):
+    """WHERE clause selecting rows after a cursor for an ORDER BY over columns.
+
+    (a, b) < (x, y) is expanded to (a < x) OR (a = x AND b < y) so MySQL
+    can use a range scan on the matching index.
+    """
+    operator = '<' if descending else '>'
+    clauses = []
+    params = []
+    for i, column in enumerate(columns):
+        parts = [f"{previous} = %s" for previous in columns[:i]]
+        parts.append(f"{column} {operator} %s")
+        clauses.append("(" + " AND ".join(parts) + ")")
+        params.extend(values[:i + 1])
+    return "(" + " OR ".join(clauses) + ")", params
+
+def fetch_page(select: str, where: list, params: list, order_columns: list,
+               limit: int, cursor: list = None, descending: bool = True) -> dict:
+    """Run a keyset-paginated query and build the page response.
+
+    order_columns must end with a unique column (the id) so the ordering is
+    stable; the cursor holds the values of those columns for the last row.
+    """
+    where = list(where)
+    params = list(params)
+    if cursor is not None:
+        if len(cursor) != len(order_columns):
+            raise ValueError("Invalid cursor")
+        condition, cursor_params = keyset_condition(order_columns, cursor, descending)
+        where.append(condition)
+        params.extend(cursor_params)
+
+    direction = 'DESC' if descending else 'ASC'
+    query = select
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    query += " ORDER BY " + ", ".join(f"{column} {direction}" for column in order_columns)
+    query += " LIMIT %s"
+    params.append(limit + 1)
+
+    rows = db_manager.execute_query(query, params)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor([last[column.split('.')[-1]] for column in order_columns])
+
+    return {'items': rows, 'next_cursor': next_cursor, 'limit': limit}
 
 app = Flask(__name__, static_folder='html')
 CORS(app)  # Enable CORS for all routes
 
+def ndjson_export(query: str, params: list = None) -> Response:
+    """Stream query results as newline-delimited JSON, one row per line.
+
+    Rows come from an unbuffered cursor and are written out as they are
+    read, so memory use does not grow with the size of the export.
+    """
+    rows = db_manager.stream_query(query, params)
+    # Pull the first row now so connection and SQL errors still produce a
+    # proper error response instead of a truncated 200
+    first = next(rows, None)
+
+    def generate():
+        try:
+            for row in chain([first] if first is not None else [], rows):
+                yield app.json.dumps(row) + '\n'
+        except Exception as e:
+            logger.error(f"Export stream failed: {str(e)}")
+            raise
+        finally:
+            rows.close()
+
+    return Response(generate(), mimetype='application/x-ndjson')
+
+def user_data_changed(*user_ids):
+    """Bump the data version of users whose appointments or records changed.
+
+    Runs after the write. A failure is logged, not raised: the write itself
+    succeeded, and cached responses still expire after RESPONSE_CACHE_TTL.
+    """
+    for user_id in user_ids:
+        response_cache.invalidate(user_id)
+    try:
+        query, params = bump_data_versions(user_ids)
+        db_manager.execute_query(query, params, fetch=False)
+    except Exception as e:
+        logger.error(f"Could not bump the data version of users {user_ids}: {str(e)}")
+
+def cached_user_response(resource: str, user_id: str, build) -> Response:
+    """JSON response of one user's page, built by `build` or served from the cache.
+
+    The body is cached per data version of the user; a client sending the
+    ETag it already has gets 304 Not Modified.
+    """
+    rows = db_manager.execute_query(DATA_VERSION_QUERY, (user_id,))
+    if not rows:
+        return jsonify(build())
+
+    version = rows[0]['data_version']
+    key = (resource, str(user_id), request.args.get('limit'), request.args.get('cursor'))
+    entry = response_cache.get(key, version)
+    if entry is None:
+        entry = response_cache.put(key, version, jsonify(build()).get_data())
+
+    response = app.response_class(entry.body, mimetype='application/json')
+    response.set_etag(entry.etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
 @app.route('/')
 def index():
     return send_from_directory('html', 'home_page.html')
@@ -68,22 +204,59 @@ def handle_patients():
             return jsonify({'error': str(e)}), 500
     else:
         try:
-            query = "SELECT * FROM users"
-            results = db_manager.execute_query(query)
-            return jsonify(results)
+            limit, cursor = get_page_args()
+            page = fetch_page("SELECT * FROM users", [], [], ['id'], limit, cursor, descending=False)
+            return jsonify(page)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             logger.error(f"Error fetching patients: {str(e)}")
             return jsonify({'error': str(e)}), 500
 
+def appointments_page(user_id: str = None) -> dict:
+    """One page of appointments, of one user or of everyone"""
+    limit, cursor = get_page_args()
+    query = """
+        SELECT a.*, d.name as doctor_name 
+        FROM appointments a 
+        LEFT JOIN doctors d ON a.doctor_id = d.id
+    """
+    where, params = [], []
+    if user_id:
+        where.append("a.user_id = %s")
+        params.append(user_id)
+    return fetch_page(query, where, params, ['a.appointment_date', 'a.id'], limit, cursor)
+
+def parse_appointment_start(value) -> datetime:
+    """Start time of a new appointment, which must lie on the slot grid.
+
+    The unique (doctor, start) key only catches overlaps between
+    appointments that start on the same grid point.
+    """
+    try:
+        start = datetime.fromisoformat(str(value))
+    except ValueError:
+        raise ValueError('appointment_date must be formatted as YYYY-MM-DD HH:MM')
+    check_slot_grid(start.minute)
+    if start.second or start.microsecond:
+        raise ValueError(SLOT_GRID_MESSAGE)
+    return start
+
 @app.route('/api/appointments', methods=['GET', 'POST'])
 def handle_appointments():
     if request.method == 'POST':
         try:
             data = request.json
+            start = parse_appointment_start(data['appointment_date'])
             query = "INSERT INTO appointments (user_id, doctor_id, appointment_date, reason) VALUES (%s, %s, %s, %s)"
-            params = (data['user_id'], data['doctor_id'], data['appointment_date'], data['reason'])
+            params = (data['user_id'], data['doctor_id'], start, data['reason'])
             db_manager.execute_query(query, params, fetch=False)
+            user_data_changed(data['user_id'])
             return jsonify({'message': 'Appointment added successfully'}), 201
+        except DuplicateKeyError:
+            return jsonify({'error': 'The doctor already has an appointment at that time'}), 409
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             logger.error(f"Error adding appointment: {str(e)}")
             return jsonify({'error': str(e)}), 500
@@ -91,40 +264,44 @@ def handle_appointments():
         try:
             user_id = request.args.get('user_id')
             if user_id:
-                query = """
-                    SELECT a.*, d.name as doctor_name 
-                    FROM appointments a 
-                    LEFT JOIN doctors d ON a.doctor_id = d.id 
-                    WHERE a.user_id = %s 
-                    ORDER BY a.appointment_date DESC
-                """
-                results = db_manager.execute_query(query, (user_id,))
-            else:
-                query = """
-                    SELECT a.*, d.name as doctor_name 
-                    FROM appointments a 
-                    LEFT JOIN doctors d ON a.doctor_id = d.id 
-                    ORDER BY a.appointment_date DESC
-                """
-                results = db_manager.execute_query(query)
-            return jsonify(results)
+                return cached_user_response('appointments', user_id, lambda: appointments_page(user_id))
+            return jsonify(appointments_page())
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             logger.error(f"Error fetching appointments: {str(e)}")
             return jsonify({'error': str(e)}), 500
 
+@app.route('/api/appointments/export', methods=['GET'])
+def export_appointments():
+    try:
+        query = """
+            SELECT a.*, d.name as doctor_name 
+            FROM appointments a 
+            LEFT JOIN doctors d ON a.doctor_id = d.id
+        """
+        params = []
+        user_id = request.args.get('user_id')
+        if user_id:
+            query += " WHERE a.user_id = %s"
+            params.append(user_id)
+        query += " ORDER BY a.appointment_date DESC, a.id DESC"
+        return ndjson_export(query, params)
+    except Exception as e:
+        logger.error(f"Error exporting appointments: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/appointments/<int:appointment_id>', methods=['DELETE'])
 def delete_appointment(appointment_id):
     try:
-        # First check if the appointment exists
-        check_query = "SELECT id FROM appointments WHERE id = %s"
-        result = db_manager.execute_query(check_query, (appointment_id,))
-        
-        if not result:
-            return jsonify({'error': 'Appointment not found'}), 404
-        
-        # Delete the appointment
-        delete_query = "DELETE FROM appointments WHERE id = %s"
-        db_manager.execute_query(delete_query, (appointment_id,), fetch=False)
+        # Lock the row while reading its owner, whose cached dashboard
+        # responses are invalidated after the delete commits
+        with db_manager.transaction() as tx:
+            owner = tx.execute_query("SELECT user_id FROM appointments WHERE id = %s FOR UPDATE", (appointment_id,))
+            if not owner:
+                return jsonify({'error': 'Appointment not found'}), 404
+            tx.execute_query("DELETE FROM appointments WHERE id = %s", (appointment_id,), fetch=False)
+        user_data_changed(owner[0]['user_id'])
         
         logger.info(f"Appointment {appointment_id} deleted successfully")
         return jsonify({'message': 'Appointment deleted successfully'}), 200
@@ -132,6 +309,26 @@ def delete_appointment(appointment_id):
         logger.error(f"Error deleting appointment: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+def records_page(user_id: str = None) -> dict:
+    """One page of medical records, of one patient or of everyone (with patient names)"""
+    limit, cursor = get_page_args()
+    order_columns = ['mr.record_date', 'mr.created_at', 'mr.id']
+    if user_id:
+        query = """
+            SELECT mr.*, d.name as doctor_name 
+            FROM medical_records mr 
+            LEFT JOIN doctors d ON mr.doctor_id = d.id
+        """
+        return fetch_page(query, ["mr.patient_id = %s"], [user_id], order_columns, limit, cursor)
+    query = """
+        SELECT mr.*, d.name as doctor_name, 
+               u.first_name, u.last_name
+        FROM medical_records mr 
+        LEFT JOIN doctors d ON mr.doctor_id = d.id 
+        LEFT JOIN users u ON mr.patient_id = u.id
+    """
+    return fetch_page(query, [], [], order_columns, limit, cursor)
+
 @app.route('/api/records', methods=['GET', 'POST'])
 def handle_records():
     if request.method == 'POST':
@@ -150,6 +347,7 @@ def handle_records():
                 data['record_date']
             )
             db_manager.execute_query(query, params, fetch=False)
+            user_data_changed(data['patient_id'])
             return jsonify({'message': 'Medical record added successfully'}), 201
         except Exception as e:
             logger.error(f"Error adding medical record: {str(e)}")
@@ -158,42 +356,46 @@ def handle_records():
         try:
             user_id = request.args.get('user_id')
             if user_id:
-                query = """
-                    SELECT mr.*, d.name as doctor_name 
-                    FROM medical_records mr 
-                    LEFT JOIN doctors d ON mr.doctor_id = d.id 
-                    WHERE mr.patient_id = %s 
-                    ORDER BY mr.record_date DESC, mr.created_at DESC
-                """
-                results = db_manager.execute_query(query, (user_id,))
-            else:
-                query = """
-                    SELECT mr.*, d.name as doctor_name, 
-                           u.first_name, u.last_name
-                    FROM medical_records mr 
-                    LEFT JOIN doctors d ON mr.doctor_id = d.id 
-                    LEFT JOIN users u ON mr.patient_id = u.id
-                    ORDER BY mr.record_date DESC, mr.created_at DESC
-                """
-                results = db_manager.execute_query(query)
-            return jsonify(results)
+                return cached_user_response('records', user_id, lambda: records_page(user_id))
+            return jsonify(records_page())
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             logger.error(f"Error fetching records: {str(e)}")
             return jsonify({'error': str(e)}), 500
 
+@app.route('/api/records/export', methods=['GET'])
+def export_records():
+    try:
+        query = """
+            SELECT mr.*, d.name as doctor_name, 
+                   u.first_name, u.last_name
+            FROM medical_records mr 
+            LEFT JOIN doctors d ON mr.doctor_id = d.id 
+            LEFT JOIN users u ON mr.patient_id = u.id
+        """
+        params = []
+        user_id = request.args.get('user_id')
+        if user_id:
+            query += " WHERE mr.patient_id = %s"
+            params.append(user_id)
+        query += " ORDER BY mr.record_date DESC, mr.created_at DESC, mr.id DESC"
+        return ndjson_export(query, params)
+    except Exception as e:
+        logger.error(f"Error exporting records: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/records/<int:record_id>', methods=['DELETE'])
 def delete_record(record_id):
     try:
-        # First check if the record exists
-        check_query = "SELECT id FROM medical_records WHERE id = %s"
-        result = db_manager.execute_query(check_query, (record_id,))
-        
-        if not result:
-            return jsonify({'error': 'Medical record not found'}), 404
-        
-        # Delete the record
-        delete_query = "DELETE FROM medical_records WHERE id = %s"
-        db_manager.execute_query(delete_query, (record_id,), fetch=False)
+        # Lock the row while reading its patient, whose cached dashboard
+        # responses are invalidated after the delete commits
+        with db_manager.transaction() as tx:
+            owner = tx.execute_query("SELECT patient_id FROM medical_records WHERE id = %s FOR UPDATE", (record_id,))
+            if not owner:
+                return jsonify({'error': 'Medical record not found'}), 404
+            tx.execute_query("DELETE FROM medical_records WHERE id = %s", (record_id,), fetch=False)
+        user_data_changed(owner[0]['patient_id'])
         
         logger.info(f"Medical record {record_id} deleted successfully")
         return jsonify({'message': 'Medical record deleted successfully'}), 200
@@ -226,6 +428,9 @@ def create_user():
             db_manager.execute_query(query, params, fetch=False)
             logger.info(f"User created successfully: {data['email']}")
             return jsonify({'message': 'User created successfully'}), 201
+        except HasherBusyError:
+            logger.warning("Sign-up rejected: password hashing pool is saturated")
+            return jsonify({'error': 'Server busy, please try again'}), 503, {'Retry-After': '1'}
         except Exception as e:
             logger.error(f"Error creating user: {str(e)}")
             return jsonify({'error': str(e)}), 500
@@ -242,21 +447,37 @@ def login():
             """
             params = (data['email'],)
             result = db_manager.execute_query(query, params)
+            stored_hash = result[0]['password'] if result else None
             
-            if result and verify_password(data['password'], result[0]['password']):
+            valid, new_hash = verification_pool.run(
+                password_context.verify_and_update, data['password'], stored_hash
+            )
+            if valid:
+                if new_hash:
+                    # Upgrade legacy/outdated hashes now that we know the password;
+                    # the old hash in the WHERE clause guards against a concurrent change
+                    db_manager.execute_query(
+                        "UPDATE users SET password = %s WHERE id = %s AND password = %s",
+                        (new_hash, result[0]['id'], stored_hash), fetch=False
+                    )
+                    logger.info(f"Rehashed password for user: {data['email']}")
                 logger.info(f"Successful login for user: {data['email']}")
+                user = {
+                    'id': result[0]['id'],
+                    'name': f"{result[0]['first_name']} {result[0]['last_name']}",
+                    'email': result[0]['email']
+                }
                 return jsonify({
                     'message': 'Login successful',
-                    'token': 'dummy_token',
-                    'user': {
-                        'id': result[0]['id'],
-                        'name': f"{result[0]['first_name']} {result[0]['last_name']}",
-                        'email': result[0]['email']
-                    }
+                    'token': session_manager.issue(user),
+                    'user': user
                 }), 200
             else:
                 logger.warning(f"Failed login attempt for email: {data.get('email', 'unknown')}")
                 return jsonify({'error': 'Invalid email or password'}), 401
+        except HasherBusyError:
+            logger.warning("Login rejected: password hashing pool is saturated")
+            return jsonify({'error': 'Server busy, please try again'}), 503, {'Retry-After': '1'}
         except Exception as e:
             logger.error(f"Error during login: {str(e)}")
             return jsonify({'error': str(e)}), 500
@@ -266,6 +487,9 @@ def delete_user(user_id):
     try:
         # Delete the user directly
         db_manager.execute_query("DELETE FROM users WHERE id = %s", (user_id,), fetch=False)
+        # Other server processes notice the missing user on their next recheck
+        session_manager.revoke_user(user_id)
+        response_cache.invalidate(user_id)
         return jsonify({'message': 'User account deleted successfully'}), 200
     except Exception as e:
         logger.error(f"Error deleting user: {str(e)}")
@@ -281,35 +505,140 @@ def validate_session():
         if not user_id or not token:
             return jsonify({'valid': False, 'error': 'Missing user_id or token'}), 400
         
-        # For now, we'll do a simple validation by checking if user exists
-        # In a real application, you'd validate the actual token
-        query = "SELECT id, first_name, last_name, email FROM users WHERE id = %s"
-        result = db_manager.execute_query(query, (user_id,))
+        # Signature, expiry and revocation are checked locally; recently
+        # validated sessions come straight from the cache
+        try:
+            claims, user = session_manager.validate(token)
+        except InvalidTokenError as e:
+            return jsonify({'valid': False, 'error': str(e)}), 401
         
-        if result:
-            return jsonify({
-                'valid': True,
-                'user': {
-                    'id': result[0]['id'],
-                    'name': f"{result[0]['first_name']} {result[0]['last_name']}",
-                    'email': result[0]['email']
-                }
-            }), 200
-        else:
-            return jsonify({'valid': False, 'error': 'User not found'}), 404
+        if str(claims['uid']) != str(user_id):
+            return jsonify({'valid': False, 'error': 'Token does not belong to this user'}), 401
+        
+        if user is None:
+            query = """
+                SELECT u.id, u.first_name, u.last_name, u.email,
+                       EXISTS(SELECT 1 FROM revoked_sessions r WHERE r.session_id = %s) AS revoked
+                FROM users u
+                WHERE u.id = %s
+            """
+            result = db_manager.execute_query(query, (claims['sid'], claims['uid']))
+            
+            if not result:
+                session_manager.revoke_user(claims['uid'])
+                return jsonify({'valid': False, 'error': 'User not found'}), 404
+            if result[0]['revoked']:
+                session_manager.revoke(claims)
+                return jsonify({'valid': False, 'error': 'Session has been revoked'}), 401
+            
+            user = {
+                'id': result[0]['id'],
+                'name': f"{result[0]['first_name']} {result[0]['last_name']}",
+                'email': result[0]['email']
+            }
+            session_manager.mark_validated(claims, user)
+        
+        return jsonify({'valid': True, 'user': user}), 200
             
     except Exception as e:
         logger.error(f"Error validating session: {str(e)}")
         return jsonify({'valid': False, 'error': str(e)}), 500
 
+@app.route('/api/logout', methods=['POST'])
+def logout():
+    try:
+        data = request.json or {}
+        try:
+            claims = session_manager.decode(data.get('token'))
+        except InvalidTokenError:
+            # Nothing to revoke - the token is already unusable
+            return jsonify({'message': 'Logged out'}), 200
+        
+        session_manager.revoke(claims)
+        # Recorded so other server processes reject the token too; rows can be
+        # dropped once the token would have expired anyway
+        db_manager.execute_query(
+            "INSERT IGNORE INTO revoked_sessions (session_id, user_id, expires_at) VALUES (%s, %s, FROM_UNIXTIME(%s))",
+            (claims['sid'], claims['uid'], claims['exp']), fetch=False
+        )
+        db_manager.execute_query(
+            "DELETE FROM revoked_sessions WHERE expires_at < NOW() LIMIT 100", fetch=False
+        )
+        return jsonify({'message': 'Logged out'}), 200
+    except Exception as e:
+        logger.error(f"Error during logout: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+# Content types accepted by the bulk import endpoint
+IMPORT_FORMATS = {'text/csv': 'csv', 'application/x-ndjson': 'ndjson', 'application/jsonl': 'ndjson'}
+
+@app.route('/api/import/<kind>', methods=['POST'])
+def bulk_import(kind):
+    """Stream a CSV or NDJSON body into the database.
+
+    ?job=<id> names the import; posting the same file with the same job id
+    resumes after the last committed chunk.
+    """
+    job_id = request.args.get('job')
+    fmt = request.args.get('format') or IMPORT_FORMATS.get(request.mimetype)
+    if not job_id:
+        return jsonify({'error': 'job query parameter is required'}), 400
+    try:
+        rows = read_rows(text_stream(request.stream), fmt or '')
+        report = BulkImporter(db_manager).run(kind, rows, job_id)
+        return jsonify(report.to_dict()), 200
+    except BulkImportError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Import {job_id} stopped: {str(e)}")
+        return jsonify({'error': str(e), 'job_id': job_id, 'resumable': True}), 500
+
+def admin_endpoint(view):
+    """Answer 404 unless the diagnostic endpoints are enabled (ADMIN_ENDPOINTS=1)"""
+    @wraps(view)
+    def guarded(*args, **kwargs):
+        if not ADMIN_CONFIG['endpoints']:
+            return jsonify({'error': 'Not found'}), 404
+        return view(*args, **kwargs)
+    return guarded
+
+@app.route('/api/admin/db-pool', methods=['GET'])
+@admin_endpoint
+def db_pool_stats():
+    return jsonify(db_manager.pool_stats()), 200
+
+@app.route('/api/admin/db-queries', methods=['GET', 'DELETE'])
+@admin_endpoint
+def db_query_trace():
+    """Slowest statements and per-fingerprint totals of this server process"""
+    if request.method == 'DELETE':
+        query_tracer.reset()
+        return jsonify({'message': 'Query trace cleared'}), 200
+    try:
+        limit = int(request.args['limit']) if 'limit' in request.args else None
+    except ValueError:
+        return jsonify({'error': 'limit must be a whole number'}), 400
+    return jsonify(query_tracer.snapshot(limit)), 200
+
+@app.route('/api/admin/response-cache', methods=['GET', 'DELETE'])
+@admin_endpoint
+def response_cache_stats():
+    """Dashboard response cache of this server process"""
+    if request.method == 'DELETE':
+        response_cache.invalidate()
+        return jsonify({'message': 'Response cache cleared'}), 200
+    return jsonify(response_cache.stats()), 200
+
 if __name__ == '__main__':
     # Test database connection on startup
     try:
         test_query = "SELECT 1"
         db_manager.execute_query(test_query)
+        db_manager.pool.warm()
         logger.info("Database connection successful!")
     except Exception as e:
         logger.error(f"Database connection failed: {str(e)}")
     
-    # Run with localhost and port 5000
-    app.run(host='127.0.0.1', port=5000, debug=True) 
\ No newline at end of file
+    # Development server on localhost:5000 - use serve.py in production
+    app.run(host='127.0.0.1', port=int(os.getenv('SERVER_PORT', 5000)),
+            debug=os.getenv('FLASK_DEBUG', '1') == '1') 
\ No newline at end of file
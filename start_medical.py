@@ -43,7 +43,7 @@ subprocess.Popen(['cmd', '/c', 'start', 'Medical - Flask', 'cmd', '/k', 'venv\\S
 time.sleep(4)
 
 print("Starting Rasa Actions...")
-subprocess.Popen(['cmd', '/c', 'start', 'Medical - Actions', 'cmd', '/k', 'venv\\Scripts\\activate && rasa run actions'])
+subprocess.Popen(['cmd', '/c', 'start', 'Medical - Actions', 'cmd', '/k', 'venv\\Scripts\\activate && python run_actions.py'])
 time.sleep(6)
 
 print("Starting Rasa Server...")
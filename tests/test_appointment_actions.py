@@ -1,7 +1,17 @@
+import asyncio
+import json
+import multiprocessing
+import random
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
 import pytest
 from unittest.mock import Mock, patch
 from rasa_sdk import Tracker
 from rasa_sdk.executor import CollectingDispatcher
+from actions.clinic_calendar import SlotUnavailableError, clinic_calendar
+from actions.db_connect import DuplicateKeyError, WriteResult
+from actions.doctor_directory import doctor_directory
 
 
 class TestAppointmentActions:
@@ -81,4 +91,262 @@ class TestAppointmentActions:
         
         # Test call arguments
         call_args = self.dispatcher.utter_message.call_args[1]
-        assert call_args['text'] == "Test message" 
\ No newline at end of file
+        assert call_args['text'] == "Test message" 
+
+class FakeAppointmentDb:
+    """Async database stand-in that yields to the event loop on every query"""
+
+    def __init__(self):
+        self.inserts = []
+        self.rng = random.Random(1234)
+
+    async def execute_query(self, query, params=None, fetch=True):
+        # Interleave concurrent conversations at every round trip
+        for _ in range(self.rng.randint(1, 5)):
+            await asyncio.sleep(0)
+
+        if query.strip().startswith("INSERT INTO appointments"):
+            self.inserts.append(params)
+            return WriteResult(len(self.inserts), 1)
+        raise AssertionError(f"Unexpected query: {query}")
+
+
+class TestConcurrentBookings:
+    """Stress test: many conversations share the one AppointmentManager"""
+
+    def make_tracker(self, user_id, reason, slot_index=0):
+        tracker = Mock(spec=Tracker)
+        next_monday = date.today() + timedelta(days=7 - date.today().weekday())
+        # 20 half-hour slots (08:00-17:30) per weekday, spread over two weeks
+        day_index, slot = divmod(slot_index, 20)
+        day = next_monday + timedelta(days=day_index // 5 * 7 + day_index % 5)
+        hour, minute = divmod(8 * 60 + slot * 30, 60)
+        slots = {
+            "session_started_metadata": {"user": json.dumps({"id": user_id, "name": f"User {user_id}"})},
+            "date": day.isoformat(),
+            "time": f"{hour:02d}:{minute:02d}",
+            "doctor_name": "Smith",
+            "reason": reason,
+        }
+        tracker.get_slot.side_effect = slots.get
+        tracker.latest_message = {'entities': [], 'intent': {'name': 'book_appointment', 'confidence': 0.95}}
+        return tracker
+
+    def test_parallel_bookings_keep_their_own_user(self):
+        """Test that concurrent bookings never cross user contexts"""
+        from actions.action_appointments import ActionBookAppointment
+
+        fake_db = FakeAppointmentDb()
+        doctor_directory.load_rows([{'id': 3, 'name': 'Dr. John Smith', 'specialty': 'Adult Cardiology'}])
+        clinic_calendar.load([], [], [], [])
+        action = ActionBookAppointment()
+        user_ids = list(range(1, 201))
+
+        async def book_all():
+            runs = [
+                action.run(Mock(spec=CollectingDispatcher),
+                           self.make_tracker(uid, f"checkup for user {uid}", slot_index=uid - 1), {})
+                for uid in user_ids
+            ]
+            return await asyncio.gather(*runs)
+
+        with patch('actions.appointment_manager.async_db_manager', fake_db):
+            asyncio.run(book_all())
+
+        assert len(fake_db.inserts) == len(user_ids)
+        for params in fake_db.inserts:
+            user_id, _, _, reason, _ = params
+            assert reason == f"checkup for user {user_id}"
+        assert sorted(params[0] for params in fake_db.inserts) == user_ids
+
+    def test_parallel_bookings_of_one_slot_book_it_once(self):
+        """Test that only one of many conversations racing for a slot gets it"""
+        from actions.action_appointments import ActionBookAppointment
+
+        fake_db = FakeAppointmentDb()
+        doctor_directory.load_rows([{'id': 3, 'name': 'Dr. John Smith', 'specialty': 'Adult Cardiology'}])
+        clinic_calendar.load([], [], [], [])
+        action = ActionBookAppointment()
+        dispatchers = [Mock(spec=CollectingDispatcher) for _ in range(50)]
+
+        async def book_all():
+            runs = [
+                action.run(dispatcher, self.make_tracker(uid, f"checkup for user {uid}"), {})
+                for uid, dispatcher in enumerate(dispatchers, start=1)
+            ]
+            return await asyncio.gather(*runs)
+
+        with patch('actions.appointment_manager.async_db_manager', fake_db):
+            asyncio.run(book_all())
+
+        assert len(fake_db.inserts) == 1
+        rejected = [
+            dispatcher for dispatcher in dispatchers
+            if "already has an appointment" in str(dispatcher.utter_message.call_args_list)
+        ]
+        assert len(rejected) == 49
+
+
+class UniqueSlotDb:
+    """Thread-safe database stand-in enforcing the UNIQUE (doctor, time) key"""
+
+    def __init__(self, booked=()):
+        self.lock = threading.Lock()
+        self.booked = set(booked)
+        self.inserts = []
+
+    async def execute_query(self, query, params=None, fetch=True):
+        await asyncio.sleep(0)
+        if query.strip().startswith("INSERT INTO appointments"):
+            _, doctor_id, appointment_date, _, _ = params
+            with self.lock:
+                if (doctor_id, appointment_date) in self.booked:
+                    raise DuplicateKeyError("Database error: (1062, \"Duplicate entry\")")
+                self.booked.add((doctor_id, appointment_date))
+                self.inserts.append(params)
+                return WriteResult(len(self.inserts), 1)
+        raise AssertionError(f"Unexpected query: {query}")
+
+
+class SqliteSlotDb:
+    """Database stand-in shared by processes, with the unique (doctor, start) key"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def create(self):
+        with sqlite3.connect(self.path) as connection:
+            connection.execute(
+                "CREATE TABLE appointments (user_id INTEGER, doctor_id INTEGER, appointment_date TEXT, "
+                "reason TEXT, status TEXT, UNIQUE (doctor_id, appointment_date))"
+            )
+
+    def rows(self):
+        with sqlite3.connect(self.path) as connection:
+            return connection.execute("SELECT doctor_id, appointment_date FROM appointments").fetchall()
+
+    async def execute_query(self, query, params=None, fetch=True):
+        if query.strip().startswith("UPDATE users SET data_version"):
+            return WriteResult(None, 0)
+        if query.strip().startswith("INSERT INTO appointments"):
+            connection = sqlite3.connect(self.path, timeout=30)
+            try:
+                with connection:
+                    cursor = connection.execute(
+                        "INSERT INTO appointments (user_id, doctor_id, appointment_date, reason, status) "
+                        "VALUES (?, ?, ?, ?, ?)", params
+                    )
+            except sqlite3.IntegrityError:
+                raise DuplicateKeyError("Database error: (1062, \"Duplicate entry\")")
+            finally:
+                connection.close()
+            return WriteResult(cursor.lastrowid, 1)
+        raise AssertionError(f"Unexpected query: {query}")
+
+
+def book_in_process(db_path, day, clock, user_id, barrier, results):
+    """One action server process booking Dr. Smith at `clock`"""
+    from actions.appointment_manager import AppointmentManager
+
+    doctor_directory.load_rows([{'id': 3, 'name': 'Dr. John Smith', 'specialty': 'Adult Cardiology'}])
+    clinic_calendar.load([], [], [], [])
+    slots = {"date": day.isoformat(), "time": clock, "doctor_name": "Smith", "reason": f"checkup {user_id}"}
+    barrier.wait()
+    with patch('actions.appointment_manager.async_db_manager', SqliteSlotDb(db_path)):
+        result = asyncio.run(AppointmentManager().create_appointment(slots, user_id))
+    results.put((clock, result["success"], result["message"]))
+
+
+class TestAtomicReservation:
+    """One winner per (doctor, slot), however the bookings race"""
+
+    def setup_method(self):
+        doctor_directory.load_rows([{'id': 3, 'name': 'Dr. John Smith', 'specialty': 'Adult Cardiology'}])
+        clinic_calendar.load([], [], [], [])
+        self.day = date.today() + timedelta(days=7 - date.today().weekday())
+
+    def slots(self, uid):
+        return {"date": self.day.isoformat(), "time": "10:00", "doctor_name": "Smith", "reason": f"checkup {uid}"}
+
+    def test_threaded_bookings_of_one_slot_have_one_winner(self):
+        """Test that hundreds of simultaneous bookings from threads book the slot once"""
+        from actions.appointment_manager import AppointmentManager
+
+        manager = AppointmentManager()
+        fake_db = UniqueSlotDb()
+        threads_count = 300
+        barrier = threading.Barrier(threads_count)
+        results = [None] * threads_count
+
+        def book(index):
+            barrier.wait()
+            results[index] = asyncio.run(manager.create_appointment(self.slots(index), index + 1))
+
+        with patch('actions.appointment_manager.async_db_manager', fake_db):
+            threads = [threading.Thread(target=book, args=(i,)) for i in range(threads_count)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert len(fake_db.inserts) == 1
+        assert sum(result["success"] for result in results) == 1
+        losers = [result for result in results if not result["success"]]
+        assert all("already has an appointment" in result["message"] for result in losers)
+        assert all(result["alternatives"][0] == f"{self.day.isoformat()} 10:30" for result in losers)
+
+    def test_slot_booked_by_another_process_is_a_conflict(self):
+        """Test that the unique key catches bookings this process has not seen"""
+        from actions.action_appointments import ActionBookAppointment
+
+        taken = (3, f"{self.day.isoformat()} 10:00:00")
+        fake_db = UniqueSlotDb(booked=[taken])
+        dispatcher = Mock(spec=CollectingDispatcher)
+        tracker = Mock(spec=Tracker)
+        slots = {
+            "session_started_metadata": {"user": json.dumps({"id": 7, "name": "User 7"})},
+            **self.slots(7),
+        }
+        tracker.get_slot.side_effect = slots.get
+        tracker.latest_message = {'entities': [], 'intent': {'name': 'book_appointment', 'confidence': 0.95}}
+
+        with patch('actions.appointment_manager.async_db_manager', fake_db):
+            events = asyncio.run(ActionBookAppointment().run(dispatcher, tracker, {}))
+
+        message = dispatcher.utter_message.call_args.kwargs["text"]
+        assert "already has an appointment" in message
+        assert "10:30" in message
+        assert fake_db.inserts == []
+        # The form is reopened for a new date/time, keeping doctor and reason
+        assert {"event": "slot", "name": "doctor_name", "value": "Smith", "timestamp": None} in events
+        assert events[-1]["event"] == "followup"
+
+        # The calendar now knows the slot is taken without asking the database
+        with pytest.raises(SlotUnavailableError):
+            asyncio.run(clinic_calendar.check_slot(3, datetime.fromisoformat(taken[1])))
+
+    @pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason="needs fork")
+    def test_processes_booking_off_grid_starts_never_overlap(self, tmp_path):
+        """Test that separate processes cannot book overlapping slots with starts between grid points"""
+        db = SqliteSlotDb(str(tmp_path / 'appointments.db'))
+        db.create()
+        clocks = ['10:00', '10:15', '10:10', '10:00', '10:30', '10:45', '10:20', '10:30'] * 2
+        context = multiprocessing.get_context('fork')
+        barrier = context.Barrier(len(clocks))
+        results = context.Queue()
+        processes = [
+            context.Process(target=book_in_process, args=(db.path, self.day, clock, index + 1, barrier, results))
+            for index, clock in enumerate(clocks)
+        ]
+        for process in processes:
+            process.start()
+        outcomes = [results.get(timeout=60) for _ in processes]
+        for process in processes:
+            process.join()
+
+        starts = sorted(datetime.fromisoformat(start) for _, start in db.rows())
+        assert starts == [datetime.fromisoformat(f"{self.day.isoformat()} {clock}") for clock in ('10:00', '10:30')]
+        assert all(later - earlier >= timedelta(minutes=30) for earlier, later in zip(starts, starts[1:]))
+        assert sum(success for _, success, _ in outcomes) == 2
+        off_grid = [message for clock, success, message in outcomes if clock.endswith(('15', '10', '45', '20'))]
+        assert len(off_grid) == 8 and all("every 30 minutes" in message for message in off_grid)
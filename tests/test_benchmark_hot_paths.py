@@ -0,0 +1,40 @@
+import json
+import pytest
+from unittest.mock import patch
+import benchmark_hot_paths
+from benchmark_hot_paths import BENCHMARKS, compare, main
+
+
+class TestBenchmarkGate:
+    """Tests for the micro-benchmark baseline and regression gate"""
+
+    @pytest.mark.parametrize('benchmark', BENCHMARKS, ids=lambda benchmark: benchmark.name)
+    def test_benchmark_inputs_run(self, benchmark):
+        # Inputs must stay valid on any day; a ValueError here would time the error path
+        benchmark.fn()
+
+    def test_compare_flags_regressions_only(self):
+        rows = compare({'a': 1.3, 'b': 0.5, 'c': 2.0}, {'a': 1.0, 'b': 1.0}, max_regression=25)
+        assert [(name, round(change, 1) if change is not None else None, regressed)
+                for name, _, _, change, regressed in rows] == [
+            ('a', 30.0, True), ('b', -50.0, False), ('c', None, False)
+        ]
+
+    def test_first_run_saves_baseline_then_gates(self, tmp_path, capsys):
+        baseline = str(tmp_path / 'baseline.json')
+        with patch.object(benchmark_hot_paths, 'run_benchmarks', return_value={'normalize_date': 2.0}):
+            assert main(['--baseline', baseline]) == 0
+        assert json.loads(open(baseline).read())['results_us'] == {'normalize_date': 2.0}
+
+        with patch.object(benchmark_hot_paths, 'run_benchmarks', return_value={'normalize_date': 2.4}):
+            assert main(['--baseline', baseline, '--max-regression', '25']) == 0
+            assert main(['--baseline', baseline, '--max-regression', '10']) == 1
+        assert 'regressed: normalize_date' in capsys.readouterr().out
+
+    def test_save_baseline_keeps_benchmarks_not_run(self, tmp_path):
+        baseline = str(tmp_path / 'baseline.json')
+        with patch.object(benchmark_hot_paths, 'run_benchmarks', return_value={'a': 1.0, 'b': 1.0}):
+            main(['--baseline', baseline])
+        with patch.object(benchmark_hot_paths, 'run_benchmarks', return_value={'a': 3.0}):
+            main(['--baseline', baseline, '--save-baseline'])
+        assert json.loads(open(baseline).read())['results_us'] == {'a': 3.0, 'b': 1.0}
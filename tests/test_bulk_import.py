@@ -0,0 +1,234 @@
+import io
+import json
+from contextlib import contextmanager
+from datetime import date
+import pytest
+from unittest.mock import patch
+from actions.bulk_import import (
+    UNUSABLE_PASSWORD, BulkImporter, BulkImportError, RowError, detect_format, read_rows,
+    validate_patient, validate_record
+)
+from actions.db_connect import WriteResult
+from actions.password_hasher import password_context
+
+
+def patient(i, **overrides):
+    row = {'first_name': f'First{i}', 'last_name': f'Last{i}', 'email': f'patient{i}@example.com',
+           'sex': 'female', 'age': '40', 'phone': '555-0100'}
+    row.update(overrides)
+    return row
+
+
+def csv_text(rows):
+    header = list(rows[0])
+    lines = [','.join(header)] + [','.join(str(row[column]) for column in header) for row in rows]
+    return '\n'.join(lines) + '\n'
+
+
+class FakeImportDb:
+    """In-memory users/doctors/import_jobs with transactional chunk inserts"""
+
+    def __init__(self, emails=(), user_ids=(), doctor_ids=(), fail_on_chunk=None):
+        self.emails = set(emails)
+        self.user_ids = set(user_ids)
+        self.doctor_ids = set(doctor_ids)
+        self.jobs = {}
+        self.inserted = []
+        self.bumped = []
+        self.chunks = 0
+        self.fail_on_chunk = fail_on_chunk
+
+    def execute_query(self, query, params=None, fetch=True):
+        query = ' '.join(query.split())
+        if query.startswith("SELECT email FROM users"):
+            return [{'email': email} for email in params if email in self.emails]
+        if query.startswith("SELECT id FROM users"):
+            return [{'id': i} for i in params if i in self.user_ids]
+        if query.startswith("SELECT id FROM doctors"):
+            return [{'id': i} for i in params if i in self.doctor_ids]
+        if query.startswith("SELECT kind, rows_committed FROM import_jobs"):
+            job = self.jobs.get(params[0])
+            return [dict(job)] if job else []
+        if query.startswith("INSERT INTO import_jobs"):
+            self.jobs[params[0]] = {'kind': params[1], 'rows_committed': 0, 'status': 'running'}
+            return WriteResult(0, 1)
+        if query.startswith("UPDATE import_jobs SET status"):
+            self.jobs[params[-1]]['status'] = query.split("'")[1]
+            return WriteResult(0, 1)
+        raise AssertionError(f"Unexpected query: {query}")
+
+    @contextmanager
+    def transaction(self):
+        db = self
+        pending = {}
+
+        class Tx:
+            def execute_many(self, query, rows):
+                assert query.startswith("INSERT INTO")
+                db.chunks += 1
+                if db.fail_on_chunk == db.chunks:
+                    raise Exception("Database error: (2013, 'Lost connection')")
+                pending['rows'] = list(rows)
+                return WriteResult(1, len(rows))
+
+            def execute_query(self, query, params=None, fetch=True):
+                if query.startswith("UPDATE users SET data_version"):
+                    pending['bumped'] = list(params)
+                    return
+                assert query.startswith("UPDATE import_jobs SET rows_committed")
+                pending['committed'] = params
+
+        yield Tx()
+        # Committed only when the block finished without an error
+        self.inserted.extend(pending.get('rows', []))
+        self.bumped.extend(pending.get('bumped', []))
+        committed, job_id = pending['committed']
+        self.jobs[job_id]['rows_committed'] = committed
+
+
+class TestRowValidation:
+    """Tests for per-row validation and parsing"""
+
+    def test_valid_patient(self):
+        values = validate_patient(patient(1, email=' Patient1@Example.com ', sex='Female'))
+        assert values == ('First1', 'Last1', 'patient1@example.com', UNUSABLE_PASSWORD, 'female', 40, '555-0100')
+
+    @pytest.mark.parametrize('overrides, message', [
+        ({'email': 'not-an-email'}, 'email is not a valid address'),
+        ({'sex': 'x'}, 'sex must be one of'),
+        ({'age': 'forty'}, 'age must be a whole number'),
+        ({'phone': ''}, 'phone is required'),
+    ])
+    def test_invalid_patient(self, overrides, message):
+        with pytest.raises(RowError, match=message):
+            validate_patient(patient(1, **overrides))
+
+    def test_record_defaults_and_dates(self):
+        values = validate_record({'patient_id': '4', 'title': 'Checkup', 'record_date': '2024-02-29'})
+        assert values == (4, None, 'note', 'Checkup', '', date(2024, 2, 29))
+        with pytest.raises(RowError, match='record_date'):
+            validate_record({'patient_id': '4', 'title': 'Checkup', 'record_date': '29/02/2024'})
+
+    def test_imported_password_never_verifies(self):
+        assert not password_context.verify(UNUSABLE_PASSWORD, UNUSABLE_PASSWORD)
+        assert not password_context.verify('', UNUSABLE_PASSWORD)
+
+    def test_read_rows_reports_bad_lines(self):
+        rows = list(read_rows(io.StringIO('{"a": 1}\n\nnot json\n[1]\n'), 'ndjson'))
+        assert rows[0] == (1, {'a': 1})
+        assert [(line, str(error)) for line, error in rows[1:]] == [
+            (3, 'line is not valid JSON'), (4, 'line is not a JSON object')
+        ]
+        csv_rows = list(read_rows(io.StringIO('a,b\n1,2\n1,2,3\n'), 'csv'))
+        assert csv_rows[0] == (2, {'a': '1', 'b': '2'})
+        assert isinstance(csv_rows[1][1], RowError)
+
+    def test_format_detection(self):
+        assert detect_format('history.NDJSON') == 'ndjson'
+        assert detect_format('patients.csv') == 'csv'
+        with pytest.raises(BulkImportError):
+            detect_format('patients.xlsx')
+        with pytest.raises(BulkImportError):
+            read_rows(io.StringIO(''), 'xml')
+
+
+class TestBulkImporter:
+    """Tests for chunked, resumable imports"""
+
+    def run_import(self, db, kind, text, fmt='csv', job='job-1', chunk_size=1000):
+        return BulkImporter(db, chunk_size=chunk_size).run(kind, read_rows(io.StringIO(text), fmt), job)
+
+    def test_rows_go_in_one_executemany_per_chunk(self):
+        db = FakeImportDb()
+        report = self.run_import(db, 'patients', csv_text([patient(i) for i in range(2500)]))
+
+        assert db.chunks == 3
+        assert len(db.inserted) == 2500
+        assert report.rows_inserted == 2500 and report.chunks == 3
+        assert db.jobs['job-1'] == {'kind': 'patients', 'rows_committed': 2500, 'status': 'completed'}
+        assert report.to_dict()['rows_per_second'] > 0
+
+    def test_row_errors_are_reported_with_line_numbers(self):
+        rows = [patient(1), patient(2, age='x'), patient(3, email='taken@example.com'), patient(1)]
+        db = FakeImportDb(emails={'taken@example.com'})
+        report = self.run_import(db, 'patients', csv_text(rows))
+
+        assert report.rows_inserted == 1
+        assert report.errors == [
+            (3, 'age must be a whole number'),
+            (4, 'email is already registered'),
+            (5, 'email appears more than once in this chunk'),
+        ]
+
+    def test_records_check_patients_and_doctors(self):
+        lines = [
+            {'patient_id': 1, 'doctor_id': 2, 'title': 'A', 'record_date': '2024-01-01'},
+            {'patient_id': 9, 'title': 'B', 'record_date': '2024-01-01'},
+            {'patient_id': 1, 'doctor_id': 7, 'title': 'C', 'record_date': '2024-01-01'},
+        ]
+        db = FakeImportDb(user_ids={1}, doctor_ids={2})
+        report = self.run_import(db, 'records', '\n'.join(json.dumps(line) for line in lines), fmt='ndjson')
+
+        assert report.rows_inserted == 1
+        assert [message for _, message in report.errors] == [
+            'patient_id 9 does not exist', 'doctor_id 7 does not exist'
+        ]
+        # The patient's cached dashboard responses are rebuilt
+        assert db.bumped == [1]
+
+    def test_failed_import_resumes_after_last_committed_chunk(self):
+        text = csv_text([patient(i) for i in range(2500)])
+        db = FakeImportDb(fail_on_chunk=2)
+        with pytest.raises(Exception, match='Lost connection'):
+            self.run_import(db, 'patients', text)
+        assert db.jobs['job-1']['rows_committed'] == 1000
+        assert db.jobs['job-1']['status'] == 'failed'
+
+        db.fail_on_chunk = None
+        report = self.run_import(db, 'patients', text)
+
+        assert report.rows_skipped == 1000
+        assert report.rows_inserted == 1500
+        assert [row[2] for row in db.inserted] == [f'patient{i}@example.com' for i in range(2500)]
+
+    def test_job_kind_must_match(self):
+        db = FakeImportDb()
+        self.run_import(db, 'patients', csv_text([patient(1)]))
+        with pytest.raises(BulkImportError, match='is a patients import'):
+            self.run_import(db, 'records', 'patient_id,title,record_date\n')
+
+    def test_errors_kept_in_report_are_capped(self):
+        db = FakeImportDb()
+        rows = [patient(i, age='x') for i in range(30)]
+        report = BulkImporter(db, max_errors=10).run('patients', read_rows(io.StringIO(csv_text(rows)), 'csv'), 'j')
+
+        assert report.rows_failed == 30
+        assert len(report.errors) == 10
+        assert report.to_dict()['errors_truncated']
+
+
+class TestImportEndpoint:
+    """Tests for POST /api/import/<kind>"""
+
+    @pytest.fixture
+    def client(self):
+        import server
+        server.app.config['TESTING'] = True
+        with server.app.test_client() as client:
+            yield client
+
+    def test_csv_upload(self, client):
+        db = FakeImportDb()
+        with patch('server.db_manager', db):
+            response = client.post('/api/import/patients?job=partner', data=csv_text([patient(1), patient(2)]),
+                                   content_type='text/csv')
+
+        assert response.status_code == 200
+        assert response.get_json()['rows_inserted'] == 2
+        assert len(db.inserted) == 2
+
+    def test_bad_requests(self, client):
+        with patch('server.db_manager', FakeImportDb()):
+            assert client.post('/api/import/patients', data='', content_type='text/csv').status_code == 400
+            assert client.post('/api/import/patients?job=j', data='', content_type='text/plain').status_code == 400
+            assert client.post('/api/import/doctors?job=j', data='', content_type='text/csv').status_code == 400
@@ -0,0 +1,191 @@
+import asyncio
+from datetime import date, datetime, timedelta
+import pytest
+from unittest.mock import patch
+from actions.clinic_calendar import ClinicCalendar, SlotUnavailableError
+from actions.doctor_directory import doctor_directory
+
+# A Monday far enough ahead that "now" never falls inside the test week
+MONDAY = date(2030, 6, 10)
+
+HOURS = [
+    {'weekday': weekday, 'opens_at': timedelta(hours=8), 'closes_at': timedelta(hours=18)}
+    for weekday in range(5)
+] + [{'weekday': 5, 'opens_at': timedelta(hours=9), 'closes_at': timedelta(hours=14)}]
+
+
+def at(day: date, clock: str) -> datetime:
+    return datetime.fromisoformat(f"{day.isoformat()} {clock}")
+
+
+class TestClinicCalendar:
+    """Tests for clinic hours, doctor shifts and the booked-slot index"""
+
+    def setup_method(self):
+        self.calendar = ClinicCalendar(ttl=60)
+        self.calendar.load(
+            HOURS,
+            holidays=[{'holiday_date': MONDAY + timedelta(days=7), 'description': 'Public holiday'}],
+            shifts=[
+                # Doctor 2 works Monday mornings and Wednesday afternoons only
+                {'doctor_id': 2, 'weekday': 0, 'starts_at': timedelta(hours=8), 'ends_at': timedelta(hours=12)},
+                {'doctor_id': 2, 'weekday': 2, 'starts_at': timedelta(hours=13), 'ends_at': timedelta(hours=17)},
+            ],
+            bookings=[
+                {'doctor_id': 1, 'appointment_date': at(MONDAY, '08:00')},
+                {'doctor_id': 1, 'appointment_date': at(MONDAY, '08:30')},
+                {'doctor_id': 1, 'appointment_date': at(MONDAY, '09:30')},
+            ],
+        )
+
+    def check(self, doctor_id, start, ignore=None):
+        asyncio.run(self.calendar.check_slot(doctor_id, start, ignore))
+
+    def test_hours_come_from_table_rows(self):
+        """Test that closing time becomes the last bookable slot"""
+        hours = asyncio.run(self.calendar.opening_hours())
+        assert hours[0][:2] == (8 * 60, 17 * 60 + 30)
+        assert hours[5][:2] == (9 * 60, 13 * 60 + 30)
+        assert hours[6] is None
+
+    def test_empty_hours_table_keeps_defaults(self):
+        calendar = ClinicCalendar(ttl=60)
+        calendar.load([], [], [], [])
+        assert asyncio.run(calendar.opening_hours())[5][:2] == (9 * 60, 13 * 60 + 30)
+
+    def test_booked_slot_is_rejected_with_alternatives(self):
+        with pytest.raises(SlotUnavailableError) as error:
+            self.check(1, at(MONDAY, '08:30'))
+        assert "already has an appointment" in str(error.value)
+        assert error.value.alternatives == [at(MONDAY, '09:00'), at(MONDAY, '10:00'), at(MONDAY, '10:30')]
+
+    def test_off_grid_start_is_rejected(self):
+        """Test that a slot starting between grid points is rejected, even when it is free"""
+        for clock in ('09:45', '10:15', '10:10'):
+            with pytest.raises(SlotUnavailableError, match="every 30 minutes") as error:
+                self.check(1, at(MONDAY, clock))
+            assert error.value.alternatives[0] == at(MONDAY, '10:00' if clock == '09:45' else '10:30')
+        with pytest.raises(SlotUnavailableError, match="every 30 minutes"):
+            self.check(1, at(MONDAY, '10:00') + timedelta(seconds=30))
+        self.check(1, at(MONDAY, '09:00'))
+
+    def test_moving_an_appointment_ignores_its_own_slot(self):
+        self.check(1, at(MONDAY, '09:30'), ignore=at(MONDAY, '09:30'))
+        with pytest.raises(SlotUnavailableError):
+            self.check(1, at(MONDAY, '09:30'), ignore=at(MONDAY, '08:30'))
+
+    def test_shift_between_grid_points_starts_at_the_next_one(self):
+        calendar = ClinicCalendar(ttl=60)
+        calendar.load(HOURS, [], [
+            {'doctor_id': 4, 'weekday': 0, 'starts_at': timedelta(hours=8, minutes=15), 'ends_at': timedelta(hours=10)},
+        ], [])
+        assert asyncio.run(calendar.next_free_slots(4, at(MONDAY, '07:00'), count=2)) == [
+            at(MONDAY, '08:30'), at(MONDAY, '09:00')
+        ]
+
+    def test_holidays_and_closed_days(self):
+        with pytest.raises(SlotUnavailableError, match="Public holiday"):
+            self.check(1, at(MONDAY + timedelta(days=7), '10:00'))
+        with pytest.raises(SlotUnavailableError, match="Sundays"):
+            self.check(1, at(MONDAY + timedelta(days=6), '10:00'))
+        with pytest.raises(ValueError, match="Public holiday"):
+            asyncio.run(self.calendar.check_day(MONDAY + timedelta(days=7)))
+
+    def test_outside_opening_hours(self):
+        with pytest.raises(SlotUnavailableError, match="Weekday appointments"):
+            self.check(1, at(MONDAY, '17:45'))
+
+    def test_doctor_shifts_limit_availability(self):
+        self.check(2, at(MONDAY, '11:30'))
+        with pytest.raises(SlotUnavailableError, match="not working") as error:
+            self.check(2, at(MONDAY, '12:00'))
+        # Next free slots skip to the Wednesday afternoon shift
+        assert error.value.alternatives[0] == at(MONDAY + timedelta(days=2), '13:00')
+
+    def test_reserve_and_release(self):
+        asyncio.run(self.calendar.reserve(1, at(MONDAY, '09:00')))
+        with pytest.raises(SlotUnavailableError):
+            asyncio.run(self.calendar.reserve(1, at(MONDAY, '09:00')))
+
+        self.calendar.release(1, at(MONDAY, '09:00'))
+        asyncio.run(self.calendar.reserve(1, at(MONDAY, '09:00')))
+
+    def test_next_free_slots_skip_bookings(self):
+        slots = asyncio.run(self.calendar.next_free_slots(1, at(MONDAY, '07:00'), count=3))
+        assert slots == [at(MONDAY, '09:00'), at(MONDAY, '10:00'), at(MONDAY, '10:30')]
+
+    def test_next_free_slots_round_up_and_roll_over(self):
+        """Test that a start between slots rounds up and late starts move to the next open day"""
+        assert asyncio.run(self.calendar.next_free_slots(3, at(MONDAY, '10:10'), count=1)) == [at(MONDAY, '10:30')]
+        saturday = MONDAY + timedelta(days=5)
+        assert asyncio.run(self.calendar.next_free_slots(3, at(saturday, '13:45'), count=1)) == [
+            at(MONDAY + timedelta(days=8), '08:00')
+        ]
+
+    def test_next_free_slots_for_specialty_merges_doctors(self):
+        doctor_directory.load_rows([
+            {'id': 1, 'name': 'Dr. Ahmet Demir', 'specialty': 'Adult Cardiology'},
+            {'id': 2, 'name': 'Dr. Sarah Johnson', 'specialty': 'Adult Cardiology'},
+        ])
+        slots = asyncio.run(self.calendar.next_free_slots_for_specialty('adult cardiology', at(MONDAY, '08:00'), count=4))
+        assert [(slot.strftime('%H:%M'), doctor['id']) for slot, doctor in slots] == [
+            ('08:00', 2), ('08:30', 2), ('09:00', 1), ('09:00', 2)
+        ]
+
+    @patch('actions.clinic_calendar.async_db_manager', autospec=True)
+    def test_loads_from_database_until_invalidated(self, mock_db_manager):
+        mock_db_manager.execute_query.side_effect = lambda query, *args: HOURS if 'clinic_hours' in query else []
+        calendar = ClinicCalendar(ttl=60)
+
+        asyncio.run(calendar.opening_hours())
+        asyncio.run(calendar.next_free_slots(1, at(MONDAY, '08:00')))
+        assert mock_db_manager.execute_query.call_count == 4
+
+        calendar.invalidate()
+        asyncio.run(calendar.opening_hours())
+        assert mock_db_manager.execute_query.call_count == 8
+
+    @patch('actions.clinic_calendar.async_db_manager', autospec=True)
+    def test_reload_keeps_reservations_still_being_written(self, mock_db_manager):
+        """Test that a refresh does not drop a slot whose INSERT has not been read back"""
+        rows = {'appointments': []}
+        calendar = ClinicCalendar(ttl=60)
+        read = []
+
+        def execute_query(query, *args):
+            if 'clinic_hours' in query:
+                return HOURS
+            if 'appointments' in query:
+                if read:
+                    # The 11:00 write commits while the reload is reading
+                    calendar.confirm(1, at(MONDAY, '11:00'))
+                read.append(query)
+                return rows['appointments']
+            return []
+
+        mock_db_manager.execute_query.side_effect = execute_query
+        asyncio.run(calendar.reserve(1, at(MONDAY, '10:00')))
+        asyncio.run(calendar.reserve(1, at(MONDAY, '11:00')))
+
+        # Neither write is visible to this reload
+        calendar.invalidate()
+        for clock in ('10:00', '11:00'):
+            with pytest.raises(SlotUnavailableError, match="already has an appointment"):
+                asyncio.run(calendar.check_slot(1, at(MONDAY, clock)))
+
+        # Once a write is confirmed before a reload starts, the rows are authoritative
+        calendar.confirm(1, at(MONDAY, '10:00'))
+        rows['appointments'] = [{'doctor_id': 1, 'appointment_date': at(MONDAY, '10:00')}]
+        mock_db_manager.execute_query.side_effect = lambda query, *args: (
+            HOURS if 'clinic_hours' in query else rows['appointments'] if 'appointments' in query else []
+        )
+        calendar.invalidate()
+        asyncio.run(calendar.check_slot(1, at(MONDAY, '11:00')))
+        with pytest.raises(SlotUnavailableError):
+            asyncio.run(calendar.check_slot(1, at(MONDAY, '10:00')))
+
+    def test_released_reservation_is_not_carried_over(self):
+        asyncio.run(self.calendar.reserve(1, at(MONDAY, '10:00')))
+        self.calendar.release(1, at(MONDAY, '10:00'))
+        self.calendar.load(HOURS, [], [], [], read_since=0)
+        self.check(1, at(MONDAY, '10:00'))
@@ -0,0 +1,177 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import urllib.request
+from http.server import ThreadingHTTPServer
+import pytest
+import yaml
+from unittest.mock import AsyncMock, Mock, patch
+from rasa_sdk import Tracker
+from rasa_sdk.executor import CollectingDispatcher
+from actions.content_store import ContentError, ContentStore, content_store, render_catalogue
+from actions.db_config import METRICS_CONFIG
+from actions.doctor_directory import doctor_directory
+from actions.instrumentation import _MetricsHandler
+from actions.medical_actions import (
+    ActionListDoctors, ActionListDoctorsBySpecialty, ActionListPrices, ActionListProcedures, ActionListTests
+)
+
+DOCTORS = [
+    {'id': 1, 'name': 'Dr. Smith', 'specialty': 'Adult Cardiology'},
+    {'id': 2, 'name': 'Dr. Williams', 'specialty': 'Pediatric Cardiology'},
+]
+
+
+def catalogue_content(price='150 - 250 RON'):
+    section = {'title': 'Consultations', 'items': [{'name': 'Initial Consultation', 'detail': price}]}
+    return {
+        'footer': 'Call us',
+        'catalogues': {
+            'procedures': {'sections': [section]},
+            'tests': {'sections': [section]},
+            'prices': {'title': 'PRICES', 'separator': ' → ', 'sections': [section]},
+        },
+    }
+
+
+def write_catalogue(path, content, mtime):
+    path.write_text(yaml.safe_dump(content, allow_unicode=True), encoding='utf-8')
+    os.utime(path, (mtime, mtime))
+
+
+class TestRendering:
+    """Tests for turning catalogue data into response text"""
+
+    def test_render_catalogue(self):
+        catalogue = {
+            'title': 'PRICES',
+            'separator': ' → ',
+            'sections': [
+                {'title': 'Consultations', 'items': [{'name': 'Initial', 'detail': '150 RON'},
+                                                     {'name': 'Control', 'detail': '100 RON'}]},
+                {'title': 'Tests', 'items': [{'name': 'ECG', 'detail': '50 RON'}]},
+            ],
+        }
+        assert render_catalogue(catalogue, 'Call us\n') == (
+            "PRICES\n\nConsultations\n• Initial → 150 RON\n• Control → 100 RON\n\nTests\n• ECG → 50 RON\n\nCall us"
+        )
+
+    def test_missing_catalogue_is_rejected(self):
+        content = catalogue_content()
+        del content['catalogues']['tests']
+        with pytest.raises(ContentError, match="tests"):
+            ContentStore(path='unused').load(content)
+
+    @pytest.mark.parametrize('action_class, name, expected', [
+        (ActionListProcedures, 'procedures', "• Coronary Angioplasty (PCI) - opens blocked arteries"),
+        (ActionListTests, 'tests', "• BNP/NT-proBNP - heart failure indicator"),
+        (ActionListPrices, 'prices', "• Valve Replacement → 30.000 - 60.000 RON"),
+    ])
+    def test_actions_send_the_shipped_catalogues(self, action_class, name, expected):
+        dispatcher = Mock(spec=CollectingDispatcher)
+        action_class().run(dispatcher, Mock(spec=Tracker), {})
+
+        text = dispatcher.utter_message.call_args.kwargs['text']
+        assert text == content_store.catalogue(name)
+        assert expected in text
+        assert text.endswith("📧 Email: info@cardiologyclinic.com")
+
+
+class TestReloading:
+    """Edits to the catalogue file go live without a restart"""
+
+    def test_changed_file_is_reloaded(self, tmp_path):
+        path = tmp_path / 'catalogue.yml'
+        write_catalogue(path, catalogue_content(), 1_000_000)
+        store = ContentStore(path=str(path), check_interval=0)
+        assert "150 - 250 RON" in store.catalogue('prices')
+
+        write_catalogue(path, catalogue_content('175 - 275 RON'), 1_000_100)
+        assert "175 - 275 RON" in store.catalogue('prices')
+
+    def test_file_is_checked_once_per_interval(self, tmp_path):
+        path = tmp_path / 'catalogue.yml'
+        write_catalogue(path, catalogue_content(), 1_000_000)
+        store = ContentStore(path=str(path), check_interval=3600)
+        store.catalogue('prices')
+
+        write_catalogue(path, catalogue_content('175 - 275 RON'), 1_000_100)
+        with patch('actions.content_store.os.stat') as stat:
+            assert "150 - 250 RON" in store.catalogue('prices')
+        stat.assert_not_called()
+
+        store.invalidate()
+        assert "175 - 275 RON" in store.catalogue('prices')
+
+    def test_broken_edit_keeps_current_content(self, tmp_path, caplog):
+        path = tmp_path / 'catalogue.yml'
+        write_catalogue(path, catalogue_content(), 1_000_000)
+        store = ContentStore(path=str(path), check_interval=0)
+        store.catalogue('prices')
+
+        path.write_text("catalogues: [unclosed", encoding='utf-8')
+        os.utime(path, (1_000_100, 1_000_100))
+        with caplog.at_level(logging.ERROR, logger='actions.content_store'):
+            assert "150 - 250 RON" in store.catalogue('prices')
+        assert "Keeping the current catalogue content" in caplog.text
+
+    def test_missing_file_fails_the_first_load(self, tmp_path):
+        store = ContentStore(path=str(tmp_path / 'missing.yml'))
+        with pytest.raises(ContentError, match="missing.yml"):
+            store.catalogue('prices')
+
+
+class TestDoctorLists:
+    """Doctor lists are rendered once per doctor directory version"""
+
+    def setup_method(self):
+        doctor_directory.load_rows(DOCTORS)
+
+    def test_doctor_list_is_rendered_once_per_version(self):
+        store = ContentStore(path='unused')
+        with patch('actions.content_store.format_doctor_list', return_value="rendered") as render:
+            assert asyncio.run(store.doctor_list()) == "rendered"
+            assert asyncio.run(store.doctor_list()) == "rendered"
+            assert render.call_count == 1
+
+            doctor_directory.load_rows(DOCTORS + [{'id': 3, 'name': 'Dr. Brown', 'specialty': 'Adult Cardiology'}])
+            asyncio.run(store.doctor_list())
+            assert render.call_count == 2
+
+    def test_actions_use_the_rendered_lists(self):
+        dispatcher = Mock(spec=CollectingDispatcher)
+        asyncio.run(ActionListDoctors().run(dispatcher, Mock(spec=Tracker), {}))
+        assert dispatcher.utter_message.call_args.kwargs['text'] == \
+            "Adult Cardiology:\n• Dr. Smith\n\nPediatric Cardiology:\n• Dr. Williams"
+
+        tracker = Mock(spec=Tracker)
+        tracker.get_slot.return_value = 'Pediatric Cardiology'
+        tracker.latest_message = {'text': 'pediatric doctors'}
+        asyncio.run(ActionListDoctorsBySpecialty().run(dispatcher, tracker, {}))
+        assert dispatcher.utter_message.call_args.kwargs['text'] == "Pediatric Cardiology Doctors:\n• Dr. Williams"
+
+    @patch('actions.doctor_directory.async_db_manager')
+    def test_invalidate_reloads_the_doctors(self, mock_db_manager):
+        mock_db_manager.execute_query = AsyncMock(return_value=DOCTORS[:1])
+        store = ContentStore(path='unused')
+        assert "Dr. Williams" in asyncio.run(store.doctor_list())
+
+        store.invalidate()
+        assert asyncio.run(store.doctor_list()) == "Adult Cardiology:\n• Dr. Smith"
+        mock_db_manager.execute_query.assert_awaited_once()
+
+    def test_delete_content_endpoint_invalidates(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/content"
+        try:
+            with patch.object(content_store, 'invalidate') as invalidate, \
+                    patch.dict(METRICS_CONFIG, {'host': '127.0.0.1', 'allow_delete': True}):
+                with urllib.request.urlopen(urllib.request.Request(url, method='DELETE')) as response:
+                    assert json.loads(response.read()) == {'message': 'Content cache cleared'}
+            invalidate.assert_called_once()
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,119 @@
+import pytest
+from datetime import date
+from actions.datetime_parser import (
+    check_opening_hours, normalize_date, normalize_time, parse_date, parse_time
+)
+
+# A Wednesday
+TODAY = date(2025, 6, 11)
+
+
+class TestParseDate:
+    """Tests for relative and absolute date expressions"""
+
+    @pytest.mark.parametrize('text, expected', [
+        ('today', date(2025, 6, 11)),
+        ('Tomorrow', date(2025, 6, 12)),
+        ('the day after tomorrow', date(2025, 6, 13)),
+        ('in 3 days', date(2025, 6, 14)),
+        ('in two weeks', date(2025, 6, 25)),
+        ('in a week', date(2025, 6, 18)),
+        ('next week', date(2025, 6, 18)),
+        ('friday', date(2025, 6, 13)),
+        ('next Tuesday', date(2025, 6, 17)),
+        ('on  wed', date(2025, 6, 18)),
+        ('2025-07-01', date(2025, 7, 1)),
+    ])
+    def test_expressions(self, text, expected):
+        assert parse_date(text, TODAY) == expected
+
+    def test_closed_on_sundays(self):
+        with pytest.raises(ValueError, match="closed on Sundays"):
+            parse_date('sunday', TODAY)
+        with pytest.raises(ValueError, match="closed on Sundays"):
+            normalize_date('in 4 days', TODAY)
+
+    def test_past_and_invalid_dates(self):
+        with pytest.raises(ValueError, match="future date"):
+            parse_date('2025-01-01', TODAY)
+        with pytest.raises(ValueError, match="valid date"):
+            parse_date('2025-02-30', TODAY)
+        with pytest.raises(ValueError, match="valid date"):
+            parse_date('someday', TODAY)
+
+    def test_normalize_date_format(self):
+        assert normalize_date('tomorrow', TODAY) == '2025-06-12'
+        assert normalize_date('', TODAY) is None
+
+
+class TestParseTime:
+    """Tests for spoken and written times"""
+
+    @pytest.mark.parametrize('text, expected', [
+        ('3 PM', (15, 0)),
+        ('3pm', (15, 0)),
+        ('8:am', (8, 0)),
+        ('9 a.m.', (9, 0)),
+        ('12 pm', (12, 0)),
+        ('12 am', (0, 0)),
+        ('2:30 PM', (14, 30)),
+        ('14:30', (14, 30)),
+        ('9.15', (9, 15)),
+        ('noon', (12, 0)),
+        ('midday', (12, 0)),
+        ('half past two', (14, 30)),
+        ('quarter past 10', (10, 15)),
+        ('quarter to four', (15, 45)),
+        ('quarter to 9 am', (8, 45)),
+        ('quarter to 8', (7, 45)),
+        ('quarter to 8 pm', (19, 45)),
+        ('quarter to one', (12, 45)),
+        ('quarter to 12', (11, 45)),
+        ('half past 7', (19, 30)),
+        ('half past 8', (8, 30)),
+        ('quarter past 12', (12, 15)),
+        ("ten o'clock", (10, 0)),
+        ('seven in the morning', (7, 0)),
+        ('3', (15, 0)),
+        ('07:30', (7, 30)),
+    ])
+    def test_expressions(self, text, expected):
+        assert parse_time(text) == expected
+
+    @pytest.mark.parametrize('text, message', [
+        ('25', 'valid hour'),
+        ('13 pm', 'valid hour'),
+        ('10:75', 'valid time'),
+        ('soonish', 'valid time format'),
+    ])
+    def test_invalid_times(self, text, message):
+        with pytest.raises(ValueError, match=message):
+            parse_time(text)
+
+
+class TestOpeningHours:
+    """Tests for the opening-hours table"""
+
+    def test_weekday_hours(self):
+        check_opening_hours(date(2025, 6, 11), 8, 0)
+        check_opening_hours(date(2025, 6, 11), 17, 30)
+        with pytest.raises(ValueError, match="Weekday appointments"):
+            check_opening_hours(date(2025, 6, 11), 17, 45)
+
+    def test_saturday_and_sunday(self):
+        with pytest.raises(ValueError, match="Saturday appointments"):
+            check_opening_hours(date(2025, 6, 14), 14, 0)
+        with pytest.raises(ValueError, match="closed on Sundays"):
+            check_opening_hours(date(2025, 6, 15), 10, 0)
+
+    def test_normalize_time_checks_date(self):
+        assert normalize_time('half past two', '2025-06-11') == '14:30'
+        with pytest.raises(ValueError, match="Saturday appointments"):
+            normalize_time('half past two', '2025-06-14')
+
+    def test_normalize_time_checks_the_slot_grid(self):
+        assert normalize_time('quarter past 10') == '10:15'
+        assert normalize_time('10:30', '2025-06-11') == '10:30'
+        for text in ('quarter past 10', '10:10', '9.45'):
+            with pytest.raises(ValueError, match="every 30 minutes"):
+                normalize_time(text, '2025-06-11')
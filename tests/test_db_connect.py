@@ -0,0 +1,390 @@
+import asyncio
+import threading
+import time
+import pytest
+import pymysql
+from unittest.mock import Mock, MagicMock, AsyncMock, patch
+from actions.db_connect import ConnectionPool, DatabaseManager, DuplicateKeyError, PoolTimeoutError
+from actions.db_async import AsyncDatabaseManager
+
+
+class FakeConnection:
+    """Minimal stand-in for a PyMySQL connection"""
+
+    def __init__(self):
+        self.open = True
+        self.pings = 0
+        self.healthy = True
+
+    def ping(self, reconnect=False):
+        self.pings += 1
+        if not self.healthy:
+            raise Exception("server has gone away")
+
+    def close(self):
+        self.open = False
+
+
+class TestConnectionPool:
+    """Tests for the bounded connection pool"""
+
+    def setup_method(self):
+        self.created = []
+
+    def connect(self):
+        connection = FakeConnection()
+        self.created.append(connection)
+        return connection
+
+    def make_pool(self, **kwargs):
+        options = {'min_size': 1, 'max_size': 2, 'wait_timeout': 0.05, 'ping_interval': 0}
+        options.update(kwargs)
+        return ConnectionPool(self.connect, **options)
+
+    def test_connections_are_reused(self):
+        """Test that a released connection is handed out again"""
+        pool = self.make_pool()
+
+        first = pool.acquire()
+        pool.release(first)
+        second = pool.acquire()
+
+        assert first is second
+        assert len(self.created) == 1
+        assert pool.stats()['checkouts'] == 2
+        assert pool.stats()['creates'] == 1
+
+    def test_wait_times_out_when_exhausted(self):
+        """Test that checkout waits and then fails when the pool is full"""
+        pool = self.make_pool(max_size=1)
+        pool.acquire()
+
+        with pytest.raises(PoolTimeoutError):
+            pool.acquire()
+
+        stats = pool.stats()
+        assert stats['waits'] == 1
+        assert stats['wait_timeouts'] == 1
+        assert stats['in_use'] == 1
+
+    def test_waiter_gets_released_connection(self):
+        """Test that a waiting thread is woken up by a release"""
+        pool = self.make_pool(max_size=1, wait_timeout=2)
+        held = pool.acquire()
+        timer = threading.Timer(0.05, pool.release, args=(held,))
+        timer.start()
+
+        connection = pool.acquire()
+
+        assert connection is held
+        assert pool.stats()['waits'] == 1
+
+    def test_failed_health_check_replaces_connection(self):
+        """Test that a dead idle connection is discarded on checkout"""
+        pool = self.make_pool()
+        first = pool.acquire()
+        pool.release(first)
+        first.healthy = False
+
+        second = pool.acquire()
+
+        assert second is not first
+        assert not first.open
+        assert pool.stats()['failed_health_checks'] == 1
+        assert pool.stats()['size'] == 1
+
+    def test_expired_connections_are_recycled(self):
+        """Test that connections past their lifetime are closed"""
+        pool = self.make_pool(max_lifetime=0.01)
+        first = pool.acquire()
+        pool.release(first)
+        time.sleep(0.02)
+
+        second = pool.acquire()
+
+        assert second is not first
+        assert not first.open
+        assert pool.stats()['recycled'] == 1
+
+    def test_broken_connection_is_not_returned(self):
+        """Test that closed connections are dropped on release"""
+        pool = self.make_pool()
+        connection = pool.acquire()
+        connection.open = False
+        pool.release(connection)
+
+        assert pool.stats()['size'] == 0
+        assert pool.stats()['idle'] == 0
+
+    def test_never_exceeds_max_size_under_load(self):
+        """Test that concurrent checkouts stay within the bound"""
+        pool = self.make_pool(max_size=3, wait_timeout=5)
+        peak = []
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(20):
+                    with pool.connection():
+                        peak.append(pool.stats()['in_use'])
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert not errors
+        assert max(peak) <= 3
+        assert len(self.created) <= 3
+        assert pool.stats()['checkouts'] == 200
+
+    def test_warm_fills_min_size(self):
+        """Test that warming opens min_size idle connections"""
+        pool = self.make_pool(min_size=2, max_size=4)
+        pool.warm()
+
+        assert pool.stats()['idle'] == 2
+        assert len(self.created) == 2
+
+
+class TestDatabaseManager:
+    """Tests for DatabaseManager on top of the pool"""
+
+    def test_execute_query_uses_pool(self):
+        """Test that consecutive queries share one connection"""
+        connection = MagicMock()
+        connection.open = True
+        cursor = connection.cursor.return_value.__enter__.return_value
+        cursor.fetchall.return_value = [{'test': 1}]
+
+        manager = DatabaseManager(pool_config={'max_size': 2, 'ping_interval': 60})
+        with patch.object(manager.pool, '_connect', return_value=connection) as connect:
+            assert manager.execute_query("SELECT 1 as test") == [{'test': 1}]
+            assert manager.execute_query("SELECT 1 as test") == [{'test': 1}]
+
+        connect.assert_called_once()
+        assert manager.pool_stats()['checkouts'] == 2
+
+    def make_manager(self, connection):
+        manager = DatabaseManager(pool_config={'max_size': 2, 'ping_interval': 60})
+        manager.pool._connect = Mock(return_value=connection)
+        return manager
+
+    def make_connection(self):
+        connection = MagicMock()
+        connection.open = True
+        return connection
+
+    def test_write_returns_lastrowid_and_rowcount(self):
+        """Test that writes report the inserted ID and affected rows"""
+        connection = self.make_connection()
+        cursor = connection.cursor.return_value.__enter__.return_value
+        cursor.lastrowid = 42
+        cursor.rowcount = 1
+        manager = self.make_manager(connection)
+
+        result = manager.execute_query("INSERT INTO doctors (name) VALUES (%s)", ('Dr. Test',), fetch=False)
+
+        assert result.lastrowid == 42
+        assert result.rowcount == 1
+
+    def test_transaction_commits_once_on_one_connection(self):
+        """Test that a transaction pins a single connection and commits"""
+        connection = self.make_connection()
+        manager = self.make_manager(connection)
+
+        with manager.transaction() as tx:
+            tx.execute_query("SELECT id FROM appointments WHERE id = %s", (1,))
+            tx.execute_query("DELETE FROM appointments WHERE id = %s", (1,), fetch=False)
+
+        manager.pool._connect.assert_called_once()
+        connection.begin.assert_called_once()
+        connection.commit.assert_called_once()
+        connection.rollback.assert_not_called()
+        assert manager.pool_stats()['in_use'] == 0
+
+    def test_transaction_rolls_back_on_error(self):
+        """Test that an exception inside the block rolls back"""
+        connection = self.make_connection()
+        manager = self.make_manager(connection)
+
+        with pytest.raises(ValueError):
+            with manager.transaction() as tx:
+                tx.execute_query("DELETE FROM appointments WHERE id = %s", (1,), fetch=False)
+                raise ValueError("abort")
+
+        connection.rollback.assert_called_once()
+        connection.commit.assert_not_called()
+        assert manager.pool_stats()['in_use'] == 0
+
+    def test_transaction_execute_many(self):
+        """Test that bulk rows go to cursor.executemany in one call"""
+        connection = self.make_connection()
+        cursor = connection.cursor.return_value.__enter__.return_value
+        cursor.rowcount = 3
+        manager = self.make_manager(connection)
+        rows = [('a',), ('b',), ('c',)]
+
+        with manager.transaction() as tx:
+            result = tx.execute_many("INSERT INTO doctors (name) VALUES (%s)", rows)
+
+        cursor.executemany.assert_called_once_with("INSERT INTO doctors (name) VALUES (%s)", rows)
+        assert result.rowcount == 3
+        connection.commit.assert_called_once()
+
+    def test_duplicate_key_is_reported_separately(self):
+        """Test that a UNIQUE violation raises DuplicateKeyError, other errors stay generic"""
+        connection = self.make_connection()
+        cursor = connection.cursor.return_value.__enter__.return_value
+        manager = self.make_manager(connection)
+
+        cursor.execute.side_effect = pymysql.err.IntegrityError(1062, "Duplicate entry '3-2030-06-10 10:00:00'")
+        with pytest.raises(DuplicateKeyError):
+            manager.execute_query("INSERT INTO appointments VALUES (%s)", (1,), fetch=False)
+
+        cursor.execute.side_effect = pymysql.err.IntegrityError(1452, "Cannot add or update a child row")
+        with pytest.raises(Exception) as error:
+            manager.execute_query("INSERT INTO appointments VALUES (%s)", (1,), fetch=False)
+        assert not isinstance(error.value, DuplicateKeyError)
+
+    def make_streaming_connection(self, rows, batch_size):
+        connection = self.make_connection()
+        cursor = connection.cursor.return_value
+        batches = [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+        cursor.fetchmany.side_effect = batches + [[]]
+        return connection, cursor
+
+    def test_stream_query_reads_in_batches(self):
+        """Test that streaming uses an unbuffered cursor and fetchmany"""
+        rows = [{'id': i} for i in range(5)]
+        connection, cursor = self.make_streaming_connection(rows, 2)
+        manager = self.make_manager(connection)
+
+        assert list(manager.stream_query("SELECT id FROM appointments", batch_size=2)) == rows
+
+        connection.cursor.assert_called_once_with(pymysql.cursors.SSDictCursor)
+        cursor.fetchmany.assert_called_with(2)
+        assert cursor.fetchmany.call_count == 4
+        cursor.close.assert_called_once()
+        assert manager.pool_stats()['idle'] == 1
+
+    def test_abandoned_stream_drops_connection(self):
+        """Test that a half-read stream is not returned to the pool"""
+        connection, cursor = self.make_streaming_connection([{'id': i} for i in range(4)], 2)
+
+        def close():
+            connection.open = False
+        connection.close.side_effect = close
+        manager = self.make_manager(connection)
+
+        rows = manager.stream_query("SELECT id FROM appointments", batch_size=2)
+        assert next(rows) == {'id': 0}
+        rows.close()
+
+        connection.close.assert_called()
+        stats = manager.pool_stats()
+        assert stats['in_use'] == 0
+        assert stats['idle'] == 0
+        assert stats['size'] == 0
+
+
+class FakeAsyncPool:
+    """Stand-in for an aiomysql pool handing out one connection"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.maxsize = 1
+        self.released = 0
+
+    async def acquire(self):
+        return self.connection
+
+    def release(self, connection):
+        self.released += 1
+
+
+class SlowAsyncPool(FakeAsyncPool):
+    """Hands out its connection only after `delay`, even when cancelled"""
+
+    def __init__(self, connection, delay):
+        super().__init__(connection)
+        self.delay = delay
+
+    async def acquire(self):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            # The connection was already taken when the cancellation arrived
+            pass
+        return self.connection
+
+
+class TestAsyncDatabaseManager:
+    """Tests for the asyncio database layer used by the action server"""
+
+    def make_manager(self):
+        connection = MagicMock()
+        connection.begin = AsyncMock()
+        connection.commit = AsyncMock()
+        connection.rollback = AsyncMock()
+        cursor = connection.cursor.return_value.__aenter__.return_value
+        cursor.execute = AsyncMock()
+        cursor.fetchall = AsyncMock(return_value=[{'id': 1}])
+        cursor.lastrowid = 7
+        cursor.rowcount = 1
+
+        manager = AsyncDatabaseManager()
+        pool = FakeAsyncPool(connection)
+        return manager, pool, connection
+
+    def test_execute_query(self):
+        """Test fetches and writes through the async pool"""
+        manager, pool, connection = self.make_manager()
+
+        async def scenario():
+            with patch('actions.db_async.aiomysql.create_pool', AsyncMock(return_value=pool)) as create_pool:
+                rows = await manager.execute_query("SELECT id FROM doctors")
+                result = await manager.execute_query("DELETE FROM doctors WHERE id = %s", (1,), fetch=False)
+                create_pool.assert_awaited_once()
+            return rows, result
+
+        rows, result = asyncio.run(scenario())
+
+        assert rows == [{'id': 1}]
+        assert result.lastrowid == 7
+        assert pool.released == 2
+
+    def test_transaction_rolls_back_on_error(self):
+        """Test that an async transaction rolls back and releases"""
+        manager, pool, connection = self.make_manager()
+
+        async def scenario():
+            with patch('actions.db_async.aiomysql.create_pool', AsyncMock(return_value=pool)):
+                async with manager.transaction() as tx:
+                    await tx.execute_query("UPDATE appointments SET status = 'cancelled'", fetch=False)
+                    raise ValueError("abort")
+
+        with pytest.raises(ValueError):
+            asyncio.run(scenario())
+
+        connection.rollback.assert_awaited_once()
+        connection.commit.assert_not_awaited()
+        assert pool.released == 1
+
+    def test_connection_acquired_after_the_timeout_is_released(self):
+        """Test that a pool wait that times out as the connection arrives does not leak it"""
+        manager, _, connection = self.make_manager()
+        manager.wait_timeout = 0.01
+        pool = SlowAsyncPool(connection, delay=0.05)
+
+        async def scenario():
+            with patch('actions.db_async.aiomysql.create_pool', AsyncMock(return_value=pool)):
+                with pytest.raises(PoolTimeoutError):
+                    await manager.execute_query("SELECT id FROM doctors")
+                await asyncio.sleep(0.1)
+
+        asyncio.run(scenario())
+        assert pool.released == 1
@@ -0,0 +1,116 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import patch
+from actions.doctor_directory import DoctorDirectory, normalize_doctor_name, with_title
+from actions.doctor_matcher import DoctorNameMatcher
+
+
+DOCTORS = [
+    {'id': 1, 'name': 'Dr. Ahmet Demir', 'specialty': 'Adult Cardiology'},
+    {'id': 2, 'name': 'Dr. Sarah Johnson', 'specialty': 'Adult Cardiology'},
+    {'id': 3, 'name': 'Dr. John Smith', 'specialty': 'Adult Cardiology'},
+    {'id': 4, 'name': 'Dr. Emily Chen', 'specialty': 'Pediatric Cardiology'},
+    {'id': 5, 'name': 'Dr. James Miller', 'specialty': 'Cardiovascular Surgery'},
+    {'id': 6, 'name': 'Dr. Elif Kaya', 'specialty': 'Cardiovascular Surgery'},
+]
+
+
+class TestDoctorDirectory:
+    """Tests for the in-memory doctor directory"""
+
+    def setup_method(self):
+        self.directory = DoctorDirectory(ttl=60)
+        self.directory.load_rows(DOCTORS)
+
+    def test_normalize_doctor_name(self):
+        """Test that titles, case and punctuation are ignored"""
+        assert normalize_doctor_name("Dr. John Smith") == "john smith"
+        assert normalize_doctor_name("doctor  SMITH") == "smith"
+        assert normalize_doctor_name("dr smith") == "smith"
+        assert with_title("John Smith") == "Dr. John Smith"
+        assert with_title("Dr. John Smith") == "Dr. John Smith"
+
+    def test_exact_and_prefix_lookup(self):
+        """Test full-name, last-name and prefix lookups"""
+        assert asyncio.run(self.directory.find("Dr. Sarah Johnson"))['id'] == 2
+        assert asyncio.run(self.directory.find("Smith"))['id'] == 3
+        assert asyncio.run(self.directory.find("dr. joh"))['id'] == 3
+        assert [d['id'] for d in asyncio.run(self.directory.search("jo"))] == [3, 2]
+        assert asyncio.run(self.directory.find("Nobody")) is None
+
+    def test_substring_lookup_matches_like_semantics(self):
+        """Test that a mid-word fragment still matches like LIKE %x% did"""
+        assert asyncio.run(self.directory.find("ohnso"))['id'] == 2
+
+    def test_specialty_index(self):
+        """Test that specialty lookups are case-insensitive and ordered by name"""
+        names = [d['name'] for d in asyncio.run(self.directory.by_specialty("cardiovascular surgery"))]
+        assert names == ['Dr. Elif Kaya', 'Dr. James Miller']
+        assert asyncio.run(self.directory.by_specialty("Dermatology")) == []
+
+    def test_all_is_ordered_by_specialty_then_name(self):
+        """Test ordering matches the old ORDER BY specialty, name"""
+        doctors = asyncio.run(self.directory.all())
+        assert [d['id'] for d in doctors] == [1, 3, 2, 6, 5, 4]
+
+    @patch('actions.doctor_directory.async_db_manager', autospec=True)
+    def test_loads_once_until_invalidated(self, mock_db_manager):
+        """Test that lookups hit the database only on (re)load"""
+        mock_db_manager.execute_query.return_value = DOCTORS
+        directory = DoctorDirectory(ttl=60)
+
+        async def lookups():
+            for _ in range(50):
+                await directory.find("Smith")
+                await directory.by_specialty("Adult Cardiology")
+
+        asyncio.run(lookups())
+        mock_db_manager.execute_query.assert_called_once()
+
+        directory.invalidate()
+        asyncio.run(directory.find("Smith"))
+        assert mock_db_manager.execute_query.call_count == 2
+        assert directory.version == 2
+
+    @patch('actions.doctor_directory.async_db_manager', autospec=True)
+    def test_ttl_expiry_reloads(self, mock_db_manager):
+        """Test that a stale directory reloads itself"""
+        mock_db_manager.execute_query.return_value = DOCTORS
+        directory = DoctorDirectory(ttl=0.01)
+
+        asyncio.run(directory.find("Smith"))
+        time.sleep(0.02)
+        asyncio.run(directory.find("Smith"))
+
+        assert mock_db_manager.execute_query.call_count == 2
+
+
+class TestDoctorNameMatcher:
+    """Tests for fuzzy doctor-name matching"""
+
+    def setup_method(self):
+        self.directory = DoctorDirectory(ttl=60)
+        self.directory.load_rows(DOCTORS)
+
+    def test_misspellings_resolve(self):
+        """Test that common typos still find the right doctor"""
+        assert asyncio.run(self.directory.find("Dr. Jonson"))['id'] == 2
+        assert asyncio.run(self.directory.find("smth"))['id'] == 3
+        assert asyncio.run(self.directory.find("Elif Kayya"))['id'] == 6
+        assert asyncio.run(self.directory.find("sara jonson"))['id'] == 2
+
+    def test_threshold_rejects_unrelated_names(self):
+        """Test that names below the confidence threshold do not match"""
+        assert asyncio.run(self.directory.find("Dr. Zed")) is None
+        assert asyncio.run(self.directory.find("John Xyz")) is None
+
+    def test_matcher_ranks_best_first(self):
+        """Test that candidates come back ordered by score"""
+        matcher = DoctorNameMatcher([("john smith", 'smith'), ("sarah johnson", 'johnson'), ("james johnston", 'johnston')])
+
+        ranked = matcher.match("jonson")
+
+        assert ranked[0][1] == 'johnson'
+        assert all(ranked[i][0] >= ranked[i + 1][0] for i in range(len(ranked) - 1))
+        assert all(score > matcher.threshold for score, _ in ranked)
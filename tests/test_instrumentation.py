@@ -0,0 +1,155 @@
+import asyncio
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from rasa_sdk import Action, Tracker
+from rasa_sdk.executor import CollectingDispatcher
+from rasa_sdk.utils import all_subclasses
+import actions.action_appointments
+import actions.action_first
+import actions.db_custom_actions
+import actions.medical_records_actions
+from actions.db_async import _run_statement
+from actions.db_config import METRICS_CONFIG
+from actions.instrumentation import (
+    _MetricsHandler, deletes_allowed, instrument_actions, instrument_class, metrics, record_query, report_error
+)
+from actions.medical_actions import ActionListDoctors, ActionListProcedures
+
+# What run_actions.py does before the action server registers the actions
+instrument_actions('actions')
+
+
+class FakeCursor:
+    lastrowid = None
+    rowcount = 1
+
+    async def execute(self, query, params=None):
+        await asyncio.sleep(0.01)
+
+    async def fetchall(self):
+        return [{'id': 1}]
+
+
+class TestActionInstrumentation:
+    """Tests for per-action timing, DB and error metrics"""
+
+    def setup_method(self):
+        metrics.reset()
+        self.dispatcher = Mock(spec=CollectingDispatcher)
+        self.tracker = Mock(spec=Tracker)
+
+    def test_every_project_action_is_instrumented(self):
+        project_actions = [cls for cls in all_subclasses(Action) if cls.__module__.startswith('actions.')]
+        assert len(project_actions) >= 15
+        assert all(getattr(cls.run, '__instrumented__', False) for cls in project_actions)
+        # Inherited FormValidationAction.run is wrapped in the subclass
+        assert getattr(actions.action_appointments.ValidateAppointmentForm.run, '__instrumented__', False)
+
+    def test_importing_the_package_patches_nothing(self):
+        assert '__init_subclass__' not in Action.__dict__
+        assert not getattr(Action.run, '__instrumented__', False)
+        # Instrumenting twice does not wrap twice
+        run = ActionListDoctors.run
+        instrument_actions('actions')
+        assert ActionListDoctors.run is run
+
+    def test_async_action_records_db_time_and_queries(self):
+        async def all_doctors():
+            await _run_statement(FakeCursor(), "SELECT 1", None, True)
+            await _run_statement(FakeCursor(), "SELECT 2", None, True)
+            return [{'id': 1, 'name': 'Dr. Smith', 'specialty': 'Adult Cardiology'}]
+
+        with patch('actions.medical_actions.doctor_directory.all', side_effect=all_doctors):
+            asyncio.run(ActionListDoctors().run(self.dispatcher, self.tracker, {}))
+
+        stats = metrics.snapshot('action_list_doctors')
+        assert stats['runs'] == 1 and stats['errors'] == 0
+        assert stats['queries'] == 2
+        assert 0.02 <= stats['db_seconds'] <= stats['seconds']
+
+    def test_caught_errors_are_counted(self):
+        with patch('actions.medical_actions.doctor_directory.all', AsyncMock(side_effect=Exception("boom"))):
+            asyncio.run(ActionListDoctors().run(self.dispatcher, self.tracker, {}))
+            asyncio.run(ActionListDoctors().run(self.dispatcher, self.tracker, {}))
+
+        assert metrics.snapshot('action_list_doctors')['errors'] == 2
+        self.dispatcher.utter_message.assert_called_with(
+            text="Sorry, I encountered an error while fetching doctors: boom"
+        )
+
+    def test_sync_action_and_raised_errors(self):
+        ActionListProcedures().run(self.dispatcher, self.tracker, {})
+        assert metrics.snapshot('action_list_procedures')['runs'] == 1
+
+        @instrument_class
+        class ActionExplode(Action):
+            def name(self):
+                return "action_explode"
+
+            def run(self, dispatcher, tracker, domain):
+                record_query(0.5)
+                raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            ActionExplode().run(self.dispatcher, self.tracker, {})
+        assert metrics.snapshot('action_explode') == {
+            'runs': 1, 'errors': 1, 'seconds': pytest.approx(0, abs=0.1), 'db_seconds': 0.5, 'queries': 1
+        }
+
+    def test_queries_outside_actions_are_ignored(self):
+        record_query(1.0)
+        report_error(ValueError("not in an action"))
+        assert metrics.render().count('_count{') == 0
+
+    def test_metrics_endpoint_serves_prometheus_text(self):
+        metrics.observe('action_list_doctors', 0.03, 0.01, 2, False)
+        metrics.observe('action_list_doctors', 0.2, 0.15, 3, True)
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            with urllib.request.urlopen(url) as response:
+                body = response.read().decode()
+                assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        lines = body.splitlines()
+        assert '# TYPE rasa_action_duration_seconds histogram' in lines
+        assert 'rasa_action_duration_seconds_bucket{action="action_list_doctors",le="0.05"} 1' in lines
+        assert 'rasa_action_duration_seconds_bucket{action="action_list_doctors",le="+Inf"} 2' in lines
+        assert 'rasa_action_duration_seconds_count{action="action_list_doctors"} 2' in lines
+        assert 'rasa_action_db_queries_bucket{action="action_list_doctors",le="2"} 1' in lines
+        assert 'rasa_action_db_seconds_sum{action="action_list_doctors"} 0.160000' in lines
+        assert 'rasa_action_errors_total{action="action_list_doctors"} 1' in lines
+
+    @pytest.mark.parametrize('host, allow, expected', [
+        ('127.0.0.1', True, True),
+        ('::1', True, True),
+        ('localhost', True, True),
+        ('0.0.0.0', True, False),
+        ('10.1.2.3', True, False),
+        ('127.0.0.1', False, False),
+    ])
+    def test_deletes_need_opt_in_and_loopback(self, host, allow, expected):
+        assert deletes_allowed({'host': host, 'port': 9155, 'allow_delete': allow}) is expected
+
+    def test_delete_routes_are_refused_by_default(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            with patch.dict(METRICS_CONFIG, {'host': '127.0.0.1', 'allow_delete': False}):
+                for path, status in [('/content', 403), ('/queries', 403), ('/metrics', 404)]:
+                    with pytest.raises(urllib.error.HTTPError) as error:
+                        urllib.request.urlopen(urllib.request.Request(base + path, method='DELETE'))
+                    assert error.value.code == status
+        finally:
+            server.shutdown()
+            server.server_close()
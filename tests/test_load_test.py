@@ -0,0 +1,208 @@
+import json
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from actions.datetime_parser import check_opening_hours
+from actions.db_connect import WriteResult
+from load_test import (
+    OPERATIONS, SyntheticData, action_request, clean, compare, generate, percentile, replay,
+    save_results, summarize, user_email
+)
+
+
+class FakeBulkDb:
+    """Records executemany chunks and answers the MAX(id) lookups"""
+
+    def __init__(self, next_ids=None):
+        self.next_ids = next_ids or {}
+        self.chunks = []
+        self.deletes = []
+
+    def execute_query(self, query, params=None, fetch=True):
+        if query.startswith("SELECT COALESCE(MAX(id)"):
+            table = query.split()[-1]
+            return [{'next_id': self.next_ids.get(table, 1)}]
+        if query.startswith("DELETE"):
+            self.deletes.append((query, params))
+            # First batch of each statement is full, the second one finishes it
+            done = sum(1 for previous, _ in self.deletes if previous == query) > 1
+            return WriteResult(0, 3 if done else 10)
+        raise AssertionError(f"Unexpected query: {query}")
+
+    @contextmanager
+    def transaction(self):
+        db = self
+
+        class Tx:
+            def execute_many(self, query, rows):
+                db.chunks.append((query.split()[2], list(rows)))
+                return WriteResult(0, len(rows))
+
+        yield Tx()
+
+    def rows(self, table):
+        return [row for name, rows in self.chunks if name == table for row in rows]
+
+
+class TestSyntheticData:
+    """Tests for the deterministic dataset generator"""
+
+    def make(self, **overrides):
+        options = dict(users=200, doctors=5, appointments=2000, records=500, seed=7,
+                       first_user_id=101, first_doctor_id=11, today=date(2030, 6, 12))
+        options.update(overrides)
+        return SyntheticData(**options)
+
+    def test_same_seed_gives_same_rows(self):
+        first, second = self.make(), self.make()
+        assert list(first.appointment_rows()) == list(second.appointment_rows())
+        assert list(first.record_rows()) == list(second.record_rows())
+        assert list(first.appointment_rows()) != list(self.make(seed=8).appointment_rows())
+
+    def test_users_continue_after_existing_ids(self):
+        rows = list(self.make().user_rows('hash'))
+        assert [row[0] for row in rows] == list(range(101, 301))
+        assert rows[0][3] == user_email(101) == 'user101@loadtest.example'
+        assert len({row[3] for row in rows}) == 200
+
+    def test_appointments_never_share_a_slot_and_fall_in_opening_hours(self):
+        data = self.make()
+        rows = list(data.appointment_rows())
+        assert len(rows) == 2000
+        assert len({(doctor_id, slot) for _, doctor_id, slot, _, _ in rows}) == 2000
+        assert {doctor_id for _, doctor_id, _, _, _ in rows} <= set(data.doctor_ids())
+        assert {user_id for user_id, _, _, _, _ in rows} <= set(data.user_ids())
+        for _, _, slot, _, _ in rows[::50]:
+            check_opening_hours(slot.date(), slot.hour, slot.minute)
+
+        now = datetime(2030, 6, 12)
+        assert {status for _, _, slot, _, status in rows if slot < now} <= {'completed', 'cancelled'}
+        assert 'scheduled' in {status for _, _, slot, _, status in rows if slot >= now}
+
+    def test_records_reference_generated_rows(self):
+        data = self.make()
+        rows = list(data.record_rows())
+        assert len(rows) == 500
+        assert {row[0] for row in rows} <= set(data.user_ids())
+        assert {row[1] for row in rows} - {None} <= set(data.doctor_ids())
+        assert all(row[5] <= date(2030, 6, 12) for row in rows)
+
+
+class TestGenerate:
+    """Tests for writing a dataset and the manifest"""
+
+    def test_generate_inserts_in_chunks(self):
+        db = FakeBulkDb(next_ids={'users': 51, 'doctors': 4})
+        manifest = generate(db, users=120, doctors=3, appointments=250, records=90,
+                            chunk_size=100, password_hash='hash')
+
+        assert [len(rows) for table, rows in db.chunks if table == 'users'] == [100, 20]
+        assert len(db.rows('appointments')) == 250
+        assert len(db.rows('medical_records')) == 90
+        assert manifest['user_ids'] == [51, 170]
+        assert manifest['doctor_ids'] == [4, 6]
+
+    def test_clean_deletes_in_batches(self):
+        db = FakeBulkDb()
+        deleted = clean(db, {'user_ids': [51, 170], 'doctor_ids': [4, 6]}, batch_size=10)
+        assert deleted == {'medical_records': 26, 'appointments': 26, 'users': 13, 'doctors': 13}
+        assert db.deletes[0] == ("DELETE FROM medical_records WHERE patient_id BETWEEN %s AND %s LIMIT 10",
+                                 (51, 170))
+
+
+class TestReport:
+    """Tests for latency percentiles and run comparison"""
+
+    def test_percentiles(self):
+        values = [i / 1000 for i in range(1, 101)]
+        assert percentile(values, 0.50) == 0.050
+        assert percentile(values, 0.95) == 0.095
+        assert percentile(values, 0.99) == 0.099
+        assert percentile([], 0.99) == 0.0
+
+        stats = summarize(values, Counter({500: 2}), elapsed=10)
+        assert stats['throughput_rps'] == 10.0
+        assert stats['p95_ms'] == 95.0 and stats['errors'] == 2
+        assert stats['error_codes'] == {'500': 2}
+
+    def test_compare(self):
+        base = {'operations': {'GET /api/records': summarize([0.01] * 10, Counter(), 1)}}
+        base['total'] = base['operations']['GET /api/records']
+        new = {'operations': {'GET /api/records': summarize([0.005] * 20, Counter(), 1)}}
+        new['total'] = new['operations']['GET /api/records']
+
+        rows = {(name, metric): change for name, metric, _, _, change in compare(base, new)}
+        assert rows[('GET /api/records', 'throughput_rps')] == 100.0
+        assert rows[('GET /api/records', 'p99_ms')] == -50.0
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    seen = []
+
+    def _reply(self, status):
+        body = b'{}'
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.seen.append(('GET', self.path, None))
+        self._reply(200)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.seen.append(('POST', self.path, body))
+        self._reply(401 if self.path == '/api/login' else 200)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestReplay:
+    """Tests for driving traffic against running servers"""
+
+    @pytest.fixture
+    def stub_url(self):
+        _StubHandler.seen = []
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+        server.shutdown()
+        server.server_close()
+
+    def test_webhook_body_carries_the_user(self):
+        body = action_request('action_view_appointments', 42, {'specialty': 'Adult Cardiology'})
+        assert body['next_action'] == 'action_view_appointments'
+        assert json.loads(body['tracker']['latest_message']['metadata']['user']) == {'id': 42}
+        assert body['tracker']['slots']['specialty'] == 'Adult Cardiology'
+
+    def test_replay_reports_every_operation(self, stub_url, tmp_path):
+        dataset = {'user_ids': [1, 50], 'password': 'secret'}
+        report = replay({'api': stub_url, 'actions': stub_url}, dataset,
+                        concurrency=4, duration=0.5, warmup=0.1)
+
+        assert set(report['operations']) == {operation.name for operation in OPERATIONS}
+        login = report['operations']['POST /api/login']
+        assert login['requests'] == 0 and set(login['error_codes']) == {'401'}
+        records = report['operations']['GET /api/records']
+        assert records['requests'] > 0 and records['p50_ms'] <= records['p99_ms']
+        assert report['total']['requests'] > 0
+
+        webhook_calls = [body for method, path, body in _StubHandler.seen if path == '/webhook']
+        assert all(1 <= json.loads(body['tracker']['slots']['session_started_metadata']['user'])['id'] <= 50
+                   for body in webhook_calls)
+
+        path = save_results(report, str(tmp_path / 'run.json'))
+        assert json.loads(open(path).read())['total'] == report['total']
+
+    def test_only_selected_targets_are_hit(self, stub_url):
+        report = replay({'api': stub_url}, {'user_ids': [1, 5], 'password': 'x'},
+                        concurrency=2, duration=0.2, warmup=0)
+        assert all(not name.startswith('action:') for name in report['operations'])
+        assert not [path for _, path, _ in _StubHandler.seen if path == '/webhook']
@@ -1,8 +1,10 @@
+import asyncio
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 from rasa_sdk import Tracker
 from rasa_sdk.executor import CollectingDispatcher
 from actions.medical_actions import ActionListDoctors, ActionSelectDoctor, ActionListDoctorsBySpecialty
+from actions.doctor_directory import doctor_directory
 
 
 class TestActionListDoctors:
@@ -13,18 +15,19 @@ class TestActionListDoctors:
         self.dispatcher = Mock(spec=CollectingDispatcher)
         self.tracker = Mock(spec=Tracker)
         self.domain = {}
+        doctor_directory.invalidate()
 
-    @patch('actions.medical_actions.db_manager')
+    @patch('actions.doctor_directory.async_db_manager', autospec=True)
     def test_list_doctors_success(self, mock_db_manager):
         """Test successful doctor listing"""
         # Mock database response
         mock_db_manager.execute_query.return_value = [
-            {'name': 'Dr. Smith', 'specialty': 'Adult Cardiology'},
-            {'name': 'Dr. Johnson', 'specialty': 'Adult Cardiology'},
-            {'name': 'Dr. Williams', 'specialty': 'Pediatric Cardiology'}
+            {'id': 1, 'name': 'Dr. Smith', 'specialty': 'Adult Cardiology'},
+            {'id': 2, 'name': 'Dr. Johnson', 'specialty': 'Adult Cardiology'},
+            {'id': 3, 'name': 'Dr. Williams', 'specialty': 'Pediatric Cardiology'}
         ]
         
-        result = self.action.run(self.dispatcher, self.tracker, self.domain)
+        result = asyncio.run(self.action.run(self.dispatcher, self.tracker, self.domain))
         
         # Verify database was queried
         mock_db_manager.execute_query.assert_called_once()
@@ -38,24 +41,24 @@ class TestActionListDoctors:
         # Verify return value
         assert result == []
 
-    @patch('actions.medical_actions.db_manager')
+    @patch('actions.doctor_directory.async_db_manager', autospec=True)
     def test_list_doctors_empty_result(self, mock_db_manager):
         """Test when no doctors are found"""
         mock_db_manager.execute_query.return_value = []
         
-        result = self.action.run(self.dispatcher, self.tracker, self.domain)
+        result = asyncio.run(self.action.run(self.dispatcher, self.tracker, self.domain))
         
         self.dispatcher.utter_message.assert_called_once_with(
             text="No doctors found in the database."
         )
         assert result == []
 
-    @patch('actions.medical_actions.db_manager')
+    @patch('actions.doctor_directory.async_db_manager', autospec=True)
     def test_list_doctors_database_error(self, mock_db_manager):
         """Test database error handling"""
         mock_db_manager.execute_query.side_effect = Exception("Database connection failed")
         
-        result = self.action.run(self.dispatcher, self.tracker, self.domain)
+        result = asyncio.run(self.action.run(self.dispatcher, self.tracker, self.domain))
         
         self.dispatcher.utter_message.assert_called_once()
         call_args = self.dispatcher.utter_message.call_args[1]
@@ -71,8 +74,9 @@ class TestActionSelectDoctor:
         self.dispatcher = Mock(spec=CollectingDispatcher)
         self.tracker = Mock(spec=Tracker)
         self.domain = {}
+        doctor_directory.invalidate()
 
-    @patch('actions.medical_actions.db_manager')
+    @patch('actions.doctor_directory.async_db_manager', autospec=True)
     def test_select_doctor_found(self, mock_db_manager):
         """Test successful doctor selection"""
         # Mock tracker message with entity
@@ -83,10 +87,10 @@ class TestActionSelectDoctor:
         
         # Mock database response
         mock_db_manager.execute_query.return_value = [
-            {'name': 'Dr. Smith', 'specialty': 'Adult Cardiology'}
+            {'id': 1, 'name': 'Dr. Smith', 'specialty': 'Adult Cardiology'}
         ]
         
-        result = self.action.run(self.dispatcher, self.tracker, self.domain)
+        result = asyncio.run(self.action.run(self.dispatcher, self.tracker, self.domain))
         
         # Verify response contains doctor info
         self.dispatcher.utter_message.assert_called_once()
@@ -100,7 +104,7 @@ class TestActionSelectDoctor:
         assert result[0]['name'] == 'doctor_name'
         assert result[0]['value'] == 'Dr. Smith'
 
-    @patch('actions.medical_actions.db_manager')
+    @patch('actions.doctor_directory.async_db_manager', autospec=True)
     def test_select_doctor_not_found(self, mock_db_manager):
         """Test when doctor is not found"""
         self.tracker.latest_message = {
@@ -108,16 +112,17 @@ class TestActionSelectDoctor:
             'text': 'I want to see Dr. Unknown'
         }
         
-        # Mock database responses
-        mock_db_manager.execute_query.side_effect = [
-            [],  # First query returns no results
-            [{'name': 'Dr. Smith', 'specialty': 'Adult Cardiology'}]  # Second query for all doctors
+        # Mock database response - the directory loads every doctor once
+        mock_db_manager.execute_query.return_value = [
+            {'id': 1, 'name': 'Dr. Smith', 'specialty': 'Adult Cardiology'}
         ]
         
-        result = self.action.run(self.dispatcher, self.tracker, self.domain)
+        result = asyncio.run(self.action.run(self.dispatcher, self.tracker, self.domain))
         
         # Verify two calls to dispatcher (not found message + doctor list)
         assert self.dispatcher.utter_message.call_count == 2
+        assert 'Dr. Smith' in self.dispatcher.utter_message.call_args[1]['text']
+        mock_db_manager.execute_query.assert_called_once()
         assert result == []
 
 
@@ -129,8 +134,9 @@ class TestActionListDoctorsBySpecialty:
         self.dispatcher = Mock(spec=CollectingDispatcher)
         self.tracker = Mock(spec=Tracker)
         self.domain = {}
+        doctor_directory.invalidate()
 
-    @patch('actions.medical_actions.db_manager')
+    @patch('actions.doctor_directory.async_db_manager', autospec=True)
     def test_list_doctors_by_specialty_success(self, mock_db_manager):
         """Test successful specialty-based doctor listing"""
         # Mock tracker with specialty slot
@@ -139,21 +145,22 @@ class TestActionListDoctorsBySpecialty:
         
         # Mock database response
         mock_db_manager.execute_query.return_value = [
-            {'name': 'Dr. Smith'},
-            {'name': 'Dr. Johnson'}
+            {'id': 1, 'name': 'Dr. Smith', 'specialty': 'Adult Cardiology'},
+            {'id': 2, 'name': 'Dr. Johnson', 'specialty': 'Adult Cardiology'},
+            {'id': 3, 'name': 'Dr. Chen', 'specialty': 'Pediatric Cardiology'}
         ]
         
-        result = self.action.run(self.dispatcher, self.tracker, self.domain)
+        result = asyncio.run(self.action.run(self.dispatcher, self.tracker, self.domain))
         
-        # Verify database was queried with correct specialty
+        # Verify the doctors table was loaded once and filtered by specialty
         mock_db_manager.execute_query.assert_called_once()
-        call_args = mock_db_manager.execute_query.call_args[0]
-        assert 'Adult Cardiology' in call_args[1]
         
         # Verify response
         self.dispatcher.utter_message.assert_called_once()
         call_args = self.dispatcher.utter_message.call_args[1]
+        assert 'Adult Cardiology Doctors:' in call_args['text']
         assert 'Dr. Smith' in call_args['text']
+        assert 'Dr. Chen' not in call_args['text']
         assert result == []
 
     def test_list_doctors_no_specialty_provided(self):
@@ -161,7 +168,7 @@ class TestActionListDoctorsBySpecialty:
         self.tracker.get_slot.return_value = None
         self.tracker.latest_message = {'text': 'show me doctors'}
         
-        result = self.action.run(self.dispatcher, self.tracker, self.domain)
+        result = asyncio.run(self.action.run(self.dispatcher, self.tracker, self.domain))
         
         # Verify error message is sent
         self.dispatcher.utter_message.assert_called_once()
@@ -169,7 +176,7 @@ class TestActionListDoctorsBySpecialty:
         assert 'specify which specialty' in call_args['text'].lower()
         assert result == []
 
-    @patch('actions.medical_actions.db_manager')
+    @patch('actions.doctor_directory.async_db_manager', autospec=True)
     def test_specialty_mapping(self, mock_db_manager):
         """Test specialty name mapping functionality"""
         # Test various specialty inputs
@@ -180,13 +187,18 @@ class TestActionListDoctorsBySpecialty:
             ('adult cardiologist', 'Adult Cardiology')
         ]
         
+        mock_db_manager.execute_query.return_value = [
+            {'id': 1, 'name': 'Dr. Adult', 'specialty': 'Adult Cardiology'},
+            {'id': 2, 'name': 'Dr. Pediatric', 'specialty': 'Pediatric Cardiology'},
+            {'id': 3, 'name': 'Dr. Surgeon', 'specialty': 'Cardiovascular Surgery'}
+        ]
+        
         for input_specialty, expected_specialty in test_cases:
             self.tracker.get_slot.return_value = input_specialty
             self.tracker.latest_message = {'text': f'show me {input_specialty}'}
-            mock_db_manager.execute_query.return_value = [{'name': 'Dr. Test'}]
             
-            result = self.action.run(self.dispatcher, self.tracker, self.domain)
+            result = asyncio.run(self.action.run(self.dispatcher, self.tracker, self.domain))
             
-            # Verify correct specialty was used in query
-            call_args = mock_db_manager.execute_query.call_args[0]
-            assert expected_specialty in call_args[1] 
\ No newline at end of file
+            # Verify correct specialty was used for the lookup
+            call_args = self.dispatcher.utter_message.call_args[1]
+            assert call_args['text'].startswith(f"{expected_specialty} Doctors:") 
\ No newline at end of file
@@ -0,0 +1,227 @@
+import asyncio
+import os
+import re
+from datetime import datetime
+import pytest
+from unittest.mock import patch
+from actions.migrations import MIGRATIONS, Migration, MigrationError, MigrationRunner
+
+
+class FakeMigrationDb:
+    """Records statements and keeps schema_migrations in memory"""
+
+    def __init__(self, present=(), blocked=(), failing=()):
+        self.applied = {}
+        self.statements = []
+        self.present = set(present)    # detect queries that find the change
+        self.blocked = set(blocked)    # blocker queries that return rows
+        self.failing = set(failing)    # statements that raise
+
+    def execute_query(self, query, params=None, fetch=True):
+        query = query.strip()
+        if query.startswith("CREATE TABLE IF NOT EXISTS schema_migrations"):
+            return None
+        if query.startswith("SELECT version FROM schema_migrations"):
+            return [{'version': version} for version in sorted(self.applied)]
+        if query.startswith("INSERT INTO schema_migrations"):
+            self.applied[params[0]] = params[1]
+            return None
+        if query.startswith("DELETE FROM schema_migrations"):
+            del self.applied[params[0]]
+            return None
+        if query in self.present:
+            return [{'found': 1}]
+        if query in self.blocked:
+            return [{'doctor_id': 3, 'bookings': 2}]
+        if fetch:
+            return []
+        if query in self.failing:
+            raise Exception("Database error: (1061, \"Duplicate key name\")")
+        self.statements.append(query)
+        return None
+
+
+def make_migrations():
+    return [
+        Migration(2, 'second', up=["ADD B"], down=["DROP B"], detect="DETECT B"),
+        Migration(1, 'first', up=["ADD A1", "ADD A2"], down=["DROP A2", "DROP A1"]),
+        Migration(3, 'third', up=["ADD C"], down=["DROP C"], blockers="BLOCKERS C"),
+    ]
+
+
+class TestMigrationRunner:
+    """Tests for versioned up/down migrations"""
+
+    def make_runner(self, db):
+        return MigrationRunner(db, make_migrations(), log=lambda message: None)
+
+    def test_upgrade_applies_pending_in_order_once(self):
+        db = FakeMigrationDb()
+        runner = self.make_runner(db)
+
+        assert [m.version for m in runner.upgrade()] == [1, 2, 3]
+        assert db.statements == ["ADD A1", "ADD A2", "ADD B", "ADD C"]
+        assert db.applied == {1: 'first', 2: 'second', 3: 'third'}
+
+        assert runner.upgrade() == []
+        assert len(db.statements) == 4
+
+    def test_upgrade_to_target(self):
+        db = FakeMigrationDb()
+        runner = self.make_runner(db)
+
+        runner.upgrade(target=2)
+        assert sorted(db.applied) == [1, 2]
+        assert [applied for _, applied in runner.status()] == [True, True, False]
+
+    def test_existing_change_is_recorded_without_running(self):
+        """Test that databases built before tracking are baselined"""
+        db = FakeMigrationDb(present={"DETECT B"})
+        self.make_runner(db).upgrade()
+
+        assert "ADD B" not in db.statements
+        assert 2 in db.applied
+
+    def test_blocked_migration_stops_the_run(self):
+        db = FakeMigrationDb(blocked={"BLOCKERS C"})
+        with pytest.raises(MigrationError, match="blocked by existing data: doctor_id=3, bookings=2"):
+            self.make_runner(db).upgrade()
+        assert sorted(db.applied) == [1, 2]
+
+    def test_failed_statement_is_not_recorded(self):
+        db = FakeMigrationDb(failing={"ADD B"})
+        with pytest.raises(MigrationError, match="0002 second failed"):
+            self.make_runner(db).upgrade()
+        assert sorted(db.applied) == [1]
+
+    def test_downgrade_reverts_newest_first(self):
+        db = FakeMigrationDb()
+        runner = self.make_runner(db)
+        runner.upgrade()
+        db.statements.clear()
+
+        assert [m.version for m in runner.downgrade(1)] == [3, 2]
+        assert db.statements == ["DROP C", "DROP B"]
+        assert sorted(db.applied) == [1]
+
+        runner.downgrade(0)
+        assert db.applied == {}
+
+    def test_shipped_migrations_are_consistent(self):
+        """Test versions are unique and schema.sql records every one of them"""
+        versions = [migration.version for migration in MIGRATIONS]
+        assert versions == sorted(set(versions))
+        assert all(migration.up and migration.down for migration in MIGRATIONS)
+
+        schema_path = os.path.join(os.path.dirname(__file__), '..', 'actions', 'schema.sql')
+        with open(schema_path) as schema_file:
+            schema = schema_file.read()
+        recorded = re.findall(r"\((\d+), '(\w+)'\)", schema.split("INSERT INTO schema_migrations")[1])
+        assert [(int(version), name) for version, name in recorded] == [(m.version, m.name) for m in MIGRATIONS]
+
+    def test_index_migration_detects_every_index_it_creates(self):
+        """Test that a partly applied index migration is not mistaken for a finished one"""
+        migration = next(m for m in MIGRATIONS if m.name == 'hot_query_indexes')
+        created = re.findall(r"ADD INDEX (\w+)", ' '.join(migration.up))
+        assert len(created) == 5
+        assert all(f"'{index}'" in migration.detect for index in created)
+        assert migration.detect.endswith(f"HAVING found = {len(created)}")
+
+
+class CapturingAsyncDb:
+    def __init__(self):
+        self.queries = []
+
+    async def execute_query(self, query, params=None, fetch=True):
+        self.queries.append((query, list(params or [])))
+        return []
+
+
+class TestSargableQueries:
+    """The date filter must leave appointment_date bare so indexes apply"""
+
+    def test_get_appointments_filters_date_by_range(self):
+        from actions.appointment_manager import AppointmentManager
+
+        fake_db = CapturingAsyncDb()
+        with patch('actions.appointment_manager.async_db_manager', fake_db):
+            asyncio.run(AppointmentManager().get_appointments({'date': '2030-06-11'}, user_id=7))
+
+        query, params = fake_db.queries[0]
+        assert "DATE(" not in query
+        assert "a.appointment_date >= %s AND a.appointment_date < %s" in query
+        assert params == [7, datetime(2030, 6, 11), datetime(2030, 6, 12)]
+
+
+@pytest.fixture(scope='module')
+def live_db():
+    """The real database; tests using it skip unless MySQL is running and migrated"""
+    from actions.db_connect import db_manager
+    try:
+        db_manager.execute_query("SELECT 1")
+    except Exception as e:
+        pytest.skip(f"MySQL not available: {e}")
+    if not all(applied for _, applied in MigrationRunner(db_manager).status()):
+        pytest.skip("Database has pending migrations; run python migrate_database.py")
+    return db_manager
+
+
+class TestQueryPlans:
+    """EXPLAIN the hot queries against a live database"""
+
+    def explain(self, db, query, params=()):
+        rows = db.execute_query("EXPLAIN " + query, params)
+        return {row['table']: row for row in rows}
+
+    def assert_uses(self, plan, table, index):
+        assert plan[table]['type'] != 'ALL', plan[table]
+        assert plan[table]['key'] == index, plan[table]
+
+    def test_user_appointments_by_date(self, live_db):
+        plan = self.explain(live_db, """
+            SELECT a.*, d.name AS doctor_name FROM appointments a
+            LEFT JOIN doctors d ON a.doctor_id = d.id
+            WHERE a.user_id = %s AND a.appointment_date >= %s AND a.appointment_date < %s
+            ORDER BY a.appointment_date DESC
+        """, (1, datetime(2030, 6, 11), datetime(2030, 6, 12)))
+        self.assert_uses(plan, 'a', 'idx_appointments_user_date')
+        assert 'filesort' not in (plan['a']['Extra'] or '')
+
+    @pytest.mark.parametrize('condition, order', [('', 'DESC'), ('AND a.appointment_date >= NOW()', 'ASC')])
+    def test_user_scheduled_appointments(self, live_db, condition, order):
+        plan = self.explain(live_db, f"""
+            SELECT a.*, d.name AS doctor_name FROM appointments a
+            LEFT JOIN doctors d ON a.doctor_id = d.id
+            WHERE a.user_id = %s AND a.status = 'scheduled' {condition}
+            ORDER BY a.appointment_date {order}
+            LIMIT 1
+        """, (1,))
+        # status is part of the key, so other appointments are never read
+        self.assert_uses(plan, 'a', 'idx_appointments_user_status_date')
+        assert 'filesort' not in (plan['a']['Extra'] or '')
+
+    def test_patient_records_newest_first(self, live_db):
+        plan = self.explain(live_db, """
+            SELECT mr.* FROM medical_records mr
+            WHERE mr.patient_id = %s
+            ORDER BY mr.record_date DESC, mr.created_at DESC
+            LIMIT 5
+        """, (1,))
+        self.assert_uses(plan, 'mr', 'idx_records_patient_date')
+        assert 'filesort' not in (plan['mr']['Extra'] or '')
+
+    def test_login_by_email(self, live_db):
+        plan = self.explain(live_db, "SELECT id, password FROM users WHERE email = %s", ('a@example.com',))
+        assert plan['users']['type'] in ('const', 'ref')
+
+    def test_doctors_by_specialty(self, live_db):
+        plan = self.explain(live_db, "SELECT id, name FROM doctors WHERE specialty = %s ORDER BY name",
+                            ('Adult Cardiology',))
+        self.assert_uses(plan, 'doctors', 'idx_doctors_specialty')
+
+    def test_calendar_upcoming_bookings(self, live_db):
+        plan = self.explain(live_db, """
+            SELECT doctor_id, appointment_date FROM appointments
+            WHERE status = 'scheduled' AND appointment_date >= CURDATE()
+        """)
+        assert plan['appointments']['key'] in ('idx_appointments_status_date', 'uniq_appointments_doctor_slot')
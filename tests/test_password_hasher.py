@@ -0,0 +1,97 @@
+import hashlib
+import threading
+import pytest
+from actions.password_hasher import (
+    HasherBusyError, PasswordContext, PlaintextHasher, ScryptHasher, Sha256Hasher, VerificationPool
+)
+
+
+def make_context(n=2 ** 4):
+    return PasswordContext(ScryptHasher(n=n, r=1), legacy=(Sha256Hasher(), PlaintextHasher()))
+
+
+class TestPasswordContext:
+    """Tests for hashing, verification and legacy upgrades"""
+
+    def test_hash_round_trip(self):
+        context = make_context()
+        stored = context.hash('s3cret!')
+
+        assert stored.startswith('scrypt$n=16,r=1,p=1$')
+        assert context.verify('s3cret!', stored)
+        assert not context.verify('wrong', stored)
+
+    def test_same_password_gets_different_salts(self):
+        context = make_context()
+        assert context.hash('s3cret!') != context.hash('s3cret!')
+
+    def test_current_hash_is_not_rehashed(self):
+        context = make_context()
+        assert context.verify_and_update('s3cret!', context.hash('s3cret!')) == (True, None)
+
+    def test_sha256_hash_is_upgraded(self):
+        context = make_context()
+        salt = 'a1b2c3'
+        legacy = f"{salt}:" + hashlib.sha256(f"s3cret!{salt}".encode()).hexdigest()
+
+        valid, new_hash = context.verify_and_update('s3cret!', legacy)
+
+        assert valid
+        assert new_hash.startswith('scrypt$')
+        assert context.verify('s3cret!', new_hash)
+        assert context.verify_and_update('wrong', legacy) == (False, None)
+
+    def test_plaintext_password_is_upgraded(self):
+        context = make_context()
+        valid, new_hash = context.verify_and_update('s3cret!', 's3cret!')
+
+        assert valid
+        assert context.verify('s3cret!', new_hash)
+
+    def test_changed_cost_triggers_rehash(self):
+        old = make_context(n=2 ** 4).hash('s3cret!')
+        valid, new_hash = make_context(n=2 ** 5).verify_and_update('s3cret!', old)
+
+        assert valid
+        assert new_hash.startswith('scrypt$n=32,')
+
+    def test_missing_or_malformed_hash_fails(self):
+        context = make_context()
+        assert context.verify_and_update('s3cret!', None) == (False, None)
+        assert context.verify_and_update('s3cret!', 'scrypt$garbage') == (False, None)
+
+    def test_n_must_be_power_of_two(self):
+        with pytest.raises(ValueError):
+            ScryptHasher(n=1000)
+
+
+class TestVerificationPool:
+    """Tests for the bounded hashing pool"""
+
+    def test_runs_function_on_pool(self):
+        pool = VerificationPool(workers=1, max_pending=0)
+        assert pool.run(lambda a, b: threading.current_thread().name.startswith('password-hash') and a + b, 1, 2) == 3
+        pool.shutdown()
+
+    def test_saturated_pool_rejects(self):
+        pool = VerificationPool(workers=1, max_pending=0, wait_timeout=0.05)
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow():
+            started.set()
+            release.wait(5)
+
+        worker = threading.Thread(target=pool.run, args=(slow,))
+        worker.start()
+        started.wait(5)
+        try:
+            with pytest.raises(HasherBusyError):
+                pool.run(lambda: None)
+        finally:
+            release.set()
+            worker.join()
+
+        # The slot is free again once the slow call finished
+        assert pool.run(lambda: 'ok') == 'ok'
+        pool.shutdown()
@@ -1,9 +1,14 @@
+import asyncio
+import random
+import string
 import time
 import pytest
 from unittest.mock import Mock, patch
 from rasa_sdk import Tracker
 from rasa_sdk.executor import CollectingDispatcher
 from actions.medical_actions import ActionListDoctors
+from actions.doctor_directory import DoctorDirectory, doctor_directory
+from actions.appointment_manager import AppointmentManager
 
 
 class TestPerformance:
@@ -13,13 +18,14 @@ class TestPerformance:
         self.dispatcher = Mock(spec=CollectingDispatcher)
         self.tracker = Mock(spec=Tracker)
         self.domain = {}
+        doctor_directory.invalidate()
 
-    @patch('actions.medical_actions.db_manager')
+    @patch('actions.doctor_directory.async_db_manager', autospec=True)
     def test_list_doctors_performance(self, mock_db_manager):
         """Test that listing doctors completes within acceptable time"""
         # Mock a reasonable database response
         mock_db_manager.execute_query.return_value = [
-            {'name': f'Dr. Doctor{i}', 'specialty': 'Adult Cardiology'} 
+            {'id': i, 'name': f'Dr. Doctor{i}', 'specialty': 'Adult Cardiology'} 
             for i in range(10)
         ]
         
@@ -27,7 +33,7 @@ class TestPerformance:
         
         # Measure execution time
         start_time = time.time()
-        result = action.run(self.dispatcher, self.tracker, self.domain)
+        result = asyncio.run(action.run(self.dispatcher, self.tracker, self.domain))
         end_time = time.time()
         
         execution_time = end_time - start_time
@@ -54,4 +60,42 @@ class TestPerformance:
         
         # Should be nearly instantaneous
         assert execution_time < 0.1, f"Mock operations took {execution_time:.3f}s"
-        assert result == "test" 
\ No newline at end of file
+        assert result == "test" 
+    def test_fuzzy_doctor_lookup_performance(self):
+        """Test that misspelled lookups stay sub-millisecond with thousands of doctors"""
+        rng = random.Random(42)
+        first_names = ['James', 'Mary', 'John', 'Sarah', 'Ahmet', 'Elif', 'Emily', 'Wei', 'Linda', 'David']
+        rows = [
+            {
+                'id': i,
+                'name': f"Dr. {rng.choice(first_names)} {''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9))).title()}",
+                'specialty': 'Adult Cardiology'
+            }
+            for i in range(5000)
+        ]
+        directory = DoctorDirectory(ttl=600)
+        directory.load_rows(rows)
+
+        # Drop one letter from each surname to force the fuzzy path
+        sample = rng.sample(rows, 200)
+        queries = [row['name'][:-2] + row['name'][-1] for row in sample]
+
+        start_time = time.perf_counter()
+        matches = [directory._search_loaded(query) for query in queries]
+        average_ms = (time.perf_counter() - start_time) / len(queries) * 1000
+
+        assert average_ms < 1.0, f"Fuzzy lookup took {average_ms:.3f}ms on average, should be < 1ms"
+        hits = sum(1 for found, row in zip(matches, sample) if found and found[0]['id'] == row['id'])
+        assert hits / len(sample) > 0.95
+
+    def test_datetime_normalization_performance(self):
+        """Test that date/time slot validation stays in the microsecond range"""
+        manager = AppointmentManager()
+        inputs = [('friday', '2 PM'), ('next tuesday', 'half past two'), ('2030-06-11', '14:30')] * 1000
+
+        start_time = time.perf_counter()
+        for date_text, time_text in inputs:
+            manager._normalize_time(time_text, manager._normalize_date(date_text))
+        average_us = (time.perf_counter() - start_time) / len(inputs) * 1e6
+
+        assert average_us < 100, f"Date/time normalization took {average_us:.1f}us per call, should be < 100us"
@@ -0,0 +1,308 @@
+import asyncio
+import json
+from datetime import date, datetime, timedelta
+import pytest
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+from rasa_sdk import Tracker
+from rasa_sdk.executor import CollectingDispatcher
+from actions.action_appointments import (
+    ActionBookAppointment, ActionCancelAppointment, ActionModifyAppointment,
+    ActionSubmitAppointmentForm, ActionViewAppointments
+)
+from actions.appointment_manager import AppointmentManager
+from actions.clinic_calendar import clinic_calendar
+from actions.doctor_directory import doctor_directory
+from actions.instrumentation import instrument_actions, metrics
+
+instrument_actions('actions')
+
+# Most database round trips one run of each action may make, with the doctor
+# directory and clinic calendar caches warm. Every write is followed by the
+# user's data version bump (actions/response_cache.py).
+ACTION_QUERY_BUDGETS = {
+    'action_book_appointment': 2,
+    'action_submit_appointment_form': 2,
+    'action_view_appointments': 1,
+    'action_cancel_appointment': 3,
+    'action_modify_appointment': 3,
+}
+
+USER_ID = 7
+NEXT_MONDAY = date.today() + timedelta(days=7 - date.today().weekday())
+
+
+class ScriptedDb:
+    """aiomysql pool stand-in that answers statements from a list of appointments"""
+
+    maxsize = 1
+
+    def __init__(self, appointments=()):
+        self.appointments = [dict(appointment) for appointment in appointments]
+        self.statements = []
+        self.bumped = []
+
+    async def acquire(self):
+        connection = MagicMock()
+        connection.cursor.side_effect = lambda: self._cursor()
+        connection.begin = connection.commit = connection.rollback = AsyncMock()
+        return connection
+
+    def release(self, connection):
+        pass
+
+    def _cursor(self):
+        cursor = MagicMock()
+        cursor.rowcount = 0
+        cursor.lastrowid = None
+
+        async def execute(sql, params=None):
+            sql = " ".join(sql.split())
+            self.statements.append((sql, params))
+            cursor.rows = self.answer(sql, params or (), cursor)
+
+        cursor.execute = execute
+        cursor.fetchall = AsyncMock(side_effect=lambda: cursor.rows)
+        context = MagicMock()
+        context.__aenter__ = AsyncMock(return_value=cursor)
+        context.__aexit__ = AsyncMock(return_value=False)
+        return context
+
+    def answer(self, sql, params, cursor):
+        if sql.startswith("SELECT id FROM users"):
+            return [{'id': USER_ID}]
+        if sql.startswith("SELECT a.*") and "a.id = %s" in sql:
+            return [dict(a) for a in self.appointments if (a['id'], a['user_id']) == tuple(params)]
+        if sql.startswith("SELECT a.*"):
+            rows = [a for a in self.appointments if a['user_id'] == params[0]]
+            if "a.status = 'scheduled'" in sql:
+                rows = [a for a in rows if a['status'] == 'scheduled']
+            if "a.appointment_date >= %s" in sql:
+                rows = [a for a in rows if a['appointment_date'] >= params[1]]
+            rows = sorted(rows, key=lambda a: a['appointment_date'], reverse="DESC" in sql)
+            if "LIMIT %s" in sql:
+                rows = rows[:params[-1]]
+            return [dict(row) for row in rows]
+        if sql.startswith("UPDATE users SET data_version"):
+            self.bumped.extend(params)
+            return []
+        if sql.startswith("UPDATE appointments"):
+            matched = [a for a in self.appointments if (a['id'], a['user_id']) == tuple(params[-2:])]
+            if "status = 'scheduled'" in sql:
+                matched = [a for a in matched if a['status'] == 'scheduled']
+            cursor.rowcount = len(matched)
+            return []
+        if sql.startswith("INSERT INTO appointments"):
+            cursor.rowcount = 1
+            cursor.lastrowid = 100
+            return []
+        raise AssertionError(f"Unexpected query: {sql}")
+
+
+def appointment(appointment_id, day, hour, status='scheduled', user_id=USER_ID):
+    return {
+        'id': appointment_id, 'user_id': user_id, 'doctor_id': 3, 'doctor_name': 'Dr. John Smith',
+        'appointment_date': datetime.combine(day, datetime.min.time()).replace(hour=hour),
+        'reason': 'checkup', 'status': status, 'created_at': datetime(2030, 1, 1),
+    }
+
+
+def make_tracker(slots=None, entities=(), intent='book_appointment'):
+    tracker = Mock(spec=Tracker)
+    slots = {
+        "session_started_metadata": {"user": json.dumps({"id": USER_ID, "name": "Jane Doe"})},
+        **(slots or {}),
+    }
+    tracker.get_slot.side_effect = slots.get
+    tracker.latest_message = {'entities': list(entities), 'intent': {'name': intent, 'confidence': 0.95}}
+    return tracker
+
+
+def run_action(action, tracker, db):
+    """Run an action against db; returns the dispatcher and the queries it made"""
+    dispatcher = Mock(spec=CollectingDispatcher)
+    metrics.reset()
+    with patch('actions.db_async.aiomysql.create_pool', AsyncMock(return_value=db)):
+        asyncio.run(action.run(dispatcher, tracker, {}))
+    return dispatcher, metrics.snapshot(action.name())['queries']
+
+
+class TestActionQueryBudgets:
+    """Each appointment action stays within its database round-trip budget"""
+
+    def setup_method(self):
+        doctor_directory.load_rows([
+            {'id': 3, 'name': 'Dr. John Smith', 'specialty': 'Adult Cardiology'},
+            {'id': 4, 'name': 'Dr. Anna Jones', 'specialty': 'Adult Cardiology'},
+        ])
+        clinic_calendar.load([], [], [], [])
+        self.db = ScriptedDb([
+            appointment(1, NEXT_MONDAY, 10),
+            appointment(2, NEXT_MONDAY + timedelta(days=1), 11),
+            appointment(3, NEXT_MONDAY + timedelta(days=2), 9, status='cancelled'),
+            appointment(4, NEXT_MONDAY, 15, user_id=8),
+        ])
+
+    def assert_within_budget(self, action, queries):
+        budget = ACTION_QUERY_BUDGETS[action.name()]
+        statements = "\n".join(sql for sql, _ in self.db.statements)
+        assert queries <= budget, f"{action.name()} made {queries} queries (budget {budget}):\n{statements}"
+
+    def test_every_budgeted_action_is_measured(self):
+        actions = [ActionBookAppointment(), ActionSubmitAppointmentForm(), ActionViewAppointments(),
+                   ActionCancelAppointment(), ActionModifyAppointment()]
+        assert {action.name() for action in actions} == set(ACTION_QUERY_BUDGETS)
+
+    @pytest.mark.parametrize('action_class', [ActionBookAppointment, ActionSubmitAppointmentForm])
+    def test_booking(self, action_class):
+        slots = {"date": (NEXT_MONDAY + timedelta(days=3)).isoformat(), "time": "10:00",
+                 "doctor_name": "Smith", "reason": "chest pain"}
+        action = action_class()
+        dispatcher, queries = run_action(action, make_tracker(slots), self.db)
+
+        assert "Appointment confirmed" in dispatcher.utter_message.call_args.kwargs["text"]
+        self.assert_within_budget(action, queries)
+        assert self.db.bumped == [USER_ID]
+
+    def test_view(self):
+        action = ActionViewAppointments()
+        dispatcher, queries = run_action(action, make_tracker(), self.db)
+
+        assert "Your Appointments" in dispatcher.utter_message.call_args.kwargs["text"]
+        self.assert_within_budget(action, queries)
+
+    def test_cancel(self):
+        action = ActionCancelAppointment()
+        dispatcher, queries = run_action(action, make_tracker(intent='cancel_appointment'), self.db)
+
+        day = (NEXT_MONDAY + timedelta(days=1)).isoformat()
+        assert dispatcher.utter_message.call_args.kwargs["text"] == \
+            f"✅ Your appointment on {day} at 11:00 with Dr. John Smith has been cancelled."
+        self.assert_within_budget(action, queries)
+        update, params = self.db.statements[-2]
+        assert "status = 'scheduled'" in update and params == (2, USER_ID)
+        assert self.db.bumped == [USER_ID]
+
+    def test_modify(self):
+        entities = [{'entity': 'time', 'value': '2 PM'}, {'entity': 'doctor_name', 'value': 'Dr. Jones'}]
+        action = ActionModifyAppointment()
+        dispatcher, queries = run_action(action, make_tracker(entities=entities, intent='modify_appointment'),
+                                         self.db)
+
+        message = dispatcher.utter_message.call_args.kwargs["text"]
+        day = (NEXT_MONDAY + timedelta(days=1)).isoformat()
+        assert f"📅 {day} at 14:00\n👨‍⚕️ Dr. Anna Jones\n📝 Reason: checkup" in message
+        self.assert_within_budget(action, queries)
+        update, params = self.db.statements[-2]
+        assert update.startswith("UPDATE appointments SET appointment_date = %s, doctor_id = %s,")
+        assert params == [f"{day} 14:00", 4, 2, USER_ID]
+
+    def test_nothing_to_cancel_is_one_query(self):
+        self.db.appointments = [a for a in self.db.appointments if a['status'] != 'scheduled']
+        action = ActionCancelAppointment()
+        dispatcher, queries = run_action(action, make_tracker(intent='cancel_appointment'), self.db)
+
+        assert dispatcher.utter_message.call_args.kwargs["text"] == "📅 You have no active appointments to cancel."
+        assert queries == 1
+
+
+class TestRequestContext:
+    """Calls outside the actions resolve the fallback user once per request"""
+
+    def setup_method(self):
+        doctor_directory.load_rows([{'id': 3, 'name': 'Dr. John Smith', 'specialty': 'Adult Cardiology'}])
+        clinic_calendar.load([], [], [], [])
+
+    def test_modify_without_user_resolves_it_once(self):
+        db = ScriptedDb([appointment(1, NEXT_MONDAY, 10)])
+        with patch('actions.db_async.aiomysql.create_pool', AsyncMock(return_value=db)):
+            result = asyncio.run(AppointmentManager().modify_appointment(1, {'reason': 'follow-up'}))
+
+        assert result["success"]
+        assert [sql.split()[0] for sql, _ in db.statements] == ["SELECT", "SELECT", "UPDATE", "UPDATE"]
+        assert db.statements[0][0].startswith("SELECT id FROM users")
+
+    def test_modify_of_an_appointment_cancelled_meanwhile(self):
+        """Test that a move whose update finds no scheduled row releases the new slot"""
+        db = ScriptedDb([appointment(1, NEXT_MONDAY, 10)])
+        answer = db.answer
+
+        def cancel_after_read(sql, params, cursor):
+            rows = answer(sql, params, cursor)
+            if sql.startswith("SELECT a.*"):
+                # Another conversation cancels it before the update runs
+                db.appointments[0]['status'] = 'cancelled'
+            return rows
+
+        db.answer = cancel_after_read
+        with patch('actions.db_async.aiomysql.create_pool', AsyncMock(return_value=db)):
+            result = asyncio.run(AppointmentManager().modify_appointment(1, {'time': '2 PM'}, USER_ID))
+
+        assert not result["success"] and "not found" in result["message"]
+        update, _ = db.statements[-1]
+        assert update.startswith("UPDATE appointments") and "status = 'scheduled'" in update
+        assert db.bumped == []
+        # The reserved 14:00 slot is free again
+        asyncio.run(clinic_calendar.check_slot(3, datetime.combine(NEXT_MONDAY, datetime.min.time()).replace(hour=14)))
+
+    def test_cancelled_appointment_is_not_cancelled_again(self):
+        db = ScriptedDb([appointment(1, NEXT_MONDAY, 10, status='cancelled')])
+        with patch('actions.db_async.aiomysql.create_pool', AsyncMock(return_value=db)):
+            result = asyncio.run(AppointmentManager().cancel_appointment(1, USER_ID))
+
+        assert result == {"success": False, "message": "Appointment with ID 1 is already cancelled."}
+        assert len(db.statements) == 1
+
+    def test_failed_version_bump_does_not_fail_the_write(self):
+        db = ScriptedDb([appointment(1, NEXT_MONDAY, 10)])
+        answer = db.answer
+
+        def answer_without_bump(sql, params, cursor):
+            if sql.startswith("UPDATE users SET data_version"):
+                raise RuntimeError("lock wait timeout")
+            return answer(sql, params, cursor)
+
+        db.answer = answer_without_bump
+        with patch('actions.db_async.aiomysql.create_pool', AsyncMock(return_value=db)):
+            result = asyncio.run(AppointmentManager().cancel_appointment(1, USER_ID))
+
+        assert result["success"]
+        assert db.statements[-1][0].startswith("UPDATE users SET data_version")
+
+
+class TestScheduledAppointments:
+    """The cancel/modify lookup reads a bounded window, not the whole history"""
+
+    def setup_method(self):
+        history = [appointment(i, date(2020, 1, 1) + timedelta(days=i), 10, status='completed')
+                   for i in range(1, 301)]
+        self.db = ScriptedDb(history + [
+            appointment(400, date.today() - timedelta(days=2), 9),
+            appointment(401, NEXT_MONDAY + timedelta(days=7), 10),
+            appointment(402, NEXT_MONDAY, 11),
+        ])
+
+    def scheduled(self, **kwargs):
+        with patch('actions.db_async.aiomysql.create_pool', AsyncMock(return_value=self.db)):
+            return asyncio.run(AppointmentManager().get_scheduled_appointments(USER_ID, **kwargs))
+
+    def test_latest_scheduled(self):
+        result = self.scheduled()
+
+        assert [apt["id"] for apt in result["appointments"]] == [401]
+        (sql, params), = self.db.statements
+        assert "ORDER BY a.appointment_date DESC LIMIT %s" in sql and params == (USER_ID, 1)
+
+    def test_upcoming_window(self):
+        result = self.scheduled(limit=5, upcoming=True)
+
+        # The overdue appointment from two days ago is not upcoming
+        assert [apt["id"] for apt in result["appointments"]] == [402, 401]
+        assert result["appointments"][0]["time"] == "11:00"
+        assert "ORDER BY a.appointment_date ASC LIMIT %s" in self.db.statements[0][0]
+
+    def test_errors_are_reported(self):
+        self.db.answer = Mock(side_effect=RuntimeError("connection lost"))
+        result = self.scheduled()
+
+        assert result["success"] is False and result["appointments"] == []
+        assert "connection lost" in result["message"]
@@ -0,0 +1,184 @@
+import asyncio
+import json
+import logging
+import threading
+import urllib.request
+from http.server import ThreadingHTTPServer
+import pytest
+import pymysql
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+from actions.db_async import AsyncDatabaseManager
+from actions.db_config import METRICS_CONFIG
+from actions.db_connect import DatabaseManager
+from actions.instrumentation import _MetricsHandler
+from actions.query_trace import OTHER_FINGERPRINT, QueryTracer, fingerprint, query_tracer
+
+
+class TestFingerprint:
+    """Tests for SQL normalization"""
+
+    @pytest.mark.parametrize('sql, expected', [
+        ("SELECT * FROM users WHERE id = %s", "SELECT * FROM users WHERE id = ?"),
+        ("SELECT *\n  FROM users\n  WHERE email = 'a@b.com' AND age > 30;", "SELECT * FROM users WHERE email = ? AND age > ?"),
+        ("SELECT id FROM users WHERE id IN (%s, %s, %s)", "SELECT id FROM users WHERE id IN (?+)"),
+        ("SELECT id FROM users WHERE id IN (1,2)", "SELECT id FROM users WHERE id IN (?+)"),
+        ("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s), (%s, %s)", "INSERT INTO t (a, b) VALUES (?+), ..."),
+        ("SELECT a1, t2.b FROM t2 WHERE x = %(name)s", "SELECT a1, t2.b FROM t2 WHERE x = ?"),
+    ])
+    def test_fingerprint(self, sql, expected):
+        assert fingerprint(sql) == expected
+
+    def test_same_statement_with_different_values_matches(self):
+        assert fingerprint("SELECT * FROM a WHERE id = 1") == fingerprint("SELECT * FROM a WHERE id = 22")
+
+
+class TestQueryTracer:
+    """Tests for the slowest-query buffer, totals and slow log"""
+
+    def test_slowest_are_bounded_and_sorted(self):
+        tracer = QueryTracer(slow_query_ms=10000, slowest_kept=3)
+        for ms in [5, 50, 1, 30, 20, 2]:
+            tracer.record("SELECT * FROM t WHERE id = %s", (ms,), rows=1, execute=ms / 1000)
+
+        snapshot = tracer.snapshot()
+        assert [entry['total_ms'] for entry in snapshot['slowest']] == [50.0, 30.0, 20.0]
+        assert snapshot['queries'] == 6
+        assert snapshot['fingerprints'] == [{
+            'fingerprint': "SELECT * FROM t WHERE id = ?", 'calls': 6, 'total_ms': 108.0,
+            'mean_ms': 18.0, 'max_ms': 50.0, 'rows': 6, 'errors': 0
+        }]
+
+    def test_phases_and_params_are_kept(self):
+        tracer = QueryTracer(slow_query_ms=10000)
+        tracer.record("UPDATE t SET a = %s WHERE id = %s", (1, 2), rows=1, connect=0.001, execute=0.002,
+                      fetch=0.003, error=True)
+        entry = tracer.snapshot()['slowest'][0]
+        assert (entry['params'], entry['connect_ms'], entry['execute_ms'], entry['fetch_ms'], entry['total_ms']) == \
+            (2, 1.0, 2.0, 3.0, 6.0)
+        assert entry['error'] and tracer.snapshot()['fingerprints'][0]['errors'] == 1
+
+    def test_fingerprint_table_is_bounded(self):
+        tracer = QueryTracer(slow_query_ms=10000, fingerprints_kept=2)
+        for table in ['a', 'b', 'c', 'd']:
+            tracer.record(f"SELECT * FROM {table}")
+        keys = {entry['fingerprint']: entry['calls'] for entry in tracer.snapshot()['fingerprints']}
+        assert keys == {"SELECT * FROM a": 1, "SELECT * FROM b": 1, OTHER_FINGERPRINT: 2}
+
+    def test_slow_queries_are_logged_and_hooks_called(self, caplog):
+        tracer = QueryTracer(slow_query_ms=100)
+        hook = Mock()
+        tracer.add_hook(hook)
+        with caplog.at_level(logging.WARNING, logger='actions.query_trace'):
+            tracer.record("SELECT 1", execute=0.05)
+            tracer.record("SELECT * FROM appointments WHERE user_id = %s", (4,), rows=3, connect=0.02, execute=0.15)
+
+        assert len(caplog.records) == 1
+        assert "Slow query 170.0ms (connect 20.0ms, execute 150.0ms" in caplog.records[0].getMessage()
+        assert "1 params, 3 rows): SELECT * FROM appointments WHERE user_id = ?" in caplog.records[0].getMessage()
+        assert hook.call_count == 2
+
+
+class TestDatabaseLayerTracing:
+    """Tests that both database managers report their statements"""
+
+    def setup_method(self):
+        query_tracer.reset()
+
+    def test_sync_manager_traces_rows_and_errors(self):
+        connection = MagicMock()
+        connection.open = True
+        cursor = connection.cursor.return_value.__enter__.return_value
+        cursor.fetchall.return_value = [{'id': 1}, {'id': 2}]
+        manager = DatabaseManager(pool_config={'max_size': 2, 'ping_interval': 60})
+        manager.pool._connect = Mock(return_value=connection)
+
+        manager.execute_query("SELECT id FROM doctors WHERE specialty = %s", ('Adult Cardiology',))
+        cursor.execute.side_effect = pymysql.err.ProgrammingError(1064, "syntax")
+        with pytest.raises(Exception, match="Database error"):
+            manager.execute_query("SELEC 1")
+
+        snapshot = query_tracer.snapshot()
+        by_fingerprint = {entry['fingerprint']: entry for entry in snapshot['fingerprints']}
+        assert by_fingerprint["SELECT id FROM doctors WHERE specialty = ?"]['rows'] == 2
+        assert by_fingerprint["SELEC ?"]['errors'] == 1
+
+    def test_transaction_statements_are_traced(self):
+        connection = MagicMock()
+        connection.open = True
+        cursor = connection.cursor.return_value.__enter__.return_value
+        cursor.rowcount = 3
+        manager = DatabaseManager(pool_config={'max_size': 2, 'ping_interval': 60})
+        manager.pool._connect = Mock(return_value=connection)
+
+        with manager.transaction() as tx:
+            tx.execute_many("INSERT INTO doctors (name, specialty) VALUES (%s, %s)", [('a', 'x'), ('b', 'y'), ('c', 'z')])
+            tx.execute_query("UPDATE import_jobs SET rows_committed = %s WHERE job_id = %s", (3, 'j'), fetch=False)
+
+        slowest = {entry['fingerprint']: entry for entry in query_tracer.snapshot()['slowest']}
+        assert slowest["INSERT INTO doctors (name, specialty) VALUES (?+)"]['params'] == 6
+        assert slowest["INSERT INTO doctors (name, specialty) VALUES (?+)"]['rows'] == 3
+        assert slowest["UPDATE import_jobs SET rows_committed = ? WHERE job_id = ?"]['connect_ms'] == 0
+
+    def test_async_manager_traces_statements(self):
+        connection = MagicMock()
+        cursor = connection.cursor.return_value.__aenter__.return_value
+        cursor.execute = AsyncMock()
+        cursor.fetchall = AsyncMock(return_value=[{'id': 1}])
+
+        class Pool:
+            maxsize = 1
+
+            async def acquire(self):
+                return connection
+
+            def release(self, connection):
+                pass
+
+        manager = AsyncDatabaseManager()
+        with patch('actions.db_async.aiomysql.create_pool', AsyncMock(return_value=Pool())):
+            asyncio.run(manager.execute_query("SELECT id FROM users WHERE id = %s", (1,)))
+
+        entry = query_tracer.snapshot()['slowest'][0]
+        assert entry['fingerprint'] == "SELECT id FROM users WHERE id = ?"
+        assert entry['rows'] == 1 and entry['params'] == 1
+
+
+class TestQueryTraceEndpoints:
+    """Tests for dumping the trace from server.py and the action server"""
+
+    def setup_method(self):
+        query_tracer.reset()
+        query_tracer.record("SELECT * FROM appointments WHERE id = %s", (1,), rows=1, execute=0.01)
+
+    def test_server_admin_endpoint(self):
+        import server
+        server.app.config['TESTING'] = True
+        with server.app.test_client() as client:
+            with patch.dict(server.ADMIN_CONFIG, {'endpoints': False}):
+                assert client.get('/api/admin/db-queries').status_code == 404
+                assert client.delete('/api/admin/db-queries').status_code == 404
+            assert query_tracer.snapshot()['queries'] == 1
+
+            with patch.dict(server.ADMIN_CONFIG, {'endpoints': True}):
+                response = client.get('/api/admin/db-queries?limit=5')
+                assert response.status_code == 200
+                assert response.get_json()['fingerprints'][0]['calls'] == 1
+                assert client.get('/api/admin/db-queries?limit=x').status_code == 400
+
+                assert client.delete('/api/admin/db-queries').status_code == 200
+                assert client.get('/api/admin/db-queries').get_json()['queries'] == 0
+
+    def test_action_server_endpoint(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/queries"
+        try:
+            with urllib.request.urlopen(url) as response:
+                assert json.loads(response.read())['slowest'][0]['rows'] == 1
+            with patch.dict(METRICS_CONFIG, {'host': '127.0.0.1', 'allow_delete': True}):
+                urllib.request.urlopen(urllib.request.Request(url, method='DELETE')).read()
+            with urllib.request.urlopen(url) as response:
+                assert json.loads(response.read())['queries'] == 0
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,242 @@
+from datetime import date, datetime
+import threading
+from contextlib import contextmanager
+import pytest
+from unittest.mock import patch
+import server
+from actions.db_connect import WriteResult
+from actions.response_cache import DATA_VERSION_QUERY, ResponseCache, bump_data_versions
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeDashboardDb:
+    """users, appointments and medical_records behind the dashboard endpoints"""
+
+    def __init__(self):
+        self.versions = {'1': 0, '2': 0}
+        self.appointments = [{'id': 10, 'user_id': '1', 'appointment_date': datetime(2030, 6, 11, 9, 0)}]
+        self.records = [{'id': 20, 'patient_id': '1', 'record_date': date(2030, 1, 2),
+                         'created_at': datetime(2030, 1, 2, 8, 0)}]
+        self.page_queries = 0
+        self.transactions = []
+
+    @contextmanager
+    def transaction(self):
+        statements = []
+        self.transactions.append(statements)
+
+        class Transaction:
+            def execute_query(tx, query, params=None, fetch=True):
+                statements.append(' '.join(query.split()))
+                return self.execute_query(query, params, fetch)
+
+        yield Transaction()
+
+    def execute_query(self, query, params=None, fetch=True):
+        query = ' '.join(query.split())
+        if query == DATA_VERSION_QUERY:
+            user_id = str(params[0])
+            return [{'data_version': self.versions[user_id]}] if user_id in self.versions else []
+        if query.startswith("UPDATE users SET data_version"):
+            for user_id in params:
+                self.versions[str(user_id)] += 1
+            return WriteResult(None, len(params))
+        if query.startswith("SELECT a.*"):
+            self.page_queries += 1
+            return [row for row in self.appointments if row['user_id'] == params[0]]
+        if query.startswith("SELECT mr.*"):
+            self.page_queries += 1
+            return [row for row in self.records if row['patient_id'] == params[0]]
+        if query.startswith("INSERT INTO appointments"):
+            self.appointments.append({'id': 11, 'user_id': str(params[0]), 'appointment_date': params[2]})
+            return WriteResult(11, 1)
+        if query.startswith("SELECT user_id FROM appointments WHERE id = %s FOR UPDATE"):
+            return [{'user_id': row['user_id']} for row in self.appointments if row['id'] == params[0]]
+        if query.startswith("DELETE FROM appointments"):
+            before = len(self.appointments)
+            self.appointments = [row for row in self.appointments if row['id'] != params[0]]
+            return WriteResult(None, before - len(self.appointments))
+        if query.startswith("SELECT patient_id FROM medical_records WHERE id = %s FOR UPDATE"):
+            return [{'patient_id': row['patient_id']} for row in self.records if row['id'] == params[0]]
+        if query.startswith("DELETE FROM medical_records"):
+            before = len(self.records)
+            self.records = [row for row in self.records if row['id'] != params[0]]
+            return WriteResult(None, before - len(self.records))
+        raise AssertionError(f"Unexpected query: {query}")
+
+
+class TestResponseCache:
+    """Tests for the version-stamped LRU"""
+
+    def setup_method(self):
+        self.clock = FakeClock()
+        self.cache = ResponseCache(capacity=2, ttl=60, clock=self.clock)
+
+    def test_entry_is_valid_for_its_version(self):
+        stored = self.cache.put(('appointments', '1', None, None), 3, b'{"items": []}')
+
+        assert self.cache.get(('appointments', '1', None, None), 3) == stored
+        assert self.cache.get(('appointments', '1', None, None), 4) is None
+        assert self.cache.stats()['hits'] == 1 and self.cache.stats()['misses'] == 1
+
+    def test_entries_expire(self):
+        self.cache.put(('records', '1', None, None), 0, b'{}')
+        self.clock.now += 60
+        assert self.cache.get(('records', '1', None, None), 0) is None
+
+    def test_capacity_and_invalidation(self):
+        for key in [('appointments', '1', None, None), ('records', '1', None, None), ('records', '2', None, None)]:
+            self.cache.put(key, 0, b'{}')
+        assert self.cache.stats()['entries'] == 2
+
+        self.cache.invalidate(2)
+        assert self.cache.get(('records', '2', None, None), 0) is None
+        assert self.cache.get(('records', '1', None, None), 0) is not None
+
+    def test_etag_follows_the_body(self):
+        first = self.cache.put(('records', '1', None, None), 0, b'{"items": [1]}')
+        second = self.cache.put(('records', '1', None, None), 1, b'{"items": [1]}')
+        third = self.cache.put(('records', '1', None, None), 2, b'{"items": [2]}')
+        assert first.etag == second.etag != third.etag
+
+    def test_counters_are_exact_under_threads(self):
+        self.cache.put(('records', '1', None, None), 0, b'{}')
+
+        def read():
+            for version in range(1000):
+                self.cache.get(('records', '1', None, None), version % 2)
+
+        threads = [threading.Thread(target=read) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert self.cache.stats()['hits'] == self.cache.stats()['misses'] == 4000
+
+    def test_bump_statement(self):
+        assert bump_data_versions([4, 5, 4]) == (
+            "UPDATE users SET data_version = data_version + 1 WHERE id IN (%s, %s)", [4, 5]
+        )
+
+
+@pytest.fixture
+def dashboard():
+    server.app.config['TESTING'] = True
+    server.response_cache.invalidate()
+    db = FakeDashboardDb()
+    with patch.object(server, 'db_manager', db), server.app.test_client() as client:
+        yield client, db
+
+
+class TestDashboardEndpoints:
+    """GET /api/appointments and /api/records per user, served from the cache"""
+
+    @pytest.mark.parametrize('path', ['/api/appointments?user_id=1', '/api/records?user_id=1'])
+    def test_repeated_request_is_served_from_cache(self, dashboard, path):
+        client, db = dashboard
+        first = client.get(path)
+        second = client.get(path)
+
+        assert first.status_code == second.status_code == 200
+        assert first.get_json() == second.get_json() and len(first.get_json()['items']) == 1
+        assert first.headers['ETag'] == second.headers['ETag']
+        assert first.headers['Cache-Control'] == 'private, no-cache'
+        assert db.page_queries == 1
+
+    def test_matching_etag_gets_304(self, dashboard):
+        client, db = dashboard
+        etag = client.get('/api/appointments?user_id=1').headers['ETag']
+
+        response = client.get('/api/appointments?user_id=1', headers={'If-None-Match': etag})
+
+        assert response.status_code == 304
+        assert response.data == b''
+        assert db.page_queries == 1
+
+    def test_pages_are_cached_separately(self, dashboard):
+        client, db = dashboard
+        client.get('/api/appointments?user_id=1')
+        client.get('/api/appointments?user_id=1&limit=5')
+        client.get('/api/appointments?user_id=2')
+        assert db.page_queries == 3
+
+    def test_post_invalidates(self, dashboard):
+        client, db = dashboard
+        etag = client.get('/api/appointments?user_id=1').headers['ETag']
+
+        response = client.post('/api/appointments', json={
+            'user_id': '1', 'doctor_id': 3, 'appointment_date': '2030-06-12 10:00', 'reason': 'checkup'
+        })
+        assert response.status_code == 201
+        assert db.versions['1'] == 1
+
+        response = client.get('/api/appointments?user_id=1', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert [item['id'] for item in response.get_json()['items']] == [10, 11]
+
+    @pytest.mark.parametrize('start, message', [
+        ('2030-06-12 10:15', 'every 30 minutes'),
+        ('2030-06-12 10:00:30', 'every 30 minutes'),
+        ('next week', 'YYYY-MM-DD HH:MM'),
+    ])
+    def test_post_rejects_starts_off_the_slot_grid(self, dashboard, start, message):
+        client, db = dashboard
+        response = client.post('/api/appointments', json={
+            'user_id': '1', 'doctor_id': 3, 'appointment_date': start, 'reason': 'checkup'
+        })
+        assert response.status_code == 400 and message in response.get_json()['error']
+        assert len(db.appointments) == 1 and db.versions['1'] == 0
+
+    def test_deletes_invalidate_the_owner(self, dashboard):
+        client, db = dashboard
+        client.get('/api/appointments?user_id=1')
+        client.get('/api/records?user_id=1')
+
+        assert client.delete('/api/appointments/10').status_code == 200
+        assert client.delete('/api/records/20').status_code == 200
+        assert client.delete('/api/records/20').status_code == 404
+
+        # Each delete reads its owner under a row lock in the same transaction
+        assert [len(statements) for statements in db.transactions] == [2, 2, 1]
+        assert all(statements[0].endswith("FOR UPDATE") for statements in db.transactions)
+        assert db.versions == {'1': 2, '2': 0}
+        assert client.get('/api/appointments?user_id=1').get_json()['items'] == []
+        assert client.get('/api/records?user_id=1').get_json()['items'] == []
+
+    def test_write_from_another_process_is_seen(self, dashboard):
+        client, db = dashboard
+        client.get('/api/appointments?user_id=1')
+        # The action server cancelled the appointment and bumped the version
+        db.appointments = []
+        db.versions['1'] += 1
+
+        assert client.get('/api/appointments?user_id=1').get_json()['items'] == []
+
+    def test_unknown_user_is_not_cached(self, dashboard):
+        client, db = dashboard
+        client.get('/api/appointments?user_id=99')
+        response = client.get('/api/appointments?user_id=99')
+
+        assert response.status_code == 200 and 'ETag' not in response.headers
+        assert server.response_cache.stats()['entries'] == 0
+
+    def test_admin_endpoint(self, dashboard):
+        client, _ = dashboard
+        client.get('/api/records?user_id=1')
+        with patch.dict(server.ADMIN_CONFIG, {'endpoints': False}):
+            assert client.get('/api/admin/response-cache').status_code == 404
+            assert client.delete('/api/admin/response-cache').status_code == 404
+        assert server.response_cache.stats()['entries'] == 1
+
+        with patch.dict(server.ADMIN_CONFIG, {'endpoints': True}):
+            assert client.get('/api/admin/response-cache').get_json()['entries'] == 1
+            assert client.delete('/api/admin/response-cache').status_code == 200
+            assert client.get('/api/admin/response-cache').get_json()['entries'] == 0
+
@@ -0,0 +1,410 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+import server
+from actions.db_connect import WriteResult
+from actions.response_cache import DATA_VERSION_QUERY
+
+
+class FakePagedDb:
+    """Serves rows through the keyset queries built by fetch_page"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def execute_query(self, query, params=None):
+        if query == DATA_VERSION_QUERY:
+            return [{'data_version': 0}]
+        self.queries.append((query, list(params or [])))
+        return list(self.rows[:params[-1]])
+
+
+@pytest.fixture
+def client():
+    server.app.config['TESTING'] = True
+    server.response_cache.invalidate()
+    with server.app.test_client() as client:
+        yield client
+
+
+class TestCursorHelpers:
+    """Tests for cursor encoding and keyset conditions"""
+
+    def test_cursor_round_trip(self):
+        cursor = server.encode_cursor([datetime(2024, 5, 1, 9, 30), 42])
+        assert server.decode_cursor(cursor) == ['2024-05-01 09:30:00', 42]
+
+    def test_invalid_cursor_rejected(self):
+        with pytest.raises(ValueError):
+            server.decode_cursor('not-a-cursor!')
+
+    def test_keyset_condition_expands_tuple_comparison(self):
+        condition, params = server.keyset_condition(['a.appointment_date', 'a.id'], ['2024-05-01', 7])
+        assert condition == "((a.appointment_date < %s) OR (a.appointment_date = %s AND a.id < %s))"
+        assert params == ['2024-05-01', '2024-05-01', 7]
+
+    def test_ascending_keyset_condition(self):
+        condition, params = server.keyset_condition(['id'], [10], descending=False)
+        assert condition == "((id > %s))"
+        assert params == [10]
+
+
+class TestPaginatedEndpoints:
+    """Tests for limit/cursor pagination on the list endpoints"""
+
+    def test_appointments_first_page(self, client):
+        rows = [{'id': i, 'appointment_date': datetime(2024, 5, 10 - i, 9, 0), 'user_id': 1}
+                for i in range(1, 5)]
+        db = FakePagedDb(rows)
+        with patch.object(server, 'db_manager', db):
+            response = client.get('/api/appointments?user_id=1&limit=3')
+
+        assert response.status_code == 200
+        page = response.get_json()
+        assert [item['id'] for item in page['items']] == [1, 2, 3]
+        assert page['limit'] == 3
+        assert server.decode_cursor(page['next_cursor']) == ['2024-05-07 09:00:00', 3]
+
+        query, params = db.queries[0]
+        assert "WHERE a.user_id = %s" in query
+        assert "ORDER BY a.appointment_date DESC, a.id DESC" in query
+        assert params == ['1', 4]
+
+    def test_last_page_has_no_cursor(self, client):
+        db = FakePagedDb([{'id': 1, 'appointment_date': datetime(2024, 5, 1)}])
+        with patch.object(server, 'db_manager', db):
+            page = client.get('/api/appointments').get_json()
+
+        assert len(page['items']) == 1
+        assert page['next_cursor'] is None
+        assert page['limit'] == server.DEFAULT_PAGE_SIZE
+
+    def test_cursor_is_applied_to_query(self, client):
+        db = FakePagedDb([])
+        cursor = server.encode_cursor(['2024-05-01', '2024-05-01 10:00:00', 9])
+        with patch.object(server, 'db_manager', db):
+            response = client.get(f'/api/records?user_id=2&cursor={cursor}')
+
+        assert response.status_code == 200
+        query, params = db.queries[0]
+        assert "mr.patient_id = %s" in query
+        assert "ORDER BY mr.record_date DESC, mr.created_at DESC, mr.id DESC" in query
+        assert params[0] == '2'
+        assert params[-1] == server.DEFAULT_PAGE_SIZE + 1
+
+    def test_patients_page_in_id_order(self, client):
+        db = FakePagedDb([{'id': 1}, {'id': 2}, {'id': 3}])
+        with patch.object(server, 'db_manager', db):
+            page = client.get('/api/patients?limit=2').get_json()
+
+        assert [item['id'] for item in page['items']] == [1, 2]
+        assert server.decode_cursor(page['next_cursor']) == [2]
+        assert "ORDER BY id ASC" in db.queries[0][0]
+
+    def test_limit_is_capped(self, client):
+        db = FakePagedDb([])
+        with patch.object(server, 'db_manager', db):
+            page = client.get('/api/patients?limit=100000').get_json()
+
+        assert page['limit'] == server.MAX_PAGE_SIZE
+        assert db.queries[0][1][-1] == server.MAX_PAGE_SIZE + 1
+
+    @pytest.mark.parametrize('query_string', ['limit=abc', 'limit=0', 'cursor=%%%'])
+    def test_invalid_page_arguments(self, client, query_string):
+        db = FakePagedDb([])
+        with patch.object(server, 'db_manager', db):
+            response = client.get(f'/api/appointments?{query_string}')
+
+        assert response.status_code == 400
+        assert db.queries == []
+
+    def test_cursor_from_other_endpoint_rejected(self, client):
+        db = FakePagedDb([])
+        cursor = server.encode_cursor([5])
+        with patch.object(server, 'db_manager', db):
+            response = client.get(f'/api/records?cursor={cursor}')
+
+        assert response.status_code == 400
+
+
+class FakeStreamingDb:
+    """Yields rows lazily like DatabaseManager.stream_query"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+        self.closed = False
+
+    def stream_query(self, query, params=None):
+        self.queries.append((query, list(params or [])))
+        try:
+            yield from self.rows
+        finally:
+            self.closed = True
+
+
+class TestStreamingExport:
+    """Tests for the NDJSON export endpoints"""
+
+    def test_appointments_export_streams_ndjson(self, client):
+        db = FakeStreamingDb([{'id': 2, 'status': 'scheduled'}, {'id': 1, 'status': 'cancelled'}])
+        with patch.object(server, 'db_manager', db):
+            response = client.get('/api/appointments/export')
+            lines = response.get_data(as_text=True).splitlines()
+
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        assert [json.loads(line)['id'] for line in lines] == [2, 1]
+        assert db.closed
+        assert "ORDER BY a.appointment_date DESC, a.id DESC" in db.queries[0][0]
+
+    def test_records_export_filters_by_user(self, client):
+        db = FakeStreamingDb([])
+        with patch.object(server, 'db_manager', db):
+            response = client.get('/api/records/export?user_id=3')
+
+        assert response.status_code == 200
+        assert response.get_data(as_text=True) == ''
+        query, params = db.queries[0]
+        assert "WHERE mr.patient_id = %s" in query
+        assert params == ['3']
+
+    def test_export_error_before_first_row(self, client):
+        class FailingDb:
+            def stream_query(self, query, params=None):
+                raise Exception("Database error: connection refused")
+                yield
+
+        with patch.object(server, 'db_manager', FailingDb()):
+            response = client.get('/api/appointments/export')
+
+        assert response.status_code == 500
+        assert 'connection refused' in response.get_json()['error']
+
+
+class TestServeOptions:
+    """Tests for the production entry point settings"""
+
+    def test_gunicorn_options_from_args(self):
+        import serve
+        args = serve.parse_args(['--server', 'gunicorn', '--workers', '4', '--threads', '8',
+                                 '--keepalive', '10', '--log-level', 'debug'])
+        options = serve.gunicorn_options(args)
+
+        assert options['bind'] == '127.0.0.1:5000'
+        assert options['workers'] == 4
+        assert options['worker_class'] == 'gthread'
+        assert options['threads'] == 8
+        assert options['keepalive'] == 10
+        assert options['loglevel'] == 'debug'
+
+    def test_settings_from_environment(self, monkeypatch):
+        import serve
+        monkeypatch.setenv('SERVER_THREADS', '6')
+        monkeypatch.setenv('LOG_LEVEL', 'WARNING')
+        args = serve.parse_args(['--server', 'waitress'])
+
+        assert args.threads == 6
+        assert args.log_level == 'warning'
+        assert serve.waitress_options(args)['threads'] == 6
+
+    def test_settings_from_dotenv_file(self, tmp_path):
+        """Test that SERVER_* and LOG_LEVEL in .env are read before the option defaults"""
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        shutil.copy(os.path.join(root, 'serve.py'), tmp_path / 'serve.py')
+        (tmp_path / '.env').write_text("SERVER_WORKERS=7\nLOG_LEVEL=warning\n")
+        env = {name: value for name, value in os.environ.items()
+               if not name.startswith('SERVER_') and name != 'LOG_LEVEL'}
+
+        output = subprocess.run(
+            [sys.executable, '-c', "import serve; args = serve.parse_args([]); print(args.workers, args.log_level)"],
+            cwd=tmp_path, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        assert output.split() == ['7', 'warning']
+
+    def test_session_secret_from_dotenv_file(self, tmp_path, monkeypatch, caplog):
+        """Test that a SESSION_SECRET set in .env is kept, not replaced by a generated key"""
+        import serve
+        env_file = tmp_path / '.env'
+        env_file.write_text("SESSION_SECRET=fromdotenv\n")
+        monkeypatch.setattr(serve, 'ENV_FILE', str(env_file))
+        monkeypatch.delenv('SESSION_SECRET', raising=False)
+        monkeypatch.setenv('LOG_LEVEL', 'INFO')
+
+        with patch.object(serve, 'run_gunicorn') as run_gunicorn, patch.object(serve, 'check_pool_size'), \
+                caplog.at_level('WARNING', logger='serve'):
+            serve.main(['--server', 'gunicorn'])
+
+        run_gunicorn.assert_called_once()
+        assert os.environ['SESSION_SECRET'] == 'fromdotenv'
+        assert 'SESSION_SECRET is not set' not in caplog.text
+
+
+class FakeUserDb:
+    """Single-user table for the login endpoint"""
+
+    def __init__(self, password):
+        self.user = {'id': 7, 'first_name': 'Ana', 'last_name': 'Pop', 'email': 'ana@example.com',
+                     'password': password}
+        self.updates = []
+
+    def execute_query(self, query, params=None, fetch=True):
+        if query.strip().startswith('UPDATE'):
+            self.updates.append(params)
+            self.user['password'] = params[0]
+            return WriteResult(None, 1)
+        return [dict(self.user)] if params[0] == self.user['email'] else []
+
+
+class TestLogin:
+    """Tests for password verification and rehashing at login"""
+
+    @pytest.fixture(autouse=True)
+    def cheap_hasher(self):
+        from actions.password_hasher import (
+            PasswordContext, PlaintextHasher, ScryptHasher, Sha256Hasher, VerificationPool
+        )
+        context = PasswordContext(ScryptHasher(n=2 ** 4, r=1), legacy=(Sha256Hasher(), PlaintextHasher()))
+        pool = VerificationPool(workers=1, max_pending=4)
+        with patch.object(server, 'password_context', context), patch.object(server, 'verification_pool', pool):
+            yield context
+        pool.shutdown()
+
+    def login(self, client, db, password, email='ana@example.com'):
+        with patch.object(server, 'db_manager', db):
+            return client.post('/api/login', json={'email': email, 'password': password})
+
+    def test_legacy_plaintext_is_rehashed(self, client, cheap_hasher):
+        db = FakeUserDb('s3cret!')
+        response = self.login(client, db, 's3cret!')
+
+        assert response.status_code == 200
+        new_hash, user_id, old_hash = db.updates[0]
+        assert user_id == 7 and old_hash == 's3cret!'
+        assert cheap_hasher.verify('s3cret!', new_hash)
+
+        # Second login uses the new hash and does not write again
+        assert self.login(client, db, 's3cret!').status_code == 200
+        assert len(db.updates) == 1
+
+    def test_wrong_password_and_unknown_email(self, client):
+        db = FakeUserDb('s3cret!')
+        assert self.login(client, db, 'wrong').status_code == 401
+        assert self.login(client, db, 's3cret!', email='nobody@example.com').status_code == 401
+        assert db.updates == []
+
+    def test_busy_hasher_returns_503(self, client):
+        from actions.password_hasher import HasherBusyError
+        db = FakeUserDb('s3cret!')
+        with patch.object(server.verification_pool, 'run', side_effect=HasherBusyError()):
+            response = self.login(client, db, 's3cret!')
+
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
+
+
+class FakeSessionDb:
+    """users + revoked_sessions for the session endpoints"""
+
+    def __init__(self):
+        self.users = {7: {'id': 7, 'first_name': 'Ana', 'last_name': 'Pop', 'email': 'ana@example.com'}}
+        self.revoked = set()
+        self.queries = []
+
+    def execute_query(self, query, params=None, fetch=True):
+        self.queries.append(query)
+        if 'INSERT IGNORE INTO revoked_sessions' in query:
+            self.revoked.add(params[0])
+            return WriteResult(None, 1)
+        if query.strip().startswith('DELETE FROM users'):
+            self.users.pop(params[0], None)
+            return WriteResult(None, 1)
+        if query.strip().startswith('DELETE'):
+            return WriteResult(None, 0)
+        user = self.users.get(params[1])
+        return [dict(user, revoked=params[0] in self.revoked)] if user else []
+
+
+class TestSessions:
+    """Tests for signed session tokens on validate-session/logout"""
+
+    USER = {'id': 7, 'name': 'Ana Pop', 'email': 'ana@example.com'}
+
+    @pytest.fixture(autouse=True)
+    def sessions(self):
+        from actions.session_tokens import SessionManager
+        manager = SessionManager(b'test-secret')
+        db = FakeSessionDb()
+        with patch.object(server, 'session_manager', manager), patch.object(server, 'db_manager', db):
+            yield manager, db
+
+    def validate(self, client, token, user_id=7):
+        return client.post('/api/validate-session', json={'user_id': user_id, 'token': token})
+
+    def test_recent_session_needs_no_query(self, client, sessions):
+        manager, db = sessions
+        token = manager.issue(self.USER)
+
+        response = self.validate(client, token)
+
+        assert response.status_code == 200
+        assert response.get_json()['user'] == self.USER
+        assert db.queries == []
+
+    def test_cache_miss_checks_database_once(self, client, sessions):
+        manager, db = sessions
+        from actions.session_tokens import SessionManager
+        token = SessionManager(b'test-secret').issue(self.USER)
+
+        assert self.validate(client, token).status_code == 200
+        assert self.validate(client, token).status_code == 200
+        assert len(db.queries) == 1
+
+    def test_forged_and_mismatched_tokens(self, client, sessions):
+        manager, _ = sessions
+        assert self.validate(client, 'dummy_token').status_code == 401
+        assert self.validate(client, manager.issue(self.USER), user_id=8).status_code == 401
+
+    def test_logout_revokes_token(self, client, sessions):
+        manager, db = sessions
+        token = manager.issue(self.USER)
+
+        assert client.post('/api/logout', json={'token': token}).status_code == 200
+        assert self.validate(client, token).status_code == 401
+        assert len(db.revoked) == 1
+
+    def test_logout_seen_by_other_process(self, client, sessions):
+        from actions.session_tokens import SessionManager
+        other = SessionManager(b'test-secret')
+        token = other.issue(self.USER)
+        # Revoked in the database by another process; this one has no cache entry
+        sessions[1].revoked.add(other.decode(token)['sid'])
+
+        assert self.validate(client, token).status_code == 401
+
+    def test_delete_user_invalidates_sessions(self, client, sessions):
+        manager, _ = sessions
+        token = manager.issue(self.USER)
+
+        assert client.delete('/api/users/7').status_code == 200
+        assert self.validate(client, token).status_code == 401
+
+
+class TestAdminEndpoints:
+    """The unauthenticated diagnostics are off unless ADMIN_ENDPOINTS=1"""
+
+    def test_pool_stats_are_hidden_by_default(self, client):
+        with patch.dict(server.ADMIN_CONFIG, {'endpoints': False}):
+            assert client.get('/api/admin/db-pool').status_code == 404
+
+    def test_pool_stats_when_enabled(self, client):
+        with patch.dict(server.ADMIN_CONFIG, {'endpoints': True}), \
+                patch.object(server.db_manager, 'pool_stats', return_value={'in_use': 0}):
+            response = client.get('/api/admin/db-pool')
+        assert response.status_code == 200 and response.get_json() == {'in_use': 0}
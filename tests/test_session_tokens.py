@@ -0,0 +1,118 @@
+import pytest
+from actions.session_tokens import InvalidTokenError, LRUCache, SessionManager
+
+
+class FakeClock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+USER = {'id': 7, 'name': 'Ana Pop', 'email': 'ana@example.com'}
+
+
+def make_manager(clock=None, **kwargs):
+    options = {'ttl': 3600, 'cache_size': 100, 'recheck_interval': 60}
+    options.update(kwargs)
+    return SessionManager(b'test-secret', clock=clock or FakeClock(), **options)
+
+
+class TestSessionManager:
+    """Tests for signed tokens and the validated/revoked caches"""
+
+    def test_issued_token_validates_from_cache(self):
+        manager = make_manager()
+        token = manager.issue(USER)
+
+        claims, user = manager.validate(token)
+
+        assert claims['uid'] == 7
+        assert user == USER
+
+    def test_tampered_token_rejected(self):
+        manager = make_manager()
+        payload, signature = manager.issue(USER).split('.')
+
+        with pytest.raises(InvalidTokenError):
+            manager.validate(payload + '.' + signature[::-1])
+        with pytest.raises(InvalidTokenError):
+            SessionManager(b'other-secret').validate(payload + '.' + signature)
+        with pytest.raises(InvalidTokenError):
+            manager.validate('dummy_token')
+
+    def test_expired_token_rejected(self):
+        clock = FakeClock()
+        manager = make_manager(clock)
+        token = manager.issue(USER)
+
+        clock.now += 3601
+        with pytest.raises(InvalidTokenError, match="expired"):
+            manager.validate(token)
+
+    def test_stale_cache_entry_requires_recheck(self):
+        clock = FakeClock()
+        manager = make_manager(clock)
+        token = manager.issue(USER)
+
+        clock.now += 61
+        claims, user = manager.validate(token)
+        assert user is None
+
+        manager.mark_validated(claims, USER)
+        assert manager.validate(token)[1] == USER
+
+    def test_unknown_session_needs_database_check(self):
+        token = make_manager().issue(USER)
+        # Another process with the same secret has nothing cached
+        claims, user = make_manager().validate(token)
+        assert claims['uid'] == 7
+        assert user is None
+
+    def test_logout_revokes_only_that_session(self):
+        manager = make_manager()
+        first = manager.issue(USER)
+        second = manager.issue(USER)
+
+        manager.revoke(manager.decode(first))
+
+        with pytest.raises(InvalidTokenError, match="revoked"):
+            manager.validate(first)
+        assert manager.validate(second)[1] == USER
+
+    def test_revoke_user_invalidates_existing_tokens(self):
+        clock = FakeClock()
+        manager = make_manager(clock)
+        token = manager.issue(USER)
+
+        manager.revoke_user(7)
+
+        with pytest.raises(InvalidTokenError):
+            manager.validate(token)
+        assert manager.stats()['validated'] == 0
+
+        clock.now += 1
+        assert manager.validate(manager.issue(USER))[1] == USER
+
+
+class TestLRUCache:
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.get('c') == 3
+        assert (cache.hits, cache.misses) == (3, 1)
+
+    def test_invalid_value_is_a_miss(self):
+        cache = LRUCache(2)
+        cache.put('a', 1)
+
+        assert cache.get('a', valid=lambda value: value > 1) is None
+        assert cache.get('a', valid=lambda value: value == 1) == 1
+        assert (cache.hits, cache.misses) == (1, 1)
@@ -0,0 +1,70 @@
+import pytest
+from actions.specialty_resolver import SPECIALTIES, SpecialtyResolver, load_nlu_synonyms, specialty_resolver
+from benchmark_specialty_resolver import LEGACY_MAPPING
+
+
+class TestNluSynonyms:
+    """The resolver reads its phrases from the NLU training data"""
+
+    def test_specialty_synonyms_are_loaded(self):
+        synonyms = load_nlu_synonyms()
+        assert synonyms['pediatric cardiologist'] == 'Pediatric Cardiology'
+        assert synonyms['surgeon'] == 'Cardiovascular Surgery'
+        assert set(synonyms.values()) == set(SPECIALTIES)
+
+    def test_other_synonyms_are_ignored(self, tmp_path):
+        path = tmp_path / 'nlu.yml'
+        path.write_text(
+            'version: "3.1"\n'
+            'nlu:\n'
+            '- intent: greet\n'
+            '  examples: |\n'
+            '    - hello\n'
+            '- synonym: Pediatric Cardiology\n'
+            '  examples: |\n'
+            '    - kids heart doctor\n'
+            '- synonym: Dr. Smith\n'
+            '  examples: |\n'
+            '    - smith\n',
+            encoding='utf-8',
+        )
+        assert load_nlu_synonyms(str(path)) == {'kids heart doctor': 'Pediatric Cardiology'}
+
+    @pytest.mark.parametrize('phrase, specialty', LEGACY_MAPPING.items())
+    def test_every_former_mapping_still_resolves(self, phrase, specialty):
+        assert specialty_resolver.resolve(phrase) == specialty
+        assert specialty_resolver.resolve(None, f"show me {phrase} please") == specialty
+
+
+class TestMatching:
+    """Case-insensitive, plural-aware phrase matching"""
+
+    @pytest.mark.parametrize('slot, expected', [
+        ('Pediatric Cardiologists', 'Pediatric Cardiology'),
+        ('CARDIOVASCULAR  SURGERIES', 'Cardiovascular Surgery'),
+        ('adult cardiologies', 'Adult Cardiology'),
+        ('pediatric specialist', 'Pediatric Cardiology'),
+        ('Neurology', 'Neurology'),
+    ])
+    def test_slot_values(self, slot, expected):
+        assert specialty_resolver.resolve(slot) == expected
+
+    @pytest.mark.parametrize('message, expected', [
+        ("I need a pediatric cardiologist for my son", 'Pediatric Cardiology'),
+        ("Can you show me the heart SURGEONS?", 'Cardiovascular Surgery'),
+        ("my son needs a pediatric doctor, not an adult one", 'Pediatric Cardiology'),
+        ("I was told about adultery", None),
+        ("who can help with my blood pressure", None),
+    ])
+    def test_messages(self, message, expected):
+        assert specialty_resolver.resolve(None, message) == expected
+
+    def test_longest_phrase_wins(self):
+        resolver = SpecialtyResolver({'pediatric': 'Pediatric Cardiology',
+                                      'pediatric surgeon': 'Cardiovascular Surgery'})
+        assert resolver.match("a pediatric surgeon") == 'Cardiovascular Surgery'
+        assert resolver.match("a pediatric nurse") == 'Pediatric Cardiology'
+
+    def test_phrase_inside_a_word_is_skipped(self):
+        assert specialty_resolver.match("nonsurgeons and then a surgeon") == 'Cardiovascular Surgery'
+        assert specialty_resolver.match("nonsurgeons") is None